@@ -0,0 +1,275 @@
+"""
+Compile-Time Asset Resolution for Jinja2
+
+A Jinja2 extension that resolves `get_asset_url(...)` calls whose
+arguments are all string literals while the template compiles:
+
+    {{ get_asset_url('/static/logo.png', 'https://cdn.example.com/logo.png') }}
+
+compiles to the same code as the literal URL for the current environment,
+so rendering it costs nothing. Calls with any dynamic argument are left
+alone and resolved at render time through the `get_asset_url` global the
+extension installs. Compiled templates are dropped whenever the resolver
+config changes (see lib.assets.on_config_change), templates the
+application holds by reference (including `env.from_string()` ones)
+recompile on their next render, and bytecode cache keys include the
+config, so a cached template never serves another environment's URLs.
+
+Held templates refold through the template class the extension installs;
+templates created with an explicit `template_class=` argument keep their
+folded URLs until they are loaded again.
+
+Requires Jinja2 (pip install jinja2).
+
+Usage:
+    from jinja2 import Environment, FileSystemLoader
+    env = Environment(loader=FileSystemLoader('templates'), extensions=['lib.asset_jinja.AssetExtension'])
+
+License: MIT
+"""
+
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from jinja2 import BytecodeCache, Template
+    from jinja2.ext import Extension
+    from jinja2.lexer import Token, TokenStream
+except ImportError as exc:
+    raise ImportError("[AssetExtension] Jinja2 is required: pip install jinja2") from exc
+
+from .assets import AssetResolver, get_asset_url, on_config_change
+
+# Parameter names of get_asset_url(), in positional order
+_PARAMETERS = ('local_path', 'cdn_url', 'env_mode')
+
+
+class AssetExtension(Extension):
+    """
+    Constant-fold literal get_asset_url() calls at template compile time
+
+    Registers the `get_asset_url` global for dynamic calls, and treats
+    that name as reserved: templates should not rebind it. Attributes
+    added to the environment:
+
+    - `asset_folded`: number of calls folded so far (for tests and tuning)
+    - `asset_invalidate()`: recompile every template on its next use, e.g.
+      after changing something folded URLs depend on outside the resolver
+
+    Examples:
+        >>> env = Environment(extensions=[AssetExtension])
+        >>> env.from_string("{{ get_asset_url('/media/logo.png', 'https://cdn.example.com/logo.png') }}").render()
+        'https://cdn.example.com/logo.png'  # in production, with no call at render time
+    """
+
+    def __init__(self, environment: Any):
+        super().__init__(environment)
+        environment.globals.setdefault('get_asset_url', get_asset_url)
+        environment.extend(asset_folded=0, asset_invalidate=self.invalidate, asset_extension=self)
+        self.generation = 0  # Bumped by invalidate(); held templates compare against it
+        self._config_token: Optional[str] = None
+        self._compiling = threading.local()
+
+        if not issubclass(environment.template_class, _RefoldingTemplate):
+            base = environment.template_class
+            environment.template_class = type(base.__name__, (_RefoldingTemplate, base), {})
+        if environment.bytecode_cache is not None and not isinstance(environment.bytecode_cache, _ConfigKeyedBytecodeCache):
+            environment.bytecode_cache = _ConfigKeyedBytecodeCache(environment.bytecode_cache, self)
+        self._unsubscribe = on_config_change(self.invalidate)
+
+    def invalidate(self) -> None:
+        """Forget every compiled template; held ones recompile on their next render"""
+        self.generation += 1
+        self._config_token = None
+        if self.environment.cache is not None:
+            self.environment.cache.clear()
+
+    def preprocess(self, source: str, name: Optional[str], filename: Optional[str] = None) -> str:
+        """Remember the source of a from_string() template so it can be recompiled"""
+        if name is None:
+            self._compiling.source = source
+        return source
+
+    def take_source(self) -> Optional[str]:
+        """Source remembered by preprocess() for the template being created, once"""
+        source = getattr(self._compiling, 'source', None)
+        self._compiling.source = None
+        return source
+
+    def config_token(self) -> str:
+        """Short digest of everything folded URLs depend on (config and fingerprints)"""
+        token = self._config_token
+        if token is None:
+            resolver = AssetResolver.get_instance()
+            state = repr((resolver.config, sorted(resolver._digests.items())))
+            token = self._config_token = hashlib.sha256(state.encode()).hexdigest()[:16]
+        return token
+
+    def filter_stream(self, stream: TokenStream) -> Iterable[Token]:
+        """Replace foldable call token sequences with one string token"""
+        tokens = list(stream)
+        return _fold_calls(tokens, self.environment)
+
+
+def _fold_calls(tokens: List[Token], environment: Any) -> Iterator[Token]:
+    index = 0
+    count = len(tokens)
+    while index < count:
+        token = tokens[index]
+        if (
+            token.type == 'name'
+            and token.value == 'get_asset_url'
+            and index + 1 < count
+            and tokens[index + 1].type == 'lparen'
+            and (index == 0 or tokens[index - 1].type != 'dot')
+        ):
+            parsed = _literal_arguments(tokens, index + 2)
+            if parsed is not None:
+                arguments, end = parsed
+                url = _resolve(arguments)
+                if url is not None:
+                    environment.asset_folded += 1
+                    yield Token(token.lineno, 'string', url)
+                    index = end
+                    continue
+        yield token
+        index += 1
+
+
+def _literal_arguments(tokens: List[Token], index: int) -> Optional[Tuple[Dict[str, str], int]]:
+    """
+    Parse `'a', 'b', env_mode='c')` starting after the opening parenthesis
+
+    Returns:
+        (arguments by parameter name, index after the closing parenthesis),
+        or None if any argument is not a plain string literal
+    """
+    arguments: Dict[str, str] = {}
+    position = 0
+    count = len(tokens)
+    while index < count:
+        token = tokens[index]
+        if token.type == 'rparen':
+            return arguments, index + 1
+
+        if token.type == 'string':
+            # Keywords move `position` past the end, so this also rejects
+            # positional arguments after keyword ones
+            if position >= len(_PARAMETERS):
+                return None
+            arguments[_PARAMETERS[position]] = token.value
+            position += 1
+            index += 1
+        elif (
+            token.type == 'name'
+            and token.value in _PARAMETERS
+            and index + 2 < count
+            and tokens[index + 1].type == 'assign'
+            and tokens[index + 2].type == 'string'
+        ):
+            if token.value in arguments:
+                return None
+            arguments[token.value] = tokens[index + 2].value
+            position = len(_PARAMETERS)
+            index += 3
+        else:
+            return None
+
+        # Each argument is followed by a comma or the closing parenthesis
+        if index < count and tokens[index].type == 'comma':
+            index += 1
+        elif index >= count or tokens[index].type != 'rparen':
+            return None
+    return None
+
+
+def _resolve(arguments: Dict[str, str]) -> Optional[str]:
+    """Resolve now; None (leave the call for render time) if it would raise"""
+    if 'local_path' not in arguments or 'cdn_url' not in arguments:
+        return None
+    try:
+        return AssetResolver.get_instance().get_asset_url(
+            arguments['local_path'],
+            arguments['cdn_url'],
+            arguments.get('env_mode', 'cdn-production-local-dev'),
+        )
+    except ValueError:
+        return None
+
+
+class _RefoldingTemplate(Template):
+    """
+    Template that recompiles itself when rendered after a config change
+
+    Loader templates are fetched again by name; from_string() templates are
+    recompiled from the source captured while they compiled. The refold runs
+    under a per-template lock, and the generation is published last, so a
+    concurrent render never sees half of the swapped code.
+    """
+
+    _asset_generation = 0
+    _asset_source: Optional[str] = None
+    _asset_lock: Any = None
+
+    @classmethod
+    def _from_namespace(cls, environment: Any, namespace: Any, globals: Any) -> Template:
+        template = super()._from_namespace(environment, namespace, globals)
+        extension = getattr(environment, 'asset_extension', None)
+        if extension is not None:
+            template._asset_generation = extension.generation
+            template._asset_source = extension.take_source() if template.name is None else None
+            template._asset_lock = threading.Lock()
+        return template
+
+    def new_context(self, vars: Any = None, shared: bool = False, locals: Any = None) -> Any:
+        # Every render, stream and module path starts here
+        extension = getattr(self.environment, 'asset_extension', None)
+        if extension is not None and self._asset_generation != extension.generation:
+            self._refold(extension)
+        return super().new_context(vars, shared, locals)
+
+    def _refold(self, extension: AssetExtension) -> None:
+        """Take over the code of a fresh compile, keeping this template's globals and lock"""
+        with self._asset_lock:
+            # Another render may have refolded while this one waited
+            generation = extension.generation
+            if self._asset_generation == generation:
+                return
+            environment = self.environment
+            if self.name is not None and environment.loader is not None:
+                fresh = environment.get_template(self.name)
+            elif self._asset_source is not None:
+                fresh = environment.from_string(self._asset_source, template_class=type(self))
+            else:
+                self._asset_generation = generation
+                return
+
+            code = dict(fresh.__dict__)
+            for key in ('globals', '_asset_lock', '_asset_generation'):
+                code.pop(key, None)
+            self.__dict__.update(code)
+            self._asset_generation = fresh._asset_generation
+
+
+class _ConfigKeyedBytecodeCache(BytecodeCache):
+    """Wraps a bytecode cache so entries are keyed by the resolver config too"""
+
+    def __init__(self, inner: BytecodeCache, extension: AssetExtension):
+        self.inner = inner
+        self.extension = extension
+
+    def get_cache_key(self, name: str, filename: Optional[str] = None) -> str:
+        return f'{self.inner.get_cache_key(name, filename)}-assets-{self.extension.config_token()}'
+
+    def load_bytecode(self, bucket: Any) -> None:
+        self.inner.load_bytecode(bucket)
+
+    def dump_bytecode(self, bucket: Any) -> None:
+        self.inner.dump_bytecode(bucket)
+
+    def clear(self) -> None:
+        self.inner.clear()
+
+
+__all__ = ['AssetExtension']
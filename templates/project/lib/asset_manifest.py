@@ -0,0 +1,638 @@
+"""
+Fast Manifest Generator
+
+Python counterpart of scripts/sync/generate-project-manifest.sh and
+generate-cdn-manifest.sh. Writes `.r2-manifest.yml` per
+sync/manifests/schema.yml without spawning processes per file:
+- Image dimensions read from file headers (PNG, JPEG, GIF, WebP, SVG);
+  no ImageMagick
+- SHA256 computed in parallel; digests cached by asset_verify are reused
+  for files whose (size, mtime, inode) is unchanged
+- Incremental: files whose content is unchanged keep their previous
+  entry verbatim, and hand-edited fields (devices, description, env_mode,
+  sync) survive content changes
+- Deterministic output: sorted by path, fixed key order, no generation
+  timestamp in the header, and `updated` only bumped when an asset
+  changed, so git diffs show real changes only
+
+Usage:
+    python -m lib.asset_manifest my-project                  # project manifest in .
+    python -m lib.asset_manifest my-project --root ~/dev/app
+    python -m lib.asset_manifest --cdn ~/media/cdn           # central library manifest
+
+License: MIT
+"""
+
+import argparse
+import json
+import mimetypes
+import os
+import re
+import struct
+import sys
+import time
+from collections import namedtuple
+from typing import IO, Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .asset_verify import DigestCache, digest_cache_path_for, hash_files, manifest_entries
+
+MANIFEST_NAME = '.r2-manifest.yml'
+MANIFEST_VERSION = '1.1'
+
+# Same defaults as the shell generators
+ASSET_DIRS = ('public/media', 'data', 'public/images', 'assets')
+DEFAULT_CDN_DIR = '~/media/cdn'
+CDN_BASE_URL = 'https://cdn.adlimen.com'
+CDN_R2_PREFIX = 'media-cdn'
+MANUAL_SYNC_SIZE = 100 * 1024 * 1024
+MANUAL_SYNC_MODEL_SIZE = 50 * 1024 * 1024
+
+# Schema order; unknown fields follow in alphabetical order
+FIELD_ORDER = (
+    'path', 'source', 'r2_key', 'cdn_url', 'size', 'sha256', 'type', 'modified',
+    'dimensions', 'env_mode', 'sync', 'devices', 'description',
+)
+
+# Fields people edit by hand; kept from the previous manifest when a file changes
+PRESERVED_FIELDS = ('env_mode', 'sync', 'devices', 'description')
+
+MODEL_EXTENSIONS = frozenset(('.bin', '.gguf', '.safetensors', '.weights', '.pt', '.h5', '.onnx'))
+DATASET_EXTENSIONS = frozenset(('.tar', '.gz', '.tgz', '.zip', '.parquet'))
+DOCUMENT_MIME_TYPES = frozenset(('application/pdf', 'application/msword'))
+
+# Bytes read to identify a file and parse fixed-offset image headers; SVG
+# root elements may follow long comments, so SVGs get a larger window
+HEADER_SIZE = 64
+SVG_HEADER_SIZE = 64 * 1024
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# JPEG start-of-frame markers (all except DHT, JPG and DAC)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+_SVG_ROOT_RE = re.compile(rb'<svg\b[^>]*>', re.IGNORECASE)
+_SVG_LENGTH_RE = {
+    name: re.compile(rb'\s' + name + rb'\s*=\s*["\']\s*([0-9]*\.?[0-9]+)\s*(px)?\s*["\']')
+    for name in (b'width', b'height')
+}
+_SVG_VIEWBOX_RE = re.compile(
+    rb'\sviewBox\s*=\s*["\']\s*[-+0-9.eE]+[\s,]+[-+0-9.eE]+[\s,]+([0-9]*\.?[0-9]+)[\s,]+([0-9]*\.?[0-9]+)'
+)
+
+# Plain YAML scalars that need no quoting, and plain-looking ones YAML would
+# read as something other than a string
+_PLAIN_RE = re.compile(r'[A-Za-z0-9_./~+][A-Za-z0-9_./~+:%=@()\-]*(?: [A-Za-z0-9_./~+:%=@()\-]+)*')
+_AMBIGUOUS_RE = re.compile(
+    r'(?i:y|n|yes|no|true|false|on|off|null|~)'
+    r'|[-+]?(?:[0-9][0-9_]*(?:\.[0-9_]*)?(?:[eE][-+]?[0-9]+)?|\.[0-9]+|(?i:\.inf|\.nan))'
+    r'|0[xob][0-9a-fA-F_]+'
+    r'|[0-9]+(?::[0-9]+)+(?:\.[0-9]*)?'
+    r'|[0-9]{4}-[0-9]{1,2}-[0-9]{1,2}.*'
+)
+
+# `updated` and `modified` are written as plain YAML timestamps, like the shell generators
+_TIMESTAMP_RE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}Z')
+TIMESTAMP_FIELDS = frozenset(('updated', 'modified'))
+
+ADDED = 'added'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+
+# What changed relative to the previous manifest; `hashed` counts files that
+# had to be read in full (the rest came from the digest cache)
+ManifestChanges = namedtuple('ManifestChanges', ['added', 'changed', 'unchanged', 'removed', 'hashed', 'errors'])
+
+
+# ============================================================================
+# Header-only image dimensions
+# ============================================================================
+
+def image_dimensions(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Read an image's pixel dimensions from its header
+
+    Only the first bytes are read (JPEG: marker segments are skipped with
+    seeks until the frame header), so this costs about one small read per
+    file regardless of image size.
+
+    Args:
+        path: Image file
+
+    Returns:
+        (width, height), or None for unreadable or unsupported files
+
+    Examples:
+        >>> image_dimensions('public/media/logo.png')
+        (512, 512)
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(HEADER_SIZE)
+            return _dimensions(f, head, path)
+    except (OSError, struct.error, ValueError):
+        return None
+
+
+def _dimensions(f: IO[bytes], head: bytes, path: str) -> Optional[Tuple[int, int]]:
+    if head.startswith(PNG_SIGNATURE) and head[12:16] in (b'IHDR', b'CgBI'):
+        if head[12:16] == b'CgBI':
+            # Apple-optimized PNG: IHDR follows the CgBI chunk
+            return struct.unpack('>II', head[32:40])
+        return struct.unpack('>II', head[16:24])
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', head[6:10])
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return _webp_dimensions(head)
+    if head[:2] == b'\xff\xd8':
+        return _jpeg_dimensions(f)
+    if path.lower().endswith('.svg') or head.lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'<'):
+        return _svg_dimensions(head + f.read(SVG_HEADER_SIZE - len(head)))
+    return None
+
+
+def _webp_dimensions(head: bytes) -> Optional[Tuple[int, int]]:
+    chunk = head[12:16]
+    if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and head[20] == 0x2F:
+        bits = int.from_bytes(head[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+    return None
+
+
+def _jpeg_dimensions(f: IO[bytes]) -> Optional[Tuple[int, int]]:
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:
+            # Standalone markers carry no length
+            continue
+        if code in (0xD9, 0xDA):
+            # End of image or start of scan: no frame header found
+            return None
+        (length,) = struct.unpack('>H', f.read(2))
+        if code in JPEG_SOF_MARKERS:
+            _precision, height, width = struct.unpack('>BHH', f.read(5))
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _svg_dimensions(head: bytes) -> Optional[Tuple[int, int]]:
+    match = _SVG_ROOT_RE.search(head)
+    if not match:
+        return None
+    root = match.group(0)
+
+    lengths = [_SVG_LENGTH_RE[name].search(root) for name in (b'width', b'height')]
+    if all(lengths):
+        width, height = (round(float(length.group(1))) for length in lengths)
+    else:
+        # Relative or missing width/height: the viewBox gives the intrinsic size
+        viewbox = _SVG_VIEWBOX_RE.search(root)
+        if not viewbox:
+            return None
+        width, height = round(float(viewbox.group(1))), round(float(viewbox.group(2)))
+    return (width, height) if width > 0 and height > 0 else None
+
+
+def detect_type(path: str, head: bytes = b'') -> str:
+    """
+    Schema `type` for a file, mirroring the shell generators' detect_file_type
+
+    Image signatures in `head` win over the extension; otherwise the
+    extension decides (no `file` subprocess).
+
+    Returns:
+        'model', 'dataset', 'media', 'video', 'audio', 'document' or 'data'
+    """
+    if head.startswith(PNG_SIGNATURE) or head[:3] == b'\xff\xd8\xff' or head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'media'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'media'
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension in MODEL_EXTENSIONS:
+        return 'model'
+    if extension in DATASET_EXTENSIONS:
+        return 'dataset'
+
+    mime_type = mimetypes.guess_type(path, strict=False)[0] or ''
+    for prefix, asset_type in (('image/', 'media'), ('video/', 'video'), ('audio/', 'audio')):
+        if mime_type.startswith(prefix):
+            return asset_type
+    if mime_type in DOCUMENT_MIME_TYPES or 'document' in mime_type:
+        return 'document'
+    return 'data'
+
+
+def _identify(full_path: str, rel_path: str) -> Tuple[str, Optional[Tuple[int, int]]]:
+    """Type and (for images) dimensions with one open and one small read"""
+    try:
+        with open(full_path, 'rb') as f:
+            head = f.read(HEADER_SIZE)
+            asset_type = detect_type(rel_path, head)
+            dimensions = _dimensions(f, head, rel_path) if asset_type == 'media' else None
+    except (OSError, struct.error, ValueError):
+        return detect_type(rel_path), None
+    return asset_type, dimensions
+
+
+# ============================================================================
+# Scanning and hashing
+# ============================================================================
+
+def scan_files(root: str, dirs: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    Regular files under `root` (or only under `dirs`), as sorted '/' paths
+
+    Hidden files and directories (manifests, digest caches, plans, .git)
+    and symlinks are skipped.
+    """
+    found: List[str] = []
+
+    def walk(directory: str, prefix: str) -> None:
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                walk(entry.path, f'{prefix}{entry.name}/')
+            elif entry.is_file(follow_symlinks=False):
+                found.append(prefix + entry.name)
+
+    for directory in (dirs if dirs is not None else ('',)):
+        directory = directory.strip('/')
+        walk(os.path.join(root, directory) if directory else root, f'{directory}/' if directory else '')
+    found.sort()
+    return found
+
+
+# ============================================================================
+# Manifest generation
+# ============================================================================
+
+def build_manifest(
+    root: str = '.',
+    project: Optional[str] = None,
+    cdn: bool = False,
+    previous: Union[bool, Mapping[str, Any], None] = True,
+    library: Union[str, Mapping[str, Any], None] = DEFAULT_CDN_DIR,
+    dirs: Sequence[str] = ASSET_DIRS,
+    cache: Union[bool, DigestCache, None] = True,
+    workers: Optional[int] = None,
+    processes: bool = True,
+) -> Tuple[Dict[str, Any], ManifestChanges]:
+    """
+    Build a manifest for a project (or, with cdn=True, the central library)
+
+    Project mode scans `dirs`. Files whose content is in the central
+    library manifest get `source`, the library `r2_key`/`cdn_url` and
+    `sync: copy-from-library`; the rest get `r2_key:
+    projects/<project>/<path>` and a size-based sync default, as in
+    generate-project-manifest.sh. CDN mode scans the whole directory with
+    `media-cdn/` keys, CDN URLs and `modified`, as in generate-cdn-manifest.sh.
+
+    Args:
+        root: Directory to scan (the manifest is written here)
+        project: Project name (project mode; default: directory name)
+        cdn: Generate the central library manifest instead
+        previous: True to read `<root>/.r2-manifest.yml`, a parsed manifest,
+                  or False/None to start from scratch
+        library: Central library directory or parsed library manifest
+                 (project mode only; None to disable)
+        dirs: Directories scanned in project mode
+        cache: True for the digest cache next to the manifest, a DigestCache,
+               or False/None to hash every file
+        workers: Hashing workers (default: CPU count)
+        processes: Hash in processes (True) or threads
+
+    Returns:
+        (manifest dict, ManifestChanges)
+
+    Raises:
+        ImportError: If a previous or library manifest must be parsed and PyYAML is missing
+        ValueError: If the project name is invalid
+
+    Examples:
+        >>> manifest, changes = build_manifest('.', project='my-app')
+        >>> write_manifest(manifest, '.r2-manifest.yml')
+    """
+    root = os.path.abspath(os.path.expanduser(root))
+    manifest_path = os.path.join(root, MANIFEST_NAME)
+    project = 'media-cdn' if cdn else project or os.path.basename(root)
+    if not re.fullmatch(r'[A-Za-z0-9-]+', project):
+        raise ValueError(f"[ManifestGenerator] Invalid project name: {project!r} (alphanumeric and hyphens only)")
+
+    if previous is True:
+        previous = _load_yaml(manifest_path) if os.path.exists(manifest_path) else None
+    previous_entries = {str(entry['path']): entry for entry in manifest_entries(previous)} if previous else {}
+
+    if cache is True:
+        cache = DigestCache(digest_cache_path_for(manifest_path))
+    elif cache is None or cache is False:
+        cache = DigestCache()
+
+    library_dir, library_by_sha = None, {}
+    if not cdn and library is not None:
+        library_dir, library_by_sha = _library_index(library)
+
+    # Pass 1: stat everything, take digests from the cache where possible
+    paths = scan_files(root, None if cdn else dirs)
+    stats: Dict[str, os.stat_result] = {}
+    digests: Dict[str, str] = {}
+    pending: List[str] = []
+    pending_bytes = 0
+    for path in paths:
+        try:
+            stat = os.stat(os.path.join(root, path))
+        except OSError:
+            continue
+        stats[path] = stat
+        digest = cache.get(path, stat)
+        if digest is None:
+            pending.append(path)
+            pending_bytes += stat.st_size
+        else:
+            digests[path] = digest
+
+    # Pass 2: hash new and modified files in parallel
+    errors = []
+    for path, digest in hash_files(pending, root, workers, processes, pending_bytes):
+        if digest is None:
+            errors.append(path)
+            continue
+        digests[path] = digest
+        cache.put(path, stats[path], digest)
+    cache.save()
+
+    # Pass 3: entries; unchanged content keeps its previous entry verbatim
+    assets = []
+    counts = {ADDED: 0, CHANGED: 0, UNCHANGED: 0}
+    for path in paths:
+        if path not in digests:
+            continue
+        stat, digest = stats[path], digests[path]
+        old = previous_entries.get(path)
+        if old is not None and old.get('sha256') == digest and old.get('size') == stat.st_size:
+            assets.append(dict(old))
+            counts[UNCHANGED] += 1
+            continue
+
+        entry = _new_entry(root, path, stat, digest, project, cdn, library_dir, library_by_sha.get(digest))
+        if old is not None:
+            entry.update((field, old[field]) for field in PRESERVED_FIELDS if field in old)
+        assets.append(entry)
+        counts[ADDED if old is None else CHANGED] += 1
+
+    removed = len(set(previous_entries) - set(digests))
+    previous_updated = previous.get('updated') if isinstance(previous, Mapping) else None
+    unchanged = not counts[ADDED] and not counts[CHANGED] and not removed
+    manifest = {
+        'project': project,
+        'version': MANIFEST_VERSION,
+        'updated': previous_updated if unchanged and previous_updated else time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'assets': assets,
+    }
+    changes = ManifestChanges(counts[ADDED], counts[CHANGED], counts[UNCHANGED], removed, len(pending), errors)
+    return manifest, changes
+
+
+def _new_entry(
+    root: str,
+    path: str,
+    stat: os.stat_result,
+    digest: str,
+    project: str,
+    cdn: bool,
+    library_dir: Optional[str],
+    library_entry: Optional[Mapping[str, Any]],
+) -> Dict[str, Any]:
+    """Entry for a new or modified file, with generator defaults"""
+    asset_type, dimensions = _identify(os.path.join(root, path), path)
+    entry: Dict[str, Any] = {'path': path}
+
+    if cdn:
+        entry['r2_key'] = f'{CDN_R2_PREFIX}/{path}'
+        entry['cdn_url'] = f'{CDN_BASE_URL}/{path}'
+    elif library_entry is not None:
+        entry['source'] = os.path.join(library_dir or '', str(library_entry['path']))
+        entry['r2_key'] = library_entry.get('r2_key')
+        entry['cdn_url'] = library_entry.get('cdn_url')
+        dimensions = _dimensions_tuple(library_entry.get('dimensions')) or dimensions
+    else:
+        entry['r2_key'] = f'projects/{project}/{path}'
+
+    entry['size'] = stat.st_size
+    entry['sha256'] = digest
+    entry['type'] = asset_type
+    if cdn:
+        entry['modified'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(stat.st_mtime))
+    if dimensions:
+        entry['dimensions'] = {'width': dimensions[0], 'height': dimensions[1]}
+
+    if cdn:
+        entry['sync'] = True
+    elif library_entry is not None:
+        entry['sync'] = 'copy-from-library'
+    else:
+        entry['sync'] = _default_sync(stat.st_size, asset_type)
+    return {key: value for key, value in entry.items() if value is not None}
+
+
+def _default_sync(size: int, asset_type: str) -> Union[bool, str]:
+    """Size-based sync default (generate-project-manifest.sh determine_sync_mode)"""
+    if size > MANUAL_SYNC_SIZE:
+        return False
+    if asset_type in ('model', 'dataset') and size > MANUAL_SYNC_MODEL_SIZE:
+        return False
+    return 'download'
+
+
+def _dimensions_tuple(value: Any) -> Optional[Tuple[int, int]]:
+    if isinstance(value, Mapping) and value.get('width') and value.get('height'):
+        return int(value['width']), int(value['height'])
+    return None
+
+
+def _library_index(library: Union[str, Mapping[str, Any]]) -> Tuple[Optional[str], Dict[str, Mapping[str, Any]]]:
+    """
+    Central library entries by sha256
+
+    Matching on content rather than file name means a project file only
+    becomes copy-from-library when the library really holds the same bytes.
+    """
+    library_dir = None
+    if isinstance(library, str):
+        library_dir = os.path.abspath(os.path.expanduser(library))
+        manifest_path = os.path.join(library_dir, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return library_dir, {}
+        library = _load_yaml(manifest_path)
+
+    index: Dict[str, Mapping[str, Any]] = {}
+    for entry in manifest_entries(library):
+        digest = str(entry.get('sha256') or '').lower()
+        if digest:
+            index.setdefault(digest, entry)
+    return library_dir, index
+
+
+def _load_yaml(path: str) -> Mapping[str, Any]:
+    from .assets import _load_manifest_yaml
+
+    return _load_manifest_yaml(path) or {}
+
+
+# ============================================================================
+# Deterministic YAML output
+# ============================================================================
+
+def _scalar(value: Any) -> str:
+    """Render one YAML scalar, quoting only when a plain scalar would be misread"""
+    if value is True or value is False:
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    text = str(value)
+    if _PLAIN_RE.fullmatch(text) and not _AMBIGUOUS_RE.fullmatch(text) and ': ' not in text and not text.endswith(':'):
+        return text
+    return json.dumps(text, ensure_ascii=False)
+
+
+def _value(value: Any, field: str = '') -> str:
+    """Render a field value: scalars plain, mappings and lists in flow style"""
+    if field in TIMESTAMP_FIELDS:
+        text = value.strftime('%Y-%m-%dT%H:%M:%SZ') if hasattr(value, 'strftime') else str(value)
+        if _TIMESTAMP_RE.fullmatch(text):
+            return text
+    if isinstance(value, Mapping):
+        return '{' + ', '.join(f'{key}: {_value(item)}' for key, item in value.items()) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(_scalar(item) for item in value) + ']'
+    return _scalar(value)
+
+
+def render_manifest(manifest: Mapping[str, Any], generator: str = 'lib/asset_manifest.py') -> str:
+    """
+    Render a manifest as YAML, byte-identical for identical input
+
+    Args:
+        manifest: Dict with project, version, updated and assets
+        generator: Name written in the header comment
+
+    Returns:
+        YAML text
+    """
+    project = manifest.get('project', '')
+    title = 'Central CDN Asset Manifest' if project == 'media-cdn' else 'Project Asset Manifest'
+    lines = [
+        f'# {title}',
+        f'# Generated by {generator}',
+        f'# Project: {project}',
+        '',
+        f'project: {_scalar(project)}',
+        f'version: {json.dumps(str(manifest.get("version", MANIFEST_VERSION)))}',
+        f'updated: {_value(manifest.get("updated", ""), "updated")}',
+        '',
+    ]
+
+    assets = sorted(manifest.get('assets') or [], key=lambda entry: str(entry['path']))
+    if not assets:
+        lines.append('assets: []')
+    else:
+        lines.append('assets:')
+        for entry in assets:
+            fields = [field for field in FIELD_ORDER if entry.get(field) is not None]
+            fields += sorted(field for field in entry if field not in FIELD_ORDER and entry[field] is not None)
+            for index, field in enumerate(fields):
+                lead = '  - ' if index == 0 else '    '
+                lines.append(f'{lead}{field}: {_value(entry[field], field)}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_manifest(manifest: Mapping[str, Any], path: str) -> bool:
+    """
+    Write a manifest atomically, leaving the file untouched if nothing changed
+
+    Returns:
+        True if the file was written
+    """
+    text = render_manifest(manifest)
+    try:
+        with open(path, encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(prog='python -m lib.asset_manifest', description='Generate .r2-manifest.yml')
+    parser.add_argument('project', nargs='?', help='Project name (default: directory name)')
+    parser.add_argument('--root', default='.', help='Project directory (default: .)')
+    parser.add_argument('--cdn', metavar='DIR', help='Generate the central library manifest for DIR instead')
+    parser.add_argument('--library', default=DEFAULT_CDN_DIR, help='Central library directory (default: ~/media/cdn)')
+    parser.add_argument('--no-library', action='store_true', help='Do not match files against the library')
+    parser.add_argument('--fresh', action='store_true', help='Ignore the previous manifest and digest cache')
+    parser.add_argument('--workers', type=int, help='Hashing workers (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    root = args.cdn or args.root
+    started = time.perf_counter()
+    manifest, changes = build_manifest(
+        root,
+        project=args.project,
+        cdn=bool(args.cdn),
+        previous=not args.fresh,
+        library=None if args.no_library else args.library,
+        cache=not args.fresh,
+        workers=args.workers,
+    )
+    path = os.path.join(os.path.abspath(os.path.expanduser(root)), MANIFEST_NAME)
+    written = write_manifest(manifest, path)
+
+    for error in changes.errors:
+        print(f"[ManifestGenerator] Could not read: {error}", file=sys.stderr)
+    print(
+        f"[ManifestGenerator] {path}: {changes.added} added, {changes.changed} changed, "
+        f"{changes.unchanged} unchanged, {changes.removed} removed; {changes.hashed} hashed "
+        f"in {time.perf_counter() - started:.2f}s{'' if written else ' (no changes)'}"
+    )
+    return 1 if changes.errors else 0
+
+
+__all__ = [
+    'ManifestChanges',
+    'build_manifest',
+    'detect_type',
+    'image_dimensions',
+    'render_manifest',
+    'scan_files',
+    'write_manifest',
+]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Resolution Metrics for the Python Asset Helper
+
+Counters and an optional latency histogram fed by AssetResolver once
+metrics are enabled, with a Prometheus text-format exporter:
+- Resolutions by decision ('cdn' or 'local') and env_mode
+- Fallbacks by the kind of URL fallen back to
+- Validation failures by the kind of URL rejected
+- Unresolvable assets by env_mode
+
+Subclass AssetMetrics (or pass any object with the same record_* methods)
+to forward events to StatsD, OpenTelemetry, etc. Imported lazily by
+lib.assets, so projects that never enable metrics pay nothing.
+
+License: MIT
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds; a cache hit is well under a microsecond and a
+# miss a few microseconds, so the buckets are skewed towards the low end
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.000_000_5, 0.000_001, 0.000_002_5, 0.000_005, 0.000_01,
+    0.000_025, 0.000_05, 0.000_1, 0.000_5, 0.001,
+)
+
+
+class AssetMetrics:
+    """
+    Thread-safe resolution counters with an optional latency histogram
+
+    Args:
+        timing: Also time each get_asset_url() call (two perf_counter() reads)
+        buckets: Histogram upper bounds in seconds, ascending
+
+    Examples:
+        >>> resolver = AssetResolver.get_instance()
+        >>> metrics = resolver.enable_metrics(timing=True)
+        >>> resolver.get_asset_url('/media/logo.png', 'https://cdn.example.com/logo.png')
+        >>> metrics.resolutions
+        {('local', 'cdn-production-local-dev'): 1}  # in development
+        >>> print(metrics.to_prometheus())
+    """
+
+    def __init__(self, timing: bool = False, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        if list(buckets) != sorted(buckets):
+            raise ValueError(f"[AssetMetrics] Buckets must be ascending: {buckets}")
+
+        self.timing = timing
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero every counter and the histogram"""
+        with self._lock:
+            self.resolutions: Dict[Tuple[str, str], int] = {}
+            self.fallbacks: Dict[str, int] = {}
+            self.validation_failures: Dict[str, int] = {}
+            self.errors: Dict[str, int] = {}
+            self._bucket_counts: List[int] = [0] * (len(self.buckets) + 1)
+            self._latency_sum = 0.0
+            self._latency_count = 0
+
+    def record_resolution(self, decision: str, env_mode: str) -> None:
+        """Count one resolved URL; decision is 'cdn' or 'local'"""
+        key = (decision, env_mode)
+        with self._lock:
+            self.resolutions[key] = self.resolutions.get(key, 0) + 1
+
+    def record_fallback(self, kind: str) -> None:
+        """Count one fallback; kind is the URL fallen back to ('local' or 'cdn')"""
+        with self._lock:
+            self.fallbacks[kind] = self.fallbacks.get(kind, 0) + 1
+
+    def record_validation_failure(self, kind: str) -> None:
+        """Count one rejected URL; kind is 'local' or 'cdn'"""
+        with self._lock:
+            self.validation_failures[kind] = self.validation_failures.get(kind, 0) + 1
+
+    def record_error(self, env_mode: str) -> None:
+        """Count one asset whose local path and CDN URL were both invalid"""
+        with self._lock:
+            self.errors[env_mode] = self.errors.get(env_mode, 0) + 1
+
+    def observe(self, seconds: float) -> None:
+        """Add one get_asset_url() latency to the histogram"""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+
+        with self._lock:
+            self._bucket_counts[index] += 1
+            self._latency_sum += seconds
+            self._latency_count += 1
+
+    def histogram(self) -> List[Tuple[float, int]]:
+        """
+        Cumulative latency histogram
+
+        Returns:
+            (upper_bound, count) pairs ending with (inf, total)
+        """
+        with self._lock:
+            counts = list(self._bucket_counts)
+
+        cumulative, total = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def to_prometheus(self, prefix: str = 'asset_resolver', cache_info: Optional[Tuple] = None) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format
+
+        Args:
+            prefix: Metric name prefix
+            cache_info: Optional CacheInfo to export as cache gauges/counters
+
+        Returns:
+            Exposition text ending with a newline
+        """
+        with self._lock:
+            resolutions = dict(self.resolutions)
+            fallbacks = dict(self.fallbacks)
+            failures = dict(self.validation_failures)
+            errors = dict(self.errors)
+            latency_sum, latency_count = self._latency_sum, self._latency_count
+
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> str:
+            metric = f'{prefix}_{name}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {kind}')
+            return metric
+
+        metric = family('resolutions_total', 'counter', 'Asset URLs resolved, by decision and env_mode.')
+        for (decision, env_mode), count in sorted(resolutions.items()):
+            lines.append(f'{metric}{{decision="{_escape(decision)}",env_mode="{_escape(env_mode)}"}} {count}')
+
+        metric = family('fallbacks_total', 'counter', 'Resolutions that fell back to the other URL, by the URL used.')
+        for kind, count in sorted(fallbacks.items()):
+            lines.append(f'{metric}{{kind="{_escape(kind)}"}} {count}')
+
+        metric = family('validation_failures_total', 'counter', 'Local paths or CDN URLs rejected by validation.')
+        for kind, count in sorted(failures.items()):
+            lines.append(f'{metric}{{kind="{_escape(kind)}"}} {count}')
+
+        metric = family('errors_total', 'counter', 'Assets with neither a valid local path nor a valid CDN URL.')
+        for env_mode, count in sorted(errors.items()):
+            lines.append(f'{metric}{{env_mode="{_escape(env_mode)}"}} {count}')
+
+        if self.timing:
+            metric = family('resolution_seconds', 'histogram', 'get_asset_url() latency in seconds.')
+            for bound, count in self.histogram():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{metric}_bucket{{le="{le}"}} {count}')
+            lines.append(f'{metric}_sum {latency_sum!r}')
+            lines.append(f'{metric}_count {latency_count}')
+
+        if cache_info is not None:
+            hits, misses, maxsize, currsize = cache_info
+            lines.append(f'{family("cache_hits_total", "counter", "Resolution cache hits.")} {hits}')
+            lines.append(f'{family("cache_misses_total", "counter", "Resolution cache misses.")} {misses}')
+            lines.append(f'{family("cache_size", "gauge", "Resolutions currently cached.")} {currsize}')
+            lines.append(f'{family("cache_maxsize", "gauge", "Resolution cache capacity.")} {maxsize}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+__all__ = [
+    'AssetMetrics',
+    'DEFAULT_BUCKETS',
+]
@@ -0,0 +1,487 @@
+"""
+Device- and Type-Selective Sync Planner
+
+Computes the minimal work needed to bring one machine in line with a
+`.r2-manifest.yml`, honouring the manifest's `sync`, `devices` and `type`
+fields:
+- transfer: wanted here, missing or known to differ
+- verify:   present with the right size but not yet hashed at this stat
+- move:     a previously synced file whose manifest `path` changed
+            (same `r2_key` and `sha256`), renamed locally instead of re-downloaded
+- copy:     another path with the same `r2_key`, copied after its transfer
+- delete:   a file the last plan found in sync, unmodified since, that
+            is no longer wanted on this device
+
+The previous plan (`.r2-manifest.plan`) records which files were satisfied
+and their stat, so on an unchanged tree each asset costs one stat and a
+dict lookup; digests come from the asset_verify digest cache.
+
+Usage:
+    python -m lib.asset_plan .r2-manifest.yml --dry-run
+    python -m lib.asset_plan .r2-manifest.yml --device mac-studio --type model
+
+License: MIT
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from collections import namedtuple
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+
+from .asset_verify import DigestCache, digest_cache_path_for, manifest_entries
+
+PLAN_VERSION = 1
+
+# Dry-run throughput assumptions (bytes/second), overridable per call
+DEFAULT_BANDWIDTH = 50 * 1000 * 1000
+DEFAULT_HASH_RATE = 500 * 1000 * 1000
+
+TRANSFER = 'transfer'
+VERIFY = 'verify'
+MOVE = 'move'
+COPY = 'copy'
+DELETE = 'delete'
+
+# One unit of work; `source` is the local path a move/copy reads from
+PlanAction = namedtuple('PlanAction', ['op', 'path', 'r2_key', 'size', 'sha256', 'source'])
+
+# (size, mtime_ns, inode) of a local file
+StatKey = Tuple[int, int, int]
+
+
+def device_name() -> str:
+    """
+    Name of this machine as used in manifest `devices` lists
+
+    Matches scripts/sync/sync-project-assets.sh: lower-cased hostname
+    without a trailing `.local`. ASSET_DEVICE overrides it.
+    """
+    name = os.environ.get('ASSET_DEVICE') or socket.gethostname()
+    name = name.lower()
+    return name[:-len('.local')] if name.endswith('.local') else name
+
+
+def plan_path_for(manifest: str) -> str:
+    """Plan file stored next to a manifest (`.r2-manifest.yml` -> `.r2-manifest.plan`)"""
+    base, ext = os.path.splitext(manifest)
+    return (base if ext in ('.yml', '.yaml') else manifest) + '.plan'
+
+
+def wanted_on_device(
+    entry: Mapping[str, Any],
+    device: str,
+    types: Optional[Set[str]] = None,
+) -> bool:
+    """
+    Whether an asset should have a local copy on `device`
+
+    Entries with `sync: false` or `sync: cdn-only` never do; an empty or
+    missing `devices` list means every device; `types` (if given)
+    restricts by the manifest `type` field.
+    """
+    sync = entry.get('sync', True)
+    if sync is False or sync in ('false', 'cdn-only'):
+        return False
+    devices = entry.get('devices')
+    if devices and device not in devices:
+        return False
+    return types is None or entry.get('type') in types
+
+
+def _stat_key(path: str) -> Optional[StatKey]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class _CachedStat:
+    """Just the stat fields DigestCache compares"""
+
+    __slots__ = ('st_size', 'st_mtime_ns', 'st_ino')
+
+    def __init__(self, key: StatKey):
+        self.st_size, self.st_mtime_ns, self.st_ino = key
+
+
+class SyncPlan:
+    """
+    Actions for one device plus the state needed to diff the next run
+
+    Attributes:
+        device: Device the plan was computed for
+        actions: PlanActions, moves first, deletes last
+        desired: path -> (r2_key, size, sha256) of every asset wanted here
+        satisfied: path -> StatKey of files that needed no work
+
+    Examples:
+        >>> plan = plan_sync('.r2-manifest.yml', device='macbook')
+        >>> plan.transfer_bytes, plan.estimate_seconds()
+        (1610612736, 32.4)
+    """
+
+    def __init__(
+        self,
+        device: str,
+        actions: List[PlanAction],
+        desired: Dict[str, Tuple[str, int, str]],
+        satisfied: Dict[str, StatKey],
+    ):
+        self.device = device
+        self.actions = actions
+        self.desired = desired
+        self.satisfied = satisfied
+
+    def __repr__(self) -> str:
+        return f"SyncPlan(device={self.device!r}, {self.counts()})"
+
+    def by_op(self, op: str) -> List[PlanAction]:
+        """Actions of one kind"""
+        return [action for action in self.actions if action.op == op]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of actions per op"""
+        counts = dict.fromkeys((MOVE, TRANSFER, VERIFY, COPY, DELETE), 0)
+        for action in self.actions:
+            counts[action.op] += 1
+        return counts
+
+    @property
+    def transfer_bytes(self) -> int:
+        """Bytes to download (verify failures not included)"""
+        return sum(action.size for action in self.actions if action.op == TRANSFER)
+
+    @property
+    def verify_bytes(self) -> int:
+        """Bytes to hash before deciding whether to download"""
+        return sum(action.size for action in self.actions if action.op == VERIFY)
+
+    def estimate_seconds(
+        self,
+        bandwidth: float = DEFAULT_BANDWIDTH,
+        hash_rate: float = DEFAULT_HASH_RATE,
+    ) -> float:
+        """
+        Expected wall time: downloads at `bandwidth`, hashing at `hash_rate`
+
+        Local copies are counted at the hash rate; moves and deletes are free.
+        """
+        copy_bytes = sum(action.size for action in self.actions if action.op == COPY)
+        return self.transfer_bytes / bandwidth + (self.verify_bytes + copy_bytes) / hash_rate
+
+    def save(self, path: str) -> None:
+        """Write the plan atomically as JSON (the `previous` of the next run)"""
+        data = {
+            'version': PLAN_VERSION,
+            'device': self.device,
+            'desired': self.desired,
+            'satisfied': self.satisfied,
+            'actions': [list(action) for action in self.actions],
+        }
+        tmp_path = f'{path}.tmp{os.getpid()}'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'), sort_keys=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['SyncPlan']:
+        """Read a saved plan; None if missing, unreadable or from another version"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != PLAN_VERSION:
+                return None
+            return cls(
+                data['device'],
+                [PlanAction(*action) for action in data['actions']],
+                {key: tuple(value) for key, value in data['desired'].items()},
+                {key: tuple(value) for key, value in data['satisfied'].items()},
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+def plan_sync(
+    manifest: Union[str, Mapping[str, Any], Iterable[Mapping[str, Any]]] = '.r2-manifest.yml',
+    device: Optional[str] = None,
+    root: Optional[str] = None,
+    previous: Union[bool, SyncPlan, None] = True,
+    types: Optional[Iterable[str]] = None,
+    cache: Union[bool, DigestCache, None] = True,
+) -> SyncPlan:
+    """
+    Compute the minimal sync plan for one device
+
+    Args:
+        manifest: Manifest path, parsed manifest, or list of asset entries
+        device: Device name (default: device_name())
+        root: Project root (default: the manifest's directory, or '.')
+        previous: True to load the plan saved next to the manifest, a
+                  SyncPlan, or False/None to plan from scratch (no deletes)
+        types: Only plan assets whose `type` is in this set (never deletes
+               assets of other types)
+        cache: True for the digest cache next to the manifest, a
+               DigestCache, or False/None to treat every file as unhashed
+
+    Returns:
+        SyncPlan (nothing is changed on disk)
+
+    Raises:
+        ImportError: If a manifest path is given and PyYAML is not installed
+        ValueError: If the manifest is malformed
+
+    Examples:
+        >>> from lib.asset_plan import plan_sync
+        >>> plan = plan_sync('.r2-manifest.yml', types={'model'})
+        >>> for action in plan.actions:
+        ...     print(action.op, action.path)
+    """
+    device = device or device_name()
+    types = set(types) if types is not None else None
+    if root is None:
+        root = os.path.dirname(os.path.abspath(manifest)) if isinstance(manifest, str) else '.'
+    if previous is True:
+        previous = SyncPlan.load(plan_path_for(manifest)) if isinstance(manifest, str) else None
+    if not isinstance(previous, SyncPlan) or previous.device != device:
+        # Another device's plan says nothing about this tree
+        previous = None
+    if cache is True:
+        cache = DigestCache(digest_cache_path_for(manifest) if isinstance(manifest, str) else None)
+    elif cache is None or cache is False:
+        cache = DigestCache()
+
+    desired: Dict[str, Tuple[str, int, str]] = {}
+    on_device: Set[str] = set()
+    for entry in manifest_entries(manifest):
+        if wanted_on_device(entry, device):
+            path = str(entry['path'])
+            on_device.add(path)
+            if types is None or entry.get('type') in types:
+                desired[path] = (
+                    str(entry.get('r2_key') or ''),
+                    int(entry.get('size') or 0),
+                    str(entry.get('sha256') or '').lower(),
+                )
+
+    previous_desired = previous.desired if previous is not None else {}
+    previous_satisfied = previous.satisfied if previous is not None else {}
+
+    # Files the last plan found in sync, untouched since and no longer wanted
+    # on this device (the type filter only narrows the work, it retires
+    # nothing). Indexed by content so a renamed asset becomes a move.
+    retired: Dict[str, Tuple[str, int, str]] = {}
+    retired_by_content: Dict[Tuple[str, str], str] = {}
+    for path, stat in previous_satisfied.items():
+        if path not in on_device and path in previous_desired and _stat_key(os.path.join(root, path)) == stat:
+            r2_key, size, sha256 = retired[path] = previous_desired[path]
+            retired_by_content.setdefault((r2_key, sha256), path)
+
+    moves: List[PlanAction] = []
+    transfers: List[PlanAction] = []
+    verifies: List[PlanAction] = []
+    copies: List[PlanAction] = []
+    satisfied: Dict[str, StatKey] = {}
+    fetched_by_key: Dict[Tuple[str, str], str] = {}
+
+    for path, spec in desired.items():
+        r2_key, size, sha256 = spec
+        stat = _stat_key(os.path.join(root, path))
+
+        # Unchanged entry and untouched file since the last plan: nothing to do
+        if stat is not None and previous_desired.get(path) == spec and previous_satisfied.get(path) == stat:
+            satisfied[path] = stat
+            continue
+
+        if stat is not None and stat[0] == size:
+            digest = cache.get(path, _CachedStat(stat))
+            if digest == sha256:
+                satisfied[path] = stat
+                continue
+            if digest is None:
+                verifies.append(PlanAction(VERIFY, path, r2_key, size, sha256, None))
+                continue
+
+        content = (r2_key, sha256)
+        source = retired_by_content.pop(content, None)
+        if source is not None:
+            moves.append(PlanAction(MOVE, path, r2_key, size, sha256, source))
+        elif content in fetched_by_key and r2_key:
+            copies.append(PlanAction(COPY, path, r2_key, size, sha256, fetched_by_key[content]))
+        else:
+            fetched_by_key[content] = path
+            transfers.append(PlanAction(TRANSFER, path, r2_key, size, sha256, None))
+
+    moved = {action.source for action in moves}
+    deletes = [
+        PlanAction(DELETE, path, r2_key, size, sha256, None)
+        for path, (r2_key, size, sha256) in retired.items()
+        if path not in moved
+    ]
+
+    return SyncPlan(device, moves + transfers + verifies + copies + deletes, desired, satisfied)
+
+
+def apply_local_actions(plan: SyncPlan, root: str) -> List[PlanAction]:
+    """
+    Perform the moves and deletes of a plan
+
+    Transfers, verifies and copies need the network or the transferred
+    file; hand `transfer_entries()` to lib.asset_sync and run copies after.
+
+    Returns:
+        Actions that were applied
+    """
+    applied = []
+    for action in plan.actions:
+        target = os.path.join(root, action.path)
+        if action.op == MOVE:
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            os.replace(os.path.join(root, action.source), target)
+        elif action.op == DELETE:
+            try:
+                os.unlink(target)
+            except FileNotFoundError:
+                continue
+        else:
+            continue
+        applied.append(action)
+    return applied
+
+
+def transfer_entries(plan: SyncPlan) -> List[Dict[str, Any]]:
+    """Manifest-style entries for the plan's transfers and verifies (for AssetSyncer.sync)"""
+    return [
+        {'path': action.path, 'r2_key': action.r2_key, 'size': action.size, 'sha256': action.sha256}
+        for action in plan.actions
+        if action.op in (TRANSFER, VERIFY)
+    ]
+
+
+def next_baseline(
+    plan: SyncPlan,
+    root: str,
+    synced: Iterable[str] = (),
+    previous: Optional[SyncPlan] = None,
+) -> SyncPlan:
+    """
+    The `previous` for the next run, once `plan` has been fully applied
+
+    Assets the plan found satisfied, moved or copied, and those in `synced`
+    (downloaded or verified up to date), are recorded with their current
+    stat. Entries of the previous baseline for assets this run did not plan
+    (other types on a filtered run) carry over, so they can still be
+    retired later.
+
+    Args:
+        plan: The applied plan
+        root: Project root
+        synced: Paths the sync reported as downloaded or up to date
+        previous: Baseline `plan` was computed against (same device)
+
+    Returns:
+        SyncPlan to save at plan_path_for(manifest)
+    """
+    desired = dict(previous.desired) if previous is not None else {}
+    satisfied = dict(previous.satisfied) if previous is not None else {}
+    for action in plan.actions:
+        if action.op in (MOVE, DELETE):
+            gone = action.source if action.op == MOVE else action.path
+            desired.pop(gone, None)
+            satisfied.pop(gone, None)
+
+    done = set(synced)
+    done.update(action.path for action in plan.actions if action.op in (MOVE, COPY))
+    for path, spec in plan.desired.items():
+        desired[path] = spec
+        stat = plan.satisfied.get(path)
+        if stat is None and path in done:
+            stat = _stat_key(os.path.join(root, path))
+        if stat is not None:
+            satisfied[path] = stat
+        else:
+            satisfied.pop(path, None)
+
+    return SyncPlan(plan.device, plan.actions, desired, satisfied)
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1000:
+            return f'{size:.1f} {unit}'
+        size /= 1000
+    return f'{size:.1f} TB'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(prog='python -m lib.asset_plan', description='Plan (and run) a device-selective asset sync')
+    parser.add_argument('manifest', nargs='?', default='.r2-manifest.yml', help='Manifest path')
+    parser.add_argument('--device', help='Device name (default: hostname)')
+    parser.add_argument('--type', action='append', dest='types', help='Only this asset type (repeatable)')
+    parser.add_argument('--root', help='Project root (default: manifest directory)')
+    parser.add_argument('--dry-run', action='store_true', help='Print the plan and estimate; change nothing')
+    parser.add_argument('--bandwidth', type=float, default=DEFAULT_BANDWIDTH / 1e6, help='Download MB/s for the estimate')
+    parser.add_argument('--fresh', action='store_true', help='Ignore the previous plan')
+    args = parser.parse_args(argv)
+
+    root = args.root or os.path.dirname(os.path.abspath(args.manifest))
+    device = args.device or device_name()
+    previous = None if args.fresh else SyncPlan.load(plan_path_for(args.manifest))
+    if previous is not None and previous.device != device:
+        previous = None
+    # One digest cache for planning and syncing, saved next to the manifest
+    cache = DigestCache(digest_cache_path_for(args.manifest))
+    plan = plan_sync(args.manifest, device, root, previous=previous, types=args.types, cache=cache)
+
+    for action in plan.actions:
+        source = f' <- {action.source}' if action.source else ''
+        print(f"[AssetPlan] {action.op}: {action.path}{source} ({_format_bytes(action.size)})")
+    counts = ', '.join(f'{count} {op}' for op, count in plan.counts().items() if count)
+    seconds = plan.estimate_seconds(bandwidth=args.bandwidth * 1e6)
+    print(
+        f"[AssetPlan] {plan.device}: {counts or 'nothing to do'}; "
+        f"{_format_bytes(plan.transfer_bytes)} to download, {_format_bytes(plan.verify_bytes)} to verify, ~{seconds:.0f}s"
+    )
+    if args.dry_run:
+        return 0
+
+    apply_local_actions(plan, root)
+    failed = 0
+    synced: Set[str] = set()
+    entries = transfer_entries(plan)
+    if entries:
+        from .asset_sync import DOWNLOADED, UP_TO_DATE, sync_assets
+
+        for result in sync_assets(entries, root, cache=cache):
+            if result.status in (DOWNLOADED, UP_TO_DATE):
+                synced.add(result.path)
+            else:
+                failed += 1
+    if not failed:
+        import shutil
+
+        for action in plan.by_op(COPY):
+            shutil.copyfile(os.path.join(root, action.source), os.path.join(root, action.path))
+        # Only a fully applied plan becomes the next run's baseline
+        next_baseline(plan, root, synced, previous).save(plan_path_for(args.manifest))
+    return 1 if failed else 0
+
+
+__all__ = [
+    'PlanAction',
+    'SyncPlan',
+    'apply_local_actions',
+    'device_name',
+    'next_baseline',
+    'plan_sync',
+    'transfer_entries',
+    'wanted_on_device',
+]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,395 @@
+"""
+Preload Link Headers and 103 Early Hints for Critical Assets
+
+Declare the critical assets of each route once; a PreloadRegistry resolves
+them with the AssetResolver, infers each link's `as=` destination from the
+manifest `type`, and serializes the whole `Link` header a single time:
+
+    Link: <https://cdn.example.com/fonts/inter.woff2>; rel=preload; as=font; type="font/woff2"; crossorigin,
+          <https://cdn.example.com/media/hero.jpg>; rel=preload; as=image; type="image/jpeg"
+
+Serving it costs one dict lookup per request. Compiled headers are
+dropped when the resolver config changes (see lib.assets.on_config_change)
+and rebuilt on the next request.
+
+Middleware:
+- PreloadASGIMiddleware (FastAPI, Starlette): adds the Link header and,
+  on servers that advertise the `http.response.early_hint` extension
+  (e.g. Hypercorn), sends 103 Early Hints before the app runs
+- PreloadWSGIMiddleware (Flask): adds the Link header; WSGI cannot send
+  1xx responses, but CDNs such as Cloudflare turn Link headers into
+  Early Hints
+
+Usage:
+    registry = PreloadRegistry(AssetIndex.load('.r2-manifest.yml'))
+    registry.bundle('home', ['public/fonts/inter.woff2', 'public/media/hero.jpg'])
+    registry.route('/', 'home')
+
+    app.add_middleware(PreloadASGIMiddleware, registry=registry)     # FastAPI
+    app.wsgi_app = PreloadWSGIMiddleware(app.wsgi_app, registry)       # Flask
+
+License: MIT
+"""
+
+import mimetypes
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+from urllib.parse import quote, urlsplit
+
+from .assets import AssetIndex, AssetResolver, on_config_change
+
+# Manifest `type` (see lib.asset_manifest.detect_type) -> preload destination
+TYPE_DESTINATIONS = {
+    'media': 'image',
+    'video': 'video',
+    'audio': 'audio',
+    'document': 'fetch',
+    'model': 'fetch',
+    'dataset': 'fetch',
+}
+
+# Extensions that refine or replace the manifest type; manifests file
+# stylesheets, scripts and fonts under the generic 'data' type
+EXTENSION_DESTINATIONS = {
+    '.css': 'style',
+    '.js': 'script',
+    '.mjs': 'script',
+    '.woff2': 'font',
+    '.woff': 'font',
+    '.ttf': 'font',
+    '.otf': 'font',
+    '.vtt': 'track',
+}
+
+# Destinations fetched in CORS mode, whose preloads need `crossorigin`
+# or the browser downloads them twice
+CORS_DESTINATIONS = frozenset(('font', 'fetch'))
+
+# Destinations where a `type` hint lets browsers skip formats they cannot use
+TYPED_DESTINATIONS = frozenset(('image', 'font', 'video', 'audio'))
+
+EXTRA_MIME_TYPES = {
+    '.woff2': 'font/woff2',
+    '.woff': 'font/woff',
+    '.ttf': 'font/ttf',
+    '.otf': 'font/otf',
+    '.avif': 'image/avif',
+    '.webp': 'image/webp',
+}
+
+# Characters left as-is when percent-encoding a URL for a header
+_URL_SAFE = "!#$%&'()*+,/:;=?@[]~"
+
+AssetSpec = Union[str, Mapping[str, str]]
+
+
+def preload_destination(url: str, asset_type: Optional[str] = None) -> str:
+    """
+    Infer a preload `as=` value from the manifest type and the URL
+
+    Args:
+        url: Asset URL or path
+        asset_type: Manifest `type` field, if known
+
+    Returns:
+        Preload destination, e.g. 'image', 'font', 'style' or 'fetch'
+
+    Examples:
+        >>> preload_destination('/media/hero.jpg', 'media')
+        'image'
+        >>> preload_destination('https://cdn.example.com/fonts/inter.woff2', 'data')
+        'font'
+    """
+    extension = os.path.splitext(urlsplit(url).path)[1].lower()
+    destination = EXTENSION_DESTINATIONS.get(extension)
+    if destination is not None:
+        return destination
+    destination = TYPE_DESTINATIONS.get(asset_type or '')
+    if destination is not None:
+        return destination
+
+    mime_type = _mime_type(extension)
+    for prefix, destination in (('image/', 'image'), ('video/', 'video'), ('audio/', 'audio')):
+        if mime_type.startswith(prefix):
+            return destination
+    return 'fetch'
+
+
+def format_link(url: str, destination: str) -> str:
+    """
+    Serialize one preload link (without the `Link:` header name)
+
+    Non-ASCII characters are percent-encoded so the value is valid latin-1.
+
+    Examples:
+        >>> format_link('/media/hero.jpg', 'image')
+        '</media/hero.jpg>; rel=preload; as=image; type="image/jpeg"'
+    """
+    link = f'<{quote(url, safe=_URL_SAFE)}>; rel=preload; as={destination}'
+    if destination in TYPED_DESTINATIONS:
+        mime_type = _mime_type(os.path.splitext(urlsplit(url).path)[1].lower())
+        if mime_type:
+            link += f'; type="{mime_type}"'
+    if destination in CORS_DESTINATIONS:
+        link += '; crossorigin'
+    return link
+
+
+def _mime_type(extension: str) -> str:
+    return EXTRA_MIME_TYPES.get(extension) or mimetypes.types_map.get(extension, '')
+
+
+class PreloadBundle:
+    """
+    Serialized preload links for one declared asset set
+
+    All forms are built once; middleware only hands them out.
+
+    Attributes:
+        name: Bundle name
+        urls: Resolved asset URLs, in declaration order
+        links: One serialized link per asset, as bytes (for Early Hints)
+        header: Complete `Link` header value as bytes (ASGI)
+        value: Complete `Link` header value as str (WSGI, frameworks)
+    """
+
+    __slots__ = ('name', 'urls', 'links', 'header', 'value')
+
+    def __init__(self, name: str, links: List[Tuple[str, str]]):
+        self.name = name
+        self.urls = tuple(url for url, _link in links)
+        self.value = ', '.join(link for _url, link in links)
+        self.links = tuple(link.encode('latin-1') for _url, link in links)
+        self.header = self.value.encode('latin-1')
+
+    def __repr__(self) -> str:
+        return f"PreloadBundle(name={self.name!r}, urls={self.urls!r})"
+
+
+class PreloadRegistry:
+    """
+    Per-route preload bundles, resolved once per resolver config
+
+    Assets are manifest keys (looked up in `index`) or mappings with
+    `local_path` and `cdn_url` (plus optional `env_mode`), like the configs
+    of batch_resolve_assets(). Any asset may set `as` to override the
+    inferred destination.
+
+    Examples:
+        >>> registry = PreloadRegistry(AssetIndex.load('.r2-manifest.yml'))
+        >>> registry.bundle('home', [
+        ...     'public/media/hero.jpg',
+        ...     {'local_path': '/css/site.css', 'cdn_url': 'https://cdn.example.com/css/site.css'},
+        ... ])
+        >>> registry.route('/', 'home')
+        >>> registry.for_path('/').header
+        b'<https://cdn.example.com/media/hero.jpg>; rel=preload; as=image; ...'
+    """
+
+    def __init__(self, index: Optional[AssetIndex] = None, resolver: Optional[AssetResolver] = None):
+        self.index = index
+        self.resolver = resolver
+        self._bundles: Dict[str, List[AssetSpec]] = {}
+        self._routes: Dict[str, str] = {}
+        # (bundles by name, bundles by route), swapped as one reference
+        self._compiled: Optional[Tuple[Dict[str, PreloadBundle], Dict[str, PreloadBundle]]] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._unsubscribe = on_config_change(self.invalidate)
+
+    def bundle(self, name: str, assets: Iterable[AssetSpec]) -> None:
+        """
+        Declare (or replace) a named set of critical assets
+
+        Args:
+            name: Bundle name
+            assets: Manifest keys or {'local_path', 'cdn_url'[, 'env_mode'][, 'as']} mappings
+
+        Raises:
+            ValueError: If a manifest key is unknown or a mapping lacks URLs
+        """
+        specs = list(assets)
+        for spec in specs:
+            if isinstance(spec, str):
+                if self.index is None or spec not in self.index:
+                    raise ValueError(f"[PreloadRegistry] Unknown manifest asset {spec!r} in bundle {name!r}")
+            elif 'key' in spec:
+                if self.index is None or spec['key'] not in self.index:
+                    raise ValueError(f"[PreloadRegistry] Unknown manifest asset {spec['key']!r} in bundle {name!r}")
+            elif not spec.get('local_path') and not spec.get('cdn_url'):
+                raise ValueError(f"[PreloadRegistry] Asset in bundle {name!r} needs local_path or cdn_url")
+
+        with self._lock:
+            self._bundles[name] = specs
+            self._compiled = None
+
+    def route(self, path: str, bundle: str) -> None:
+        """
+        Serve a bundle's Link header on requests for `path` (exact match)
+
+        Raises:
+            ValueError: If the bundle has not been declared
+        """
+        if bundle not in self._bundles:
+            raise ValueError(f"[PreloadRegistry] Unknown bundle {bundle!r}")
+        with self._lock:
+            self._routes[path] = bundle
+            self._compiled = None
+
+    def get(self, name: str) -> PreloadBundle:
+        """
+        Get a compiled bundle by name
+
+        Raises:
+            KeyError: If the bundle has not been declared
+        """
+        compiled = self._compiled or self._compile()
+        return compiled[0][name]
+
+    def for_path(self, path: str) -> Optional[PreloadBundle]:
+        """
+        Get the compiled bundle routed to `path`, or None
+
+        This is the per-request call: one dict lookup once compiled.
+        """
+        compiled = self._compiled or self._compile()
+        return compiled[1].get(path)
+
+    def compile(self) -> Dict[str, PreloadBundle]:
+        """
+        Resolve and serialize every bundle now, e.g. at startup
+
+        Returns:
+            Compiled bundles by name
+
+        Raises:
+            ValueError: If an asset has no valid URL
+        """
+        return self._compile()[0]
+
+    def invalidate(self) -> None:
+        """Drop compiled headers; the next request rebuilds them"""
+        self._generation += 1
+        self._compiled = None
+
+    def _compile(self) -> Tuple[Dict[str, PreloadBundle], Dict[str, PreloadBundle]]:
+        with self._lock:
+            compiled = self._compiled
+            if compiled is None:
+                generation = self._generation
+                resolver = self.resolver or AssetResolver.get_instance()
+                bundles = {
+                    name: PreloadBundle(name, [self._link(spec, resolver) for spec in specs])
+                    for name, specs in self._bundles.items()
+                }
+                by_path = {path: bundles[name] for path, name in self._routes.items()}
+                compiled = (bundles, by_path)
+                # A config change while resolving: serve this result once, keep nothing
+                if generation == self._generation:
+                    self._compiled = compiled
+            return compiled
+
+    def _link(self, spec: AssetSpec, resolver: AssetResolver) -> Tuple[str, str]:
+        if isinstance(spec, str):
+            spec = {'key': spec}
+
+        asset_type = None
+        if 'key' in spec:
+            record = self.index.record(spec['key'])
+            asset_type = record.type
+            if record.cdn_url:
+                url = resolver.get_asset_url(record.local_path, record.cdn_url, record.env_mode)
+            else:
+                url = record.local_path
+        else:
+            url = resolver.get_asset_url(
+                spec.get('local_path', ''),
+                spec.get('cdn_url', ''),
+                spec.get('env_mode', 'cdn-production-local-dev'),
+            )
+
+        destination = spec.get('as') or preload_destination(url, asset_type)
+        return url, format_link(url, destination)
+
+
+PRELOAD_METHODS = frozenset(('GET', 'HEAD'))
+
+
+class PreloadASGIMiddleware:
+    """
+    ASGI middleware adding preload Link headers (and 103 Early Hints)
+
+    The header is only added to 2xx responses of GET and HEAD requests.
+
+    Examples:
+        >>> app = FastAPI()
+        >>> app.add_middleware(PreloadASGIMiddleware, registry=registry)
+    """
+
+    def __init__(self, app: Callable[..., Awaitable[None]], registry: PreloadRegistry, early_hints: bool = True):
+        self.app = app
+        self.registry = registry
+        self.early_hints = early_hints
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] != 'http' or scope.get('method') not in PRELOAD_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        bundle = self.registry.for_path(scope['path'])
+        if bundle is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self.early_hints and 'http.response.early_hint' in (scope.get('extensions') or {}):
+            await send({'type': 'http.response.early_hint', 'links': list(bundle.links)})
+
+        async def send_with_link(message: Dict[str, Any]) -> None:
+            if message['type'] == 'http.response.start' and 200 <= message['status'] < 300:
+                message = dict(message)
+                message['headers'] = [*message.get('headers', ()), (b'link', bundle.header)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_link)
+
+
+class PreloadWSGIMiddleware:
+    """
+    WSGI middleware adding preload Link headers
+
+    The header is only added to 2xx responses of GET and HEAD requests.
+
+    Examples:
+        >>> app = Flask(__name__)
+        >>> app.wsgi_app = PreloadWSGIMiddleware(app.wsgi_app, registry)
+    """
+
+    def __init__(self, app: Callable[..., Iterable[bytes]], registry: PreloadRegistry):
+        self.app = app
+        self.registry = registry
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        if environ.get('REQUEST_METHOD') not in PRELOAD_METHODS:
+            return self.app(environ, start_response)
+
+        bundle = self.registry.for_path(environ.get('PATH_INFO', ''))
+        if bundle is None:
+            return self.app(environ, start_response)
+
+        def start_with_link(status: str, headers: List[Tuple[str, str]], exc_info: Any = None) -> Callable:
+            if status[:1] == '2':
+                headers = [*headers, ('Link', bundle.value)]
+            return start_response(status, headers, exc_info)
+
+        return self.app(environ, start_with_link)
+
+
+__all__ = [
+    'PreloadBundle',
+    'PreloadRegistry',
+    'PreloadASGIMiddleware',
+    'PreloadWSGIMiddleware',
+    'format_link',
+    'preload_destination',
+]
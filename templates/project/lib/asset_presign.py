@@ -0,0 +1,288 @@
+"""
+Cached Signed URLs for Private R2 Assets
+
+Private objects (invoices, paid downloads, user uploads) stay in a bucket
+without a public domain; pages link to them with time-limited presigned
+URLs (AWS Signature Version 4 in the query string). Signing is local HMAC
+work, no request to R2 is made:
+- presign_url(): one URL, signed now
+- UrlSigner: signatures cached until `min_validity` seconds before expiry,
+  with sign_many() for pages that list many private files
+
+UrlSigner aligns the signing time to a fixed window (`ttl - min_validity`
+seconds), so every worker hands out the same URL for a key within a
+window, and browsers can cache the object across page views. A URL is
+replaced when less than `min_validity` seconds of its lifetime remain.
+
+As in asset_sync, the first segment of each `r2_key` is the bucket and
+credentials come from R2_ENDPOINT (or R2_ACCOUNT_ID), R2_ACCESS_KEY_ID and
+R2_SECRET_ACCESS_KEY.
+
+Usage:
+    resolver.enable_signed_urls(ttl=3600)
+    resolver.get_signed_url('private-bucket/invoices/2024-001.pdf')
+
+License: MIT
+"""
+
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from .asset_sync import R2Credentials, _signing_key
+
+DEFAULT_TTL = 3600
+DEFAULT_MIN_VALIDITY = 300
+
+# SigV4 presigned URLs are valid for at most seven days
+MAX_EXPIRES = 7 * 24 * 3600
+
+# Neither the body nor its hash is known when the link is handed out
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+
+
+def _encode(value: str) -> str:
+    """SigV4 URI encoding: everything except unreserved characters"""
+    return quote(value, safe='-_.~')
+
+
+def _presigner(
+    credentials: R2Credentials,
+    expires: int,
+    now: datetime,
+    method: str = 'GET',
+) -> Callable[[str], str]:
+    """
+    Signing function for many keys sharing one signing time
+
+    Everything except the path (scope, signing key, query string) is
+    computed once, so each URL costs one SHA256 and one HMAC.
+    """
+    if not 0 < expires <= MAX_EXPIRES:
+        raise ValueError(f"[UrlSigner] expires must be between 1 and {MAX_EXPIRES} seconds, got {expires}")
+
+    endpoint = urlsplit(credentials.endpoint)
+    host = endpoint.netloc
+    base = f'{endpoint.scheme}://{host}'
+    amz_date = now.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    date = amz_date[:8]
+    scope = f'{date}/{credentials.region}/s3/aws4_request'
+
+    # Parameter names are already in canonical (sorted) order
+    query = '&'.join(f'{name}={_encode(value)}' for name, value in (
+        ('X-Amz-Algorithm', 'AWS4-HMAC-SHA256'),
+        ('X-Amz-Credential', f'{credentials.access_key_id}/{scope}'),
+        ('X-Amz-Date', amz_date),
+        ('X-Amz-Expires', str(int(expires))),
+        ('X-Amz-SignedHeaders', 'host'),
+    ))
+    request_head = f'{method}\n'
+    request_tail = f'\n{query}\nhost:{host}\n\nhost\n{UNSIGNED_PAYLOAD}'
+    sign_head = f'AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n'
+    key = _signing_key(credentials.secret_access_key, date, credentials.region, 's3')
+    sha256 = hashlib.sha256
+    digest = hmac.digest
+
+    def presign(r2_key: str) -> str:
+        path = '/' + quote(r2_key.lstrip('/'), safe='/-_.~')
+        canonical_request = request_head + path + request_tail
+        string_to_sign = sign_head + sha256(canonical_request.encode()).hexdigest()
+        signature = digest(key, string_to_sign.encode(), 'sha256').hex()
+        return f'{base}{path}?{query}&X-Amz-Signature={signature}'
+
+    return presign
+
+
+def presign_url(
+    r2_key: str,
+    credentials: R2Credentials,
+    expires: int = DEFAULT_TTL,
+    now: Optional[datetime] = None,
+    method: str = 'GET',
+) -> str:
+    """
+    Presigned URL for an object, valid for `expires` seconds from `now`
+
+    Args:
+        r2_key: Bucket and object key, e.g. 'private-bucket/invoices/1.pdf'
+        credentials: Endpoint, access keys and region
+        expires: Lifetime in seconds (at most seven days)
+        now: Signing time (default: current UTC time)
+        method: HTTP method the URL is valid for
+
+    Returns:
+        URL on the credentials' endpoint carrying X-Amz-* query parameters
+
+    Raises:
+        ValueError: If expires is out of range
+
+    Examples:
+        >>> presign_url('private-bucket/report.pdf', R2Credentials.from_env(), expires=600)
+        'https://abc123.r2.cloudflarestorage.com/private-bucket/report.pdf?X-Amz-Algorithm=AWS4-HMAC-SHA256&...'
+    """
+    return _presigner(credentials, expires, now or datetime.now(timezone.utc), method)(r2_key)
+
+
+class _SignedUrlCache:
+    """
+    Bounded LRU of r2_key -> (signed URL, time it stops being handed out)
+
+    Reads never take the lock, writes and evictions do (as ResolutionCache).
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize <= 0:
+            raise ValueError(f"[UrlSigner] Cache size must be positive: {maxsize}")
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[str, Tuple[str, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, r2_key: str) -> Optional[Tuple[str, int]]:
+        entry = self._data.get(r2_key)
+        if entry is not None:
+            try:
+                self._data.move_to_end(r2_key)
+            except KeyError:
+                # Evicted by a concurrent writer between the probe and the touch
+                pass
+        return entry
+
+    def put(self, r2_key: str, url: str, renew_at: int) -> None:
+        with self._lock:
+            self._data[r2_key] = (url, renew_at)
+            self._data.move_to_end(r2_key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class UrlSigner:
+    """
+    Presigned GET URLs cached until shortly before they expire
+
+    Examples:
+        >>> signer = UrlSigner(R2Credentials.from_env(), ttl=3600, min_validity=300)
+        >>> signer.sign('private-bucket/invoices/2024-001.pdf') == signer.sign('private-bucket/invoices/2024-001.pdf')
+        True
+        >>> urls = signer.sign_many(f'private-bucket/exports/{name}' for name in names)
+    """
+
+    def __init__(
+        self,
+        credentials: Optional[R2Credentials] = None,
+        ttl: int = DEFAULT_TTL,
+        min_validity: int = DEFAULT_MIN_VALIDITY,
+        cache_size: int = 65536,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            credentials: Endpoint and access keys (default: R2Credentials.from_env())
+            ttl: Lifetime of each URL in seconds
+            min_validity: Seconds of lifetime a returned URL has left at least
+            cache_size: Maximum number of cached URLs
+            clock: Current Unix time; replaceable for tests
+
+        Raises:
+            ValueError: If min_validity is not below ttl, ttl exceeds seven days, or cache_size is not positive
+        """
+        if not 0 <= min_validity < ttl <= MAX_EXPIRES:
+            raise ValueError(
+                f"[UrlSigner] Need 0 <= min_validity < ttl <= {MAX_EXPIRES}, got ttl={ttl}, min_validity={min_validity}"
+            )
+        self.credentials = credentials or R2Credentials.from_env()
+        self.ttl = int(ttl)
+        self.min_validity = int(min_validity)
+        self.step = self.ttl - self.min_validity
+        self.signed = 0  # Signatures computed (cache misses)
+        self._clock = clock
+        self._cache = _SignedUrlCache(cache_size)
+        self._window: Optional[Tuple[int, Callable[[str], str]]] = None
+
+    def _presigner_for(self, now: float) -> Tuple[int, Callable[[str], str]]:
+        """(Window start, presign function) for the window containing `now`"""
+        start = int(now) - int(now) % self.step
+        window = self._window
+        if window is None or window[0] != start:
+            signed_at = datetime.fromtimestamp(start, timezone.utc)
+            window = (start, _presigner(self.credentials, self.ttl, signed_at))
+            self._window = window
+        return window
+
+    def sign(self, r2_key: str) -> str:
+        """
+        Presigned GET URL for an object, with at least min_validity seconds left
+
+        Args:
+            r2_key: Bucket and object key
+
+        Returns:
+            Cached URL while it is fresh enough, otherwise a newly signed one
+        """
+        now = self._clock()
+        entry = self._cache.get(r2_key)
+        if entry is not None and now < entry[1]:
+            return entry[0]
+
+        start, presign = self._presigner_for(now)
+        url = presign(r2_key)
+        self._cache.put(r2_key, url, start + self.step)
+        self.signed += 1
+        return url
+
+    def sign_many(self, r2_keys: Iterable[str]) -> List[str]:
+        """
+        Presigned GET URLs for many objects, e.g. every file on a listing page
+
+        Reads the clock and prepares the signing state once for the batch.
+
+        Args:
+            r2_keys: Bucket and object keys
+
+        Returns:
+            URLs in input order
+        """
+        now = self._clock()
+        cache = self._cache
+        start, presign = None, None
+        urls = []
+        for r2_key in r2_keys:
+            entry = cache.get(r2_key)
+            if entry is not None and now < entry[1]:
+                urls.append(entry[0])
+                continue
+            if presign is None:
+                start, presign = self._presigner_for(now)
+            url = presign(r2_key)
+            cache.put(r2_key, url, start + self.step)
+            self.signed += 1
+            urls.append(url)
+        return urls
+
+    def clear(self) -> None:
+        """Drop every cached URL, e.g. after rotating access keys"""
+        self._cache.clear()
+        self._window = None
+
+    def __repr__(self) -> str:
+        return f"UrlSigner(endpoint={self.credentials.endpoint!r}, ttl={self.ttl}, min_validity={self.min_validity})"
+
+
+__all__ = [
+    'DEFAULT_MIN_VALIDITY',
+    'DEFAULT_TTL',
+    'MAX_EXPIRES',
+    'UrlSigner',
+    'presign_url',
+]
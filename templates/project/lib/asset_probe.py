@@ -0,0 +1,299 @@
+"""
+CDN Reachability Probing for the Python Asset Helper
+
+Async HEAD probing used by AssetResolver.aget_asset_url() to fall back to
+local paths when a CDN object has been purged or was never uploaded:
+- Pooled keep-alive connections per origin (stdlib asyncio, no dependencies)
+- Concurrency limit shared by all probes
+- TTL cache with shorter-lived negative entries
+- Concurrent probes for the same URL are coalesced into one request
+
+Imported lazily by lib.assets, so projects that never probe pay nothing.
+
+License: MIT
+"""
+
+import asyncio
+import ssl
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class ProbeCache:
+    """
+    TTL cache of CDN reachability results
+
+    Reachable URLs are remembered for `ttl` seconds; unreachable ones for the
+    shorter `negative_ttl` so a restored object is picked up quickly.
+
+    Examples:
+        >>> cache = ProbeCache(ttl=300, negative_ttl=30)
+        >>> cache.set('https://cdn.example.com/logo.png', True)
+        >>> cache.get('https://cdn.example.com/logo.png')
+        True
+    """
+
+    def __init__(self, ttl: float = 300.0, negative_ttl: float = 30.0, maxsize: int = 65536):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self._entries: Dict[str, Tuple[bool, float]] = {}
+
+    def get(self, url: str) -> Optional[bool]:
+        """
+        Get a cached probe result
+
+        Returns:
+            True/False if a fresh result is cached, None otherwise
+        """
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+
+        available, expires = entry
+        if expires < time.monotonic():
+            self._entries.pop(url, None)
+            return None
+        return available
+
+    def set(self, url: str, available: bool) -> None:
+        """Cache a probe result with the TTL for its outcome"""
+        if len(self._entries) >= self.maxsize and url not in self._entries:
+            # Drop the oldest insertion; dicts preserve insertion order
+            self._entries.pop(next(iter(self._entries)))
+
+        ttl = self.ttl if available else self.negative_ttl
+        self._entries[url] = (available, time.monotonic() + ttl)
+
+    def clear(self) -> None:
+        """Drop all cached results"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _ConnectionPool:
+    """Idle keep-alive HTTP/1.1 connections keyed by (host, port, tls)"""
+
+    def __init__(self, timeout: float, max_idle_per_host: int):
+        self.timeout = timeout
+        self.max_idle_per_host = max_idle_per_host
+        self._idle: Dict[Tuple[str, int, bool], List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    async def head(self, url: str) -> int:
+        """
+        Send a HEAD request, reusing an idle connection when possible
+
+        Returns:
+            HTTP status code
+
+        Raises:
+            OSError, asyncio.TimeoutError, ValueError: On connection or protocol errors
+        """
+        parts = urlsplit(url)
+        secure = parts.scheme == 'https'
+        host = parts.hostname or ''
+        port = parts.port or (443 if secure else 80)
+        key = (host, port, secure)
+
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        host_header = host if parts.port is None else f'{host}:{port}'
+        request = (
+            f'HEAD {target} HTTP/1.1\r\n'
+            f'Host: {host_header}\r\n'
+            'User-Agent: AssetResolver-probe\r\n'
+            'Connection: keep-alive\r\n\r\n'
+        ).encode('latin-1')
+
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            try:
+                return await self._send(key, reader, writer, request)
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                # Server closed the idle connection; retry on the next one
+                writer.close()
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=self._context() if secure else None),
+            self.timeout,
+        )
+        try:
+            return await self._send(key, reader, writer, request)
+        except BaseException:
+            writer.close()
+            raise
+
+    async def _send(
+        self,
+        key: Tuple[str, int, bool],
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        request: bytes
+    ) -> int:
+        writer.write(request)
+        await writer.drain()
+        status, keep_alive = await asyncio.wait_for(self._read_head(reader), self.timeout)
+
+        idle = self._idle.setdefault(key, [])
+        if keep_alive and len(idle) < self.max_idle_per_host:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+        return status
+
+    @staticmethod
+    async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, bool]:
+        """Read a response status line and headers (HEAD responses carry no body)"""
+        status_line = await reader.readuntil(b'\r\n')
+        version, status, *_ = status_line.decode('latin-1').split(' ', 2)
+        keep_alive = version == 'HTTP/1.1'
+
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'connection':
+                token = value.strip().lower()
+                if token == 'close':
+                    keep_alive = False
+                elif token == 'keep-alive':
+                    keep_alive = True
+
+        return int(status), keep_alive
+
+    def _context(self) -> ssl.SSLContext:
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    def close(self) -> None:
+        """Close all idle connections"""
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+
+class CdnProber:
+    """
+    Concurrency-limited, cached HEAD prober for CDN URLs
+
+    A URL is reachable when the origin answers with a status below 400.
+    Timeouts and connection errors count as unreachable.
+
+    Examples:
+        >>> prober = CdnProber(concurrency=16, ttl=300, negative_ttl=30)
+        >>> await prober.is_available('https://cdn.example.com/logo.png')
+        True
+        >>> await prober.warm(url for url in manifest_cdn_urls)
+        >>> await prober.aclose()
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 16,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        timeout: float = 2.0,
+        max_idle_per_host: int = 8,
+    ):
+        if concurrency <= 0:
+            raise ValueError(f"[CdnProber] Concurrency must be positive: {concurrency}")
+
+        self.concurrency = concurrency
+        self.cache = ProbeCache(ttl, negative_ttl)
+        self._pool = _ConnectionPool(timeout, max_idle_per_host)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, 'asyncio.Future[bool]'] = {}
+        self.requests = 0
+
+    def _bind_loop(self) -> None:
+        """Rebind loop-specific state when used from a new event loop"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._pool.close()
+            self._inflight.clear()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+
+    async def is_available(self, url: str) -> bool:
+        """
+        Check whether a CDN URL is reachable, using the cache when fresh
+
+        Args:
+            url: CDN URL
+
+        Returns:
+            True if the URL answered HEAD with a status below 400
+        """
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached
+
+        self._bind_loop()
+        pending = self._inflight.get(url)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = self._loop.create_future()
+        self._inflight[url] = future
+        try:
+            available = await self._probe(url)
+            self.cache.set(url, available)
+            future.set_result(available)
+            return available
+        except BaseException:
+            # Only cancellation gets here; _probe() maps errors to False
+            future.cancel()
+            raise
+        finally:
+            self._inflight.pop(url, None)
+
+    async def _probe(self, url: str) -> bool:
+        async with self._semaphore:
+            self.requests += 1
+            try:
+                status = await self._pool.head(url)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError, ValueError):
+                return False
+            return status < 400
+
+    async def probe_many(self, urls: Iterable[str]) -> Dict[str, bool]:
+        """
+        Probe many URLs concurrently (bounded by `concurrency`)
+
+        Returns:
+            Mapping of each distinct URL to its reachability
+        """
+        distinct = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.is_available(url) for url in distinct))
+        return dict(zip(distinct, results))
+
+    async def warm(self, urls: Iterable[str]) -> int:
+        """
+        Pre-populate the cache, e.g. with every cdn_url in the manifest at startup
+
+        Returns:
+            Number of reachable URLs
+        """
+        results = await self.probe_many(url for url in urls if url)
+        return sum(results.values())
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        self._pool.close()
+
+
+__all__ = [
+    'CdnProber',
+    'ProbeCache',
+]
@@ -0,0 +1,469 @@
+"""
+Build-Time Asset Reference Rewriter
+
+Static pages and CSS bundles that reference local paths such as
+`/media/logo.png` directly never go through get_asset_url(), so in
+production those requests hit the origin. This build step rewrites
+`src`, `href`, `srcset` and `poster` attributes and CSS `url()`
+references (in .css files and in HTML `<style>` blocks and `style`
+attributes) to the URLs the manifest resolves them to:
+- Same rules as the application: URLs come from AssetIndex, so env_mode,
+  ASSET_MODE, fingerprints and CDN host sharding all apply
+- Streaming: files are read and written in chunks, so memory stays flat
+  for any file size
+- Parallel: large batches are rewritten in a process pool across cores
+- Incremental: files whose (size, mtime, inode) and resolved URL table are
+  unchanged since the last run are skipped
+
+References that are not in the manifest, or that resolve to themselves
+(e.g. local mode), are left as they are.
+
+Usage:
+    ENVIRONMENT=production python -m lib.asset_rewrite dist/                # in place
+    ENVIRONMENT=production python -m lib.asset_rewrite build/ -o dist/      # to another directory
+
+License: MIT
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from .asset_manifest import scan_files
+from .asset_verify import DigestCache
+from .assets import AssetIndex, AssetResolver
+
+# File kinds by extension; other files are copied (or left alone in place)
+REWRITE_EXTENSIONS = {'.html': 'html', '.htm': 'html', '.css': 'css'}
+
+# Incremental state, kept in the output directory (hidden, so never scanned)
+REWRITE_CACHE_NAME = '.asset-rewrite'
+
+# Characters read per chunk
+CHUNK_SIZE = 256 * 1024
+
+# Longest reference value recognised; longer attribute values are left as is
+MAX_REFERENCE = 8192
+
+# Characters held back at the end of each chunk so no reference is split
+# (longer than any match), and kept before the next one for lookbehind context
+WINDOW = MAX_REFERENCE + 128
+CONTEXT = 16
+
+# Rewrite in a process pool once this many bytes need rewriting
+POOL_THRESHOLD = 4 * 1024 * 1024
+
+# Quoted or unquoted attribute values, and CSS url() with any quoting
+_ATTRIBUTE = (
+    rf'''(?<![\w:-])(?P<attr>src|href|srcset|poster)(?P<eq>\s{{0,16}}=\s{{0,16}})'''
+    rf'''(?:"(?P<dq>[^"<>]{{0,{MAX_REFERENCE}}})"|'(?P<sq>[^'<>]{{0,{MAX_REFERENCE}}})'|(?P<uq>[^\s"'=<>`]{{1,{MAX_REFERENCE}}}))'''
+)
+_CSS_URL = (
+    rf'''(?<![\w-])(?P<fn>url\(\s{{0,16}})'''
+    rf'''(?:"(?P<cdq>[^"\n]{{0,{MAX_REFERENCE}}})"|'(?P<csq>[^'\n]{{0,{MAX_REFERENCE}}})'|(?P<cuq>[^"'()\s]{{1,{MAX_REFERENCE}}}))'''
+    rf'''(?P<close>\s{{0,16}}\))'''
+)
+PATTERNS = {
+    'html': re.compile(f'{_ATTRIBUTE}|{_CSS_URL}', re.IGNORECASE),
+    'css': re.compile(_CSS_URL, re.IGNORECASE),
+}
+
+# Per-run totals: files rewritten, copied and skipped as unchanged, references
+# rewritten, and files that could not be read or written
+RewriteStats = namedtuple('RewriteStats', ['rewritten', 'copied', 'skipped', 'references', 'errors'])
+
+
+def url_table(index: AssetIndex) -> Dict[str, str]:
+    """
+    Local URL -> resolved URL for every asset that does not resolve locally
+
+    Examples:
+        >>> url_table(AssetIndex.load('.r2-manifest.yml'))
+        {'/media/logo.svg': 'https://cdn.example.com/logos/logo.svg', ...}  # in production
+    """
+    return {
+        record.local_path: record.url
+        for record in index.records()
+        if record.url != record.local_path
+    }
+
+
+def table_token(table: Mapping[str, str]) -> str:
+    """Fingerprint of a URL table; outputs rewritten with another table are redone"""
+    import hashlib
+
+    return hashlib.sha256(json.dumps(sorted(table.items())).encode('utf-8')).hexdigest()[:16]
+
+
+def resolve_reference(reference: str, table: Mapping[str, str]) -> Optional[str]:
+    """
+    Resolved URL for one root-relative reference
+
+    A query string or fragment on the reference is kept (a query is merged
+    into a fingerprinted URL's own). Percent-encoded paths are also tried
+    decoded.
+
+    Returns:
+        Resolved URL, or None to leave the reference unchanged
+
+    Examples:
+        >>> resolve_reference('/media/logo.svg#icon', {'/media/logo.svg': 'https://cdn.example.com/logo.svg'})
+        'https://cdn.example.com/logo.svg#icon'
+    """
+    if not reference.startswith('/') or reference.startswith('//'):
+        return None
+
+    cut = len(reference)
+    for mark in ('?', '#'):
+        index = reference.find(mark, 0, cut)
+        if index != -1:
+            cut = index
+    path, suffix = reference[:cut], reference[cut:]
+
+    url = table.get(path)
+    if url is None and '%' in path:
+        from urllib.parse import unquote
+
+        url = table.get(unquote(path))
+    if url is None:
+        return None
+
+    if suffix.startswith('?') and '?' in url:
+        return f'{url}&{suffix[1:]}'
+    return url + suffix
+
+
+def _rewrite_srcset(value: str, table: Mapping[str, str]) -> Optional[str]:
+    """srcset with each candidate URL resolved, or None if none changed"""
+    changed = False
+    candidates = []
+    for candidate in value.split(','):
+        lead = candidate[:len(candidate) - len(candidate.lstrip())]
+        reference = candidate[len(lead):].split(None, 1)[0] if candidate.strip() else ''
+        url = resolve_reference(reference, table)
+        if url is None:
+            candidates.append(candidate)
+            continue
+        changed = True
+        candidates.append(lead + url + candidate[len(lead) + len(reference):])
+    return ','.join(candidates) if changed else None
+
+
+def _replacement(match: 're.Match[str]', table: Mapping[str, str]) -> Optional[str]:
+    """Rewritten text for one match, or None to keep it"""
+    groups = match.groupdict()
+    if groups.get('attr') is not None:
+        for name, quote in (('dq', '"'), ('sq', "'"), ('uq', '')):
+            value = groups[name]
+            if value is not None:
+                break
+        if groups['attr'].lower() == 'srcset':
+            url = _rewrite_srcset(value, table)
+        else:
+            url = resolve_reference(value.strip(), table)
+        if url is None:
+            return None
+        quote = quote or '"'
+        return f"{groups['attr']}{groups['eq']}{quote}{url}{quote}"
+
+    for name, quote in (('cdq', '"'), ('csq', "'"), ('cuq', '')):
+        value = groups[name]
+        if value is not None:
+            break
+    url = resolve_reference(value, table)
+    if url is None:
+        return None
+    return f"{groups['fn']}{quote}{url}{quote}{groups['close']}"
+
+
+def rewrite_stream(chunks: Iterable[str], table: Mapping[str, str], kind: str = 'html') -> Iterator[Tuple[str, int]]:
+    """
+    Rewrite asset references in a stream of text chunks
+
+    Output equals rewriting the whole text at once: the last WINDOW
+    characters of each chunk are held back until the next one arrives,
+    so a reference is never split.
+
+    Args:
+        chunks: Text in pieces of any size
+        table: Local URL -> resolved URL (see url_table)
+        kind: 'html' (attributes and url()) or 'css' (url() only)
+
+    Yields:
+        (output text, references rewritten in it)
+
+    Examples:
+        >>> ''.join(text for text, _ in rewrite_stream(['<img src="/media/a.png">'], {'/media/a.png': 'https://cdn.example.com/a.png'}))
+        '<img src="https://cdn.example.com/a.png">'
+    """
+    pattern = PATTERNS[kind]
+    buffer = ''
+    done = 0
+    scan = 0  # Matching resumes here; past `done` after an unchanged reference
+    for chunk, final in _with_final(chunks):
+        buffer += chunk
+        limit = len(buffer) if final else len(buffer) - WINDOW
+        if limit <= done:
+            continue
+
+        parts: List[str] = []
+        count = 0
+        for match in pattern.finditer(buffer, scan):
+            if match.start() >= limit:
+                break
+            scan = match.end()
+            replacement = _replacement(match, table)
+            if replacement is None:
+                continue
+            parts.append(buffer[done:match.start()])
+            parts.append(replacement)
+            done = match.end()
+            count += 1
+        if limit > done:
+            parts.append(buffer[done:limit])
+            done = limit
+        scan = max(scan, done)
+        yield ''.join(parts), count
+
+        keep = max(done - CONTEXT, 0)
+        buffer = buffer[keep:]
+        done -= keep
+        scan -= keep
+
+
+def _with_final(chunks: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+    """(chunk, is_last) pairs, with an empty last chunk to flush on"""
+    for chunk in chunks:
+        yield chunk, False
+    yield '', True
+
+
+def _read_chunks(f) -> Iterator[str]:
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def rewrite_file(source: str, dest: str, table: Mapping[str, str], kind: Optional[str] = None) -> int:
+    """
+    Rewrite one HTML or CSS file, streaming, and replace `dest` atomically
+
+    Bytes that are not valid UTF-8 and line endings are preserved. When
+    rewriting in place and no reference changed, the file is not touched.
+
+    Args:
+        source: File to read
+        dest: File to write (may be `source`)
+        table: Local URL -> resolved URL
+        kind: 'html' or 'css' (default: from the extension)
+
+    Returns:
+        Number of references rewritten
+    """
+    kind = kind or REWRITE_EXTENSIONS[os.path.splitext(source)[1].lower()]
+    tmp_path = f'{dest}.tmp{os.getpid()}'
+    count = 0
+    try:
+        with open(source, encoding='utf-8', errors='surrogateescape', newline='') as src, \
+                open(tmp_path, 'w', encoding='utf-8', errors='surrogateescape', newline='') as out:
+            for text, rewritten in rewrite_stream(_read_chunks(src), table, kind):
+                out.write(text)
+                count += rewritten
+        if count or os.path.abspath(source) != os.path.abspath(dest):
+            shutil.copymode(source, tmp_path)
+            os.replace(tmp_path, dest)
+        else:
+            os.unlink(tmp_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+# Table handed to pool workers once, by the initializer
+_worker_table: Dict[str, str] = {}
+
+
+def _init_worker(table: Dict[str, str]) -> None:
+    global _worker_table
+    _worker_table = table
+
+
+def _try_rewrite(source: str, dest: str, table: Optional[Mapping[str, str]] = None) -> Optional[int]:
+    """rewrite_file() for pool workers; unreadable or unwritable files return None"""
+    try:
+        return rewrite_file(source, dest, _worker_table if table is None else table)
+    except (OSError, UnicodeError):
+        return None
+
+
+def _rewrite_files(
+    jobs: List[Tuple[str, str, str]],
+    table: Dict[str, str],
+    total_bytes: int,
+    workers: Optional[int],
+) -> Iterator[Tuple[str, Optional[int]]]:
+    """(relative path, references or None) pairs, rewritten in a pool when there is enough data"""
+    if len(jobs) > 1 and total_bytes >= POOL_THRESHOLD:
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count() or 1,
+            initializer=_init_worker,
+            initargs=(table,),
+        ) as pool:
+            futures = {pool.submit(_try_rewrite, source, dest): path for path, source, dest in jobs}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    else:
+        for path, source, dest in jobs:
+            yield path, _try_rewrite(source, dest, table)
+
+
+def rewrite_tree(
+    root: str,
+    table: Dict[str, str],
+    dest: Optional[str] = None,
+    cache: bool = True,
+    workers: Optional[int] = None,
+) -> RewriteStats:
+    """
+    Rewrite every HTML and CSS file under a build directory
+
+    With `dest`, the tree is mirrored there: HTML/CSS files are rewritten
+    and other files copied. Without it, files are rewritten in place; a
+    file already rewritten is skipped until the build replaces it.
+
+    Args:
+        root: Build directory
+        table: Local URL -> resolved URL (see url_table)
+        dest: Output directory (default: rewrite in place)
+        cache: Skip files unchanged since the last run with the same table
+        workers: Rewriting processes (default: CPU count)
+
+    Returns:
+        RewriteStats
+
+    Examples:
+        >>> table = url_table(AssetIndex.load('.r2-manifest.yml'))
+        >>> rewrite_tree('build', table, dest='dist')
+        RewriteStats(rewritten=120, copied=40, skipped=0, references=3512, errors=[])
+    """
+    root = os.path.abspath(root)
+    dest = os.path.abspath(dest) if dest else root
+    in_place = dest == root
+    state = DigestCache(os.path.join(dest, REWRITE_CACHE_NAME) if cache else None)
+    token = table_token(table)
+
+    paths = scan_files(root)
+    if not in_place:
+        # An output directory inside the build directory is not input
+        inside = os.path.relpath(dest, root)
+        if not inside.startswith('..'):
+            paths = [path for path in paths if not (path + '/').startswith(inside.replace(os.sep, '/') + '/')]
+
+    jobs: List[Tuple[str, str, str]] = []
+    pending_bytes = 0
+    copied = skipped = 0
+    errors: List[str] = []
+    for path in paths:
+        source = os.path.join(root, path)
+        target = os.path.join(dest, path)
+        kind = REWRITE_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        try:
+            stat = os.stat(source)
+        except OSError:
+            errors.append(path)
+            continue
+
+        expected = token if kind else 'copy'
+        if state.get(path, stat) == expected and (in_place or os.path.exists(target)):
+            skipped += 1
+            continue
+
+        if kind is None:
+            if not in_place:
+                try:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copy2(source, target)
+                except OSError:
+                    errors.append(path)
+                    continue
+                state.put(path, stat, expected)
+                copied += 1
+            continue
+
+        if not in_place:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        jobs.append((path, source, target))
+        pending_bytes += stat.st_size
+
+    rewritten = references = 0
+    for path, count in _rewrite_files(jobs, table, pending_bytes, workers):
+        if count is None:
+            errors.append(path)
+            continue
+        rewritten += 1
+        references += count
+        try:
+            # In place, the rewritten file is what the next run sees
+            state.put(path, os.stat(os.path.join(root, path)), token)
+        except OSError:
+            pass
+    state.save()
+
+    return RewriteStats(rewritten, copied, skipped, references, sorted(errors))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(
+        prog='python -m lib.asset_rewrite',
+        description='Rewrite local asset references in HTML/CSS to resolved (CDN) URLs',
+    )
+    parser.add_argument('root', help='Build directory')
+    parser.add_argument('-o', '--output', help='Output directory (default: rewrite in place)')
+    parser.add_argument('--manifest', default='.r2-manifest.yml', help='Manifest path (default: .r2-manifest.yml)')
+    parser.add_argument('--public-dir', default='public', help='Web root prefix in manifest paths (default: public)')
+    parser.add_argument('--fresh', action='store_true', help='Ignore the state of the previous run')
+    parser.add_argument('--workers', type=int, help='Rewriting processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    resolver = AssetResolver.get_instance()
+    index = AssetIndex.load(args.manifest, resolver, public_dir=args.public_dir)
+    stats = rewrite_tree(args.root, url_table(index), args.output, cache=not args.fresh, workers=args.workers)
+
+    for error in stats.errors:
+        print(f"[AssetRewriter] Could not rewrite: {error}", file=sys.stderr)
+    print(
+        f"[AssetRewriter] {args.output or args.root} ({resolver.environment}): {stats.rewritten} rewritten, "
+        f"{stats.copied} copied, {stats.skipped} unchanged; {stats.references} references "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return 1 if stats.errors else 0
+
+
+__all__ = [
+    'RewriteStats',
+    'resolve_reference',
+    'rewrite_file',
+    'rewrite_stream',
+    'rewrite_tree',
+    'table_token',
+    'url_table',
+]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+CDN Host Sharding with Consistent Hashing and Weighted Failover
+
+A pool of equivalent CDN origins (e.g. cdn-a.example.com and
+cdn-b.example.com fronting the same bucket) spreads requests across
+hostnames. Each asset is mapped to one host by weighted rendezvous
+(highest random weight) hashing of its path:
+- Deterministic: every worker and every deploy sends an asset to the same
+  host, so browser and edge caches stay warm
+- Weighted: a host with weight 2 serves about twice the assets of weight 1
+- Consistent: marking a host down moves only that host's assets, each to
+  its next-ranked host, so the others keep their (warm) mapping and the
+  moved assets spread over the survivors in proportion to their weights
+
+AssetResolver builds a HostPool from ResolverConfig.cdn_hosts/cdn_down
+(ASSET_CDN_HOSTS / ASSET_CDN_DOWN) and routes each URL once, when the
+resolver config is applied or on a cache miss; cached lookups do no work.
+
+Usage:
+    pool = HostPool([('https://cdn-a.example.com', 2.0), ('https://cdn-b.example.com', 1.0)])
+    pool.route('https://cdn-a.example.com/media/logo.png')
+
+License: MIT
+"""
+
+import hashlib
+import math
+from typing import FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+# Scores are computed from 64-bit hashes
+HASH_RANGE = float(2 ** 64)
+
+
+class HostPool:
+    """
+    Equivalent CDN origins with per-asset host selection
+
+    URLs on any member origin are routable: their path (and query) is the
+    hashing key and the origin is replaced with the selected host. URLs on
+    other origins, local paths, and URLs when every host is down are
+    returned unchanged.
+
+    Examples:
+        >>> pool = HostPool([('https://cdn-a.example.com', 1.0), ('https://cdn-b.example.com', 1.0)])
+        >>> pool.route('https://cdn-a.example.com/media/logo.png')
+        'https://cdn-b.example.com/media/logo.png'
+        >>> pool.with_down(['https://cdn-b.example.com']).route('https://cdn-a.example.com/media/logo.png')
+        'https://cdn-a.example.com/media/logo.png'
+    """
+
+    def __init__(self, hosts: Sequence[Tuple[str, float]], down: Iterable[str] = ()):
+        """
+        Args:
+            hosts: (origin, weight) pairs, origins as 'https://host[:port]'
+                   in lowercase (see ResolverConfig.cdn_hosts)
+            down: Origins marked unhealthy; they are skipped by route()
+
+        Raises:
+            ValueError: If the pool is empty, or an origin is duplicated or
+                        has a non-positive weight
+        """
+        if not hosts:
+            raise ValueError("[HostPool] At least one CDN host is required")
+
+        origins = [origin for origin, _ in hosts]
+        if len(set(origins)) != len(origins):
+            raise ValueError("[HostPool] Duplicate CDN host")
+        for origin, weight in hosts:
+            if not weight > 0 or math.isinf(weight):
+                raise ValueError(f"[HostPool] Invalid weight for {origin}: {weight!r}")
+
+        self.hosts: Tuple[Tuple[str, float], ...] = tuple(hosts)
+        self.down: FrozenSet[str] = frozenset(down) & frozenset(origins)
+        self._members = frozenset(origins)
+        self._seeds = tuple((origin, origin.encode('utf-8') + b'\x00', weight) for origin, weight in hosts)
+
+    def with_down(self, down: Iterable[str]) -> 'HostPool':
+        """Copy of this pool with a different set of unhealthy origins"""
+        return HostPool(self.hosts, down)
+
+    def _scores(self, key: str) -> List[Tuple[float, str]]:
+        """Weighted rendezvous score of every host for a key"""
+        encoded = key.encode('utf-8', 'surrogatepass')
+        scores = []
+        for origin, seed, weight in self._seeds:
+            digest = hashlib.blake2b(seed + encoded, digest_size=8).digest()
+            # Uniform in (0, 1); -weight / ln(u) makes P(host wins) proportional to weight
+            u = (int.from_bytes(digest, 'big') + 0.5) / HASH_RANGE
+            scores.append((-weight / math.log(u), origin))
+        return scores
+
+    def ranking(self, key: str) -> List[str]:
+        """
+        All origins in failover order for a key, ignoring health
+
+        Args:
+            key: Asset path (and query), e.g. '/media/logo.png'
+
+        Returns:
+            Origins, preferred first
+        """
+        return [origin for _, origin in sorted(self._scores(key), reverse=True)]
+
+    def host_for(self, key: str) -> Optional[str]:
+        """
+        Preferred healthy origin for a key
+
+        Returns:
+            Origin, or None if every host is down
+        """
+        best: Optional[Tuple[float, str]] = None
+        for score in self._scores(key):
+            if score[1] not in self.down and (best is None or score > best):
+                best = score
+        return best[1] if best is not None else None
+
+    def route(self, url: str) -> str:
+        """
+        Rewrite a URL on a member origin to the asset's selected host
+
+        Args:
+            url: Absolute URL or local path
+
+        Returns:
+            URL on the selected host, or the URL unchanged if it is not on a
+            member origin or every host is down
+        """
+        if url[:8].lower() != 'https://':
+            return url
+
+        slash = url.find('/', 8)
+        origin = url if slash == -1 else url[:slash]
+        if origin.lower() not in self._members:
+            return url
+
+        key = url[len(origin):]
+        host = self.host_for(key)
+        if host is None or host == origin:
+            return url
+        return host + key
+
+    def __repr__(self) -> str:
+        return f"HostPool(hosts={len(self.hosts)}, down={sorted(self.down)})"
+
+
+__all__ = [
+    'HostPool',
+]
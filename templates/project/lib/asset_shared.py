@@ -0,0 +1,358 @@
+"""
+Shared-Memory Asset Table for Prefork Servers
+
+Every gunicorn/uvicorn worker that loads an AssetIndex holds its own copy
+of tens of thousands of AssetRecord objects and URL strings. Building the
+index in the master before fork does not help for long: reading a Python
+object updates its reference count, so every page a worker touches is
+copied into that worker.
+
+SharedAssetTable stores the resolved key -> URL table as one flat buffer
+(an open-addressing hash table over UTF-8 strings) that no Python object
+lives in, so its pages stay shared by every worker:
+- SharedAssetTable.build(index): anonymous shared mapping, built in the
+  master before fork and inherited by workers (gunicorn --preload)
+- SharedAssetTable.build(index, path): named segment (on Linux a file in
+  /dev/shm, see shared_table_path) that independently started workers
+  attach to with SharedAssetTable.open(path)
+
+A lookup hashes the key and decodes one URL, roughly 15x the cost of a
+dict probe (microseconds, not nanoseconds); in exchange per-worker memory
+stays flat however many workers run. Tables use
+native byte order: they are built and read on one host.
+
+Usage (gunicorn.conf.py, preload_app = True):
+    index = AssetIndex.load('.r2-manifest.yml')
+    assets = SharedAssetTable.build(index)
+    del index
+    ...
+    assets['public/media/logo.svg']
+
+License: MIT
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .assets import AssetIndex, AssetResolver, ResolverConfig
+
+TABLE_MAGIC = b'R2AT'
+TABLE_VERSION = 2
+
+# Layout (native byte order):
+#   header   TABLE_HEADER
+#   records  count x (key offset, key length, URL offset, URL length) uint32
+#   slots    power-of-two uint32 hash slots: record number + 1, 0 if empty
+#   strings  deduplicated UTF-8 string table
+#
+# magic, version, record count, slot count, records offset, slots offset,
+# strings offset, then (offset, length) refs for environment, asset mode,
+# fingerprint style and config digest (see config_digest) the URLs were
+# resolved with
+TABLE_HEADER = struct.Struct('=4sH2x5I8I')
+RECORD_FIELDS = 4
+
+
+def shared_table_path(name: str) -> str:
+    """
+    Path of a named table segment
+
+    /dev/shm (memory-backed) when available, the temp directory otherwise;
+    either way every process mapping the file shares its page cache pages.
+
+    Examples:
+        >>> shared_table_path('my-project')
+        '/dev/shm/r2-assets-my-project.table'
+    """
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, f'r2-assets-{name}.table')
+
+
+def config_digest(config: ResolverConfig) -> str:
+    """
+    Hex digest of every config field that changes resolved URLs
+
+    Covers the CDN pool and drained hosts as well as environment, mode and
+    fingerprint style; only the resolution cache size is left out.
+
+    Examples:
+        >>> config_digest(ResolverConfig('production'))
+        '2e1ec5b12e543cd9...'
+    """
+    fields = (
+        config.environment,
+        config.asset_mode.value,
+        config.fingerprint,
+        config.cdn_hosts,
+        config.cdn_down,
+    )
+    return hashlib.sha256(repr(fields).encode('utf-8')).hexdigest()
+
+
+def pack_asset_table(urls: Dict[str, str], config: ResolverConfig) -> bytes:
+    """
+    Serialize a key -> resolved URL mapping into the table layout
+
+    Args:
+        urls: Resolved URL by logical asset key
+        config: Resolver config the URLs were resolved with
+
+    Returns:
+        Table bytes
+    """
+    strings = bytearray()
+    refs: Dict[str, Tuple[int, int]] = {}
+
+    def ref(value: str) -> Tuple[int, int]:
+        found = refs.get(value)
+        if found is None:
+            encoded = value.encode('utf-8')
+            found = refs[value] = (len(strings), len(encoded))
+            strings.extend(encoded)
+        return found
+
+    keys = sorted(urls)
+    slot_count = 8
+    while slot_count < 2 * len(keys):
+        slot_count *= 2
+    mask = slot_count - 1
+
+    records = [0] * (RECORD_FIELDS * len(keys))
+    slots = [0] * slot_count
+    for number, key in enumerate(keys):
+        key_ref = ref(key)
+        at = number * RECORD_FIELDS
+        records[at:at + RECORD_FIELDS] = (*key_ref, *ref(urls[key]))
+
+        index = zlib.crc32(key.encode('utf-8')) & mask
+        while slots[index]:
+            index = (index + 1) & mask
+        slots[index] = number + 1
+
+    meta = (
+        *ref(config.environment),
+        *ref(config.asset_mode.value),
+        *ref(config.fingerprint),
+        *ref(config_digest(config)),
+    )
+    records_offset = TABLE_HEADER.size
+    slots_offset = records_offset + 4 * len(records)
+    strings_offset = slots_offset + 4 * slot_count
+    header = TABLE_HEADER.pack(
+        TABLE_MAGIC,
+        TABLE_VERSION,
+        len(keys),
+        slot_count,
+        records_offset,
+        slots_offset,
+        strings_offset,
+        *meta,
+    )
+    return b''.join((
+        header,
+        struct.pack(f'={len(records)}I', *records),
+        struct.pack(f'={slot_count}I', *slots),
+        bytes(strings),
+    ))
+
+
+class SharedAssetTable:
+    """
+    Read-only key -> URL table in a shared buffer
+
+    Supports the read-only mapping protocol of AssetIndex: `table[key]`,
+    `table.get(key)`, `key in table`, len() and iteration over keys.
+
+    Examples:
+        >>> assets = SharedAssetTable.build(AssetIndex.load('.r2-manifest.yml'))
+        >>> assets['public/media/logo.svg']
+        'https://cdn.example.com/logos/logo.svg'  # in production
+    """
+
+    def __init__(self, buffer: Any):
+        """
+        Wrap a table buffer (bytes, mmap or any buffer object)
+
+        Raises:
+            ValueError: If the buffer is not a supported table
+        """
+        if len(buffer) < TABLE_HEADER.size:
+            raise ValueError("[SharedAssetTable] Truncated table")
+        (
+            magic, version, self.count, slot_count,
+            records_offset, slots_offset, strings_offset, *meta,
+        ) = TABLE_HEADER.unpack_from(buffer)
+
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError("[SharedAssetTable] Unsupported table format")
+        if (
+            slot_count & (slot_count - 1)
+            or records_offset + 4 * RECORD_FIELDS * self.count != slots_offset
+            or slots_offset + 4 * slot_count != strings_offset
+            or strings_offset > len(buffer)
+        ):
+            raise ValueError("[SharedAssetTable] Corrupt table")
+
+        self._buffer = buffer
+        view = memoryview(buffer)
+        self._records = view[records_offset:slots_offset].cast('I')
+        self._slots = view[slots_offset:strings_offset].cast('I')
+        view.release()
+        self._strings = strings_offset
+        self._mask = slot_count - 1
+
+        self.environment = self._string(meta[0], meta[1])
+        self.asset_mode = self._string(meta[2], meta[3])
+        self.fingerprint = self._string(meta[4], meta[5])
+        self.config_digest = self._string(meta[6], meta[7])
+
+    @classmethod
+    def build(
+        cls,
+        index: AssetIndex,
+        path: Optional[str] = None,
+        resolver: Optional[AssetResolver] = None,
+    ) -> 'SharedAssetTable':
+        """
+        Build a table from a resolved AssetIndex
+
+        Args:
+            index: Resolved index (its URLs are copied, the index can be dropped)
+            path: Named segment to write (atomically) and map; None for an
+                  anonymous shared mapping that forked children inherit
+            resolver: Resolver whose config the index was resolved with
+                      (default: singleton)
+
+        Returns:
+            Mapped SharedAssetTable
+        """
+        import mmap
+
+        config = (resolver or AssetResolver.get_instance()).config
+        data = pack_asset_table({key: index[key] for key in index}, config)
+
+        if path is None:
+            buffer = mmap.mmap(-1, len(data))
+            buffer.write(data)
+            return cls(buffer)
+
+        tmp_path = f'{path}.tmp{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: str) -> 'SharedAssetTable':
+        """
+        Map a named table segment read-only
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If it is not a supported table
+        """
+        import mmap
+
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(buffer)
+        except ValueError:
+            buffer.close()
+            raise
+
+    def __enter__(self) -> 'SharedAssetTable':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the mapping (lookups fail afterwards)"""
+        self._records.release()
+        self._slots.release()
+        close = getattr(self._buffer, 'close', None)
+        if close is not None:
+            close()
+
+    def matches(self, config: Optional[ResolverConfig] = None) -> bool:
+        """
+        Check that the table was resolved with this config (default: the singleton's)
+
+        Compares config_digest(), so a changed CDN pool or a drained host
+        counts as well; after a config change (e.g. ConfigWatcher) rebuild
+        the table.
+        """
+        config = config or AssetResolver.get_instance().config
+        return self.config_digest == config_digest(config)
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        return self._buffer[start:start + length].decode('utf-8')
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Get the resolved URL for an asset
+
+        Args:
+            key: Logical asset key (manifest `path`)
+            default: Value returned for unknown keys
+
+        Returns:
+            Resolved URL, or default
+        """
+        try:
+            encoded = key.encode('utf-8')
+        except (AttributeError, UnicodeEncodeError):
+            return default
+
+        buffer = self._buffer
+        records = self._records
+        slots = self._slots
+        mask = self._mask
+        strings = self._strings
+        index = zlib.crc32(encoded) & mask
+        while True:
+            slot = slots[index]
+            if not slot:
+                return default
+            at = (slot - 1) * RECORD_FIELDS
+            if records[at + 1] == len(encoded):
+                start = strings + records[at]
+                if buffer[start:start + len(encoded)] == encoded:
+                    start = strings + records[at + 2]
+                    return buffer[start:start + records[at + 3]].decode('utf-8')
+            index = (index + 1) & mask
+
+    def __getitem__(self, key: str) -> str:
+        url = self.get(key)
+        if url is None:
+            raise KeyError(key)
+        return url
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key) is not None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[str]:
+        records = self._records
+        for number in range(self.count):
+            at = number * RECORD_FIELDS
+            yield self._string(records[at], records[at + 1])
+
+    def __repr__(self) -> str:
+        return f"SharedAssetTable(count={self.count}, environment={self.environment!r})"
+
+
+__all__ = [
+    'SharedAssetTable',
+    'config_digest',
+    'pack_asset_table',
+    'shared_table_path',
+]
@@ -0,0 +1,758 @@
+"""
+Concurrent, Resumable R2 Asset Sync
+
+Downloads the assets of a `.r2-manifest.yml` that are missing or do not
+match their `size`/`sha256`, straight from R2's S3-compatible API:
+- Pooled keep-alive connections and a global limit on concurrent requests
+- Large objects are fetched as parallel ranged GETs (multipart)
+- Interrupted downloads resume from `<path>.part` on the next run
+- SHA256 is computed while the bytes stream in; no second read pass
+- Verified digests go into the asset_verify digest cache
+
+Standard library only: requests are signed with AWS Signature Version 4
+computed locally. Credentials come from R2_ENDPOINT (or R2_ACCOUNT_ID),
+R2_ACCESS_KEY_ID and R2_SECRET_ACCESS_KEY. As with rclone, the first
+segment of each `r2_key` is the bucket.
+
+Usage:
+    python -m lib.asset_sync .r2-manifest.yml --concurrency 8
+
+License: MIT
+"""
+
+import argparse
+import hashlib
+import hmac
+import http.client
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Union
+from urllib.parse import quote, urlsplit
+
+from .asset_verify import CHUNK_SIZE, DigestCache, digest_cache_path_for, manifest_entries, verify_assets
+
+EMPTY_SHA256 = hashlib.sha256(b'').hexdigest()
+
+# Objects with at least this many bytes left to fetch are split into ranged parts
+MULTIPART_THRESHOLD = 64 * 1024 * 1024
+PART_SIZE = 16 * 1024 * 1024
+
+DOWNLOADED = 'downloaded'
+UP_TO_DATE = 'up-to-date'
+HASH_MISMATCH = 'hash-mismatch'
+FAILED = 'failed'
+
+# Outcome of syncing one asset; `transferred` counts bytes fetched in this
+# run, `resumed` is True when a previous partial download was continued
+SyncResult = namedtuple('SyncResult', ['path', 'status', 'transferred', 'resumed', 'error'])
+
+
+@dataclass(frozen=True)
+class R2Credentials:
+    """
+    Endpoint and access keys for R2's S3-compatible API
+
+    Examples:
+        >>> R2Credentials.from_env({
+        ...     'R2_ACCOUNT_ID': 'abc123',
+        ...     'R2_ACCESS_KEY_ID': 'AKIA...',
+        ...     'R2_SECRET_ACCESS_KEY': '...',
+        ... }).endpoint
+        'https://abc123.r2.cloudflarestorage.com'
+    """
+
+    endpoint: str
+    access_key_id: str
+    secret_access_key: str
+    region: str = 'auto'
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> 'R2Credentials':
+        """
+        Read credentials from R2_* (or AWS_*) environment variables
+
+        Raises:
+            ValueError: If the endpoint or keys are missing
+        """
+        environ = os.environ if environ is None else environ
+
+        endpoint = environ.get('R2_ENDPOINT', '')
+        if not endpoint and environ.get('R2_ACCOUNT_ID'):
+            endpoint = f"https://{environ['R2_ACCOUNT_ID']}.r2.cloudflarestorage.com"
+        access_key_id = environ.get('R2_ACCESS_KEY_ID') or environ.get('AWS_ACCESS_KEY_ID', '')
+        secret_access_key = environ.get('R2_SECRET_ACCESS_KEY') or environ.get('AWS_SECRET_ACCESS_KEY', '')
+
+        if not endpoint or not access_key_id or not secret_access_key:
+            raise ValueError(
+                "[AssetSync] Set R2_ENDPOINT (or R2_ACCOUNT_ID), R2_ACCESS_KEY_ID and R2_SECRET_ACCESS_KEY"
+            )
+        return cls(endpoint.rstrip('/'), access_key_id, secret_access_key, environ.get('R2_REGION', 'auto'))
+
+
+@lru_cache(maxsize=32)
+def _signing_key(secret_access_key: str, date: str, region: str, service: str) -> bytes:
+    """SigV4 signing key; valid for a whole UTC day, so derived once per day"""
+    key = hmac.new(f'AWS4{secret_access_key}'.encode(), date.encode(), hashlib.sha256).digest()
+    for part in (region, service, 'aws4_request'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return key
+
+
+def sign_request(
+    method: str,
+    host: str,
+    path: str,
+    credentials: R2Credentials,
+    query: str = '',
+    payload_hash: str = EMPTY_SHA256,
+    now: Optional[datetime] = None,
+) -> Dict[str, str]:
+    """
+    AWS Signature Version 4 headers for an S3 request
+
+    Args:
+        method: HTTP method
+        host: Host header value (host[:port])
+        path: Request path, already URI-encoded
+        credentials: Access keys and region
+        query: Canonical (sorted, encoded) query string
+        payload_hash: Hex SHA256 of the body
+        now: Signing time (default: current UTC time)
+
+    Returns:
+        Headers to send: Host, x-amz-date, x-amz-content-sha256, Authorization
+    """
+    now = now or datetime.now(timezone.utc)
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    date = amz_date[:8]
+    scope = f'{date}/{credentials.region}/s3/aws4_request'
+
+    canonical_request = '\n'.join([
+        method,
+        path,
+        query,
+        f'host:{host}\nx-amz-content-sha256:{payload_hash}\nx-amz-date:{amz_date}\n',
+        'host;x-amz-content-sha256;x-amz-date',
+        payload_hash,
+    ])
+    string_to_sign = '\n'.join([
+        'AWS4-HMAC-SHA256',
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+    key = _signing_key(credentials.secret_access_key, date, credentials.region, 's3')
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    return {
+        'Host': host,
+        'x-amz-date': amz_date,
+        'x-amz-content-sha256': payload_hash,
+        'Authorization': (
+            f'AWS4-HMAC-SHA256 Credential={credentials.access_key_id}/{scope}, '
+            f'SignedHeaders=host;x-amz-content-sha256;x-amz-date, Signature={signature}'
+        ),
+    }
+
+
+class R2Error(OSError):
+    """Unexpected HTTP status from R2; 429 and 5xx are retried"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"[AssetSync] HTTP {status}: {message}")
+        self.status = status
+
+    @property
+    def retryable(self) -> bool:
+        return self.status == 429 or self.status >= 500
+
+
+class _HttpPool:
+    """Thread-safe pool of keep-alive HTTP(S) connections to one endpoint"""
+
+    def __init__(self, endpoint: str, maxsize: int, timeout: float):
+        parts = urlsplit(endpoint)
+        self.secure = parts.scheme == 'https'
+        self.hostname = parts.hostname or ''
+        self.port = parts.port
+        self.host = parts.netloc
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.opened = 0
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> http.client.HTTPConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self.opened += 1
+
+        connection_class = http.client.HTTPSConnection if self.secure else http.client.HTTPConnection
+        return connection_class(self.hostname, self.port, timeout=self.timeout)
+
+    def release(self, connection: http.client.HTTPConnection, reusable: bool) -> None:
+        with self._lock:
+            if reusable and len(self._idle) < self.maxsize:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+def _write_state(state_path: str, frontier: int) -> None:
+    """Persist a multipart download's hashed frontier (see _resume_offset)"""
+    with open(state_path, 'w') as f:
+        f.write(str(frontier))
+
+
+class _OrderedHasher:
+    """
+    Hashes a part file in file order as out-of-order parts complete
+
+    Parts are written to disk as they stream in; once every earlier part is
+    on disk, the completed range is read back (normally from the page cache)
+    and hashed, so no part is held in memory. The caller bounds how many
+    parts are outstanding. The hashed frontier is persisted so an
+    interrupted multipart download can resume from it.
+    """
+
+    def __init__(self, digest: 'hashlib._Hash', fd: int, start: int, state_path: str, window: int):
+        self.digest = digest
+        self.fd = fd
+        self.frontier = start
+        self.state_path = state_path
+        self.window = threading.Semaphore(window)
+        self.error: Optional[BaseException] = None
+        self._next = 0
+        self._pending: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def feed(self, index: int, end: int) -> None:
+        """Mark part `index`, ending at byte `end`, as written"""
+        with self._lock:
+            self._pending[index] = end
+            drained = 0
+            while self._next in self._pending:
+                chunk_end = self._pending.pop(self._next)
+                _hash_range(self.fd, self.frontier, chunk_end, self.digest)
+                self.frontier = chunk_end
+                self._next += 1
+                drained += 1
+            if drained:
+                _write_state(self.state_path, self.frontier)
+        for _ in range(drained):
+            self.window.release()
+
+    def fail(self, error: BaseException) -> None:
+        self.error = self.error or error
+        # Wake the scheduler so it can stop submitting parts
+        self.window.release()
+
+
+class AssetSyncer:
+    """
+    Download manifest assets from R2 with bounded concurrency
+
+    Args:
+        credentials: R2 endpoint and keys (default: R2Credentials.from_env())
+        concurrency: Maximum simultaneous HTTP requests (files and parts)
+        part_size: Bytes per ranged GET for multipart downloads
+        multipart_threshold: Remaining bytes at which a download is split into parts
+        retries: Attempts per request after the first, for connection
+                 errors, timeouts, 429 and 5xx responses
+        timeout: Socket timeout in seconds
+
+    Examples:
+        >>> with AssetSyncer(concurrency=8) as syncer:
+        ...     for result in syncer.sync('.r2-manifest.yml'):
+        ...         print(result.status, result.path)
+    """
+
+    def __init__(
+        self,
+        credentials: Optional[R2Credentials] = None,
+        concurrency: int = 8,
+        part_size: int = PART_SIZE,
+        multipart_threshold: int = MULTIPART_THRESHOLD,
+        retries: int = 3,
+        timeout: float = 30.0,
+    ):
+        if concurrency <= 0:
+            raise ValueError(f"[AssetSync] Concurrency must be positive: {concurrency}")
+        if part_size <= 0:
+            raise ValueError(f"[AssetSync] Part size must be positive: {part_size}")
+
+        self.credentials = credentials or R2Credentials.from_env()
+        self.concurrency = concurrency
+        self.part_size = part_size
+        self.multipart_threshold = multipart_threshold
+        self.retries = retries
+        self._pool = _HttpPool(self.credentials.endpoint, concurrency, timeout)
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._files = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='asset-sync')
+        self._parts = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='asset-sync-part')
+        self.requests = 0
+
+    def __enter__(self) -> 'AssetSyncer':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop worker threads and close pooled connections"""
+        self._files.shutdown(wait=True, cancel_futures=True)
+        self._parts.shutdown(wait=True, cancel_futures=True)
+        self._pool.close()
+
+    @property
+    def connections_opened(self) -> int:
+        """Number of TCP connections opened so far (lower means better reuse)"""
+        return self._pool.opened
+
+    def sync(
+        self,
+        manifest: Union[str, Mapping[str, Any], List[Mapping[str, Any]]] = '.r2-manifest.yml',
+        root: Optional[str] = None,
+        cache: Union[bool, DigestCache, None] = True,
+    ) -> Iterator[SyncResult]:
+        """
+        Download missing or mismatched assets, yielding results as they finish
+
+        Local files are checked with asset_verify first (sizes, then cached or
+        fresh digests); only failures are downloaded. Entries with
+        `sync: false` or `sync: cdn-only` are skipped, and `copy-from-library`
+        entries are copied from their `source` when it exists locally, falling
+        back to R2.
+
+        Args:
+            manifest: Manifest path, parsed manifest, or list of asset entries
+            root: Project root (default: the manifest's directory, or '.')
+            cache: True for the digest cache next to the manifest, a
+                   DigestCache, or False/None to disable it
+
+        Yields:
+            SyncResult per asset
+
+        Raises:
+            ImportError: If a manifest path is given and PyYAML is not installed
+            ValueError: If the manifest is malformed
+        """
+        if root is None:
+            root = os.path.dirname(os.path.abspath(manifest)) if isinstance(manifest, str) else '.'
+        if cache is True:
+            cache = DigestCache(digest_cache_path_for(manifest) if isinstance(manifest, str) else None)
+        elif cache is None or cache is False:
+            cache = DigestCache()
+
+        entries = [entry for entry in manifest_entries(manifest) if _wants_local_copy(entry)]
+        return self._sync(entries, root, cache)
+
+    def _sync(self, entries: List[Mapping[str, Any]], root: str, cache: DigestCache) -> Iterator[SyncResult]:
+        """Generator behind sync(); arguments are already normalized"""
+        by_path = {str(entry['path']): entry for entry in entries}
+        futures: List[Future] = []
+
+        try:
+            # Downloads start while verification is still streaming. Hash in
+            # threads: forking a process pool while download threads hold
+            # locks (logging, SSL, the digest cache) can deadlock the child
+            for result in verify_assets(entries, root, cache=cache, processes=False):
+                if result.ok:
+                    yield SyncResult(result.path, UP_TO_DATE, 0, False, None)
+                else:
+                    futures.append(self._files.submit(self._sync_one, by_path[result.path], root, cache))
+
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            cache.save()
+
+    def _sync_one(self, entry: Mapping[str, Any], root: str, cache: DigestCache) -> SyncResult:
+        """Copy or download one asset; never raises"""
+        path = str(entry['path'])
+        dest = os.path.join(root, path)
+        size = int(entry.get('size') or 0)
+        sha256 = str(entry.get('sha256') or '').lower()
+
+        source = entry.get('source')
+        if entry.get('sync') == 'copy-from-library' and source:
+            source = os.path.expanduser(str(source))
+            if os.path.isfile(source) and (not size or os.path.getsize(source) == size):
+                result = self._copy_local(path, source, dest, sha256, cache)
+                if result.status == DOWNLOADED:
+                    return result
+
+        r2_key = str(entry.get('r2_key') or '')
+        if not r2_key:
+            return SyncResult(path, FAILED, 0, False, "[AssetSync] No r2_key in manifest")
+
+        try:
+            return self.download(r2_key, dest, size, sha256, path, cache)
+        except (OSError, http.client.HTTPException) as exc:
+            return SyncResult(path, FAILED, 0, False, str(exc))
+
+    def _copy_local(self, path: str, source: str, dest: str, sha256: str, cache: DigestCache) -> SyncResult:
+        """Copy from the central library, hashing while copying"""
+        part_path = dest + '.part'
+        os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+        digest = hashlib.sha256()
+        with open(source, 'rb') as src, open(part_path, 'wb') as dst:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                dst.write(chunk)
+        return self._finish(path, dest, part_path, digest.hexdigest(), sha256, 0, False, cache)
+
+    def download(
+        self,
+        r2_key: str,
+        dest: str,
+        size: int = 0,
+        sha256: str = '',
+        path: Optional[str] = None,
+        cache: Optional[DigestCache] = None,
+    ) -> SyncResult:
+        """
+        Download one object to `dest`, resuming `<dest>.part` if present
+
+        Args:
+            r2_key: '<bucket>/<key>'
+            dest: Destination file
+            size: Expected size in bytes (0 if unknown: single GET, no resume)
+            sha256: Expected hex digest ('' to skip verification)
+            path: Name reported in the result (default: dest)
+            cache: Digest cache to record the verified file in
+
+        Returns:
+            SyncResult; the destination is only replaced when the digest matches
+
+        Raises:
+            OSError: On network or HTTP errors after retries (partial data is kept)
+        """
+        path = path or dest
+        part_path = dest + '.part'
+        state_path = part_path + '.state'
+        os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+
+        offset = _resume_offset(part_path, state_path, size)
+        digest = hashlib.sha256()
+        if offset:
+            _hash_prefix(part_path, offset, digest)
+
+        if size and offset >= size:
+            pass  # Fully downloaded and hashed before the previous run stopped
+        elif size and size - offset >= self.multipart_threshold:
+            self._fetch_parts(r2_key, part_path, state_path, offset, size, digest)
+        else:
+            self._fetch_stream(r2_key, part_path, offset, size, digest)
+
+        transferred = (size or os.path.getsize(part_path)) - offset
+        return self._finish(path, dest, part_path, digest.hexdigest(), sha256, transferred, offset > 0, cache)
+
+    def _finish(
+        self,
+        path: str,
+        dest: str,
+        part_path: str,
+        actual: str,
+        expected: str,
+        transferred: int,
+        resumed: bool,
+        cache: Optional[DigestCache],
+    ) -> SyncResult:
+        """Move a verified `.part` into place, or discard it on a digest mismatch"""
+        state_path = part_path + '.state'
+        if expected and actual != expected:
+            for stale in (part_path, state_path):
+                try:
+                    os.unlink(stale)
+                except FileNotFoundError:
+                    pass
+            error = f"[AssetSync] sha256 mismatch: expected {expected[:12]}..., got {actual[:12]}..."
+            return SyncResult(path, HASH_MISMATCH, transferred, resumed, error)
+
+        os.replace(part_path, dest)
+        try:
+            os.unlink(state_path)
+        except FileNotFoundError:
+            pass
+        if cache is not None:
+            cache.put(path, os.stat(dest), actual)
+        return SyncResult(path, DOWNLOADED, transferred, resumed, None)
+
+    def _fetch_stream(self, r2_key: str, part_path: str, offset: int, size: int, digest: 'hashlib._Hash') -> None:
+        """Single GET from `offset`, appending to the part file; retries resume in place"""
+        with open(part_path, 'r+b' if os.path.exists(part_path) else 'w+b') as f:
+            f.truncate(offset)
+            f.seek(offset)
+            position = [offset]
+
+            def sink(view: memoryview) -> None:
+                f.write(view)
+                digest.update(view)
+                position[0] += len(view)
+
+            self._retry(lambda: self._get(r2_key, position[0], size or None, sink, skip=position[0]))
+
+    def _fetch_parts(
+        self,
+        r2_key: str,
+        part_path: str,
+        state_path: str,
+        offset: int,
+        size: int,
+        digest: 'hashlib._Hash',
+    ) -> None:
+        """Parallel ranged GETs written in place, hashed in order as parts arrive"""
+        # Record the frontier before preallocating, so a preallocated part
+        # file is never mistaken for downloaded bytes
+        _write_state(state_path, offset)
+        with open(part_path, 'r+b' if os.path.exists(part_path) else 'w+b') as f:
+            f.truncate(size)
+
+        ranges = [(start, min(start + self.part_size, size)) for start in range(offset, size, self.part_size)]
+        fd = os.open(part_path, os.O_RDWR)
+        hasher = _OrderedHasher(digest, fd, offset, state_path, window=self.concurrency * 2)
+        futures = []
+        try:
+            for index, (start, end) in enumerate(ranges):
+                hasher.window.acquire()
+                if hasher.error is not None:
+                    break
+                futures.append(self._parts.submit(self._fetch_part, r2_key, fd, index, start, end, hasher))
+            for future in futures:
+                future.result()
+        finally:
+            os.close(fd)
+
+        if hasher.error is not None:
+            raise hasher.error
+
+    def _fetch_part(self, r2_key: str, fd: int, index: int, start: int, end: int, hasher: _OrderedHasher) -> None:
+        """Download one part straight to its offset in the file, then hand it to the hasher"""
+        if hasher.error is not None:
+            hasher.window.release()
+            return
+
+        try:
+            def attempt() -> None:
+                position = [start]
+
+                def sink(view: memoryview) -> None:
+                    while view:
+                        written = os.pwrite(fd, view, position[0])
+                        position[0] += written
+                        view = view[written:]
+
+                self._get(r2_key, start, end, sink, skip=start)
+                if position[0] != end:
+                    raise OSError(f"[AssetSync] Short read for bytes {start}-{end - 1}: {position[0] - start}")
+
+            self._retry(attempt)
+            hasher.feed(index, end)
+        except BaseException as exc:
+            hasher.fail(exc)
+
+    def _retry(self, attempt: Callable[[], None]) -> None:
+        """Run a request with exponential backoff on transient failures"""
+        for tries in range(self.retries + 1):
+            try:
+                attempt()
+                return
+            except R2Error as exc:
+                if not exc.retryable or tries == self.retries:
+                    raise
+            except (OSError, http.client.HTTPException):
+                if tries == self.retries:
+                    raise
+            time.sleep(min(0.1 * 2 ** tries, 2.0))
+
+    def _get(
+        self,
+        r2_key: str,
+        start: int,
+        end: Optional[int],
+        sink: Callable[[memoryview], None],
+        skip: int = 0,
+    ) -> None:
+        """
+        GET bytes [start, end) of an object and stream them into `sink`
+
+        If the server ignores the Range header and answers 200, the first
+        `skip` bytes of the body are discarded.
+        """
+        request_path = '/' + quote(r2_key.lstrip('/'), safe='/-_.~')
+        headers = sign_request('GET', self._pool.host, request_path, self.credentials)
+        if start or end is not None:
+            headers['Range'] = f'bytes={start}-{"" if end is None else end - 1}'
+
+        with self._slots:
+            self.requests += 1
+            connection = self._pool.acquire()
+            reusable = False
+            try:
+                connection.request('GET', request_path, headers=headers)
+                response = connection.getresponse()
+                if response.status not in (200, 206):
+                    response.read()
+                    reusable = not response.will_close
+                    raise R2Error(response.status, f'{r2_key} ({response.reason})')
+
+                discard = skip if response.status == 200 else 0
+                wanted = None if end is None else end - start
+                buffer = bytearray(min(CHUNK_SIZE, 1024 * 1024))
+                view = memoryview(buffer)
+                while wanted is None or wanted > 0:
+                    count = response.readinto(buffer)
+                    if not count:
+                        break
+                    first = min(discard, count)
+                    discard -= first
+                    last = count if wanted is None else min(count, first + wanted)
+                    if last > first:
+                        sink(view[first:last])
+                        if wanted is not None:
+                            wanted -= last - first
+                # http.client reports a body cut short as a plain EOF
+                if wanted or (wanted is None and response.length):
+                    raise http.client.IncompleteRead(b'', wanted or response.length)
+                # An ignored Range may leave body bytes unread; drop that connection
+                reusable = not response.will_close and response.isclosed()
+            finally:
+                self._pool.release(connection, reusable)
+
+
+def _wants_local_copy(entry: Mapping[str, Any]) -> bool:
+    """Whether the manifest `sync` field asks for a local copy (default: yes)"""
+    sync = entry.get('sync', True)
+    return sync is not False and sync not in ('false', 'cdn-only')
+
+
+def _resume_offset(part_path: str, state_path: str, size: int) -> int:
+    """
+    Bytes of a previous partial download that can be kept
+
+    Multipart downloads record their contiguous, hashed frontier in
+    `<part>.state`; single-stream downloads write in order, so the part
+    file's length is the frontier. A part file of the full size without a
+    state file was preallocated by a multipart run that stopped before
+    recording anything, so nothing in it is kept.
+    """
+    if not size:
+        return 0
+    try:
+        with open(state_path) as f:
+            offset = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        try:
+            offset = os.path.getsize(part_path)
+        except OSError:
+            return 0
+        if offset >= size:
+            return 0
+    if not os.path.exists(part_path):
+        return 0
+    return max(0, min(offset, size))
+
+
+def _hash_range(fd: int, start: int, end: int, digest: 'hashlib._Hash') -> None:
+    """Feed bytes [start, end) of an open file into `digest`"""
+    while start < end:
+        chunk = os.pread(fd, min(CHUNK_SIZE, end - start), start)
+        if not chunk:
+            raise OSError(f"[AssetSync] Part file shorter than expected at byte {start}")
+        digest.update(chunk)
+        start += len(chunk)
+
+
+def _hash_prefix(path: str, length: int, digest: 'hashlib._Hash') -> None:
+    """Feed the first `length` bytes of a file into `digest`"""
+    with open(path, 'rb') as f:
+        remaining = length
+        while remaining:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise OSError(f"[AssetSync] Partial download shorter than expected: {path}")
+            digest.update(chunk)
+            remaining -= len(chunk)
+
+
+def sync_assets(
+    manifest: Union[str, Mapping[str, Any], List[Mapping[str, Any]]] = '.r2-manifest.yml',
+    root: Optional[str] = None,
+    credentials: Optional[R2Credentials] = None,
+    concurrency: int = 8,
+    cache: Union[bool, DigestCache, None] = True,
+    **kwargs: Any,
+) -> List[SyncResult]:
+    """
+    Convenience wrapper: sync a manifest and return every result
+
+    `cache` is passed to AssetSyncer.sync(); give a DigestCache when syncing
+    a list of entries, which has no manifest path to place the cache next to.
+
+    Examples:
+        >>> from lib.asset_sync import sync_assets
+        >>> failed = [r for r in sync_assets('.r2-manifest.yml') if r.status not in ('downloaded', 'up-to-date')]
+    """
+    with AssetSyncer(credentials, concurrency, **kwargs) as syncer:
+        return list(syncer.sync(manifest, root, cache))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point; exits non-zero if any asset failed"""
+    parser = argparse.ArgumentParser(prog='python -m lib.asset_sync', description='Sync manifest assets from R2')
+    parser.add_argument('manifest', nargs='?', default='.r2-manifest.yml', help='Manifest path')
+    parser.add_argument('--root', help='Project root (default: manifest directory)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Simultaneous requests')
+    parser.add_argument('--part-size', type=int, default=PART_SIZE, help='Bytes per ranged GET')
+    args = parser.parse_args(argv)
+
+    failed = 0
+    transferred = 0
+    started = time.perf_counter()
+    with AssetSyncer(concurrency=args.concurrency, part_size=args.part_size) as syncer:
+        for result in syncer.sync(args.manifest, args.root):
+            transferred += result.transferred
+            if result.status in (DOWNLOADED, UP_TO_DATE):
+                note = ' (resumed)' if result.resumed else ''
+                print(f"[AssetSync] {result.status}: {result.path}{note}", flush=True)
+            else:
+                failed += 1
+                print(f"[AssetSync] {result.status}: {result.path}: {result.error}", flush=True)
+
+    elapsed = time.perf_counter() - started
+    print(f"[AssetSync] {transferred / 1e6:.1f} MB in {elapsed:.1f}s, {failed} failed")
+    return 1 if failed else 0
+
+
+__all__ = [
+    'AssetSyncer',
+    'R2Credentials',
+    'R2Error',
+    'SyncResult',
+    'sign_request',
+    'sync_assets',
+]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Precompressed and Modern-Format Asset Variants
+
+CDNs and origins can serve precompressed files (`app.css.br`,
+`app.css.gz`) and modern image formats (`hero.avif`, `hero.webp` next to
+`hero.jpg`), but only if the page links to them. VariantIndex records
+which variants exist for each asset:
+- VariantIndex.from_index(index): sibling entries in the manifest
+- VariantIndex.scan(directory): sibling files on disk (local serving)
+
+AssetResolver.set_variants(variants) then lets get_asset_url() take the
+client's Accept / Accept-Encoding headers and return the smallest variant
+the client accepts. The headers are reduced to a 4-bit signature
+(AVIF, WebP, Brotli, gzip), and the result is cached per asset and
+signature, so repeat requests cost two dict probes.
+
+Pages whose asset URLs depend on these headers must be sent with
+`Vary: Accept, Accept-Encoding`. `.br` / `.gz` objects must be served
+with the matching `Content-Encoding` and the original `Content-Type`
+(on R2, set both as object metadata at upload).
+
+Usage:
+    resolver.set_variants(VariantIndex.from_index(assets))
+    get_asset_url('/css/app.css', 'https://cdn.example.com/css/app.css',
+                  accept=request.headers.get('accept'),
+                  accept_encoding=request.headers.get('accept-encoding'))
+
+License: MIT
+"""
+
+import os
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .assets import AssetIndex
+
+# Signature bits: what a client accepts beyond the original
+AVIF = 1
+WEBP = 2
+BR = 4
+GZIP = 8
+
+# Variant suffix -> (signature bit, media type, content encoding)
+ENCODING_SUFFIXES = {'.br': (BR, None, 'br'), '.gz': (GZIP, None, 'gzip')}
+IMAGE_SUFFIXES = {'.avif': (AVIF, 'image/avif', None), '.webp': (WEBP, 'image/webp', None)}
+
+# Originals a modern image format can replace
+REPLACEABLE_IMAGES = ('.jpg', '.jpeg', '.png', '.gif')
+
+# Tie-break when sizes are equal or unknown: lower is preferred; the original is last
+RANKS = {AVIF: 0, WEBP: 1, BR: 0, GZIP: 1}
+ORIGINAL_RANK = 2
+
+# Distinct header pairs whose signature is memoized (clients send few distinct values)
+SIGNATURE_MEMO_SIZE = 4096
+
+# A precompressed or converted file for an asset; size 0 when unknown
+Variant = namedtuple('Variant', ['local_path', 'cdn_url', 'size', 'flag', 'media_type', 'encoding'])
+
+_signatures: Dict[Tuple[str, str], int] = {}
+
+
+def _accepted(header: str) -> Dict[str, float]:
+    """Token -> q-value for a comma-separated Accept-style header"""
+    tokens: Dict[str, float] = {}
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        tokens[name] = q
+    return tokens
+
+
+def accept_signature(accept: Optional[str] = None, accept_encoding: Optional[str] = None) -> int:
+    """
+    Reduce Accept / Accept-Encoding headers to the variant bits they allow
+
+    Image formats count only when named explicitly (every client sends
+    `*/*`, including those that cannot decode AVIF); encodings follow
+    RFC 9110, so `*` allows any encoding not refused with q=0.
+
+    Returns:
+        Bitwise OR of AVIF, WEBP, BR and GZIP
+
+    Examples:
+        >>> accept_signature('image/avif,image/webp,*/*;q=0.8', 'gzip, deflate, br')
+        15
+        >>> accept_signature('text/html', 'gzip;q=1.0, br;q=0')
+        8
+    """
+    memo_key = (accept or '', accept_encoding or '')
+    signature = _signatures.get(memo_key)
+    if signature is not None:
+        return signature
+
+    signature = 0
+    if accept:
+        types = _accepted(accept)
+        if types.get('image/avif', 0) > 0:
+            signature |= AVIF
+        if types.get('image/webp', 0) > 0:
+            signature |= WEBP
+    if accept_encoding:
+        encodings = _accepted(accept_encoding)
+        wildcard = encodings.get('*', 0) > 0
+
+        def allowed(*names: str) -> bool:
+            listed = [encodings[name] for name in names if name in encodings]
+            return max(listed) > 0 if listed else wildcard
+
+        if allowed('br'):
+            signature |= BR
+        if allowed('gzip', 'x-gzip'):
+            signature |= GZIP
+
+    if len(_signatures) >= SIGNATURE_MEMO_SIZE:
+        _signatures.clear()
+    _signatures[memo_key] = signature
+    return signature
+
+
+class VariantIndex:
+    """
+    Variants available for each asset, keyed by local path
+
+    Examples:
+        >>> variants = VariantIndex.from_index(AssetIndex.load('.r2-manifest.yml'))
+        >>> variants.choose('/media/hero.jpg', accept_signature('image/avif,image/webp,*/*'))
+        Variant(local_path='/media/hero.avif', cdn_url='https://cdn.example.com/media/hero.avif', size=41230, flag=1, media_type='image/avif', encoding=None)
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Tuple[int, Tuple[Variant, ...]]]] = None):
+        """
+        Args:
+            entries: Local path -> (original size, variants); see from_files()
+        """
+        self._entries = entries or {}
+
+    @classmethod
+    def from_files(cls, files: Iterable[Tuple[str, Optional[str], int]]) -> 'VariantIndex':
+        """
+        Group (local path, CDN URL or None, size) files into originals and variants
+
+        `x.br` / `x.gz` are variants of `x`; `name.avif` / `name.webp` are
+        variants of `name.jpg`, `.jpeg`, `.png` or `.gif`. Files without an
+        original are ordinary assets.
+        """
+        files = {local_path: (cdn_url, size) for local_path, cdn_url, size in files}
+        by_lower = {local_path.lower(): local_path for local_path in files}
+        grouped: Dict[str, List[Variant]] = {}
+
+        for local_path, (cdn_url, size) in files.items():
+            stem, suffix = os.path.splitext(local_path)
+            suffix = suffix.lower()
+            if suffix in ENCODING_SUFFIXES:
+                originals = [stem] if stem in files else []
+                flag, media_type, encoding = ENCODING_SUFFIXES[suffix]
+            elif suffix in IMAGE_SUFFIXES:
+                candidates = (by_lower.get((stem + ext).lower()) for ext in REPLACEABLE_IMAGES)
+                originals = [original for original in candidates if original is not None]
+                flag, media_type, encoding = IMAGE_SUFFIXES[suffix]
+            else:
+                continue
+
+            variant = Variant(local_path, cdn_url or None, size or 0, flag, media_type, encoding)
+            for original in originals:
+                grouped.setdefault(original, []).append(variant)
+
+        return cls({
+            original: (files[original][1] or 0, tuple(sorted(variants, key=lambda v: (RANKS[v.flag], v.local_path))))
+            for original, variants in grouped.items()
+        })
+
+    @classmethod
+    def from_index(cls, index: AssetIndex) -> 'VariantIndex':
+        """Variants that are entries of the manifest behind an AssetIndex"""
+        return cls.from_files((record.local_path, record.cdn_url, record.size) for record in index.records())
+
+    @classmethod
+    def scan(cls, directory: str, url_prefix: str = '/') -> 'VariantIndex':
+        """
+        Variants on disk under a web root, for local (origin) serving
+
+        Args:
+            directory: Web root, e.g. 'public'
+            url_prefix: URL path the web root is served under
+
+        Returns:
+            VariantIndex without CDN URLs
+        """
+        from .asset_manifest import scan_files
+
+        prefix = '/' + url_prefix.strip('/') if url_prefix.strip('/') else ''
+
+        def files() -> Iterator[Tuple[str, Optional[str], int]]:
+            for path in scan_files(directory):
+                try:
+                    size = os.stat(os.path.join(directory, path)).st_size
+                except OSError:
+                    continue
+                yield f'{prefix}/{path}', None, size
+
+        return cls.from_files(files())
+
+    def choose(self, local_path: str, signature: int, cdn: bool = False) -> Optional[Variant]:
+        """
+        Smallest variant of an asset the signature allows
+
+        Args:
+            local_path: Original's local path
+            signature: accept_signature() bits
+            cdn: Only consider variants that have a CDN URL
+
+        Returns:
+            Variant, or None if the original is the best (or only) choice
+        """
+        entry = self._entries.get(local_path)
+        if entry is None or not signature:
+            return None
+
+        original_size, variants = entry
+        best = None
+        best_key = (original_size or float('inf'), ORIGINAL_RANK)
+        for variant in variants:
+            if not variant.flag & signature or (cdn and not variant.cdn_url):
+                continue
+            key = (variant.size or float('inf'), RANKS[variant.flag])
+            if key < best_key:
+                best, best_key = variant, key
+        return best
+
+    def variants(self, local_path: str) -> Tuple[Variant, ...]:
+        """All variants of an asset (empty if none)"""
+        entry = self._entries.get(local_path)
+        return entry[1] if entry is not None else ()
+
+    def __contains__(self, local_path: object) -> bool:
+        return local_path in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"VariantIndex(assets={len(self._entries)})"
+
+
+__all__ = [
+    'AVIF',
+    'BR',
+    'GZIP',
+    'WEBP',
+    'Variant',
+    'VariantIndex',
+    'accept_signature',
+]
@@ -0,0 +1,454 @@
+"""
+Parallel, Incremental Asset Verification for R2 Manifests
+
+Checks the `size` and `sha256` of every asset in a `.r2-manifest.yml`:
+- Sizes are checked first (one stat per file), so truncated or missing
+  files fail without being hashed
+- Files are hashed in a process pool with large reads (mmap for big files)
+- Digests are cached by (path, size, mtime, inode), so unchanged files are
+  never re-hashed across runs
+- Results are streamed as they complete
+
+Usage:
+    python -m lib.asset_verify .r2-manifest.yml
+    python -m lib.asset_verify .r2-manifest.yml --workers 8 --no-cache
+
+License: MIT
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+# Read size for hashing; large enough to amortize syscalls and let hashlib
+# release the GIL for the bulk of the work
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Files at least this large are memory-mapped instead of read into a buffer
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+# Below this many bytes to hash in total, hashing stays in-process; a pool
+# costs more to start than it saves
+POOL_THRESHOLD = 32 * 1024 * 1024
+
+DIGEST_CACHE_VERSION = 'r2-digests 1'
+
+OK = 'ok'
+MISSING = 'missing'
+SIZE_MISMATCH = 'size-mismatch'
+HASH_MISMATCH = 'hash-mismatch'
+ERROR = 'error'
+
+
+class VerifyResult(namedtuple('VerifyResult', [
+    'path', 'status', 'expected_size', 'actual_size', 'expected_sha256', 'actual_sha256', 'cached',
+])):
+    """
+    Outcome of verifying one asset
+
+    `actual_sha256` is None when the file was not hashed (missing, size
+    mismatch, or no sha256 in the manifest); `cached` is True when the
+    digest came from the digest cache.
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self) -> bool:
+        return self.status == OK
+
+
+def hash_file(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """
+    SHA256 of a file using large reads, memory-mapped for big files
+
+    Args:
+        path: File path
+        chunk_size: Bytes hashed per update
+
+    Returns:
+        Lowercase hex digest
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, 'madvise'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mapped) as view:
+                    for offset in range(0, size, chunk_size):
+                        digest.update(view[offset:offset + chunk_size])
+            return digest.hexdigest()
+
+        buffer = bytearray(min(chunk_size, max(size, 1)))
+        with memoryview(buffer) as view:
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                digest.update(view[:count])
+    return digest.hexdigest()
+
+
+def hash_files(
+    paths: Iterable[str],
+    root: str = '.',
+    workers: Optional[int] = None,
+    processes: bool = True,
+    total_bytes: Optional[int] = None,
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    SHA256 of many files, in a worker pool when there is enough data
+
+    Below POOL_THRESHOLD bytes in total (or for a single file) hashing stays
+    in-process, since starting a pool costs more than it saves.
+
+    Args:
+        paths: File paths relative to `root`
+        root: Directory the paths are relative to
+        workers: Pool size (default: CPU count)
+        processes: Hash in a process pool (default) or a thread pool; use
+                   threads when other threads may hold locks during a fork
+        total_bytes: Combined size if already known (default: stat each file)
+
+    Yields:
+        (path, hex digest) in completion order; the digest is None for
+        files that could not be read
+
+    Examples:
+        >>> dict(hash_files(['public/media/logo.svg']))
+        {'public/media/logo.svg': 'a1b2c3...'}
+    """
+    paths = list(paths)
+    if total_bytes is None:
+        total_bytes = 0
+        for path in paths:
+            try:
+                total_bytes += os.stat(os.path.join(root, path)).st_size
+            except OSError:
+                pass
+
+    if len(paths) <= 1 or total_bytes < POOL_THRESHOLD:
+        for path in paths:
+            yield path, _try_hash(os.path.join(root, path))
+        return
+
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    pool = pool_class(max_workers=workers or os.cpu_count() or 1)
+    try:
+        futures = {pool.submit(_try_hash, os.path.join(root, path)): path for path in paths}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def digest_cache_path_for(manifest_path: str) -> str:
+    """
+    Digest cache path next to a manifest
+
+    Examples:
+        >>> digest_cache_path_for('.r2-manifest.yml')
+        '.r2-manifest.digests'
+    """
+    root, ext = os.path.splitext(manifest_path)
+    return (root if ext in ('.yml', '.yaml') else manifest_path) + '.digests'
+
+
+class DigestCache:
+    """
+    Persistent (path, size, mtime, inode) -> sha256 cache
+
+    Stored as a small text file (one tab-separated line per file) and
+    rewritten atomically. An entry only matches while the file's size,
+    mtime_ns and inode are all unchanged, so any rewrite, copy or touch
+    forces a re-hash.
+
+    Examples:
+        >>> cache = DigestCache('.r2-manifest.digests')
+        >>> cache.get('data/model.bin', os.stat('data/model.bin'))
+        'a1b2c3...'
+        >>> cache.save()
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.dirty = False
+        self._entries: Dict[str, Tuple[int, int, int, str]] = {}
+        if path:
+            self._load(path)
+
+    def _load(self, path: str) -> None:
+        try:
+            with open(path, encoding='utf-8') as f:
+                if f.readline().rstrip('\n') != DIGEST_CACHE_VERSION:
+                    return
+                for line in f:
+                    fields = line.rstrip('\n').split('\t', 4)
+                    if len(fields) == 5 and all(field.isdigit() for field in fields[1:4]):
+                        digest, size, mtime_ns, ino, file_path = fields
+                        self._entries[file_path] = (int(size), int(mtime_ns), int(ino), digest)
+        except (OSError, UnicodeDecodeError):
+            # A missing or corrupt cache only costs a re-hash
+            self._entries.clear()
+
+    def get(self, path: str, stat: os.stat_result) -> Optional[str]:
+        """
+        Cached digest for a file whose stat still matches
+
+        Returns:
+            Hex digest, or None if unknown or the file changed
+        """
+        entry = self._entries.get(path)
+        if entry is None:
+            return None
+        size, mtime_ns, ino, digest = entry
+        if (size, mtime_ns, ino) != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            return None
+        return digest
+
+    def put(self, path: str, stat: os.stat_result, digest: str) -> None:
+        """Remember a file's digest for its current stat"""
+        self._entries[path] = (stat.st_size, stat.st_mtime_ns, stat.st_ino, digest)
+        self.dirty = True
+
+    def save(self) -> None:
+        """Write the cache atomically if it changed"""
+        if not self.path or not self.dirty:
+            return
+
+        tmp_path = f'{self.path}.tmp{os.getpid()}'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(DIGEST_CACHE_VERSION + '\n')
+                for file_path, (size, mtime_ns, ino, digest) in sorted(self._entries.items()):
+                    f.write(f'{digest}\t{size}\t{mtime_ns}\t{ino}\t{file_path}\n')
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def manifest_entries(manifest: Union[str, Mapping[str, Any], Iterable[Mapping[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Asset entries from a manifest path, parsed manifest, or list of entries
+
+    Raises:
+        ImportError: If a manifest path is given and PyYAML is not installed
+        ValueError: If the manifest is malformed
+    """
+    if isinstance(manifest, str):
+        from .assets import _load_manifest_yaml
+
+        manifest = _load_manifest_yaml(manifest)
+    if isinstance(manifest, Mapping):
+        manifest = manifest.get('assets') or []
+    if not isinstance(manifest, (list, tuple)):
+        raise ValueError("[AssetVerifier] Manifest 'assets' must be a list")
+    return [entry for entry in manifest if isinstance(entry, Mapping) and entry.get('path')]
+
+
+def verify_assets(
+    manifest: Union[str, Mapping[str, Any], Iterable[Mapping[str, Any]]] = '.r2-manifest.yml',
+    root: Optional[str] = None,
+    workers: Optional[int] = None,
+    cache: Union[bool, DigestCache, None] = True,
+    processes: bool = True,
+) -> Iterator[VerifyResult]:
+    """
+    Verify manifest assets on disk, yielding results as they are known
+
+    Missing files, size mismatches and cache hits are yielded first (one
+    stat each); the remaining files are hashed in parallel and yielded in
+    completion order. The digest cache is saved when the generator finishes
+    or is closed early. Assets with `sync: cdn-only` are never stored
+    locally and are skipped.
+
+    Args:
+        manifest: Manifest path, parsed manifest, or list of asset entries
+        root: Project root the asset paths are relative to
+              (default: the manifest's directory, or '.')
+        workers: Hashing workers (default: CPU count)
+        cache: True for the default cache file next to the manifest, a
+               DigestCache, or False/None to always hash
+        processes: Hash in a process pool (default) or a thread pool
+
+    Yields:
+        VerifyResult per asset
+
+    Raises:
+        ImportError: If a manifest path is given and PyYAML is not installed
+        ValueError: If the manifest is malformed
+
+    Examples:
+        >>> failures = [r for r in verify_assets('.r2-manifest.yml') if not r.ok]
+    """
+    if root is None:
+        root = os.path.dirname(os.path.abspath(manifest)) if isinstance(manifest, str) else '.'
+    if cache is True:
+        cache = DigestCache(digest_cache_path_for(manifest) if isinstance(manifest, str) else None)
+    elif cache is None or cache is False:
+        cache = DigestCache()
+
+    entries = manifest_entries(manifest)
+    return _verify(entries, root, workers, cache, processes)
+
+
+def _verify(
+    entries: List[Mapping[str, Any]],
+    root: str,
+    workers: Optional[int],
+    cache: DigestCache,
+    processes: bool,
+) -> Iterator[VerifyResult]:
+    """Generator behind verify_assets(); arguments are already normalized"""
+    pending: List[Tuple[str, str, int, str, os.stat_result]] = []
+    pending_bytes = 0
+
+    try:
+        # Pass 1: stat only; fail fast on missing files and wrong sizes
+        for entry in entries:
+            if entry.get('sync') == 'cdn-only':
+                continue
+
+            path = str(entry['path'])
+            expected_size = int(entry.get('size') or 0)
+            expected_sha256 = str(entry.get('sha256') or '').lower() or None
+            full_path = os.path.join(root, path)
+
+            try:
+                stat = os.stat(full_path)
+            except FileNotFoundError:
+                yield VerifyResult(path, MISSING, expected_size, None, expected_sha256, None, False)
+                continue
+            except OSError:
+                yield VerifyResult(path, ERROR, expected_size, None, expected_sha256, None, False)
+                continue
+
+            if expected_size and stat.st_size != expected_size:
+                yield VerifyResult(path, SIZE_MISMATCH, expected_size, stat.st_size, expected_sha256, None, False)
+                continue
+
+            if expected_sha256 is None:
+                yield VerifyResult(path, OK, expected_size, stat.st_size, None, None, False)
+                continue
+
+            digest = cache.get(path, stat)
+            if digest is not None:
+                status = OK if digest == expected_sha256 else HASH_MISMATCH
+                yield VerifyResult(path, status, expected_size, stat.st_size, expected_sha256, digest, True)
+                continue
+
+            pending.append((path, full_path, expected_size, expected_sha256, stat))
+            pending_bytes += stat.st_size
+
+        # Pass 2: hash what is left, in parallel when it is worth it
+        yield from _hash_pending(pending, root, cache, workers, processes, pending_bytes)
+    finally:
+        cache.save()
+
+
+def _hash_pending(
+    pending: List[Tuple[str, str, int, str, os.stat_result]],
+    root: str,
+    cache: DigestCache,
+    workers: Optional[int],
+    processes: bool,
+    pending_bytes: int,
+) -> Iterator[VerifyResult]:
+    """Hash files with hash_files() and yield results in completion order"""
+    jobs: Dict[str, List[Tuple[str, str, int, str, os.stat_result]]] = {}
+    for job in pending:
+        jobs.setdefault(job[0], []).append(job)
+
+    hashed = hash_files([job[0] for job in pending], root, workers, processes, pending_bytes)
+    for job_path, digest in hashed:
+        path, full_path, expected_size, expected_sha256, stat = jobs[job_path].pop()
+        if digest is None:
+            yield VerifyResult(path, ERROR, expected_size, stat.st_size, expected_sha256, None, False)
+            continue
+
+        # Only cache if the file did not change while it was being hashed
+        try:
+            if os.stat(full_path).st_mtime_ns == stat.st_mtime_ns:
+                cache.put(path, stat, digest)
+        except OSError:
+            pass
+
+        status = OK if digest == expected_sha256 else HASH_MISMATCH
+        yield VerifyResult(path, status, expected_size, stat.st_size, expected_sha256, digest, False)
+
+
+def _try_hash(path: str) -> Optional[str]:
+    """hash_file() for pool workers; unreadable files return None"""
+    try:
+        return hash_file(path)
+    except OSError:
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point
+
+    Prints each failure as soon as it is known and exits non-zero if any
+    asset failed verification.
+    """
+    parser = argparse.ArgumentParser(prog='python -m lib.asset_verify', description='Verify manifest assets')
+    parser.add_argument('manifest', nargs='?', default='.r2-manifest.yml', help='Manifest path')
+    parser.add_argument('--root', help='Project root (default: manifest directory)')
+    parser.add_argument('--workers', type=int, help='Hashing workers (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore and do not update the digest cache')
+    parser.add_argument('--threads', action='store_true', help='Hash in threads instead of processes')
+    parser.add_argument('--quiet', action='store_true', help='Only print failures')
+    args = parser.parse_args(argv)
+
+    counts: Dict[str, int] = {}
+    results = verify_assets(args.manifest, args.root, args.workers, not args.no_cache, not args.threads)
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+        if not result.ok:
+            detail = ''
+            if result.status == SIZE_MISMATCH:
+                detail = f' (expected {result.expected_size} bytes, got {result.actual_size})'
+            elif result.status == HASH_MISMATCH:
+                detail = f' (expected {result.expected_sha256[:12]}..., got {result.actual_sha256[:12]}...)'
+            print(f"[AssetVerifier] {result.status}: {result.path}{detail}", flush=True)
+        elif not args.quiet:
+            print(f"[AssetVerifier] ok: {result.path}{' (cached)' if result.cached else ''}", flush=True)
+
+    failed = sum(count for status, count in counts.items() if status != OK)
+    print(f"[AssetVerifier] {counts.get(OK, 0)} ok, {failed} failed")
+    return 1 if failed else 0
+
+
+__all__ = [
+    'DigestCache',
+    'VerifyResult',
+    'digest_cache_path_for',
+    'hash_file',
+    'hash_files',
+    'manifest_entries',
+    'verify_assets',
+]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,12 +12,59 @@ Version: 1.0.0
 License: MIT
 """
 
+from __future__ import annotations
+
 import os
 import re
+import struct
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict, namedtuple
 from enum import Enum
-from functools import lru_cache
-from typing import Literal, Optional, List, Dict
-from urllib.parse import urlparse
+from dataclasses import dataclass, replace
+from itertools import repeat
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Literal, Mapping, Optional, List, Dict, Sequence, Tuple, Union
+
+# Import-time budget: every worker and short-lived CLI process imports this
+# module, so logging, urllib.parse, hashlib, mmap, PyYAML and the probing,
+# metrics, signing and sync modules are imported where first needed, and the
+# environment is only read when the resolver is first used
+# (tests/test_assets_import.py enforces this).
+if TYPE_CHECKING:
+    import logging
+    from .asset_metrics import AssetMetrics
+    from .asset_presign import UrlSigner
+    from .asset_probe import CdnProber
+    from .asset_shard import HostPool
+    from .asset_sync import R2Credentials
+    from .asset_variants import VariantIndex
+
+# Warnings (fallbacks, insecure CDN URLs, failed reloads) go through the
+# 'lib.assets' logger (`lib.assets.logger`); configure it like any other,
+# e.g. logging.basicConfig()
+_logger: Optional['logging.Logger'] = None
+
+
+def _get_logger() -> 'logging.Logger':
+    global _logger
+    if _logger is None:
+        import logging
+        _logger = logging.getLogger(__name__)
+    return _logger
+
+
+def __getattr__(name: str) -> Any:
+    # `logger` is created on first access rather than at import
+    if name == 'logger':
+        return _get_logger()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _urlsplit(url: str) -> Any:
+    from urllib.parse import urlsplit
+    return urlsplit(url)
 
 
 class AssetMode(Enum):
@@ -36,6 +83,482 @@ class AssetMode(Enum):
 # Type alias for environment-specific strategies
 EnvMode = Literal['cdn-production-local-dev', 'cdn-always', 'local-always']
 
+# Bad-row policy for streaming batch resolution
+OnError = Literal['raise', 'skip', 'sentinel']
+
+# Where the content hash goes in fingerprinted CDN URLs
+Fingerprint = Literal['off', 'query', 'path']
+
+# Hex digits of the manifest sha256 used as the URL fingerprint
+FINGERPRINT_LENGTH = 12
+
+_HEX_RE = re.compile(r'[0-9a-f]+')
+
+# Hot-reload statistics; latencies in seconds from the override change
+# (file mtime or signal receipt) to the new config being live
+SwitchStats = namedtuple('SwitchStats', ['reloads', 'last_latency', 'max_latency'])
+
+# Cache statistics, mirroring functools.lru_cache().cache_info()
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class WarningRateLimiter:
+    """
+    Log at most `limit` warnings per `interval` seconds
+
+    Warnings over the limit are dropped and counted; the first warning of
+    the next window is preceded by a summary of how many were dropped, so
+    a template with thousands of bad asset paths cannot flood the logs.
+
+    Examples:
+        >>> limiter = WarningRateLimiter(limit=20, interval=60.0)
+        >>> limiter.warn('[AssetResolver] Warning: Falling back to local path: /media/a.png')
+    """
+
+    def __init__(self, limit: int = 20, interval: float = 60.0):
+        self.limit = limit
+        self.interval = interval
+        self.suppressed = 0
+        self._window_start = float('-inf')
+        self._emitted = 0
+        self._window_suppressed = 0
+        self._lock = threading.Lock()
+
+    def warn(self, message: str) -> bool:
+        """
+        Log a warning unless the current window's budget is spent
+
+        Returns:
+            True if the warning was logged
+        """
+        now = time.monotonic()
+        with self._lock:
+            dropped = 0
+            if now - self._window_start >= self.interval:
+                dropped = self._window_suppressed
+                self._window_start = now
+                self._emitted = 0
+                self._window_suppressed = 0
+
+            allowed = self._emitted < self.limit
+            if allowed:
+                self._emitted += 1
+            else:
+                self._window_suppressed += 1
+                self.suppressed += 1
+
+        if dropped:
+            _get_logger().warning(f"[AssetResolver] Warning: {dropped} similar warnings suppressed")
+        if allowed:
+            _get_logger().warning(message)
+        return allowed
+
+
+# Shared by every resolver warning; replace or tune it to change the budget
+warning_limiter = WarningRateLimiter()
+
+
+def _warn(message: str) -> None:
+    """Log a resolver warning through the shared rate limiter"""
+    warning_limiter.warn(message)
+
+
+class ResolutionCache:
+    """
+    Bounded LRU table of resolved asset URLs
+
+    Reads are a single dict probe and never take the lock; inserts and
+    evictions are serialized so concurrent writers cannot corrupt the table.
+    Hit/miss counters are best-effort under heavy thread contention.
+
+    Examples:
+        >>> cache = ResolutionCache(maxsize=2)
+        >>> cache.put(('/a.png', 'https://cdn.example.com/a.png', 'cdn-always'), 'https://cdn.example.com/a.png')
+        >>> cache.get(('/a.png', 'https://cdn.example.com/a.png', 'cdn-always'))
+        'https://cdn.example.com/a.png'
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        if maxsize <= 0:
+            raise ValueError(f"[AssetResolver] Cache size must be positive: {maxsize}")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: 'OrderedDict[Tuple, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[str]:
+        """
+        Look up a resolved URL
+
+        Args:
+            key: Resolution key
+
+        Returns:
+            Cached URL, or None on a miss
+        """
+        url = self._data.get(key)
+        if url is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            # Evicted by a concurrent writer between the probe and the touch
+            pass
+        return url
+
+    def put(self, key: Tuple, url: str) -> None:
+        """
+        Store a resolved URL, evicting the least recently used entry when full
+
+        Args:
+            key: Resolution key
+            url: Resolved URL
+        """
+        with self._lock:
+            self._data[key] = url
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Get cache statistics"""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _detect_environment(environ: Mapping[str, str]) -> str:
+    """
+    Detect current environment from ENVIRONMENT or PYTHON_ENV variables
+
+    Returns:
+        'production', 'development', or 'test'
+    """
+    # Check ENVIRONMENT first (most common in Python), then PYTHON_ENV
+    for name in ('ENVIRONMENT', 'PYTHON_ENV'):
+        env = environ.get(name, '').lower()
+        if env in ('production', 'prod'):
+            return 'production'
+        if env in ('development', 'dev'):
+            return 'development'
+        if env == 'test':
+            return 'test'
+
+    # Default to development
+    return 'development'
+
+
+def _detect_asset_mode(environ: Mapping[str, str]) -> AssetMode:
+    """
+    Detect asset mode from ASSET_MODE environment variable
+
+    Returns:
+        AssetMode enum value
+    """
+    asset_mode = environ.get('ASSET_MODE', '').lower()
+
+    if asset_mode == 'local':
+        return AssetMode.LOCAL
+    if asset_mode == 'cdn':
+        return AssetMode.CDN
+
+    return AssetMode.AUTO
+
+
+def _detect_fingerprint(environ: Mapping[str, str]) -> str:
+    """
+    Detect the CDN URL fingerprint style from ASSET_FINGERPRINT
+
+    Returns:
+        'query', 'path', or 'off' (default, also for unknown values)
+    """
+    style = environ.get('ASSET_FINGERPRINT', '').lower()
+    return style if style in ('query', 'path') else 'off'
+
+
+def cdn_origin(host: str) -> str:
+    """
+    Normalize a CDN host to the origin form used by ResolverConfig.cdn_hosts
+
+    Args:
+        host: Hostname or https origin, e.g. 'cdn-a.example.com' or
+              'https://CDN-A.example.com/'
+
+    Returns:
+        Lowercase 'https://host[:port]' origin
+
+    Raises:
+        ValueError: If the host is empty, not HTTPS, or has a path
+
+    Examples:
+        >>> cdn_origin('CDN-A.example.com')
+        'https://cdn-a.example.com'
+    """
+    origin = host.strip().lower().rstrip('/')
+    if '://' not in origin:
+        origin = 'https://' + origin
+    name = origin[len('https://'):]
+    if not origin.startswith('https://') or not name or any(c in name for c in '/?#@ '):
+        raise ValueError(f"[AssetResolver] CDN host must be an HTTPS origin: {host!r}")
+    return origin
+
+
+def _detect_cdn_hosts(environ: Mapping[str, str]) -> Tuple[Tuple[str, float], ...]:
+    """
+    Detect the CDN host pool from ASSET_CDN_HOSTS
+
+    A comma-separated list of hosts, each optionally followed by =<weight>
+    (default 1), e.g. 'cdn-a.example.com=2, cdn-b.example.com'. Invalid and
+    repeated entries are ignored.
+
+    Returns:
+        (origin, weight) pairs, empty when unset
+    """
+    hosts: Dict[str, float] = {}
+    for entry in environ.get('ASSET_CDN_HOSTS', '').split(','):
+        host, sep, weight = entry.partition('=')
+        try:
+            origin = cdn_origin(host)
+            value = float(weight) if sep else 1.0
+        except ValueError:
+            continue
+        if origin not in hosts and 0 < value < float('inf'):
+            hosts[origin] = value
+    return tuple(hosts.items())
+
+
+def _detect_cdn_down(environ: Mapping[str, str]) -> Tuple[str, ...]:
+    """
+    Detect CDN hosts marked unhealthy from ASSET_CDN_DOWN (comma-separated)
+
+    Returns:
+        Sorted origins, empty when unset
+    """
+    down = set()
+    for host in environ.get('ASSET_CDN_DOWN', '').split(','):
+        try:
+            down.add(cdn_origin(host))
+        except ValueError:
+            continue
+    return tuple(sorted(down))
+
+
+def fingerprint_url(url: str, sha256: str, style: Fingerprint = 'query', length: int = FINGERPRINT_LENGTH) -> str:
+    """
+    Embed a content hash in a CDN URL so it can be cached as immutable
+
+    Args:
+        url: CDN URL
+        sha256: Hex SHA256 of the object's content (manifest `sha256`)
+        style: 'query' appends ?v=<hash>; 'path' inserts .<hash> before the
+               extension, which requires the object to be uploaded under
+               that key; 'off' returns the URL unchanged
+        length: Number of hex digits of the hash to use
+
+    Returns:
+        Fingerprinted URL, or the URL unchanged if style is 'off' or the
+        hash is not hexadecimal
+
+    Examples:
+        >>> fingerprint_url('https://cdn.example.com/logo.png', 'a1b2c3d4e5f6789...')
+        'https://cdn.example.com/logo.png?v=a1b2c3d4e5f6'
+        >>> fingerprint_url('https://cdn.example.com/logo.png', 'a1b2c3d4e5f6789...', 'path')
+        'https://cdn.example.com/logo.a1b2c3d4e5f6.png'
+    """
+    digest = sha256[:length].lower() if sha256 else ''
+    if style == 'off' or not digest or not _HEX_RE.fullmatch(digest):
+        return url
+
+    cut = len(url)
+    for mark in ('?', '#'):
+        index = url.find(mark)
+        if index != -1:
+            cut = min(cut, index)
+    base, rest = url[:cut], url[cut:]
+
+    if style == 'query':
+        if rest.startswith('?'):
+            return f'{base}?v={digest}&{rest[1:]}'
+        return f'{base}?v={digest}{rest}'
+
+    slash = base.rfind('/')
+    dot = base.rfind('.')
+    if dot > slash + 1:
+        return f'{base[:dot]}.{digest}{base[dot:]}{rest}'
+    return f'{base}.{digest}{rest}'
+
+
+def _fingerprint_urls(digests: Mapping[str, str], style: str, hosts: Optional['HostPool'] = None) -> Dict[str, str]:
+    """Precompute cdn_url -> routed, fingerprinted URL for every known digest"""
+    if hosts is not None:
+        return {url: fingerprint_url(hosts.route(url), sha256, style) for url, sha256 in digests.items()}
+    if style == 'off':
+        return {}
+    return {url: fingerprint_url(url, sha256, style) for url, sha256 in digests.items()}
+
+
+def _host_pool(config: ResolverConfig) -> Optional['HostPool']:
+    """HostPool for a config's CDN hosts, or None without a pool"""
+    if not config.cdn_hosts:
+        return None
+
+    from .asset_shard import HostPool
+
+    return HostPool(config.cdn_hosts, config.cdn_down)
+
+
+@dataclass(frozen=True)
+class ResolverConfig:
+    """
+    Immutable snapshot of the environment settings an AssetResolver resolves with
+
+    Computed once per resolver from ENVIRONMENT / PYTHON_ENV, ASSET_MODE,
+    ASSET_CACHE_SIZE, ASSET_FINGERPRINT, ASSET_CDN_HOSTS and ASSET_CDN_DOWN.
+    Holds no reference back to the resolver, so replacing
+    or resetting a resolver frees it immediately.
+
+    `cdn_hosts` is a pool of equivalent CDN origins with weights: CDN URLs
+    on any of them are spread across the pool (see lib.asset_shard), and
+    origins in `cdn_down` are failed over.
+
+    Examples:
+        >>> ResolverConfig.from_env({'ENVIRONMENT': 'prod', 'ASSET_MODE': 'local'})
+        ResolverConfig(environment='production', asset_mode=<AssetMode.LOCAL: 'local'>, cache_size=4096, fingerprint='off', cdn_hosts=(), cdn_down=())
+    """
+
+    environment: str = 'development'
+    asset_mode: AssetMode = AssetMode.AUTO
+    cache_size: int = 4096
+    fingerprint: str = 'off'
+    cdn_hosts: Tuple[Tuple[str, float], ...] = ()
+    cdn_down: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None, cache_size: int = 4096) -> 'ResolverConfig':
+        """
+        Build a config from environment variables
+
+        Args:
+            environ: Variables to read (default: os.environ)
+            cache_size: Resolution cache size when ASSET_CACHE_SIZE is unset or invalid
+
+        Returns:
+            ResolverConfig snapshot
+        """
+        environ = os.environ if environ is None else environ
+
+        value = environ.get('ASSET_CACHE_SIZE', '')
+        if value.isdigit() and int(value) > 0:
+            cache_size = int(value)
+
+        return cls(
+            _detect_environment(environ),
+            _detect_asset_mode(environ),
+            cache_size,
+            _detect_fingerprint(environ),
+            _detect_cdn_hosts(environ),
+            _detect_cdn_down(environ),
+        )
+
+
+class _ResolverState:
+    """
+    A config and the resolution cache filled under it, swapped as one reference
+
+    Readers take `resolver._state` once per call, so a concurrent reload can
+    never pair a new config with URLs cached under the old one. `urls` maps
+    known CDN URLs to their routed, fingerprinted form for this config (empty
+    when neither applies); `hosts` routes other CDN URLs when the config has
+    a host pool; `images` caches ResponsiveImage results and `negotiated`
+    Accept-dependent variant URLs for this config.
+    """
+
+    __slots__ = ('config', 'cache', 'urls', 'hosts', 'images', 'negotiated')
+
+    def __init__(
+        self,
+        config: ResolverConfig,
+        cache: Optional[ResolutionCache] = None,
+        urls: Optional[Dict[str, str]] = None,
+        hosts: Optional['HostPool'] = None
+    ):
+        self.config = config
+        self.cache = cache if cache is not None else ResolutionCache(config.cache_size)
+        self.urls = urls or {}
+        self.hosts = hosts
+        self.images = ResolutionCache(config.cache_size)
+        self.negotiated = ResolutionCache(config.cache_size)
+
+    def route(self, url: str) -> str:
+        """Map a resolved URL to its routed, fingerprinted form (cache misses only)"""
+        routed = self.urls.get(url)
+        if routed is not None:
+            return routed
+        return self.hosts.route(url) if self.hosts is not None else url
+
+
+# Callbacks run after a resolver switches config; bound methods are held weakly
+# so registering does not keep e.g. a template environment alive
+_config_listeners: List[Callable[[], Optional[Callable[[], None]]]] = []
+_config_listeners_lock = threading.Lock()
+
+
+def on_config_change(callback: Callable[[], None]) -> Callable[[], None]:
+    """
+    Run `callback` whenever resolved URLs may change
+
+    That is after AssetResolver.apply_config() (environment, asset mode,
+    reload, hot reload, newly registered fingerprints) and after
+    reset_instance(). Used by caches of resolved URLs, such as templates
+    compiled with lib.asset_jinja, to invalidate themselves.
+
+    Args:
+        callback: Called with no arguments; bound methods are held weakly
+
+    Returns:
+        Function that unregisters the callback
+
+    Examples:
+        >>> unsubscribe = on_config_change(page_cache.clear)
+    """
+    ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback)
+    with _config_listeners_lock:
+        _config_listeners.append(ref)
+
+    def unsubscribe() -> None:
+        with _config_listeners_lock:
+            if ref in _config_listeners:
+                _config_listeners.remove(ref)
+
+    return unsubscribe
+
+
+def _notify_config_change() -> None:
+    if not _config_listeners:
+        return
+    with _config_listeners_lock:
+        refs = list(_config_listeners)
+        dead = [ref for ref in refs if ref() is None]
+        for ref in dead:
+            _config_listeners.remove(ref)
+    for ref in refs:
+        callback = ref()
+        if callback is not None:
+            callback()
+
 
 class AssetResolver:
     """
@@ -52,73 +575,236 @@ class AssetResolver:
     """
 
     _instance: Optional['AssetResolver'] = None
+    _instance_lock = threading.Lock()
+
+    # Maximum number of (local_path, cdn_url, env_mode) resolutions kept per
+    # instance; override with the ASSET_CACHE_SIZE environment variable
+    cache_size: int = 4096
+
+    # Maximum number of distinct strings whose validation result is memoized
+    # while streaming a batch; bounds batch memory independently of input size
+    batch_memo_size: int = 65536
 
     def __init__(self):
         """Private constructor - use get_instance() instead"""
         if AssetResolver._instance is not None:
             raise RuntimeError("Use AssetResolver.get_instance() instead of constructor")
 
-        self.environment = self._detect_environment()
-        self.asset_mode = self._detect_asset_mode()
+        self._digests: Dict[str, str] = {}
+        config = ResolverConfig.from_env(cache_size=self.cache_size)
+        self._state = self._new_state(config)
+        # ASSET_CDN_HOSTS / ASSET_CDN_DOWN as last read, see reload_config()
+        self._env_cdn = (config.cdn_hosts, config.cdn_down)
+        self._prober = None
+        self._metrics = None
+        self._variants = None
+        self._signer = None
+
+    @property
+    def config(self) -> ResolverConfig:
+        """Current configuration snapshot"""
+        return self._state.config
+
+    @config.setter
+    def config(self, config: ResolverConfig) -> None:
+        self.apply_config(config)
+
+    @property
+    def _cache(self) -> ResolutionCache:
+        return self._state.cache
+
+    @_cache.setter
+    def _cache(self, cache: ResolutionCache) -> None:
+        state = self._state
+        self._state = _ResolverState(state.config, cache, state.urls, state.hosts)
+
+    @property
+    def environment(self) -> str:
+        """Detected environment ('production', 'development' or 'test')"""
+        return self._state.config.environment
+
+    @environment.setter
+    def environment(self, value: str) -> None:
+        self.apply_config(replace(self._state.config, environment=value))
+
+    @property
+    def asset_mode(self) -> AssetMode:
+        """Detected asset mode override"""
+        return self._state.config.asset_mode
+
+    @asset_mode.setter
+    def asset_mode(self, value: AssetMode) -> None:
+        self.apply_config(replace(self._state.config, asset_mode=value))
+
+    def apply_config(self, config: ResolverConfig) -> None:
+        """
+        Atomically switch to a new config with an empty resolution cache
 
-    @classmethod
-    def get_instance(cls) -> 'AssetResolver':
-        """Get singleton instance of AssetResolver"""
-        if cls._instance is None:
-            cls._instance = cls.__new__(cls)
-            cls._instance.__init__()
-        return cls._instance
+        The swap is a single reference assignment: readers never lock, and a
+        call already in flight finishes with the config it started with.
+        Routed and fingerprinted URLs for the config's CDN hosts and style
+        are precomputed here, then on_config_change() callbacks run.
 
-    @classmethod
-    def reset_instance(cls) -> None:
-        """Reset singleton instance (useful for testing)"""
-        cls._instance = None
+        Args:
+            config: New configuration snapshot
+        """
+        self._state = self._new_state(config)
+        _notify_config_change()
+
+    def _new_state(self, config: ResolverConfig) -> _ResolverState:
+        """Empty state for a config, with URLs for the registered digests precomputed"""
+        hosts = _host_pool(config)
+        return _ResolverState(config, urls=_fingerprint_urls(self._digests, config.fingerprint, hosts), hosts=hosts)
+
+    def set_cdn_hosts(
+        self,
+        hosts: Union[Mapping[str, float], Iterable[str]],
+        down: Iterable[str] = ()
+    ) -> None:
+        """
+        Spread CDN URLs across a pool of equivalent CDN origins
 
-    @lru_cache(maxsize=1)
-    def _detect_environment(self) -> str:
+        CDN URLs on any pool origin are mapped to one host per asset by
+        weighted consistent hashing, so an asset always gets the same host
+        (keeping browser and edge caches warm) and load follows the weights.
+        Same as setting ASSET_CDN_HOSTS; an empty pool turns sharding off.
+
+        Args:
+            hosts: Origins or hostnames, optionally mapped to weights (default 1)
+            down: Origins to fail over from, see mark_cdn_host()
+
+        Raises:
+            ValueError: If a host is not an HTTPS origin or a weight is not positive
+
+        Examples:
+            >>> resolver.set_cdn_hosts({'cdn-a.example.com': 2, 'cdn-b.example.com': 1})
+            >>> resolver.get_asset_url('/media/logo.png', 'https://cdn-a.example.com/media/logo.png')
+            'https://cdn-b.example.com/media/logo.png'  # in production
         """
-        Detect current environment from ENVIRONMENT or PYTHON_ENV variables
+        weights = hosts if isinstance(hosts, Mapping) else dict.fromkeys(hosts, 1.0)
+        pool: Dict[str, float] = {}
+        for host, weight in weights.items():
+            weight = float(weight)
+            if not 0 < weight < float('inf'):
+                raise ValueError(f"[AssetResolver] Invalid weight for CDN host {host!r}: {weight!r}")
+            pool[cdn_origin(host)] = weight
+
+        config = self._state.config
+        self.apply_config(replace(
+            config,
+            cdn_hosts=tuple(pool.items()),
+            cdn_down=tuple(sorted({cdn_origin(host) for host in down})),
+        ))
+
+    def mark_cdn_host(self, host: str, healthy: bool) -> bool:
+        """
+        Mark a pool origin unhealthy (drain it) or healthy again
+
+        Assets mapped to an unhealthy origin move to their next-ranked host,
+        spread over the healthy ones by weight; all other assets keep their
+        host. Same as listing it in ASSET_CDN_DOWN, which a ConfigWatcher
+        override file can change without a deploy. If every origin is down,
+        URLs are left on the origin they were given.
+
+        Args:
+            host: Origin or hostname
+            healthy: False to fail over from the origin, True to restore it
 
         Returns:
-            'production', 'development', or 'test'
+            True if the health changed and the config was swapped in
         """
-        # Check ENVIRONMENT first (most common in Python)
-        env = os.getenv('ENVIRONMENT', '').lower()
-        if env in ('production', 'prod'):
-            return 'production'
-        if env in ('development', 'dev'):
-            return 'development'
-        if env == 'test':
-            return 'test'
+        origin = cdn_origin(host)
+        config = self._state.config
+        down = set(config.cdn_down)
+        if healthy:
+            down.discard(origin)
+        else:
+            down.add(origin)
+        if tuple(sorted(down)) == config.cdn_down:
+            return False
 
-        # Fallback to PYTHON_ENV
-        python_env = os.getenv('PYTHON_ENV', '').lower()
-        if python_env in ('production', 'prod'):
-            return 'production'
-        if python_env in ('development', 'dev'):
-            return 'development'
-        if python_env == 'test':
-            return 'test'
+        self.apply_config(replace(config, cdn_down=tuple(sorted(down))))
+        return True
+
+    def register_fingerprints(self, digests: Mapping[str, str]) -> None:
+        """
+        Register content hashes so CDN URLs resolve to fingerprinted URLs
+
+        Called by AssetIndex.load() with every manifest cdn_url and sha256.
+        With ASSET_FINGERPRINT=query or path, get_asset_url() then returns
+        e.g. 'https://cdn.example.com/logo.png?v=a1b2c3d4e5f6', which can be
+        served with `Cache-Control: public, max-age=31536000, immutable`.
+        The fingerprinted URLs are built once here, never per call.
 
-        # Default to development
-        return 'development'
+        Args:
+            digests: Mapping of CDN URL to hex SHA256 of its content
+        """
+        if digests.items() <= self._digests.items():
+            return
 
-    @lru_cache(maxsize=1)
-    def _detect_asset_mode(self) -> AssetMode:
+        self._digests.update(digests)
+        self.apply_config(self._state.config)
+
+    def reload_config(self, environ: Optional[Mapping[str, str]] = None) -> bool:
         """
-        Detect asset mode from ASSET_MODE environment variable
+        Re-detect ENVIRONMENT / PYTHON_ENV / ASSET_MODE and apply them if changed
+
+        The CDN pool and drained hosts only take what changed in
+        ASSET_CDN_HOSTS / ASSET_CDN_DOWN since the last read, so a pool set
+        with set_cdn_hosts() and hosts drained with mark_cdn_host() survive
+        reloads that do not touch those variables.
+
+        Args:
+            environ: Variables to read (default: os.environ)
 
         Returns:
-            AssetMode enum value
+            True if the config changed and was swapped in
+        """
+        config = self._merge_cdn_changes(ResolverConfig.from_env(environ, cache_size=self.cache_size))
+        if config == self._state.config:
+            return False
+
+        self.apply_config(config)
+        return True
+
+    def _merge_cdn_changes(self, detected: ResolverConfig) -> ResolverConfig:
+        """Detected config with the current CDN pool and health, updated by env changes only"""
+        env_hosts, env_down = self._env_cdn
+        self._env_cdn = (detected.cdn_hosts, detected.cdn_down)
+        current = self._state.config
+
+        hosts = detected.cdn_hosts if detected.cdn_hosts != env_hosts else current.cdn_hosts
+        restored = set(env_down) - set(detected.cdn_down)
+        drained = set(detected.cdn_down) - set(env_down)
+        down = (set(current.cdn_down) - restored) | drained
+        return replace(detected, cdn_hosts=hosts, cdn_down=tuple(sorted(down)))
+
+    @classmethod
+    def get_instance(cls) -> 'AssetResolver':
         """
-        asset_mode = os.getenv('ASSET_MODE', '').lower()
+        Get singleton instance of AssetResolver
 
-        if asset_mode == 'local':
-            return AssetMode.LOCAL
-        if asset_mode == 'cdn':
-            return AssetMode.CDN
+        Thread-safe via double-checked locking: only the first construction
+        takes the lock, so steady-state calls are a plain attribute read.
+        """
+        instance = cls._instance
+        if instance is None:
+            with cls._instance_lock:
+                instance = cls._instance
+                if instance is None:
+                    instance = cls.__new__(cls)
+                    instance.__init__()
+                    cls._instance = instance
+        return instance
 
-        return AssetMode.AUTO
+    @classmethod
+    def reset_instance(cls) -> None:
+        """Reset singleton instance and its resolution cache (useful for testing)"""
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance._cache.clear()
+            cls._instance = None
+        _notify_config_change()
 
     def _validate_local_path(self, path: str) -> bool:
         """
@@ -143,12 +829,13 @@ class AssetResolver:
 
         return True
 
-    def _validate_cdn_url(self, url: str) -> bool:
+    def _validate_cdn_url(self, url: str, config: Optional[ResolverConfig] = None) -> bool:
         """
         Validate CDN URL format
 
         Args:
             url: CDN URL
+            config: Config snapshot to validate against (default: current)
 
         Returns:
             True if valid, False otherwise
@@ -157,31 +844,45 @@ class AssetResolver:
             return False
 
         try:
-            parsed = urlparse(url)
+            # Plain ASCII http(s) URLs need no parsing: only the scheme matters.
+            # Anything else (IPv6 hosts, odd casing, whitespace) goes through
+            # urlsplit, which also rejects malformed hosts.
+            if url.isascii() and '[' not in url and url.startswith(('https://', 'http://')):
+                scheme = url[:url.index(':')]
+            else:
+                scheme = _urlsplit(url).scheme
 
             # In production, require HTTPS
-            if self.environment == 'production' and parsed.scheme != 'https':
-                print(f"[AssetResolver] Warning: CDN URL should use HTTPS in production: {url}")
+            environment = (config or self._state.config).environment
+            if environment == 'production' and scheme != 'https':
+                _warn(f"[AssetResolver] Warning: CDN URL should use HTTPS in production: {url}")
                 return False
 
-            return parsed.scheme in ('http', 'https')
+            return scheme in ('http', 'https')
         except Exception:
             return False
 
-    def _should_use_cdn(self, env_mode: EnvMode = 'cdn-production-local-dev') -> bool:
+    def _should_use_cdn(
+        self,
+        env_mode: EnvMode = 'cdn-production-local-dev',
+        config: Optional[ResolverConfig] = None
+    ) -> bool:
         """
         Determine whether to use CDN based on environment and mode
 
         Args:
             env_mode: Environment mode strategy
+            config: Config snapshot to decide with (default: current)
 
         Returns:
             True if CDN should be used, False otherwise
         """
+        config = config or self._state.config
+
         # Handle explicit asset mode override
-        if self.asset_mode == AssetMode.CDN:
+        if config.asset_mode == AssetMode.CDN:
             return True
-        if self.asset_mode == AssetMode.LOCAL:
+        if config.asset_mode == AssetMode.LOCAL:
             return False
 
         # Handle envMode strategies
@@ -190,13 +891,15 @@ class AssetResolver:
         elif env_mode == 'local-always':
             return False
         else:  # cdn-production-local-dev (default)
-            return self.environment == 'production'
+            return config.environment == 'production'
 
     def get_asset_url(
         self,
         local_path: str,
         cdn_url: str,
-        env_mode: EnvMode = 'cdn-production-local-dev'
+        env_mode: EnvMode = 'cdn-production-local-dev',
+        accept: Optional[str] = None,
+        accept_encoding: Optional[str] = None
     ) -> str:
         """
         Get environment-aware asset URL
@@ -205,6 +908,10 @@ class AssetResolver:
             local_path: Local file path (e.g., '/media/logo.png')
             cdn_url: CDN URL (e.g., 'https://cdn.example.com/logos/logo.png')
             env_mode: Environment mode strategy (default: 'cdn-production-local-dev')
+            accept: Request Accept header; with set_variants(), selects
+                    AVIF/WebP variants the client accepts
+            accept_encoding: Request Accept-Encoding header; with
+                             set_variants(), selects .br/.gz variants
 
         Returns:
             Resolved asset URL based on environment
@@ -231,50 +938,636 @@ class AssetResolver:
             ...     'https://cdn.example.com/icon.svg',
             ...     'local-always'
             ... )
+
+            # Smallest variant the client accepts (after set_variants())
+            >>> url4 = resolver.get_asset_url(
+            ...     '/css/app.css',
+            ...     'https://cdn.example.com/css/app.css',
+            ...     accept_encoding='gzip, br'
+            ... )
         """
-        # Validate inputs
-        is_local_valid = self._validate_local_path(local_path)
-        is_cdn_valid = self._validate_cdn_url(cdn_url)
+        if (accept or accept_encoding) and self._variants is not None:
+            return self._get_variant_url(local_path, cdn_url, env_mode, accept, accept_encoding)
+
+        # Metrics cost one attribute check when disabled
+        if self._metrics is not None:
+            return self._get_asset_url_measured(local_path, cdn_url, env_mode)
+
+        # One read of the state: the cache belongs to this config, so a
+        # concurrent reload or mode change cannot mix the two
+        state = self._state
+        key = (local_path, cdn_url, env_mode)
+        url = state.cache.get(key)
+        if url is not None:
+            return url
+
+        url = self._resolve(local_path, cdn_url, env_mode, state.config)
+        if state.urls or state.hosts is not None:
+            url = state.route(url)
+        state.cache.put(key, url)
+        return url
+
+    def _get_asset_url_measured(self, local_path: str, cdn_url: str, env_mode: str) -> str:
+        """get_asset_url() with metrics recording; only used while metrics are enabled"""
+        metrics = self._metrics
+        start = time.perf_counter() if metrics.timing else 0.0
+
+        state = self._state
+        key = (local_path, cdn_url, env_mode)
+        url = state.cache.get(key)
+        if url is None:
+            try:
+                url = self._resolve(local_path, cdn_url, env_mode, state.config)
+            except ValueError:
+                metrics.record_error(env_mode)
+                raise
+            if state.urls or state.hosts is not None:
+                url = state.route(url)
+            state.cache.put(key, url)
+
+        metrics.record_resolution('local' if url == local_path else 'cdn', env_mode)
+        if metrics.timing:
+            metrics.observe(time.perf_counter() - start)
+        return url
+
+    def _get_variant_url(
+        self,
+        local_path: str,
+        cdn_url: str,
+        env_mode: str,
+        accept: Optional[str],
+        accept_encoding: Optional[str]
+    ) -> str:
+        """get_asset_url() with variant negotiation, cached per asset and header signature"""
+        signature = self._accept_signature(accept, accept_encoding)
+        state = self._state
+        key = (local_path, cdn_url, env_mode, signature)
+        url = state.negotiated.get(key)
+        if url is not None:
+            return url
+
+        url = self.get_asset_url(local_path, cdn_url, env_mode)
+        on_cdn = url != local_path
+        variant = self._variants.choose(local_path, signature, cdn=on_cdn)
+        if variant is not None:
+            if not on_cdn:
+                url = variant.local_path
+            elif self._validate_cdn_url(variant.cdn_url, state.config):
+                url = state.route(variant.cdn_url)
+        state.negotiated.put(key, url)
+        return url
+
+    def set_variants(self, variants: Optional['VariantIndex']) -> None:
+        """
+        Use precompressed / modern-format variants when request headers are passed
 
-        if not is_local_valid and not is_cdn_valid:
-            raise ValueError(
-                f"[AssetResolver] Invalid asset paths: "
-                f'local="{local_path}", cdn="{cdn_url}"'
-            )
+        With a VariantIndex set, get_asset_url(..., accept=..., accept_encoding=...)
+        returns the smallest variant the client accepts on the same side
+        (CDN or local) as the original. Calls without headers are unaffected.
 
-        # Determine which URL to use
-        use_cdn = self._should_use_cdn(env_mode)
+        Args:
+            variants: VariantIndex, e.g. VariantIndex.from_index(assets); None to disable
 
-        if use_cdn and is_cdn_valid:
-            return cdn_url
+        Examples:
+            >>> from lib.asset_variants import VariantIndex
+            >>> resolver.set_variants(VariantIndex.from_index(AssetIndex.load('.r2-manifest.yml')))
+        """
+        from .asset_variants import accept_signature
 
-        if not use_cdn and is_local_valid:
-            return local_path
+        self._accept_signature = accept_signature
+        self._variants = variants
+        self._state.negotiated.clear()
 
-        # Fallback logic
-        if is_local_valid:
-            print(f"[AssetResolver] Warning: Falling back to local path: {local_path}")
-            return local_path
+    @property
+    def variants(self) -> Optional['VariantIndex']:
+        """Variant index in use, or None when variant selection is off"""
+        return self._variants
 
-        if is_cdn_valid:
-            print(f"[AssetResolver] Warning: Falling back to CDN URL: {cdn_url}")
-            return cdn_url
+    def get_responsive_image(
+        self,
+        local_path: str,
+        cdn_url: str,
+        width: int,
+        height: int,
+        env_mode: EnvMode = 'cdn-production-local-dev',
+        breakpoints: Optional['Breakpoints'] = None
+    ) -> 'ResponsiveImage':
+        """
+        Get srcset, sizes and width/height attributes for an image
 
-        raise ValueError("[AssetResolver] Cannot resolve asset URL")
+        The URL is resolved as in get_asset_url(). CDN URLs get one resized
+        variant per breakpoint below the intrinsic width; local URLs only
+        list the original. Results are cached per asset and config, so a
+        page re-rendering the same images does no string building.
 
-    def get_environment(self) -> str:
-        """Get current environment"""
-        return self.environment
+        Args:
+            local_path: Local file path
+            cdn_url: CDN URL
+            width: Intrinsic width in pixels
+            height: Intrinsic height in pixels
+            env_mode: Environment mode strategy
+            breakpoints: Candidate widths (default: DEFAULT_BREAKPOINTS)
+
+        Returns:
+            ResponsiveImage
+
+        Raises:
+            ValueError: If both paths or the dimensions are invalid
+
+        Examples:
+            >>> resolver = AssetResolver.get_instance()
+            >>> hero = resolver.get_responsive_image('/media/hero.jpg', 'https://cdn.example.com/hero.jpg', 1600, 900)
+            >>> hero.width, hero.height
+            (1600, 900)
+        """
+        breakpoints = breakpoints or DEFAULT_BREAKPOINTS
+        state = self._state
+        key = (local_path, cdn_url, env_mode, width, height, breakpoints)
+        image = state.images.get(key)
+        if image is not None:
+            return image
+
+        url = self.get_asset_url(local_path, cdn_url, env_mode)
+        image = ResponsiveImage.build(url, width, height, url != local_path, breakpoints)
+        state.images.put(key, image)
+        return image
+
+    def _resolve(
+        self,
+        local_path: str,
+        cdn_url: str,
+        env_mode: EnvMode,
+        config: Optional[ResolverConfig] = None
+    ) -> str:
+        """
+        Resolve an asset URL without consulting the resolution cache
+
+        Args:
+            local_path: Local file path
+            cdn_url: CDN URL
+            env_mode: Environment mode strategy
+            config: Config snapshot to resolve with (default: current)
+
+        Returns:
+            Resolved asset URL
+
+        Raises:
+            ValueError: If both paths are invalid
+        """
+        config = config or self._state.config
+
+        # Validate inputs
+        is_local_valid = self._validate_local_path(local_path)
+        is_cdn_valid = self._validate_cdn_url(cdn_url, config)
+
+        metrics = self._metrics
+        if metrics is not None:
+            if not is_local_valid:
+                metrics.record_validation_failure('local')
+            if not is_cdn_valid:
+                metrics.record_validation_failure('cdn')
+
+        if not is_local_valid and not is_cdn_valid:
+            raise ValueError(
+                f"[AssetResolver] Invalid asset paths: "
+                f'local="{local_path}", cdn="{cdn_url}"'
+            )
+
+        # Determine which URL to use
+        use_cdn = self._should_use_cdn(env_mode, config)
+
+        if use_cdn and is_cdn_valid:
+            return cdn_url
+
+        if not use_cdn and is_local_valid:
+            return local_path
+
+        # Fallback logic
+        if is_local_valid:
+            if metrics is not None:
+                metrics.record_fallback('local')
+            _warn(f"[AssetResolver] Warning: Falling back to local path: {local_path}")
+            return local_path
+
+        if is_cdn_valid:
+            if metrics is not None:
+                metrics.record_fallback('cdn')
+            _warn(f"[AssetResolver] Warning: Falling back to CDN URL: {cdn_url}")
+            return cdn_url
+
+        raise ValueError("[AssetResolver] Cannot resolve asset URL")
+
+    def iter_resolve(
+        self,
+        rows: Iterable[Sequence[str]],
+        env_mode: EnvMode = 'cdn-production-local-dev',
+        on_error: OnError = 'raise',
+        sentinel: Any = None
+    ) -> Iterator[Any]:
+        """
+        Lazily resolve many assets with the same rules as get_asset_url()
+
+        The CDN decision is made once per distinct env_mode and each distinct
+        local path / CDN URL is validated once, so large batches cost a few
+        dict probes per row. Validation memos are bounded by batch_memo_size,
+        so memory stays flat however long the input is. Fallback warnings are
+        emitted once per URL.
+
+        Args:
+            rows: Iterable of (local_path, cdn_url) or (local_path, cdn_url, env_mode)
+            env_mode: Environment mode for rows without one
+            on_error: What to do with an unresolvable or malformed row:
+                      'raise' (default), 'skip' it, or yield 'sentinel' in its place
+            sentinel: Value yielded for bad rows when on_error='sentinel'
+
+        Yields:
+            Resolved URLs in input order
+
+        Raises:
+            ValueError: If on_error is unknown, or a row is invalid and on_error='raise'
+
+        Examples:
+            >>> resolver = AssetResolver.get_instance()
+            >>> list(resolver.iter_resolve([
+            ...     ('/media/logo.png', 'https://cdn.example.com/logo.png'),
+            ...     ('/media/icon.svg', 'https://cdn.example.com/icon.svg', 'cdn-always'),
+            ... ]))
+            ['/media/logo.png', 'https://cdn.example.com/icon.svg']  # in development
+        """
+        if on_error not in ('raise', 'skip', 'sentinel'):
+            raise ValueError(f"[AssetResolver] Invalid on_error: {on_error!r}")
+
+        return self._iter_resolve(rows, env_mode, on_error, sentinel)
+
+    def _iter_resolve(
+        self,
+        rows: Iterable[Sequence[str]],
+        env_mode: str,
+        on_error: str,
+        sentinel: Any
+    ) -> Iterator[Any]:
+        """Generator behind iter_resolve(); arguments are already validated"""
+        # The whole batch resolves against one config snapshot
+        state = self._state
+        config = state.config
+        route = state.route if state.urls or state.hosts is not None else None
+        memo_size = self.batch_memo_size
+        metrics = self._metrics
+        validate_local = self._validate_local_path
+        validate_cdn = self._validate_cdn_url
+
+        # Memos map each distinct string to the URL it resolves to ('' when
+        # invalid), so routing and fingerprinting cost nothing per row either
+        def resolve_local(path: str) -> str:
+            return path if validate_local(path) else ''
+
+        def resolve_cdn(url: str) -> str:
+            if not validate_cdn(url, config):
+                return ''
+            return route(url) if route is not None else url
+
+        decisions: Dict[str, bool] = {}
+        local_urls: Dict[str, str] = {}
+        cdn_urls: Dict[str, str] = {}
+        warned = set()
+
+        for row in rows:
+            try:
+                if len(row) == 2:
+                    local_path, cdn_url = row
+                    mode = env_mode
+                else:
+                    local_path, cdn_url, mode = row
+
+                use_cdn = decisions.get(mode)
+                if use_cdn is None:
+                    use_cdn = decisions[mode] = self._should_use_cdn(mode, config)
+            except (TypeError, ValueError):
+                if metrics is not None:
+                    metrics.record_error(env_mode)
+                if on_error == 'raise':
+                    raise ValueError(f"[AssetResolver] Malformed asset row: {row!r}")
+                if on_error == 'sentinel':
+                    yield sentinel
+                continue
+
+            if use_cdn:
+                preferred, fallback = cdn_url, local_path
+                preferred_urls, fallback_urls = cdn_urls, local_urls
+                resolve_preferred, resolve_fallback = resolve_cdn, resolve_local
+            else:
+                preferred, fallback = local_path, cdn_url
+                preferred_urls, fallback_urls = local_urls, cdn_urls
+                resolve_preferred, resolve_fallback = resolve_local, resolve_cdn
+
+            url = preferred_urls.get(preferred)
+            if url is None:
+                if len(preferred_urls) >= memo_size:
+                    preferred_urls.clear()
+                url = preferred_urls[preferred] = resolve_preferred(preferred)
+                if not url and metrics is not None:
+                    metrics.record_validation_failure('cdn' if use_cdn else 'local')
+            if url:
+                if metrics is not None:
+                    metrics.record_resolution('cdn' if use_cdn else 'local', mode)
+                yield url
+                continue
+
+            url = fallback_urls.get(fallback)
+            if url is None:
+                if len(fallback_urls) >= memo_size:
+                    fallback_urls.clear()
+                url = fallback_urls[fallback] = resolve_fallback(fallback)
+                if not url and metrics is not None:
+                    metrics.record_validation_failure('local' if use_cdn else 'cdn')
+            if not url:
+                if metrics is not None:
+                    metrics.record_error(mode)
+                if on_error == 'raise':
+                    raise ValueError(
+                        f"[AssetResolver] Invalid asset paths: "
+                        f'local="{local_path}", cdn="{cdn_url}"'
+                    )
+                if on_error == 'sentinel':
+                    yield sentinel
+                continue
+
+            if fallback not in warned:
+                if len(warned) >= memo_size:
+                    warned.clear()
+                warned.add(fallback)
+                kind = 'local path' if use_cdn else 'CDN URL'
+                _warn(f"[AssetResolver] Warning: Falling back to {kind}: {fallback}")
+            if metrics is not None:
+                metrics.record_fallback('local' if use_cdn else 'cdn')
+                metrics.record_resolution('local' if use_cdn else 'cdn', mode)
+            yield url
+
+    def get_environment(self) -> str:
+        """Get current environment"""
+        return self.environment
 
     def get_asset_mode(self) -> AssetMode:
         """Get current asset mode"""
         return self.asset_mode
 
+    def cache_info(self) -> CacheInfo:
+        """Get resolution cache statistics (hits, misses, maxsize, currsize)"""
+        return self._cache.info()
+
+    def clear_cache(self) -> None:
+        """Drop all cached resolutions, responsive images and negotiated variants"""
+        self._cache.clear()
+        self._state.images.clear()
+        self._state.negotiated.clear()
+
+    def enable_metrics(self, timing: bool = False, metrics: Optional['AssetMetrics'] = None) -> 'AssetMetrics':
+        """
+        Start recording resolution counters (and optionally latencies)
+
+        Counts every get_asset_url() call and batch row by decision and
+        env_mode. Fallbacks and validation failures are counted where the
+        work is done: on cache misses, and once per distinct URL in a batch.
+
+        Args:
+            timing: Also record a get_asset_url() latency histogram
+            metrics: Recorder to use instead of a new AssetMetrics, e.g. a
+                     subclass forwarding events to StatsD or OpenTelemetry
+
+        Returns:
+            The recorder now in use
+
+        Examples:
+            >>> resolver = AssetResolver.get_instance()
+            >>> metrics = resolver.enable_metrics(timing=True)
+            >>> print(resolver.metrics_text())
+        """
+        if metrics is None:
+            from .asset_metrics import AssetMetrics
+
+            metrics = AssetMetrics(timing=timing)
+
+        self._metrics = metrics
+        return metrics
+
+    def disable_metrics(self) -> None:
+        """Stop recording metrics; resolution goes back to the uninstrumented path"""
+        self._metrics = None
+
+    @property
+    def metrics(self) -> Optional['AssetMetrics']:
+        """Active metrics recorder, or None when metrics are disabled"""
+        return self._metrics
+
+    def metrics_text(self, prefix: str = 'asset_resolver') -> str:
+        """
+        Export metrics and cache statistics in the Prometheus text format
+
+        Serve the result from a /metrics endpoint with content type
+        'text/plain; version=0.0.4'.
+
+        Raises:
+            RuntimeError: If metrics are not enabled
+        """
+        if self._metrics is None:
+            raise RuntimeError("[AssetResolver] Metrics are not enabled; call enable_metrics() first")
+
+        text = self._metrics.to_prometheus(prefix, cache_info=self.cache_info())
+        metric = f'{prefix}_warnings_suppressed_total'
+        return (
+            text
+            + f'# HELP {metric} Warnings dropped by the rate limiter.\n'
+            + f'# TYPE {metric} counter\n'
+            + f'{metric} {warning_limiter.suppressed}\n'
+        )
+
+    def enable_cdn_probing(
+        self,
+        concurrency: int = 16,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        timeout: float = 2.0
+    ) -> 'CdnProber':
+        """
+        Make the async API verify CDN URLs with HEAD requests
+
+        Unreachable CDN objects fall back to the local path. Probe results are
+        cached for `ttl` seconds (`negative_ttl` for failures).
+
+        Args:
+            concurrency: Maximum simultaneous HEAD requests
+            ttl: Seconds to trust a reachable result
+            negative_ttl: Seconds to trust an unreachable result
+            timeout: Per-request connect/response timeout in seconds
+
+        Returns:
+            The CdnProber now used by aget_asset_url()
+        """
+        from .asset_probe import CdnProber
+
+        self._prober = CdnProber(concurrency, ttl, negative_ttl, timeout)
+        return self._prober
+
+    def disable_cdn_probing(self) -> None:
+        """Stop probing CDN URLs in the async API"""
+        self._prober = None
+
+    def enable_signed_urls(
+        self,
+        credentials: Optional['R2Credentials'] = None,
+        ttl: int = 3600,
+        min_validity: int = 300
+    ) -> 'UrlSigner':
+        """
+        Hand out presigned, time-limited URLs for private R2 objects
+
+        URLs are signed locally (no request to R2) and cached until fewer
+        than `min_validity` seconds of their lifetime remain.
+
+        Args:
+            credentials: R2 endpoint and keys (default: R2Credentials.from_env())
+            ttl: Lifetime of each URL in seconds (at most seven days)
+            min_validity: Seconds of lifetime a returned URL has left at least
+
+        Returns:
+            The UrlSigner now used by get_signed_url() / get_signed_urls()
+
+        Raises:
+            ValueError: If credentials are missing or ttl / min_validity are out of range
+        """
+        from .asset_presign import UrlSigner
+
+        self._signer = UrlSigner(credentials, ttl, min_validity)
+        return self._signer
+
+    def disable_signed_urls(self) -> None:
+        """Stop handing out signed URLs and drop the cached ones"""
+        self._signer = None
+
+    def get_signed_url(self, r2_key: str) -> str:
+        """
+        Presigned GET URL for a private object
+
+        Args:
+            r2_key: Bucket and object key, e.g. 'private-bucket/invoices/1.pdf'
+
+        Raises:
+            RuntimeError: If signed URLs are not enabled
+
+        Examples:
+            >>> resolver.enable_signed_urls(ttl=3600)
+            >>> resolver.get_signed_url('private-bucket/invoices/2024-001.pdf')
+            'https://abc123.r2.cloudflarestorage.com/private-bucket/invoices/2024-001.pdf?X-Amz-Algorithm=...'
+        """
+        signer = self._signer
+        if signer is None:
+            raise RuntimeError("[AssetResolver] Signed URLs are not enabled; call enable_signed_urls() first")
+        return signer.sign(r2_key)
+
+    def get_signed_urls(self, r2_keys: Iterable[str]) -> List[str]:
+        """
+        Presigned GET URLs for many private objects, in input order
+
+        Raises:
+            RuntimeError: If signed URLs are not enabled
+        """
+        signer = self._signer
+        if signer is None:
+            raise RuntimeError("[AssetResolver] Signed URLs are not enabled; call enable_signed_urls() first")
+        return signer.sign_many(r2_keys)
+
+    async def awarm_cdn_probes(self, source: Union['AssetIndex', Iterable[str]]) -> int:
+        """
+        Probe CDN URLs ahead of traffic, e.g. every cdn_url in the manifest at startup
+
+        Args:
+            source: AssetIndex or iterable of CDN URLs
+
+        Returns:
+            Number of reachable URLs (0 if probing is disabled)
+        """
+        if self._prober is None:
+            return 0
+
+        # Probe the URLs aget_asset_url() will check: routed and fingerprinted
+        if isinstance(source, AssetIndex):
+            source = (record.cdn_url for record in source.records() if record.cdn_url)
+        route = self._state.route
+        return await self._prober.warm(route(url) for url in source)
+
+    async def aget_asset_url(
+        self,
+        local_path: str,
+        cdn_url: str,
+        env_mode: EnvMode = 'cdn-production-local-dev'
+    ) -> str:
+        """
+        Async get_asset_url() that can verify the CDN object exists
+
+        Without probing enabled this is get_asset_url() and never awaits I/O.
+        With probing, a CDN URL (as resolved: routed and fingerprinted) that
+        fails its (cached) HEAD check falls back to the local path when that
+        path is valid.
+
+        Examples:
+            >>> resolver = AssetResolver.get_instance()
+            >>> resolver.enable_cdn_probing()
+            >>> url = await resolver.aget_asset_url('/media/logo.png', 'https://cdn.example.com/logo.png')
+        """
+        url = self.get_asset_url(local_path, cdn_url, env_mode)
+        prober = self._prober
+        # A CDN result may be routed and fingerprinted, so compare with the local side
+        if prober is None or url == local_path:
+            return url
+
+        if await prober.is_available(url):
+            return url
+
+        if self._validate_local_path(local_path):
+            _warn(f"[AssetResolver] Warning: CDN URL unreachable, falling back to local path: {local_path}")
+            return local_path
+        return url
+
+    async def aresolve_many(
+        self,
+        rows: Iterable[Sequence[str]],
+        env_mode: EnvMode = 'cdn-production-local-dev'
+    ) -> List[str]:
+        """
+        Async batch resolution with concurrent, deduplicated CDN probing
+
+        Args:
+            rows: Iterable of (local_path, cdn_url) or (local_path, cdn_url, env_mode)
+            env_mode: Environment mode for rows without one
+
+        Returns:
+            Resolved URLs in input order
+
+        Raises:
+            ValueError: If both paths of a row are invalid
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        urls = list(self.iter_resolve(rows, env_mode))
+        prober = self._prober
+        if prober is None:
+            return urls
+
+        reachable = await prober.probe_many(
+            url for row, url in zip(rows, urls) if url != row[0]
+        )
+        for i, (row, url) in enumerate(zip(rows, urls)):
+            if url != row[0] and not reachable[url] and self._validate_local_path(row[0]):
+                _warn(f"[AssetResolver] Warning: CDN URL unreachable, falling back to local path: {row[0]}")
+                urls[i] = row[0]
+        return urls
+
 
 def get_asset_url(
     local_path: str,
     cdn_url: str,
-    env_mode: EnvMode = 'cdn-production-local-dev'
+    env_mode: EnvMode = 'cdn-production-local-dev',
+    accept: Optional[str] = None,
+    accept_encoding: Optional[str] = None
 ) -> str:
     """
     Convenience function for getting asset URL without creating resolver instance
@@ -283,6 +1576,8 @@ def get_asset_url(
         local_path: Local file path
         cdn_url: CDN URL
         env_mode: Environment mode strategy
+        accept: Request Accept header (see AssetResolver.set_variants)
+        accept_encoding: Request Accept-Encoding header
 
     Returns:
         Resolved asset URL
@@ -318,7 +1613,7 @@ def get_asset_url(
         ...     return f'<img src="{logo_url}" />'
     """
     resolver = AssetResolver.get_instance()
-    return resolver.get_asset_url(local_path, cdn_url, env_mode)
+    return resolver.get_asset_url(local_path, cdn_url, env_mode, accept, accept_encoding)
 
 
 def batch_resolve_assets(configs: List[Dict[str, str]]) -> List[str]:
@@ -354,25 +1649,1402 @@ def batch_resolve_assets(configs: List[Dict[str, str]]) -> List[str]:
         ... ])
         >>> logo_url, banner_url, icon_url = urls
     """
+    rows = (
+        (
+            config.get('local_path', ''),
+            config.get('cdn_url', ''),
+            config.get('env_mode', 'cdn-production-local-dev'),
+        )
+        for config in configs
+    )
+    return list(AssetResolver.get_instance().iter_resolve(rows))
+
+
+def resolve_asset_columns(
+    local_paths: Sequence[str],
+    cdn_urls: Sequence[str],
+    env_modes: Union[EnvMode, Sequence[EnvMode]] = 'cdn-production-local-dev',
+    lazy: bool = False
+) -> Union[List[str], Iterator[str]]:
+    """
+    Batch resolve assets given as parallel columns
+
+    Avoids building a dict per asset: the columns are zipped straight into
+    AssetResolver.iter_resolve(), which decides CDN vs local once per
+    env_mode and validates each distinct string once.
+
+    Args:
+        local_paths: Local file paths
+        cdn_urls: CDN URLs, same length as local_paths
+        env_modes: One environment mode for every row, or one per row
+        lazy: Return a generator instead of a list
+
+    Returns:
+        Resolved URLs in input order (list, or generator if lazy)
+
+    Raises:
+        ValueError: If column lengths differ or both paths of a row are invalid
+
+    Examples:
+        >>> from lib.assets import resolve_asset_columns
+
+        >>> urls = resolve_asset_columns(
+        ...     ['/media/logo.png', '/media/banner.jpg'],
+        ...     ['https://cdn.example.com/logo.png', 'https://cdn.example.com/banner.jpg'],
+        ... )
+    """
+    if isinstance(env_modes, str):
+        modes: Iterable[str] = repeat(env_modes)
+    else:
+        modes = env_modes
+        if len(env_modes) != len(local_paths):
+            raise ValueError("[AssetResolver] env_modes must match local_paths in length")
+
+    if len(local_paths) != len(cdn_urls):
+        raise ValueError("[AssetResolver] local_paths and cdn_urls must have the same length")
+
+    urls = AssetResolver.get_instance().iter_resolve(zip(local_paths, cdn_urls, modes))
+    return urls if lazy else list(urls)
+
+
+def resolve_asset_rows(
+    rows: Iterable[Sequence[str]],
+    env_mode: EnvMode = 'cdn-production-local-dev',
+    lazy: bool = False
+) -> Union[List[str], Iterator[str]]:
+    """
+    Batch resolve assets given as (local_path, cdn_url[, env_mode]) tuples
+
+    Args:
+        rows: Iterable of 2- or 3-tuples
+        env_mode: Environment mode for rows without one
+        lazy: Return a generator instead of a list
+
+    Returns:
+        Resolved URLs in input order (list, or generator if lazy)
+
+    Raises:
+        ValueError: If both paths of a row are invalid
+
+    Examples:
+        >>> from lib.assets import resolve_asset_rows
+
+        >>> urls = resolve_asset_rows([
+        ...     ('/media/logo.png', 'https://cdn.example.com/logo.png'),
+        ...     ('/media/icon.svg', 'https://cdn.example.com/icon.svg', 'cdn-always'),
+        ... ])
+    """
+    urls = AssetResolver.get_instance().iter_resolve(rows, env_mode)
+    return urls if lazy else list(urls)
+
+
+def stream_resolve_assets(
+    configs: Iterable[Union[Dict[str, str], Sequence[str]]],
+    on_error: OnError = 'raise',
+    sentinel: Any = None
+) -> Iterator[Any]:
+    """
+    Stream-resolve assets one at a time with constant memory
+
+    Accepts any iterable, including lazily read files, so multi-million-row
+    exports never hold more than one row and a bounded validation memo.
+
+    Args:
+        configs: Iterable of dicts (local_path, cdn_url, optional env_mode)
+                 or (local_path, cdn_url[, env_mode]) tuples
+        on_error: 'raise' (default), 'skip' bad rows, or yield 'sentinel'
+                  for them so output stays aligned with input
+        sentinel: Value yielded for bad rows when on_error='sentinel'
+
+    Yields:
+        Resolved URLs in input order
+
+    Raises:
+        ValueError: If on_error is unknown, or a row is invalid and on_error='raise'
+
+    Examples:
+        >>> import csv, json
+        >>> from lib.assets import stream_resolve_assets
+
+        >>> # CSV with local_path,cdn_url,env_mode columns
+        >>> with open('assets.csv', newline='') as f:
+        ...     for url in stream_resolve_assets(csv.DictReader(f), on_error='skip'):
+        ...         out.write(url + '\\n')
+
+        >>> # JSONL, one config per line; None marks rows that failed
+        >>> with open('assets.jsonl') as f:
+        ...     urls = stream_resolve_assets((json.loads(line) for line in f), on_error='sentinel')
+    """
+    default_mode = 'cdn-production-local-dev'
+    rows = (
+        (
+            config.get('local_path', ''),
+            config.get('cdn_url', ''),
+            config.get('env_mode') or default_mode,
+        ) if isinstance(config, dict) else config
+        for config in configs
+    )
+    return AssetResolver.get_instance().iter_resolve(rows, default_mode, on_error, sentinel)
+
+
+async def aget_asset_url(
+    local_path: str,
+    cdn_url: str,
+    env_mode: EnvMode = 'cdn-production-local-dev'
+) -> str:
+    """
+    Async convenience wrapper for AssetResolver.aget_asset_url()
+
+    Examples:
+        >>> from lib.assets import AssetResolver, aget_asset_url
+
+        >>> AssetResolver.get_instance().enable_cdn_probing()
+
+        >>> @app.get("/")
+        >>> async def read_root():
+        ...     return {"logo": await aget_asset_url('/static/logo.png', 'https://cdn.example.com/logo.png')}
+    """
+    return await AssetResolver.get_instance().aget_asset_url(local_path, cdn_url, env_mode)
+
+
+async def abatch_resolve_assets(configs: List[Dict[str, str]]) -> List[str]:
+    """
+    Async batch_resolve_assets(); CDN URLs are probed concurrently when probing is enabled
+
+    Args:
+        configs: List of dicts with local_path, cdn_url and optional env_mode
+
+    Returns:
+        List of resolved URLs in same order
+    """
+    rows = [
+        (
+            config.get('local_path', ''),
+            config.get('cdn_url', ''),
+            config.get('env_mode', 'cdn-production-local-dev'),
+        )
+        for config in configs
+    ]
+    return await AssetResolver.get_instance().aresolve_many(rows)
+
+
+# ============================================================================
+# Responsive images
+# ============================================================================
+
+@dataclass(frozen=True)
+class Breakpoints:
+    """
+    Candidate widths and resize scheme for responsive image variants
+
+    Variants are only generated below an image's intrinsic width (plus the
+    intrinsic width itself), so images are never upscaled. Hashable, so it
+    doubles as part of the responsive-image cache key.
+
+    Args:
+        widths: Candidate variant widths in pixels
+        sizes: Default `sizes` attribute
+        resize: How the CDN is asked for a width: 'query' appends
+                `<param>=<width>`; 'cloudflare' uses Cloudflare Image Resizing
+                (`/cdn-cgi/image/width=<width>,fit=scale-down/<path>`)
+        param: Query parameter name for resize='query'
+
+    Examples:
+        >>> Breakpoints(widths=(480, 960, 1440), sizes='(min-width: 960px) 50vw, 100vw')
+    """
+
+    widths: Tuple[int, ...] = (320, 640, 768, 1024, 1280, 1536, 1920, 2560)
+    sizes: str = '100vw'
+    resize: str = 'query'
+    param: str = 'w'
+
+    def __post_init__(self) -> None:
+        if self.resize not in ('query', 'cloudflare'):
+            raise ValueError(f"[Breakpoints] Invalid resize scheme: {self.resize!r}")
+        widths = tuple(sorted({int(width) for width in self.widths}))
+        if not widths or widths[0] <= 0:
+            raise ValueError(f"[Breakpoints] Widths must be positive: {self.widths}")
+        object.__setattr__(self, 'widths', widths)
+
+    def variant_url(self, url: str, width: int) -> str:
+        """
+        Build the CDN URL of a resized variant
+
+        Args:
+            url: Full-size CDN URL (may already carry a fingerprint query)
+            width: Variant width in pixels
+
+        Returns:
+            Variant URL
+        """
+        if self.resize == 'cloudflare':
+            parts = _urlsplit(url)
+            origin = f'{parts.scheme}://{parts.netloc}'
+            return f'{origin}/cdn-cgi/image/width={width},fit=scale-down{url[len(origin):]}'
+
+        base, hash_mark, fragment = url.partition('#')
+        joiner = '&' if '?' in base else '?'
+        return f'{base}{joiner}{self.param}={width}{hash_mark}{fragment}'
+
+
+DEFAULT_BREAKPOINTS = Breakpoints()
+
+
+class ResponsiveImage:
+    """
+    Ready-to-render <img> attributes for one asset
+
+    `width` and `height` are the intrinsic dimensions, so browsers reserve
+    the right box before the image loads (no layout shift). Local URLs
+    cannot be resized, so in development srcset lists only the original.
+
+    Examples:
+        >>> image = get_responsive_image('/media/hero.jpg', 'https://cdn.example.com/hero.jpg', 1600, 900)
+        >>> image.srcset
+        'https://cdn.example.com/hero.jpg?w=320 320w, ..., https://cdn.example.com/hero.jpg 1600w'  # in production
+        >>> f'<img {image.html()} alt="Hero">'
+    """
+
+    __slots__ = ('src', 'srcset', 'sizes', 'width', 'height', 'variants')
+
+    def __init__(
+        self,
+        src: str,
+        srcset: str,
+        sizes: str,
+        width: int,
+        height: int,
+        variants: Tuple[Tuple[int, str], ...],
+    ):
+        self.src = src
+        self.srcset = srcset
+        self.sizes = sizes
+        self.width = width
+        self.height = height
+        self.variants = variants
+
+    @classmethod
+    def build(
+        cls,
+        url: str,
+        width: int,
+        height: int,
+        resizable: bool,
+        breakpoints: Breakpoints = DEFAULT_BREAKPOINTS,
+    ) -> 'ResponsiveImage':
+        """
+        Compute variants and srcset for a resolved URL
+
+        Args:
+            url: Resolved full-size URL
+            width: Intrinsic width in pixels
+            height: Intrinsic height in pixels
+            resizable: Whether `url` is a CDN URL that can serve resized variants
+            breakpoints: Candidate widths and resize scheme
+
+        Returns:
+            ResponsiveImage
+
+        Raises:
+            ValueError: If the dimensions are not positive
+        """
+        if not width or not height or width <= 0 or height <= 0:
+            raise ValueError(f"[ResponsiveImage] Invalid dimensions for {url!r}: {width}x{height}")
+
+        variants = [(w, breakpoints.variant_url(url, w)) for w in breakpoints.widths if w < width] if resizable else []
+        variants.append((width, url))
+        srcset = ', '.join(f'{variant} {w}w' for w, variant in variants)
+        return cls(url, srcset, breakpoints.sizes, width, height, tuple(variants))
+
+    def attrs(self, sizes: Optional[str] = None) -> Dict[str, str]:
+        """
+        <img> attributes as a dict, e.g. for template engines
+
+        Args:
+            sizes: Override the breakpoints' `sizes` attribute
+        """
+        return {
+            'src': self.src,
+            'srcset': self.srcset,
+            'sizes': sizes or self.sizes,
+            'width': str(self.width),
+            'height': str(self.height),
+        }
+
+    def html(self, sizes: Optional[str] = None) -> str:
+        """
+        <img> attributes as an HTML-escaped string
+
+        Args:
+            sizes: Override the breakpoints' `sizes` attribute
+        """
+        from html import escape
+
+        return ' '.join(f'{name}="{escape(value)}"' for name, value in self.attrs(sizes).items())
+
+    def __repr__(self) -> str:
+        return f"ResponsiveImage(src={self.src!r}, width={self.width}, height={self.height}, variants={len(self.variants)})"
+
+
+def get_responsive_image(
+    local_path: str,
+    cdn_url: str,
+    width: int,
+    height: int,
+    env_mode: EnvMode = 'cdn-production-local-dev',
+    breakpoints: Optional[Breakpoints] = None
+) -> ResponsiveImage:
+    """
+    Convenience function for AssetResolver.get_responsive_image()
+
+    Args:
+        local_path: Local file path
+        cdn_url: CDN URL
+        width: Intrinsic width in pixels (manifest `dimensions.width`)
+        height: Intrinsic height in pixels (manifest `dimensions.height`)
+        env_mode: Environment mode strategy
+        breakpoints: Candidate widths (default: DEFAULT_BREAKPOINTS)
+
+    Returns:
+        ResponsiveImage for the current environment
+
+    Examples:
+        >>> from lib.assets import get_responsive_image
+        >>> hero = get_responsive_image('/media/hero.jpg', 'https://cdn.example.com/hero.jpg', 1600, 900)
+        >>> f'<img {hero.html()} alt="Hero">'
+    """
     resolver = AssetResolver.get_instance()
+    return resolver.get_responsive_image(local_path, cdn_url, width, height, env_mode, breakpoints)
+
+
+class AssetRecord:
+    """
+    Compact manifest entry with its URL resolved for the current environment
+
+    Uses __slots__ so tens of thousands of records stay small in memory.
+    Optional fields (cdn_url, sha256, dimensions, r2_key) are None when absent.
+    `r2_key` is the object's bucket and key, e.g. for signing private assets
+    (see AssetIndex.signed_url).
+    """
+
+    __slots__ = (
+        'key', 'url', 'local_path', 'cdn_url', 'env_mode',
+        'type', 'size', 'sha256', 'width', 'height', 'r2_key',
+    )
+
+    def __init__(
+        self,
+        key: str,
+        url: str,
+        local_path: str,
+        cdn_url: Optional[str] = None,
+        env_mode: str = 'cdn-production-local-dev',
+        type: Optional[str] = None,
+        size: int = 0,
+        sha256: Optional[str] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        r2_key: Optional[str] = None,
+    ):
+        self.key = key
+        self.url = url
+        self.local_path = local_path
+        self.cdn_url = cdn_url
+        self.env_mode = env_mode
+        self.type = type
+        self.size = size
+        self.sha256 = sha256
+        self.width = width
+        self.height = height
+        self.r2_key = r2_key
+
+    def __repr__(self) -> str:
+        return f"AssetRecord(key={self.key!r}, url={self.url!r})"
+
+
+class AssetIndex:
+    """
+    Manifest-driven asset lookup table
+
+    Loads a project's `.r2-manifest.yml` once and resolves every asset's URL
+    up front for the resolver's environment and AssetMode. Lookups by logical
+    key (the manifest `path`) are a single dict probe with no validation.
+    When the resolver switches config (ConfigWatcher reload, set_cdn_hosts(),
+    ...) every URL is resolved again, so the index and get_asset_url() agree.
+
+    Examples:
+        >>> assets = AssetIndex.load('.r2-manifest.yml')
+        >>> assets['public/media/logo.svg']
+        '/media/logo.svg'  # in development
+        'https://cdn.example.com/logos/logo.svg'  # in production
+        >>> assets.record('public/media/logo.svg').width
+        512
+    """
+
+    def __init__(
+        self,
+        records: Optional[List[AssetRecord]] = None,
+        project: str = '',
+        version: str = '',
+        updated: str = '',
+        environment: str = 'development',
+        asset_mode: AssetMode = AssetMode.AUTO,
+    ):
+        self.project = project
+        self.version = version
+        self.updated = updated
+        self.environment = environment
+        self.asset_mode = asset_mode
+        self._records: Dict[str, AssetRecord] = {
+            record.key: record for record in (records or [])
+        }
+        self._images: Dict[Tuple[str, Breakpoints], ResponsiveImage] = {}
+        self._resolver: Optional[AssetResolver] = None
+
+    @classmethod
+    def load(
+        cls,
+        path: str = '.r2-manifest.yml',
+        resolver: Optional[AssetResolver] = None,
+        public_dir: str = 'public',
+        snapshot: bool = True,
+    ) -> 'AssetIndex':
+        """
+        Load and resolve a `.r2-manifest.yml` file
+
+        When a compiled snapshot (see compile_manifest_snapshot) sits next to
+        the manifest and matches its content, it is memory-mapped instead of
+        parsing YAML. Stale, missing or corrupt snapshots fall back to YAML.
+
+        Args:
+            path: Manifest file path
+            resolver: Resolver to resolve URLs with (default: singleton)
+            public_dir: Web root prefix stripped from manifest paths to form
+                        local URLs (e.g. 'public/media/logo.svg' -> '/media/logo.svg')
+            snapshot: Use a fresh compiled snapshot when available
+
+        Returns:
+            Resolved AssetIndex
+
+        Raises:
+            ImportError: If PyYAML is needed but not installed
+            ValueError: If the manifest is malformed or an asset has no valid URL
+        """
+        resolver = resolver or AssetResolver.get_instance()
+
+        if snapshot:
+            with open(path, 'rb') as f:
+                content = f.read()
+            try:
+                with AssetSnapshot(snapshot_path_for(path)) as snap:
+                    if snap.matches(content):
+                        return cls._from_rows(
+                            snap.rows(),
+                            resolver,
+                            public_dir,
+                            project=snap.project,
+                            version=snap.version,
+                            updated=snap.updated,
+                        )
+            except (OSError, ValueError):
+                pass
+
+        data = _load_manifest_yaml(path)
+        return cls.from_manifest(data, resolver, public_dir)
+
+    @classmethod
+    def from_manifest(
+        cls,
+        data: Dict[str, Any],
+        resolver: Optional[AssetResolver] = None,
+        public_dir: str = 'public',
+    ) -> 'AssetIndex':
+        """
+        Build an index from an already parsed manifest mapping
+
+        Args:
+            data: Parsed manifest (project, version, updated, assets)
+            resolver: Resolver to resolve URLs with (default: singleton)
+            public_dir: Web root prefix stripped from manifest paths
+
+        Returns:
+            Resolved AssetIndex
+
+        Raises:
+            ValueError: If the manifest is malformed or an asset has no valid URL
+        """
+        if not isinstance(data, dict):
+            raise ValueError("[AssetIndex] Manifest must be a mapping")
+
+        entries = data.get('assets') or []
+        if not isinstance(entries, list):
+            raise ValueError("[AssetIndex] Manifest 'assets' must be a list")
+
+        resolver = resolver or AssetResolver.get_instance()
+        rows = _manifest_rows(entries)
+        return cls._from_rows(
+            rows,
+            resolver,
+            public_dir,
+            project=str(data.get('project') or ''),
+            version=str(data.get('version') or ''),
+            updated=_format_updated(data.get('updated')),
+        )
+
+    @classmethod
+    def _from_rows(
+        cls,
+        rows: List[Tuple],
+        resolver: AssetResolver,
+        public_dir: str,
+        project: str = '',
+        version: str = '',
+        updated: str = '',
+    ) -> 'AssetIndex':
+        """Build an index from rows and keep it resolved for `resolver`'s config"""
+        records, digests = cls._resolve_rows(rows, resolver, public_dir)
+        if digests:
+            resolver.register_fingerprints(digests)
+
+        config = resolver._state.config
+        index = cls(
+            records,
+            project=project,
+            version=version,
+            updated=updated,
+            environment=config.environment,
+            asset_mode=config.asset_mode,
+        )
+        index._follow(resolver, public_dir)
+        return index
+
+    @staticmethod
+    def _resolve_rows(
+        rows: Iterable[Tuple],
+        resolver: AssetResolver,
+        public_dir: str,
+    ) -> Tuple[List[AssetRecord], Dict[str, str]]:
+        """
+        Resolve (path, cdn_url, env_mode, type, size, sha256, width, height, r2_key) rows
+
+        The CDN decision is computed once per env_mode rather than per asset,
+        and CDN URLs are routed to their pool host and fingerprinted here when
+        ASSET_CDN_HOSTS / ASSET_FINGERPRINT are set.
+
+        Returns:
+            (records, cdn_url -> sha256 for fingerprinting)
+        """
+        prefix = public_dir.strip('/') + '/' if public_dir else ''
+        state = resolver._state
+        config = state.config
+        hosts = state.hosts
+        style = config.fingerprint
+        decisions: Dict[str, bool] = {}
+        digests: Dict[str, str] = {}
+        records = []
+
+        for path, cdn_url, env_mode, asset_type, size, sha256, width, height, r2_key in rows:
+            env_mode = sys.intern(env_mode or 'cdn-production-local-dev')
+            use_cdn = decisions.get(env_mode)
+            if use_cdn is None:
+                use_cdn = decisions[env_mode] = resolver._should_use_cdn(env_mode, config)
+
+            local_path = path[len(prefix):] if prefix and path.startswith(prefix) else path
+            if not local_path.startswith('/'):
+                local_path = '/' + local_path
+
+            is_local_valid = resolver._validate_local_path(local_path)
+            is_cdn_valid = bool(cdn_url) and resolver._validate_cdn_url(cdn_url, config)
+
+            if use_cdn and is_cdn_valid:
+                url = cdn_url
+            elif is_local_valid:
+                url = local_path
+            elif is_cdn_valid:
+                url = cdn_url
+            else:
+                raise ValueError(
+                    f"[AssetIndex] Invalid asset paths for {path!r}: "
+                    f'local="{local_path}", cdn="{cdn_url}"'
+                )
+
+            if url == cdn_url and hosts is not None:
+                url = hosts.route(cdn_url)
+            if cdn_url and sha256:
+                digests[cdn_url] = sha256
+                if url != local_path and style != 'off':
+                    url = fingerprint_url(url, sha256, style)
+
+            records.append(AssetRecord(
+                path,
+                url,
+                local_path,
+                cdn_url or None,
+                env_mode,
+                sys.intern(asset_type) if asset_type else None,
+                size,
+                sha256,
+                width,
+                height,
+                r2_key,
+            ))
+
+        return records, digests
+
+    def _follow(self, resolver: AssetResolver, public_dir: str) -> None:
+        """Re-resolve every record whenever `resolver` switches config"""
+        self._resolver = resolver
+        self._public_dir = public_dir
+        self._resolved_state = resolver._state
+        self._unsubscribe = on_config_change(self._refresh)
+
+    def _refresh(self) -> None:
+        """Config-change listener: swap in records resolved for the new config"""
+        resolver = self._resolver
+        if resolver is None:
+            return
+        state = resolver._state
+        if state is self._resolved_state:
+            return
+
+        rows = [
+            (r.key, r.cdn_url, r.env_mode, r.type, r.size, r.sha256, r.width, r.height, r.r2_key)
+            for r in self._records.values()
+        ]
+        try:
+            records, _ = self._resolve_rows(rows, resolver, self._public_dir)
+        except ValueError as e:
+            _warn(f"[AssetIndex] Warning: keeping previous URLs after config change: {e}")
+            return
+
+        # Readers see the old or the new table, never a mix
+        self._records = {record.key: record for record in records}
+        self._images = {}
+        self._resolved_state = state
+        self.environment = state.config.environment
+        self.asset_mode = state.config.asset_mode
+
+    def __getitem__(self, key: str) -> str:
+        return self._records[key].url
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._records)
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Get the resolved URL for an asset
+
+        Args:
+            key: Logical asset key (manifest `path`)
+            default: Value returned for unknown keys
+
+        Returns:
+            Resolved URL, or default
+        """
+        record = self._records.get(key)
+        return record.url if record is not None else default
+
+    def record(self, key: str) -> AssetRecord:
+        """
+        Get the full manifest record for an asset
+
+        Raises:
+            KeyError: If the asset is not in the manifest
+        """
+        return self._records[key]
+
+    def records(self) -> Iterator[AssetRecord]:
+        """Iterate over all asset records"""
+        return iter(self._records.values())
+
+    def signed_url(self, key: str) -> str:
+        """
+        Presigned GET URL for a private asset, from its manifest `r2_key`
+
+        Args:
+            key: Logical asset key (manifest `path`)
+
+        Raises:
+            KeyError: If the asset is not in the manifest
+            ValueError: If the manifest entry has no r2_key
+            RuntimeError: If signed URLs are not enabled on the resolver
+
+        Examples:
+            >>> resolver.enable_signed_urls(ttl=3600)
+            >>> index.signed_url('private/invoices/2024-001.pdf')
+            'https://abc123.r2.cloudflarestorage.com/private-bucket/invoices/2024-001.pdf?X-Amz-Algorithm=...'
+        """
+        return (self._resolver or AssetResolver.get_instance()).get_signed_url(self._r2_key(key))
+
+    def signed_urls(self, keys: Iterable[str]) -> List[str]:
+        """
+        Presigned GET URLs for many private assets, in input order
+
+        Raises:
+            KeyError: If an asset is not in the manifest
+            ValueError: If a manifest entry has no r2_key
+            RuntimeError: If signed URLs are not enabled on the resolver
+        """
+        r2_keys = [self._r2_key(key) for key in keys]
+        return (self._resolver or AssetResolver.get_instance()).get_signed_urls(r2_keys)
+
+    def _r2_key(self, key: str) -> str:
+        r2_key = self._records[key].r2_key
+        if not r2_key:
+            raise ValueError(f"[AssetIndex] Asset has no r2_key to sign: {key!r}")
+        return r2_key
+
+    def responsive(self, key: str, breakpoints: Optional[Breakpoints] = None) -> ResponsiveImage:
+        """
+        Get srcset, sizes and width/height attributes from manifest dimensions
+
+        Computed once per asset and breakpoint set, then served from the
+        index (which is itself resolved for one environment).
 
-    results = []
-    for config in configs:
-        local_path = config.get('local_path', '')
-        cdn_url = config.get('cdn_url', '')
-        env_mode = config.get('env_mode', 'cdn-production-local-dev')
+        Args:
+            key: Logical asset key (manifest `path`)
+            breakpoints: Candidate widths (default: DEFAULT_BREAKPOINTS)
+
+        Returns:
+            ResponsiveImage
+
+        Raises:
+            KeyError: If the asset is not in the manifest
+            ValueError: If the asset has no `dimensions` in the manifest
+
+        Examples:
+            >>> assets = AssetIndex.load('.r2-manifest.yml')
+            >>> hero = assets.responsive('public/media/hero.jpg')
+            >>> f'<img {hero.html(sizes="(min-width: 960px) 50vw, 100vw")} alt="Hero">'
+        """
+        breakpoints = breakpoints or DEFAULT_BREAKPOINTS
+        image = self._images.get((key, breakpoints))
+        if image is not None:
+            return image
+
+        record = self._records[key]
+        if record.width is None or record.height is None:
+            raise ValueError(f"[AssetIndex] No dimensions in manifest for {key!r}")
+
+        image = ResponsiveImage.build(
+            record.url,
+            record.width,
+            record.height,
+            record.url != record.local_path,
+            breakpoints,
+        )
+        self._images[(key, breakpoints)] = image
+        return image
+
+    def precompute_responsive(self, breakpoints: Optional[Breakpoints] = None) -> int:
+        """
+        Build responsive attributes for every asset with dimensions, e.g. at startup
+
+        Args:
+            breakpoints: Candidate widths (default: DEFAULT_BREAKPOINTS)
+
+        Returns:
+            Number of images precomputed
+        """
+        count = 0
+        for record in self._records.values():
+            if record.width is not None and record.height is not None and record.width > 0 and record.height > 0:
+                self.responsive(record.key, breakpoints)
+                count += 1
+        return count
+
+
+def _manifest_rows(entries: List[Any]) -> List[Tuple]:
+    """
+    Normalize manifest asset entries into flat rows
+
+    Returns:
+        (path, cdn_url, env_mode, type, size, sha256, width, height, r2_key) tuples,
+        with absent optional fields as None
+    """
+    rows = []
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get('path'):
+            continue
+
+        width = height = None
+        dimensions = entry.get('dimensions')
+        if isinstance(dimensions, dict):
+            width = dimensions.get('width')
+            height = dimensions.get('height')
+
+        sha256 = entry.get('sha256')
+        r2_key = entry.get('r2_key')
+        rows.append((
+            str(entry['path']),
+            entry.get('cdn_url') or None,
+            entry.get('env_mode') or None,
+            entry.get('type') or None,
+            int(entry.get('size') or 0),
+            str(sha256) if sha256 else None,
+            int(width) if width is not None else None,
+            int(height) if height is not None else None,
+            str(r2_key) if r2_key else None,
+        ))
+    return rows
+
+
+def _load_manifest_yaml(path: str) -> Dict[str, Any]:
+    """
+    Parse a manifest file with PyYAML, preferring the libyaml C loader
+
+    Raises:
+        ImportError: If PyYAML is not installed
+    """
+    try:
+        import yaml
+    except ImportError as exc:
+        raise ImportError(
+            "[AssetIndex] PyYAML is required to load manifests: pip install pyyaml"
+        ) from exc
+
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(path, 'rb') as f:
+        return yaml.load(f, Loader=loader)
+
+
+def _format_updated(value: Any) -> str:
+    """Normalize the manifest `updated` field (YAML may parse it as datetime)"""
+    if value is None:
+        return ''
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return str(value)
+
+
+# Variables an override file may set
+OVERRIDE_KEYS = (
+    'ENVIRONMENT',
+    'PYTHON_ENV',
+    'ASSET_MODE',
+    'ASSET_CACHE_SIZE',
+    'ASSET_FINGERPRINT',
+    'ASSET_CDN_HOSTS',
+    'ASSET_CDN_DOWN',
+)
+
+
+def read_override_file(path: str) -> Dict[str, str]:
+    """
+    Read OVERRIDE_KEYS (ENVIRONMENT, ASSET_MODE, ASSET_CDN_DOWN, ...) from a .env-style file
+
+    Lines are KEY=VALUE (optionally prefixed with `export`); blank lines,
+    comments and unknown keys are ignored. A missing file means no overrides.
+
+    Examples:
+        $ cat /etc/myapp/asset-mode.env
+        # Serve everything locally during the CDN incident
+        ASSET_MODE=local
+        # Or drain one CDN host of the pool
+        ASSET_CDN_DOWN=cdn-b.example.com
+    """
+    overrides: Dict[str, str] = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return overrides
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('export '):
+            line = line[len('export '):]
+
+        key, sep, value = line.partition('=')
+        key = key.strip()
+        if sep and key in OVERRIDE_KEYS:
+            overrides[key] = value.strip().strip('\'"')
+    return overrides
+
+
+class ConfigWatcher:
+    """
+    Opt-in hot reload of the resolver config without restarting workers
+
+    Watches an override file (polled by a daemon thread) and/or a signal.
+    On change, the process environment overlaid with the file's values is
+    re-detected and, if different, swapped into the resolver atomically
+    together with an empty resolution cache. The read path takes no lock.
+
+    The signal handler only wakes the watcher thread: reloading takes locks
+    the interrupted thread may be holding, so it never runs in the handler.
+
+    Examples:
+        >>> watcher = ConfigWatcher('/etc/myapp/asset-mode.env', signum=signal.SIGHUP).start()
+        >>> # echo ASSET_MODE=local > /etc/myapp/asset-mode.env   (or: kill -HUP <pid>)
+        >>> watcher.stats()
+        SwitchStats(reloads=1, last_latency=0.41, max_latency=0.41)
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        interval: float = 1.0,
+        signum: Optional[int] = None,
+        resolver: Optional[AssetResolver] = None,
+        on_reload: Optional[Callable[[ResolverConfig], None]] = None,
+    ):
+        """
+        Args:
+            path: Override file (default: ASSET_OVERRIDE_FILE environment variable)
+            interval: Seconds between file polls
+            signum: Signal that forces a reload, e.g. signal.SIGHUP (main thread only)
+            resolver: Resolver to update (default: the current singleton at reload time)
+            on_reload: Callable receiving the new ResolverConfig after a switch,
+                       e.g. to clear page caches (AssetIndex refreshes itself)
+        """
+        self.path = path or os.getenv('ASSET_OVERRIDE_FILE')
+        self.interval = interval
+        self.signum = signum
+        self.on_reload = on_reload
+        self._resolver = resolver
+        self._fingerprint = self._stat()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._signalled_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._previous_handler: Any = None
+        self._reloads = 0
+        self._last_latency: Optional[float] = None
+        self._max_latency: Optional[float] = None
+
+    def start(self) -> 'ConfigWatcher':
+        """Apply the current overrides, then start polling and/or listening for the signal"""
+        self.reload()
+
+        if self.signum is not None:
+            import signal
+
+            self._previous_handler = signal.signal(self.signum, self._on_signal)
+
+        if (self.path or self.signum is not None) and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='asset-config-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop polling and restore the previous signal handler"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self.signum is not None and self._previous_handler is not None:
+            import signal
+
+            signal.signal(self.signum, self._previous_handler)
+            self._previous_handler = None
+
+    def check(self) -> bool:
+        """
+        Poll the override file once
+
+        Returns:
+            True if the file changed and the resolver config was switched
+        """
+        fingerprint = self._stat()
+        if fingerprint == self._fingerprint:
+            return False
+
+        self._fingerprint = fingerprint
+        changed_at = fingerprint[0] / 1e9 if fingerprint else time.time()
+        return self.reload(changed_at)
+
+    def reload(self, changed_at: Optional[float] = None) -> bool:
+        """
+        Re-detect the config from os.environ plus the override file and apply it
+
+        Args:
+            changed_at: Wall-clock time of the change, for latency measurement
+
+        Returns:
+            True if the config changed and was swapped in
+        """
+        environ = dict(os.environ)
+        if self.path:
+            environ.update(read_override_file(self.path))
+
+        resolver = self._resolver or AssetResolver.get_instance()
+        if not resolver.reload_config(environ):
+            return False
+
+        if changed_at is not None:
+            latency = max(time.time() - changed_at, 0.0)
+            self._last_latency = latency
+            self._max_latency = latency if self._max_latency is None else max(self._max_latency, latency)
+        self._reloads += 1
+
+        if self.on_reload is not None:
+            self.on_reload(resolver.config)
+        return True
+
+    def stats(self) -> SwitchStats:
+        """Get reload count and switchover latencies"""
+        return SwitchStats(self._reloads, self._last_latency, self._max_latency)
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        if not self.path:
+            return None
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _run(self) -> None:
+        # Without a file there is nothing to poll: sleep until signalled
+        interval = self.interval if self.path else None
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            signalled_at, self._signalled_at = self._signalled_at, None
+            try:
+                if signalled_at is not None:
+                    self._fingerprint = self._stat()
+                    self.reload(signalled_at)
+                else:
+                    self.check()
+            except (OSError, ValueError) as exc:
+                _warn(f"[ConfigWatcher] Warning: reload failed: {exc}")
+
+    def _on_signal(self, signum: int, frame: Any) -> None:
+        # Runs between bytecodes of whatever the main thread is doing: take no locks
+        self._signalled_at = time.time()
+        self._wake.set()
+
+
+# ============================================================================
+# Compiled manifest snapshots
+# ============================================================================
+#
+# Layout (little-endian, version 2):
+#   header   SNAPSHOT_HEADER
+#   records  count x SNAPSHOT_RECORD, sorted by UTF-8 key bytes
+#   strings  deduplicated UTF-8 string table
+#
+# Strings are referenced as (offset, length) into the string table; an
+# absent optional string has offset NO_STRING. Absent dimensions are NO_DIMENSION.
+
+SNAPSHOT_MAGIC = b'R2AS'
+SNAPSHOT_VERSION = 2
+
+# magic, version, manifest sha256, record count, records offset,
+# strings offset, then (offset, length) refs for project, version, updated
+SNAPSHOT_HEADER = struct.Struct('<4sH2x32sIII6I')
+
+# key, cdn_url, env_mode, type, sha256, r2_key refs; size; width; height
+SNAPSHOT_RECORD = struct.Struct('<12IQII')
+
+NO_STRING = 0xFFFFFFFF
+NO_DIMENSION = 0xFFFFFFFF
+
+_UPDATED_RE = re.compile(rb'^updated:[ \t]*["\']?([^"\'\r\n#]*?)["\']?[ \t]*(?:#.*)?$', re.MULTILINE)
+
+
+def snapshot_path_for(manifest_path: str) -> str:
+    """
+    Get the default snapshot path for a manifest
+
+    Examples:
+        >>> snapshot_path_for('.r2-manifest.yml')
+        '.r2-manifest.snapshot'
+    """
+    return os.path.splitext(manifest_path)[0] + '.snapshot'
+
+
+def _manifest_updated(content: bytes) -> str:
+    """Extract the top-level `updated` value from raw manifest bytes without parsing YAML"""
+    match = _UPDATED_RE.search(content)
+    return match.group(1).decode('utf-8') if match else ''
+
+
+def compile_manifest_snapshot(
+    manifest_path: str = '.r2-manifest.yml',
+    snapshot_path: Optional[str] = None,
+) -> str:
+    """
+    Compile a manifest into a binary snapshot for fast worker start-up
+
+    The snapshot is keyed on the manifest's SHA256 and `updated` timestamp,
+    so AssetIndex.load() ignores it as soon as the manifest changes. The file
+    is written atomically, so running workers never see a partial snapshot.
+
+    Args:
+        manifest_path: Manifest file path
+        snapshot_path: Output path (default: manifest path with .snapshot extension)
+
+    Returns:
+        Path of the written snapshot
+
+    Raises:
+        ImportError: If PyYAML is not installed
+        ValueError: If the manifest is malformed
+
+    Examples:
+        >>> compile_manifest_snapshot('.r2-manifest.yml')
+        '.r2-manifest.snapshot'
+    """
+    snapshot_path = snapshot_path or snapshot_path_for(manifest_path)
+
+    with open(manifest_path, 'rb') as f:
+        content = f.read()
+
+    data = _load_manifest_yaml(manifest_path)
+    if not isinstance(data, dict) or not isinstance(data.get('assets') or [], list):
+        raise ValueError(f"[AssetSnapshot] Malformed manifest: {manifest_path}")
+
+    rows = _manifest_rows(data.get('assets') or [])
+    rows.sort(key=lambda row: row[0].encode('utf-8'))
+
+    strings = bytearray()
+    refs: Dict[str, Tuple[int, int]] = {}
+
+    def ref(value: Optional[str]) -> Tuple[int, int]:
+        if value is None:
+            return NO_STRING, 0
+        found = refs.get(value)
+        if found is None:
+            encoded = str(value).encode('utf-8')
+            found = refs[value] = (len(strings), len(encoded))
+            strings.extend(encoded)
+        return found
+
+    records = bytearray()
+    for path, cdn_url, env_mode, asset_type, size, sha256, width, height, r2_key in rows:
+        records += SNAPSHOT_RECORD.pack(
+            *ref(path),
+            *ref(cdn_url),
+            *ref(env_mode),
+            *ref(asset_type),
+            *ref(sha256),
+            *ref(r2_key),
+            size,
+            NO_DIMENSION if width is None else width,
+            NO_DIMENSION if height is None else height,
+        )
+
+    import hashlib
+
+    records_offset = SNAPSHOT_HEADER.size
+    strings_offset = records_offset + len(records)
+    header = SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        hashlib.sha256(content).digest(),
+        len(rows),
+        records_offset,
+        strings_offset,
+        *ref(str(data.get('project') or '')),
+        *ref(str(data.get('version') or '')),
+        *ref(_manifest_updated(content)),
+    )
+
+    tmp_path = f"{snapshot_path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(records)
+        f.write(strings)
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_path
+
+
+class AssetSnapshot:
+    """
+    Read-only, memory-mapped view of a compiled manifest snapshot
+
+    Examples:
+        >>> with AssetSnapshot('.r2-manifest.snapshot') as snap:
+        ...     if snap.matches(open('.r2-manifest.yml', 'rb').read()):
+        ...         rows = snap.rows()
+    """
+
+    def __init__(self, path: str):
+        """
+        Open and validate a snapshot
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is not a supported snapshot
+        """
+        import mmap
+
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < SNAPSHOT_HEADER.size:
+                raise ValueError(f"[AssetSnapshot] Truncated snapshot: {path}")
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic, version, self.digest, self.count,
+            self._records_offset, self._strings_offset, *meta,
+        ) = SNAPSHOT_HEADER.unpack_from(self._buffer)
+
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"[AssetSnapshot] Unsupported snapshot format: {path}")
+        if self._records_offset + self.count * SNAPSHOT_RECORD.size != self._strings_offset \
+                or self._strings_offset > size:
+            self.close()
+            raise ValueError(f"[AssetSnapshot] Corrupt snapshot: {path}")
+
+        self.project = self._string(meta[0], meta[1])
+        self.version = self._string(meta[2], meta[3])
+        self.updated = self._string(meta[4], meta[5])
+
+    def __enter__(self) -> 'AssetSnapshot':
+        return self
 
-        url = resolver.get_asset_url(local_path, cdn_url, env_mode)
-        results.append(url)
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
-    return results
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        """Release the memory map"""
+        self._buffer.close()
+
+    def matches(self, manifest_content: bytes) -> bool:
+        """
+        Check that the snapshot was compiled from this exact manifest
+
+        Args:
+            manifest_content: Raw manifest bytes
+
+        Returns:
+            True if both the content hash and `updated` timestamp match
+        """
+        import hashlib
+
+        return (
+            hashlib.sha256(manifest_content).digest() == self.digest
+            and _manifest_updated(manifest_content) == self.updated
+        )
+
+    def _string(self, offset: int, length: int) -> Optional[str]:
+        if offset == NO_STRING:
+            return None
+        start = self._strings_offset + offset
+        return self._buffer[start:start + length].decode('utf-8')
+
+    def rows(self) -> List[Tuple]:
+        """
+        Decode all records
+
+        Returns:
+            (path, cdn_url, env_mode, type, size, sha256, width, height, r2_key) rows
+            in key order, the same shape AssetIndex builds from YAML
+        """
+        decoded: Dict[int, Optional[str]] = {}
+        string = self._string
+
+        def text(offset: int, length: int) -> Optional[str]:
+            value = decoded.get(offset, decoded)
+            if value is decoded:
+                value = decoded[offset] = string(offset, length)
+            return value
+
+        end = self._strings_offset
+        view = memoryview(self._buffer)[self._records_offset:end]
+        try:
+            return [
+                (
+                    text(k_off, k_len),
+                    text(c_off, c_len),
+                    text(e_off, e_len),
+                    text(t_off, t_len),
+                    size,
+                    text(h_off, h_len),
+                    None if width == NO_DIMENSION else width,
+                    None if height == NO_DIMENSION else height,
+                    text(r_off, r_len),
+                )
+                for (
+                    k_off, k_len, c_off, c_len, e_off, e_len,
+                    t_off, t_len, h_off, h_len, r_off, r_len, size, width, height,
+                ) in SNAPSHOT_RECORD.iter_unpack(view)
+            ]
+        finally:
+            view.release()
 
 
 # Convenience exports
 __all__ = [
     'AssetMode',
     'EnvMode',
+    'Fingerprint',
+    'OnError',
     'AssetResolver',
+    'ResolverConfig',
+    'AssetIndex',
+    'AssetRecord',
+    'AssetSnapshot',
+    'Breakpoints',
+    'DEFAULT_BREAKPOINTS',
+    'CacheInfo',
+    'ConfigWatcher',
+    'SwitchStats',
+    'WarningRateLimiter',
+    'ResolutionCache',
+    'ResponsiveImage',
     'get_asset_url',
+    'get_responsive_image',
+    'aget_asset_url',
     'batch_resolve_assets',
+    'abatch_resolve_assets',
+    'resolve_asset_columns',
+    'resolve_asset_rows',
+    'stream_resolve_assets',
+    'compile_manifest_snapshot',
+    'cdn_origin',
+    'fingerprint_url',
+    'on_config_change',
+    'read_override_file',
+    'snapshot_path_for',
 ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point for build steps
+
+    Examples:
+        $ python -m lib.assets compile-snapshot .r2-manifest.yml
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m lib.assets', description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compile_parser = commands.add_parser('compile-snapshot', help='Compile a manifest into a binary snapshot')
+    compile_parser.add_argument('manifest', nargs='?', default='.r2-manifest.yml')
+    compile_parser.add_argument('-o', '--output', help='Snapshot path (default: <manifest>.snapshot)')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'compile-snapshot':
+        path = compile_manifest_snapshot(args.manifest, args.output)
+        print(f"[AssetSnapshot] Wrote {path}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Benchmarks for the Python Asset Helper
+
+Standalone timeit-based benchmarks; no extra dependencies required.
+
+Run from the project root (the directory containing lib/):
+    python -m lib.benchmarks.bench_assets
+    python -m lib.benchmarks.bench_assets --size 1000000
+"""
+
+import argparse
+import os
+import threading
+import time
+import timeit
+from typing import Callable, Dict, List
+
+from lib.assets import (
+    AssetResolver,
+    ResolverConfig,
+    batch_resolve_assets,
+    resolve_asset_columns,
+    resolve_asset_rows,
+)
+
+ENV_MODES = ('cdn-production-local-dev', 'cdn-always', 'local-always')
+
+
+def make_configs(size: int, distinct: int = 5000) -> List[Dict[str, str]]:
+    """Build asset configs with a realistic amount of repetition"""
+    return [
+        {
+            'local_path': f'/media/img{i % distinct}.png',
+            'cdn_url': f'https://cdn.example.com/img{i % distinct}.png',
+            'env_mode': ENV_MODES[i % 3],
+        }
+        for i in range(size)
+    ]
+
+
+def legacy_batch_resolve(configs: List[Dict[str, str]]) -> List[str]:
+    """The original per-item loop, kept as the comparison baseline"""
+    resolver = AssetResolver.get_instance()
+    results = []
+    for config in configs:
+        local_path = config.get('local_path', '')
+        cdn_url = config.get('cdn_url', '')
+        env_mode = config.get('env_mode', 'cdn-production-local-dev')
+        results.append(resolver._resolve(local_path, cdn_url, env_mode))
+    return results
+
+
+def best_of(func: Callable[[], object], repeat: int = 3) -> float:
+    """Best wall time in seconds over several runs"""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def bench_batch(size: int) -> Dict[str, float]:
+    """Compare the legacy loop with the dict, row and columnar batch APIs"""
+    configs = make_configs(size)
+    rows = [(c['local_path'], c['cdn_url'], c['env_mode']) for c in configs]
+    local_paths = [r[0] for r in rows]
+    cdn_urls = [r[1] for r in rows]
+    env_modes = [r[2] for r in rows]
+
+    return {
+        'legacy loop': best_of(lambda: legacy_batch_resolve(configs)),
+        'batch_resolve_assets': best_of(lambda: batch_resolve_assets(configs)),
+        'resolve_asset_rows': best_of(lambda: resolve_asset_rows(rows)),
+        'resolve_asset_columns': best_of(lambda: resolve_asset_columns(local_paths, cdn_urls, env_modes)),
+    }
+
+
+def bench_singleton(threads: int, calls: int = 100_000) -> Dict[str, float]:
+    """
+    Stress singleton access: a cold start under contention, then steady state
+
+    Every thread waits on a barrier so the first get_instance() calls race.
+    Raises AssertionError if more than one instance is ever observed. The
+    threaded figure is wall time divided by thread count, i.e. the cost of
+    `calls` calls when the work is shared across threads.
+    """
+    AssetResolver.reset_instance()
+    barrier = threading.Barrier(threads + 1)
+    seen = set()
+
+    def worker() -> None:
+        barrier.wait()
+        seen.add(id(AssetResolver.get_instance()))
+        get_instance = AssetResolver.get_instance
+        for _ in range(calls):
+            get_instance()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    threaded = (time.perf_counter() - start) / threads
+
+    assert len(seen) == 1, f"{len(seen)} AssetResolver instances were built"
+
+    attribute = best_of(lambda: [AssetResolver._instance for _ in range(calls)])
+    get_instance = best_of(lambda: [AssetResolver.get_instance() for _ in range(calls)])
+    return {
+        'attribute read': attribute,
+        'get_instance()': get_instance,
+        f'get_instance() x{threads} threads': threaded,
+    }
+
+
+def bench_fingerprint(size: int, distinct: int = 2000) -> Dict[str, float]:
+    """
+    Compare plain and fingerprinted CDN URLs on the hot paths
+
+    Fingerprints are precomputed when digests are registered (as AssetIndex.load
+    does), so cached get_asset_url() calls and batches should cost the same.
+    """
+    configs = make_configs(size, distinct)
+    rows = [(c['local_path'], c['cdn_url'], 'cdn-always') for c in configs]
+    digests = {f'https://cdn.example.com/img{i}.png': f'{i:064x}' for i in range(distinct)}
+
+    resolver = AssetResolver.get_instance()
+    resolver.register_fingerprints(digests)
+    config = resolver.config
+    results = {}
+
+    for style in ('off', 'query'):
+        resolver.apply_config(ResolverConfig(config.environment, config.asset_mode, config.cache_size, style))
+        get = resolver.get_asset_url
+        get(*rows[0])
+        results[f'get_asset_url {style}'] = best_of(lambda: [get(*rows[0]) for _ in range(size)])
+        results[f'resolve_asset_rows {style}'] = best_of(lambda: resolve_asset_rows(rows))
+
+    resolver.apply_config(config)
+    return results
+
+
+def report(title: str, results: Dict[str, float], size: int) -> None:
+    """Print timings relative to the first entry"""
+    baseline = next(iter(results.values()))
+    print(f"\n{title} ({size:,} items)")
+    for name, seconds in results.items():
+        print(f"  {name:<24} {seconds * 1000:10.1f} ms  {size / seconds:14,.0f} items/s  x{baseline / seconds:.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Asset helper benchmarks')
+    parser.add_argument('--size', type=int, default=100_000, help='Number of assets per batch')
+    parser.add_argument('--threads', type=int, default=64, help='Threads for the singleton stress test')
+    args = parser.parse_args()
+
+    os.environ.setdefault('ENVIRONMENT', 'production')
+    AssetResolver.reset_instance()
+
+    report('Batch resolution', bench_batch(args.size), args.size)
+    report('Singleton access', bench_singleton(args.threads), 100_000)
+    report('Fingerprinted URLs', bench_fingerprint(args.size), args.size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark for the Fast Manifest Generator
+
+Compares the per-file subprocess pipeline of the shell generators
+(`file --mime-type`, `shasum -a 256` and, when ImageMagick is installed,
+`identify -format %wx%h` for images) with lib.asset_manifest, cold and
+incremental, on a synthetic media library.
+
+Run from the project root (the directory containing lib/):
+    python -m lib.benchmarks.bench_manifest
+    python -m lib.benchmarks.bench_manifest --files 2000 --kb 200
+"""
+
+import argparse
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict
+
+from lib.asset_manifest import build_manifest
+from lib.benchmarks.bench_assets import report
+
+
+def make_library(root: str, files: int, kb: int) -> None:
+    """Write PNG/JPEG/GIF headers followed by `kb` KiB of random payload"""
+    payload = os.urandom(kb * 1024)
+    headers = (
+        ('png', b'\x89PNG\r\n\x1a\n' + struct.pack('>I4sII', 13, b'IHDR', 1920, 1080) + b'\x08\x06\x00\x00\x00'),
+        ('jpg', b'\xff\xd8\xff\xc0' + struct.pack('>HBHHB', 11, 8, 1080, 1920, 1) + b'\x01\x11\x00'),
+        ('gif', b'GIF89a' + struct.pack('<HH', 1920, 1080)),
+    )
+    for index in range(files):
+        extension, header = headers[index % len(headers)]
+        directory = os.path.join(root, 'public', 'media', f'set{index // 100}')
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'image{index}.{extension}'), 'wb') as f:
+            f.write(header + payload[index % 1024:])
+
+
+def shell_pipeline(root: str) -> None:
+    """What generate-*-manifest.sh spawns for every file"""
+    identify = shutil.which('identify')
+    for directory, _dirs, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            mime = subprocess.run(['file', '--brief', '--mime-type', path], capture_output=True, text=True).stdout
+            subprocess.run(['shasum', '-a', '256', path], capture_output=True)
+            if identify and mime.startswith('image/'):
+                subprocess.run([identify, '-format', '%wx%h', path], capture_output=True)
+
+
+def timed(func: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def bench_generate(files: int, kb: int) -> Dict[str, float]:
+    """Shell-style pipeline vs cold and incremental Python generation"""
+    root = tempfile.mkdtemp(prefix='bench-manifest-')
+    try:
+        make_library(root, files, kb)
+        results = {}
+        if shutil.which('file') and shutil.which('shasum'):
+            label = 'per-file subprocesses' + ('' if shutil.which('identify') else ' (no identify)')
+            results[label] = timed(lambda: shell_pipeline(root))
+
+        results['asset_manifest cold'] = timed(lambda: build_manifest(root, 'bench', library=None, previous=False, cache=False))
+        manifest, _ = build_manifest(root, 'bench', library=None, previous=False)
+        results['asset_manifest incremental'] = timed(lambda: build_manifest(root, 'bench', library=None, previous=manifest))
+        return results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Manifest generator benchmark')
+    parser.add_argument('--files', type=int, default=500, help='Number of images')
+    parser.add_argument('--kb', type=int, default=100, help='Payload size per image in KiB')
+    args = parser.parse_args()
+
+    report('Manifest generation', bench_generate(args.files, args.kb), args.files)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""
+Benchmark Suite with Saved Baselines for the Python Asset Helper
+
+Times the paths a page render depends on and compares them with a baseline
+saved on the same machine, failing when any case slows down by more than a
+threshold:
+- get_asset_url() in every env_mode, cached and uncached
+- batch_resolve_assets() at 1k and 100k items (1M with --full)
+- AssetResolver.get_instance() alone and under thread contention
+- AssetIndex loading at realistic manifest sizes, from YAML and snapshot
+- Presigned URLs for private objects: signing, cache hits and batches
+- `import lib.assets` in a fresh interpreter
+
+Every result is seconds per item, so cases of different sizes compare
+directly. Standalone and timeit-based; no extra dependencies (PyYAML for
+the manifest cases, which are skipped without it).
+
+Run from the project root (the directory containing lib/):
+    python -m lib.benchmarks.bench_suite --save          # record this machine's baseline
+    python -m lib.benchmarks.bench_suite                 # compare; exit 1 on regression
+    python -m lib.benchmarks.bench_suite --only batch --threshold 0.1
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from collections import namedtuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from lib.assets import AssetIndex, AssetResolver, batch_resolve_assets, compile_manifest_snapshot
+from lib.benchmarks.bench_assets import ENV_MODES, make_configs
+
+DEFAULT_BASELINE = os.path.join('.benchmarks', 'assets.json')
+DEFAULT_THRESHOLD = 0.25
+BASELINE_VERSION = 1
+
+# A case: name, items per run, and a setup function returning the
+# zero-argument function to time (so filtered-out cases build nothing)
+Case = namedtuple('Case', ['name', 'items', 'setup'])
+
+# A slowdown beyond the threshold: seconds per item then and now
+Regression = namedtuple('Regression', ['name', 'baseline', 'current', 'ratio'])
+
+
+def best_per_item(func: Callable[[], object], items: int, repeat: int = 5) -> float:
+    """Best of `repeat` runs, in seconds per item"""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) / items
+
+
+def resolution_cases(calls: int = 100_000) -> Iterator[Case]:
+    """get_asset_url() per env_mode: cached hot path and uncached resolution"""
+    resolver = AssetResolver.get_instance()
+    local_path, cdn_url = '/media/logo.png', 'https://cdn.example.com/logo.png'
+    for env_mode in ENV_MODES:
+        def cached(env_mode: str = env_mode) -> Callable[[], object]:
+            get = resolver.get_asset_url
+            get(local_path, cdn_url, env_mode)
+            return lambda: [get(local_path, cdn_url, env_mode) for _ in range(calls)]
+
+        def uncached(env_mode: str = env_mode) -> Callable[[], object]:
+            resolve = resolver._resolve
+            return lambda: [resolve(local_path, cdn_url, env_mode) for _ in range(calls // 10)]
+
+        yield Case(f'get_asset_url[{env_mode}]', calls, cached)
+        yield Case(f'get_asset_url[{env_mode}] uncached', calls // 10, uncached)
+
+
+def batch_cases(sizes: Tuple[int, ...]) -> Iterator[Case]:
+    """batch_resolve_assets() on dict configs with realistic repetition"""
+    for size in sizes:
+        def setup(size: int = size) -> Callable[[], object]:
+            configs = make_configs(size)
+            return lambda: batch_resolve_assets(configs)
+
+        yield Case(f'batch_resolve_assets[{size}]', size, setup)
+
+
+def singleton_cases(threads: int = 8, calls: int = 50_000) -> Iterator[Case]:
+    """get_instance() from one thread, and from `threads` threads at once"""
+    get_instance = AssetResolver.get_instance
+    yield Case('get_instance', calls, lambda: lambda: [get_instance() for _ in range(calls)])
+
+    def contended() -> None:
+        barrier = threading.Barrier(threads)
+
+        def worker() -> None:
+            barrier.wait()
+            for _ in range(calls):
+                get_instance()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    yield Case(f'get_instance x{threads} threads', threads * calls, lambda: contended)
+
+
+def write_manifest_file(path: str, assets: int) -> None:
+    """Write a manifest shaped like the generators' output"""
+    from lib.asset_manifest import render_manifest
+
+    entries = [
+        {
+            'path': f'public/media/set{i // 100}/image{i}.jpg',
+            'r2_key': f'projects/bench/public/media/set{i // 100}/image{i}.jpg',
+            'size': 100_000 + i,
+            'sha256': f'{i:064x}',
+            'type': 'media',
+            'sync': 'download',
+            'cdn_url': f'https://cdn.example.com/media/set{i // 100}/image{i}.jpg',
+            'dimensions': {'width': 1920, 'height': 1080},
+        }
+        for i in range(assets)
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(render_manifest({'project': 'bench', 'updated': '2025-01-01T00:00:00Z', 'assets': entries}))
+
+
+def manifest_cases(directory: str, sizes: Tuple[int, ...]) -> Iterator[Case]:
+    """AssetIndex.load() from YAML and from a compiled snapshot"""
+    try:
+        import yaml  # noqa: F401
+    except ImportError:
+        return
+
+    for size in sizes:
+        path = os.path.join(directory, f'manifest-{size}.yml')
+
+        def setup(size: int = size, path: str = path, snapshot: bool = False) -> Callable[[], object]:
+            if not os.path.exists(path):
+                write_manifest_file(path, size)
+                compile_manifest_snapshot(path)
+            return lambda: AssetIndex.load(path, snapshot=snapshot)
+
+        yield Case(f'AssetIndex.load[{size}] yaml', size, setup)
+        yield Case(f'AssetIndex.load[{size}] snapshot', size, lambda setup=setup: setup(snapshot=True))
+
+
+def signing_cases(keys: int = 1_000, calls: int = 100_000) -> Iterator[Case]:
+    """UrlSigner: one signature per key, cache hits, and sign_many() batches"""
+    from lib.asset_presign import UrlSigner
+    from lib.asset_sync import R2Credentials
+
+    credentials = R2Credentials('https://bench.r2.cloudflarestorage.com', 'bench-key', 'bench-secret')
+    names = [f'private/exports/set{i // 100}/report{i}.pdf' for i in range(keys)]
+
+    def uncached() -> Callable[[], object]:
+        signer = UrlSigner(credentials)
+        sign = signer.sign
+
+        def run() -> None:
+            signer.clear()
+            for name in names:
+                sign(name)
+
+        return run
+
+    def cached() -> Callable[[], object]:
+        sign = UrlSigner(credentials).sign
+        sign(names[0])
+        return lambda: [sign(names[0]) for _ in range(calls)]
+
+    def batch() -> Callable[[], object]:
+        signer = UrlSigner(credentials)
+
+        def run() -> None:
+            signer.clear()
+            signer.sign_many(names)
+
+        return run
+
+    yield Case('UrlSigner.sign uncached', keys, uncached)
+    yield Case('UrlSigner.sign', calls, cached)
+    yield Case(f'UrlSigner.sign_many[{keys}]', keys, batch)
+
+
+def import_time(repeat: int = 5) -> float:
+    """Seconds to `import lib.assets` in a fresh interpreter, net of start-up"""
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    def run(code: str) -> float:
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], cwd=project_root, check=True)
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    return max(run('import lib.assets') - run('pass'), 0.0)
+
+
+def run_suite(full: bool = False, only: Optional[str] = None, repeat: int = 5) -> Dict[str, float]:
+    """
+    Run every case (or those whose name contains `only`)
+
+    Returns:
+        Seconds per item by case name
+    """
+    os.environ.setdefault('ENVIRONMENT', 'production')
+    AssetResolver.reset_instance()
+    directory = tempfile.mkdtemp(prefix='bench-suite-')
+    results: Dict[str, float] = {}
+    try:
+        groups = (
+            lambda: resolution_cases(),
+            lambda: batch_cases((1_000, 100_000, 1_000_000) if full else (1_000, 100_000)),
+            lambda: singleton_cases(),
+            lambda: manifest_cases(directory, (1_000, 10_000)),
+            lambda: signing_cases(),
+        )
+        for group in groups:
+            for case in group():
+                if only and only not in case.name:
+                    continue
+                # Fewer repeats for the largest batches: they are long and steady
+                runs = repeat if case.items < 1_000_000 else 2
+                results[case.name] = best_per_item(case.setup(), case.items, runs)
+                AssetResolver.get_instance().clear_cache()
+
+        if not only or only in 'import lib.assets':
+            results['import lib.assets'] = import_time(repeat)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        AssetResolver.reset_instance()
+    return results
+
+
+def machine() -> Dict[str, object]:
+    """What a baseline is only valid for"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def save_baseline(results: Dict[str, float], path: str = DEFAULT_BASELINE) -> None:
+    """Write results as the baseline (atomically), merging with existing cases"""
+    try:
+        baseline = load_baseline(path)
+    except (OSError, ValueError):
+        baseline = None
+    merged = dict(baseline['results']) if baseline and baseline['machine'] == machine() else {}
+    merged.update(results)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': BASELINE_VERSION,
+            'saved': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'machine': machine(),
+            'results': merged,
+        }, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def load_baseline(path: str = DEFAULT_BASELINE) -> Dict[str, object]:
+    """
+    Read a saved baseline
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If it is not a baseline written by this suite
+    """
+    with open(path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if not isinstance(baseline, dict) or baseline.get('version') != BASELINE_VERSION:
+        raise ValueError(f"[BenchSuite] Not a version {BASELINE_VERSION} baseline: {path}")
+    return baseline
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float = DEFAULT_THRESHOLD) -> List[Regression]:
+    """
+    Cases more than `threshold` (0.25 = 25%) slower than the baseline
+
+    Cases missing from either side are ignored.
+
+    Examples:
+        >>> compare({'a': 1.3e-6, 'b': 1e-6}, {'a': 1e-6, 'b': 1e-6})
+        [Regression(name='a', baseline=1e-06, current=1.3e-06, ratio=1.3)]
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous and current > previous * (1 + threshold):
+            regressions.append(Regression(name, previous, current, round(current / previous, 2)))
+    return regressions
+
+
+def report(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> None:
+    """Print every case with its change against the baseline"""
+    print(f"\n{'case':<48} {'per item':>12} {'baseline':>12} {'change':>8}")
+    for name, seconds in results.items():
+        previous = baseline.get(name)
+        change = f'{(seconds / previous - 1) * 100:+7.1f}%' if previous else '     new'
+        flag = '  REGRESSION' if previous and seconds > previous * (1 + threshold) else ''
+        old = format_seconds(previous) if previous else '-'
+        print(f'{name:<48} {format_seconds(seconds):>12} {old:>12} {change:>8}{flag}')
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f} {unit}'
+    return f'{seconds / 1e-9:.1f} ns'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Asset helper benchmark suite with saved baselines')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help=f'Baseline file (default: {DEFAULT_BASELINE})')
+    parser.add_argument('--save', action='store_true', help='Save the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Allowed slowdown before failing (default: {DEFAULT_THRESHOLD} = 25%%)')
+    parser.add_argument('--full', action='store_true', help='Include the 1M-item batch')
+    parser.add_argument('--only', help='Only run cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per case; the best is kept')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.full, args.only, args.repeat)
+
+    try:
+        saved = load_baseline(args.baseline)
+    except OSError:
+        saved = None
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+
+    baseline: Dict[str, float] = {}
+    if saved is not None:
+        if saved['machine'] != machine():
+            print(f"Baseline {args.baseline} was saved on {saved['machine']}; not comparing", file=sys.stderr)
+        else:
+            baseline = saved['results']
+
+    if args.save:
+        report(results, baseline, args.threshold)
+        save_baseline(results, args.baseline)
+        print(f'\nSaved baseline: {args.baseline}')
+        return 0
+
+    if saved is None:
+        report(results, {}, args.threshold)
+        print(f'\nNo baseline at {args.baseline}; run with --save to record one')
+        return 0
+
+    # Confirm apparent regressions with a second run before failing
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        retry = run_suite(args.full, regression.name, args.repeat).get(regression.name)
+        if retry is not None:
+            results[regression.name] = min(results[regression.name], retry)
+
+    report(results, baseline, args.threshold)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}', file=sys.stderr)
+        return 1
+    print(f'\nNo regressions beyond {args.threshold:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
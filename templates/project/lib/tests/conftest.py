@@ -0,0 +1,164 @@
+"""
+Shared fixtures for the asset library tests
+
+- asset_env / resolver: a resolver that ignores the shell's ASSET_* settings
+- s3: a local S3 stand-in (ThreadingHTTPServer) for the R2 tests. It accepts
+  header-signed requests (checked with asset_sync.sign_request) and presigned
+  URLs (checked independently from the SigV4 specification, including
+  expiry), honours Range requests, logs every request in `requests`, and
+  injects dropped connections (`drop_after`) and 503s (`unavailable_after`).
+"""
+
+import hashlib
+import hmac
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, quote
+
+import pytest
+from lib.asset_sync import R2Credentials, sign_request
+from lib.assets import OVERRIDE_KEYS, AssetResolver
+
+KEY_ID = 'test-key'
+SECRET = 'test-secret'
+
+
+def hmac_sha256(key, message):
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+class FakeS3(ThreadingHTTPServer):
+    """Minimal S3 GET endpoint with request logging and fault injection"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeS3Handler)
+        self.objects = {}
+        self.requests = []
+        self.drop_after = {}
+        self.unavailable_after = None
+        self.lock = threading.Lock()
+
+    @property
+    def endpoint(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    @property
+    def credentials(self):
+        return R2Credentials(self.endpoint, KEY_ID, SECRET)
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get('Range')))
+
+        if server.unavailable_after is not None and len(server.requests) > server.unavailable_after:
+            return self._reply(503, b'SlowDown')
+        path, _, query = self.path.partition('?')
+        params = dict(parse_qsl(query, keep_blank_values=True))
+        if 'X-Amz-Signature' in params:
+            error = self._check_presigned(path, params)
+        else:
+            error = None if self._signature_valid() else 'SignatureDoesNotMatch'
+        if error:
+            return self._reply(403, error.encode())
+        data = server.objects.get(path)
+        if data is None:
+            return self._reply(404, b'NoSuchKey')
+
+        status, start, end = 200, 0, len(data)
+        match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range') or '')
+        if match:
+            status, start = 206, int(match.group(1))
+            end = int(match.group(2)) + 1 if match.group(2) else len(data)
+        body = data[start:end]
+
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        with server.lock:
+            drop = server.drop_after.pop(path, None)
+        if drop is not None:
+            self.wfile.write(body[:drop])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(body)
+
+    def _signature_valid(self):
+        amz_date = self.headers.get('x-amz-date', '')
+        now = datetime.strptime(amz_date, '%Y%m%dT%H%M%SZ') if amz_date else datetime.now()
+        expected = sign_request('GET', self.headers['Host'], self.path, self.server.credentials, now=now)
+        return self.headers.get('Authorization') == expected['Authorization']
+
+    def _check_presigned(self, path, params):
+        signature = params.pop('X-Amz-Signature', '')
+        try:
+            signed_at = datetime.strptime(params['X-Amz-Date'], '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+            expires = int(params['X-Amz-Expires'])
+            key_id, date, region, service, _ = params['X-Amz-Credential'].split('/')
+        except (KeyError, ValueError):
+            return 'AuthorizationQueryParametersError'
+        if key_id != KEY_ID or params.get('X-Amz-SignedHeaders') != 'host':
+            return 'AccessDenied'
+        if not signed_at <= datetime.now(timezone.utc) <= signed_at + timedelta(seconds=expires):
+            return 'AccessDenied: Request has expired'
+
+        query = '&'.join(f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}" for k, v in sorted(params.items()))
+        canonical = f"GET\n{path}\n{query}\nhost:{self.headers['Host']}\n\nhost\nUNSIGNED-PAYLOAD"
+        key = ('AWS4' + SECRET).encode()
+        for part in (date, region, service, 'aws4_request'):
+            key = hmac_sha256(key, part)
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256', params['X-Amz-Date'], f'{date}/{region}/{service}/aws4_request',
+            hashlib.sha256(canonical.encode()).hexdigest(),
+        ])
+        if not hmac.compare_digest(hmac_sha256(key, string_to_sign).hex(), signature):
+            return 'SignatureDoesNotMatch'
+        return None
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def asset_env(monkeypatch):
+    """Clear every variable the resolver reads, so the shell's settings cannot leak in"""
+    for name in OVERRIDE_KEYS:
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+@pytest.fixture
+def resolver(asset_env):
+    """Fresh AssetResolver singleton in production"""
+    asset_env.setenv('ENVIRONMENT', 'production')
+    AssetResolver.reset_instance()
+    yield AssetResolver.get_instance()
+    AssetResolver.reset_instance()
+
+
+@pytest.fixture
+def s3():
+    """Running FakeS3 server, empty; its `credentials` are the ones it accepts"""
+    server = FakeS3()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
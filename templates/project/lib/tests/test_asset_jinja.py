@@ -0,0 +1,158 @@
+"""
+Test Suite for Compile-Time Asset Resolution in Jinja2
+
+Run tests:
+    pytest tests/test_asset_jinja.py -v
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+jinja2 = pytest.importorskip('jinja2')
+
+from lib.asset_jinja import AssetExtension  # noqa: E402
+from lib.assets import AssetResolver  # noqa: E402
+
+LOGO = "get_asset_url('/static/logo.png', 'https://cdn.example.com/logo.png')"
+
+
+@pytest.fixture
+def env(resolver):
+    return jinja2.Environment(
+        loader=jinja2.DictLoader({
+            'page.html': '<img src="{{ ' + LOGO + ' }}">',
+            'dynamic.html': "{{ get_asset_url(path, 'https://cdn.example.com/' ~ name) }}",
+        }),
+        extensions=[AssetExtension],
+        autoescape=True,
+    )
+
+
+class TestFolding:
+    """Test which calls are resolved at compile time"""
+
+    def test_literal_call_is_folded(self, env, resolver, monkeypatch):
+        """Test the compiled template embeds the URL and never calls the resolver"""
+        assert 'get_asset_url' not in env.compile('{{ ' + LOGO + ' }}', raw=True)
+        template = env.get_template('page.html')
+        monkeypatch.setattr(resolver, 'get_asset_url', lambda *args: pytest.fail('resolved at render time'))
+
+        assert template.render() == '<img src="https://cdn.example.com/logo.png">'
+        assert env.asset_folded == 2
+
+    @pytest.mark.parametrize('call,expected', [
+        ("get_asset_url('/a.png', 'https://cdn.example.com/a.png', 'local-always')", '/a.png'),
+        ("get_asset_url('/a.png', cdn_url='https://cdn.example.com/a.png', env_mode='local-always')", '/a.png'),
+        ("get_asset_url(local_path='/a.png', cdn_url='https://cdn.example.com/a.png',)", 'https://cdn.example.com/a.png'),
+    ])
+    def test_keyword_and_mode_arguments(self, env, call, expected):
+        """Test keyword arguments, env_mode and trailing commas fold too"""
+        assert env.from_string('{{ ' + call + ' }}').render() == expected
+        assert env.asset_folded == 1
+
+    def test_dynamic_arguments_resolve_at_render(self, env):
+        """Test non-literal calls fall back to the runtime global"""
+        html = env.get_template('dynamic.html').render(path='/static/a.png', name='a.png')
+
+        assert html == 'https://cdn.example.com/a.png'
+        assert env.asset_folded == 0
+
+    def test_invalid_literals_raise_at_render(self, env):
+        """Test calls that would raise are left for render time"""
+        template = env.from_string("{{ get_asset_url('../etc/passwd', 'ftp://x') }}")
+
+        assert env.asset_folded == 0
+        with pytest.raises(ValueError):
+            template.render()
+
+    def test_attribute_calls_untouched(self, env):
+        """Test obj.get_asset_url(...) is not mistaken for the global"""
+        class Helper:
+            @staticmethod
+            def get_asset_url(local_path, cdn_url):
+                return 'helper'
+
+        template = env.from_string("{{ h.get_asset_url('/a.png', 'https://cdn.example.com/a.png') }}")
+        assert template.render(h=Helper()) == 'helper'
+        assert env.asset_folded == 0
+
+
+class TestRecompilation:
+    """Test compiled templates follow resolver config changes"""
+
+    def test_config_change_recompiles(self, env, resolver):
+        """Test switching environment drops cached templates"""
+        assert 'cdn.example.com' in env.get_template('page.html').render()
+
+        resolver.environment = 'development'
+        assert env.get_template('page.html').render() == '<img src="/static/logo.png">'
+
+    def test_reset_instance_recompiles(self, env, monkeypatch):
+        """Test a fresh resolver with new environment variables is picked up"""
+        env.get_template('page.html').render()
+        monkeypatch.setenv('ENVIRONMENT', 'development')
+        AssetResolver.reset_instance()
+
+        assert env.get_template('page.html').render() == '<img src="/static/logo.png">'
+
+    def test_held_templates_refold(self, env, resolver):
+        """Test templates held by reference, from a loader or from_string, refold on next render"""
+        loaded = env.get_template('page.html')
+        inline = env.from_string('{{ ' + LOGO + ' }}', globals={'extra': 1})
+        assert inline.render() == 'https://cdn.example.com/logo.png'
+
+        resolver.environment = 'development'
+        assert loaded.render() == '<img src="/static/logo.png">'
+        assert inline.render() == '/static/logo.png'
+        assert inline.globals['extra'] == 1
+        assert env.asset_folded == 4
+
+    def test_concurrent_renders_refold_once(self, env, resolver, monkeypatch):
+        """Test threads rendering one held template after a change refold it once, never half-swapped"""
+        inline = env.from_string('{{ ' + LOGO + ' }}')
+        resolver.environment = 'development'
+        compile_string = env.from_string
+
+        def slow_from_string(*args, **kwargs):
+            time.sleep(0.05)
+            return compile_string(*args, **kwargs)
+
+        monkeypatch.setattr(env, 'from_string', slow_from_string)
+        folded = env.asset_folded
+        barrier = threading.Barrier(8)
+
+        def render():
+            barrier.wait()
+            return inline.render()
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda _: render(), range(8)))
+
+        assert results == ['/static/logo.png'] * 8
+        assert env.asset_folded == folded + 1
+
+    def test_explicit_invalidate(self, env, resolver):
+        """Test asset_invalidate() recompiles held templates once"""
+        inline = env.from_string('{{ ' + LOGO + ' }}')
+        env.asset_invalidate()
+        inline.render()
+        inline.render()
+
+        assert env.asset_folded == 2
+
+    def test_bytecode_cache_keyed_by_config(self, resolver, tmp_path):
+        """Test bytecode compiled under one config is not loaded under another"""
+        def make_env():
+            return jinja2.Environment(
+                loader=jinja2.DictLoader({'page.html': '{{ ' + LOGO + ' }}'}),
+                extensions=[AssetExtension],
+                bytecode_cache=jinja2.FileSystemBytecodeCache(str(tmp_path)),
+            )
+
+        assert make_env().get_template('page.html').render() == 'https://cdn.example.com/logo.png'
+        resolver.environment = 'development'
+        assert make_env().get_template('page.html').render() == '/static/logo.png'
+        assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,216 @@
+"""
+Test Suite for the Fast Manifest Generator
+
+Run tests:
+    pytest tests/test_asset_manifest.py -v
+"""
+
+import hashlib
+import struct
+
+import pytest
+from lib import asset_verify
+from lib.asset_manifest import (
+    build_manifest,
+    detect_type,
+    image_dimensions,
+    render_manifest,
+    scan_files,
+    write_manifest,
+)
+
+
+def png(width, height):
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I4sII', 13, b'IHDR', width, height) + b'\x08\x06\x00\x00\x00' + b'\x00' * 16
+
+
+def jpeg(width, height, exif_size=0):
+    """SOI, an optional large APP1 segment, then a baseline frame header"""
+    app1 = b'\xff\xe1' + struct.pack('>H', exif_size + 2) + b'E' * exif_size if exif_size else b''
+    sof = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, height, width, 1) + b'\x01\x11\x00'
+    return b'\xff\xd8\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9 + app1 + sof + b'\xff\xd9'
+
+
+def gif(width, height):
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\x00' * 20
+
+
+def webp(kind, width, height):
+    if kind == 'VP8 ':
+        body = b'\x00' * 3 + b'\x9d\x01\x2a' + struct.pack('<HH', width, height)
+    elif kind == 'VP8L':
+        bits = (width - 1) | ((height - 1) << 14)
+        body = b'\x2f' + bits.to_bytes(4, 'little')
+    else:
+        body = b'\x00' * 4 + (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little')
+    chunk = kind.encode() + struct.pack('<I', len(body)) + body
+    return b'RIFF' + struct.pack('<I', len(chunk) + 4) + b'WEBP' + chunk + b'\x00' * 16
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def project(tmp_path):
+    files = {
+        'public/media/logo.png': png(512, 512),
+        'public/images/hero.jpg': jpeg(1920, 1080),
+        'data/models/model.bin': b'weights' * 100,
+        'assets/notes.pdf': b'%PDF-1.4',
+        'public/media/.DS_Store': b'ignored',
+    }
+    for path, data in files.items():
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_bytes(data)
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'src/app.py').write_text('not an asset')
+    return tmp_path
+
+
+def by_path(manifest):
+    return {entry['path']: entry for entry in manifest['assets']}
+
+
+class TestImageDimensions:
+    """Test header-only dimension parsing"""
+
+    @pytest.mark.parametrize('name,data,expected', [
+        ('a.png', png(640, 480), (640, 480)),
+        ('a.jpg', jpeg(1600, 900), (1600, 900)),
+        ('exif.jpg', jpeg(4032, 3024, exif_size=60_000), (4032, 3024)),
+        ('a.gif', gif(32, 16), (32, 16)),
+        ('lossy.webp', webp('VP8 ', 800, 600), (800, 600)),
+        ('lossless.webp', webp('VP8L', 300, 200), (300, 200)),
+        ('extended.webp', webp('VP8X', 4000, 3000), (4000, 3000)),
+        ('a.svg', b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" width="120px" height="80"></svg>', (120, 80)),
+        ('box.svg', b'<svg viewBox="0 0 24.5 24" width="100%" xmlns="http://www.w3.org/2000/svg"/>', (24, 24)),
+        ('a.txt', b'plain text', None),
+        ('cut.jpg', b'\xff\xd8\xff\xe0\x00', None),
+    ])
+    def test_formats(self, tmp_path, name, data, expected):
+        """Test every supported format, including a JPEG with a large EXIF block"""
+        path = tmp_path / name
+        path.write_bytes(data)
+        assert image_dimensions(str(path)) == expected
+
+    def test_detect_type(self):
+        """Test the shell generator's type mapping"""
+        assert detect_type('x/model.gguf') == 'model'
+        assert detect_type('x/data.tar.gz') == 'dataset'
+        assert detect_type('x/clip.mp4') == 'video'
+        assert detect_type('x/song.mp3') == 'audio'
+        assert detect_type('x/paper.pdf') == 'document'
+        assert detect_type('x/blob', png(1, 1)) == 'media'
+        assert detect_type('x/blob') == 'data'
+
+
+class TestBuildManifest:
+    """Test manifest generation"""
+
+    def test_project_entries(self, project):
+        """Test scanned directories, keys, types, dimensions and sync defaults"""
+        manifest, changes = build_manifest(str(project), 'demo', library=None)
+        assets = by_path(manifest)
+
+        assert list(assets) == sorted(assets)
+        assert set(assets) == {'assets/notes.pdf', 'data/models/model.bin', 'public/images/hero.jpg', 'public/media/logo.png'}
+        logo = assets['public/media/logo.png']
+        assert logo['r2_key'] == 'projects/demo/public/media/logo.png'
+        assert logo['dimensions'] == {'width': 512, 'height': 512}
+        assert logo['sha256'] == sha256(png(512, 512))
+        assert (logo['type'], logo['sync']) == ('media', 'download')
+        assert assets['data/models/model.bin']['type'] == 'model'
+        assert (changes.added, changes.hashed) == (4, 4)
+
+    def test_library_matches_content(self, project):
+        """Test only byte-identical library files become copy-from-library"""
+        library = {'assets': [
+            {'path': 'logos/logo.png', 'r2_key': 'media-cdn/logos/logo.png', 'sha256': sha256(png(512, 512)),
+             'cdn_url': 'https://cdn.example.com/logos/logo.png', 'dimensions': {'width': 512, 'height': 512}},
+            {'path': 'photos/hero.jpg', 'r2_key': 'media-cdn/photos/hero.jpg', 'sha256': 'f' * 64},
+        ]}
+        assets = by_path(build_manifest(str(project), 'demo', library=library)[0])
+
+        assert assets['public/media/logo.png']['sync'] == 'copy-from-library'
+        assert assets['public/media/logo.png']['cdn_url'] == 'https://cdn.example.com/logos/logo.png'
+        assert assets['public/images/hero.jpg']['sync'] == 'download'
+
+    def test_cdn_mode(self, project):
+        """Test the central library layout scans everything"""
+        assets = by_path(build_manifest(str(project), cdn=True)[0])
+
+        assert assets['src/app.py']['r2_key'] == 'media-cdn/src/app.py'
+        assert assets['public/media/logo.png']['cdn_url'] == 'https://cdn.adlimen.com/public/media/logo.png'
+        assert assets['public/media/logo.png']['sync'] is True
+        assert 'modified' in assets['public/media/logo.png']
+
+    def test_incremental(self, project, monkeypatch):
+        """Test unchanged files are neither hashed nor rewritten and hand edits survive"""
+        manifest, _ = build_manifest(str(project), 'demo', library=None)
+        by_path(manifest)['public/media/logo.png']['devices'] = ['macbook']
+        by_path(manifest)['data/models/model.bin']['description'] = 'Local model'
+        write_manifest(manifest, str(project / '.r2-manifest.yml'))
+
+        (project / 'data/models/model.bin').write_bytes(b'retrained' * 100)
+        hashed = []
+        original = asset_verify._try_hash
+        monkeypatch.setattr(asset_verify, '_try_hash', lambda path: hashed.append(path) or original(path))
+
+        updated, changes = build_manifest(str(project), 'demo', library=None)
+        assets = by_path(updated)
+        assert [path.rsplit('/', 1)[-1] for path in hashed] == ['model.bin']
+        assert (changes.changed, changes.unchanged) == (1, 3)
+        assert assets['public/media/logo.png']['devices'] == ['macbook']
+        assert assets['data/models/model.bin']['description'] == 'Local model'
+        assert assets['data/models/model.bin']['sha256'] == sha256(b'retrained' * 100)
+
+    def test_removed_files_counted(self, project):
+        """Test deleted files drop out of the manifest"""
+        write_manifest(build_manifest(str(project), 'demo', library=None)[0], str(project / '.r2-manifest.yml'))
+        (project / 'assets/notes.pdf').unlink()
+
+        manifest, changes = build_manifest(str(project), 'demo', library=None)
+        assert changes.removed == 1
+        assert 'assets/notes.pdf' not in by_path(manifest)
+
+    def test_rejects_bad_project_name(self, project):
+        """Test project names follow the shell generator's rule"""
+        with pytest.raises(ValueError):
+            build_manifest(str(project), 'bad name')
+
+    def test_scan_skips_hidden(self, project):
+        """Test hidden files are not assets"""
+        assert 'public/media/.DS_Store' not in scan_files(str(project), ['public/media'])
+
+
+class TestOutput:
+    """Test deterministic YAML output"""
+
+    def test_rerun_is_byte_identical(self, project):
+        """Test a second run with no changes keeps `updated` and writes nothing"""
+        path = str(project / '.r2-manifest.yml')
+        assert write_manifest(build_manifest(str(project), 'demo', library=None)[0], path)
+        before = open(path).read()
+
+        assert not write_manifest(build_manifest(str(project), 'demo', library=None)[0], path)
+        assert open(path).read() == before
+
+    def test_round_trips_through_yaml(self):
+        """Test values that look like other YAML types are quoted"""
+        yaml = pytest.importorskip('yaml')
+        tricky = ['yes', 'null', '1.5', '0x1F', '2024-01-01', '12:30', 'a: b', '# c', 'naïve.png', 'x [1].png', 'plain/path.png']
+        manifest = {
+            'project': 'demo',
+            'updated': '2025-01-01T00:00:00Z',
+            'assets': [
+                {'path': name, 'size': 1, 'sha256': 'ab', 'sync': False, 'devices': ['mac-studio', 'on']}
+                for name in tricky
+            ],
+        }
+
+        loaded = yaml.safe_load(render_manifest(manifest))
+        assert [entry['path'] for entry in loaded['assets']] == sorted(tricky)
+        assert loaded['version'] == '1.1'
+        assert loaded['assets'][0]['devices'] == ['mac-studio', 'on']
+        assert loaded['assets'][0]['sync'] is False
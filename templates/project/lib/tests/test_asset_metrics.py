@@ -0,0 +1,156 @@
+"""
+Test Suite for Asset Resolution Metrics
+
+Run tests:
+    pytest tests/test_asset_metrics.py -v
+"""
+
+import pytest
+from lib import assets as assets_module
+from lib.asset_metrics import AssetMetrics
+from lib.assets import (
+    AssetResolver,
+    WarningRateLimiter,
+    resolve_asset_rows,
+)
+
+LOGO = ('/media/logo.png', 'https://cdn.example.com/logo.png')
+
+
+@pytest.fixture(autouse=True)
+def resolver(asset_env, monkeypatch):
+    """Resolve in development with a fresh warning budget"""
+    monkeypatch.setenv('ENVIRONMENT', 'development')
+    monkeypatch.setattr(assets_module, 'warning_limiter', WarningRateLimiter())
+    AssetResolver.reset_instance()
+    yield AssetResolver.get_instance()
+    AssetResolver.reset_instance()
+
+
+class TestRecording:
+    """Test what the resolver records once metrics are enabled"""
+
+    def test_disabled_by_default(self, resolver):
+        """Test no recorder is installed until enable_metrics()"""
+        assert resolver.metrics is None
+        with pytest.raises(RuntimeError):
+            resolver.metrics_text()
+
+    def test_counts_decisions_by_env_mode(self, resolver):
+        """Test cache hits and misses are both counted per decision"""
+        metrics = resolver.enable_metrics()
+
+        for _ in range(3):
+            resolver.get_asset_url(*LOGO)
+        resolver.get_asset_url(*LOGO, 'cdn-always')
+
+        assert metrics.resolutions == {
+            ('local', 'cdn-production-local-dev'): 3,
+            ('cdn', 'cdn-always'): 1,
+        }
+
+    def test_counts_fallbacks_and_validation_failures(self, resolver):
+        """Test the fallback branch and rejected URLs are counted"""
+        metrics = resolver.enable_metrics()
+
+        resolver.get_asset_url('../bad.png', 'https://cdn.example.com/logo.png')
+
+        assert metrics.fallbacks == {'cdn': 1}
+        assert metrics.validation_failures == {'local': 1}
+        assert metrics.resolutions == {('cdn', 'cdn-production-local-dev'): 1}
+
+    def test_counts_errors(self, resolver):
+        """Test unresolvable assets are counted before the error propagates"""
+        metrics = resolver.enable_metrics()
+
+        with pytest.raises(ValueError):
+            resolver.get_asset_url('../bad.png', 'not-a-url', 'cdn-always')
+
+        assert metrics.errors == {'cdn-always': 1}
+        assert metrics.validation_failures == {'local': 1, 'cdn': 1}
+
+    def test_counts_batch_rows(self, resolver):
+        """Test batch resolution records every row"""
+        metrics = resolver.enable_metrics()
+
+        resolve_asset_rows([LOGO] * 4 + [('../bad.png', LOGO[1])])
+
+        assert metrics.resolutions == {
+            ('local', 'cdn-production-local-dev'): 4,
+            ('cdn', 'cdn-production-local-dev'): 1,
+        }
+        assert metrics.fallbacks == {'cdn': 1}
+
+    def test_timing_histogram(self, resolver):
+        """Test latencies land in cumulative buckets"""
+        metrics = resolver.enable_metrics(timing=True)
+
+        for _ in range(10):
+            resolver.get_asset_url(*LOGO)
+
+        histogram = metrics.histogram()
+        assert histogram[-1] == (float('inf'), 10)
+        assert [count for _, count in histogram] == sorted(count for _, count in histogram)
+
+    def test_custom_recorder(self, resolver):
+        """Test a subclass can forward events elsewhere"""
+        events = []
+
+        class Forwarding(AssetMetrics):
+            def record_resolution(self, decision, env_mode):
+                events.append((decision, env_mode))
+
+        resolver.enable_metrics(metrics=Forwarding())
+        resolver.get_asset_url(*LOGO, 'cdn-always')
+
+        assert events == [('cdn', 'cdn-always')]
+
+    def test_disable_restores_plain_path(self, resolver):
+        """Test nothing is recorded after disable_metrics()"""
+        metrics = resolver.enable_metrics()
+        resolver.disable_metrics()
+
+        resolver.get_asset_url(*LOGO)
+        assert metrics.resolutions == {}
+
+    def test_rejects_unsorted_buckets(self):
+        """Test histogram bounds must ascend"""
+        with pytest.raises(ValueError):
+            AssetMetrics(buckets=(0.01, 0.001))
+
+
+class TestPrometheusExport:
+    """Test the Prometheus text exposition"""
+
+    def test_exports_counters_and_cache(self, resolver):
+        """Test counters, cache statistics and suppressed warnings are exported"""
+        resolver.enable_metrics()
+        resolver.get_asset_url(*LOGO)
+        resolver.get_asset_url(*LOGO)
+
+        text = resolver.metrics_text()
+
+        assert '# TYPE asset_resolver_resolutions_total counter' in text
+        assert 'asset_resolver_resolutions_total{decision="local",env_mode="cdn-production-local-dev"} 2' in text
+        assert 'asset_resolver_cache_hits_total 1' in text
+        assert 'asset_resolver_cache_misses_total 1' in text
+        assert 'asset_resolver_warnings_suppressed_total 0' in text
+        assert text.endswith('\n')
+
+    def test_exports_histogram(self, resolver):
+        """Test the histogram has buckets, +Inf, sum and count"""
+        resolver.enable_metrics(timing=True)
+        resolver.get_asset_url(*LOGO)
+
+        text = resolver.metrics_text(prefix='app_assets')
+
+        assert '# TYPE app_assets_resolution_seconds histogram' in text
+        assert 'app_assets_resolution_seconds_bucket{le="+Inf"} 1' in text
+        assert 'app_assets_resolution_seconds_count 1' in text
+
+    def test_escapes_label_values(self):
+        """Test quotes and backslashes in labels are escaped"""
+        metrics = AssetMetrics()
+        metrics.record_resolution('local', 'odd"mode\\')
+
+        assert 'env_mode="odd\\"mode\\\\"' in metrics.to_prometheus()
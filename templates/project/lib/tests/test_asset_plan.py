@@ -0,0 +1,216 @@
+"""
+Test Suite for the Device-Selective Sync Planner
+
+Run tests:
+    pytest tests/test_asset_plan.py -v
+"""
+
+import hashlib
+
+import pytest
+from lib import asset_plan
+from lib.asset_plan import SyncPlan, device_name, main, next_baseline, plan_sync, wanted_on_device
+from lib.asset_verify import DigestCache, verify_assets
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def entry(path, data, **fields):
+    return {'path': path, 'r2_key': f'bucket/{path}', 'size': len(data), 'sha256': sha256(data), **fields}
+
+
+def ops(plan):
+    return {action.path: action.op for action in plan.actions}
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A project where some assets are present and hashed, others missing"""
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data/synced.bin').write_bytes(b'synced')
+    (tmp_path / 'data/unhashed.bin').write_bytes(b'unhashed')
+    (tmp_path / 'data/stale.bin').write_bytes(b'old')
+
+    cache = DigestCache(str(tmp_path / '.r2-manifest.digests'))
+    list(verify_assets([entry('data/synced.bin', b'synced')], str(tmp_path), cache=cache))
+    cache.save()
+
+    entries = [
+        entry('data/synced.bin', b'synced', type='model'),
+        entry('data/unhashed.bin', b'unhashed', type='dataset'),
+        entry('data/stale.bin', b'new!', type='model'),
+        entry('data/missing.bin', b'missing', type='model', devices=['macbook']),
+        entry('data/studio.bin', b'studio', type='model', devices=['mac-studio']),
+        entry('data/manual.bin', b'manual', sync=False),
+        entry('public/hero.jpg', b'hero', sync='cdn-only'),
+    ]
+    return tmp_path, entries
+
+
+def plan(root, entries, **kwargs):
+    kwargs.setdefault('device', 'macbook')
+    kwargs.setdefault('cache', DigestCache(str(root / '.r2-manifest.digests')))
+    return plan_sync(entries, root=str(root), **kwargs)
+
+
+class TestSelection:
+    """Test which assets a device wants"""
+
+    def test_sync_and_devices_fields(self):
+        """Test sync: false / cdn-only and device lists"""
+        assert wanted_on_device({'path': 'a'}, 'macbook')
+        assert wanted_on_device({'path': 'a', 'devices': ['macbook']}, 'macbook')
+        assert not wanted_on_device({'path': 'a', 'devices': ['mac-studio']}, 'macbook')
+        assert not wanted_on_device({'path': 'a', 'sync': False}, 'macbook')
+        assert not wanted_on_device({'path': 'a', 'sync': 'cdn-only'}, 'macbook')
+        assert not wanted_on_device({'path': 'a', 'type': 'video'}, 'macbook', {'model'})
+
+    def test_device_name_override(self, monkeypatch):
+        """Test ASSET_DEVICE and the .local suffix"""
+        monkeypatch.setenv('ASSET_DEVICE', 'Mac-Studio.local')
+        assert device_name() == 'mac-studio'
+
+
+class TestPlan:
+    """Test plan computation"""
+
+    def test_minimal_actions(self, project):
+        """Test satisfied files are skipped and only real work is planned"""
+        root, entries = project
+        result = plan(root, entries, previous=False)
+
+        assert ops(result) == {
+            'data/unhashed.bin': 'verify',
+            'data/stale.bin': 'transfer',
+            'data/missing.bin': 'transfer',
+        }
+        assert set(result.satisfied) == {'data/synced.bin'}
+        assert result.transfer_bytes == len(b'new!') + len(b'missing')
+
+    def test_other_device(self, project):
+        """Test device lists select different assets"""
+        root, entries = project
+        assert 'data/studio.bin' in ops(plan(root, entries, device='mac-studio', previous=False))
+
+    def test_type_filter(self, project):
+        """Test a type filter narrows the work"""
+        root, entries = project
+        assert set(ops(plan(root, entries, previous=False, types={'dataset'}))) == {'data/unhashed.bin'}
+
+    def test_previous_plan_skips_cache(self, project):
+        """Test unchanged files from the previous plan need only a stat"""
+        root, entries = project
+        first = plan(root, entries, previous=False)
+
+        class NoCache:
+            def get(self, path, stat):
+                pytest.fail(f'digest lookup for {path}')
+
+        second = plan(root, entries, previous=first, cache=NoCache(), types={'model'})
+        assert 'data/synced.bin' in second.satisfied
+
+    def test_moves_renamed_and_deletes_removed(self, project):
+        """Test a renamed asset is moved and a dropped one deleted"""
+        root, entries = project
+        first = plan(root, entries, previous=False)
+
+        renamed = dict(entries[0], path='data/renamed.bin')
+        second = plan(root, [renamed] + entries[1:3], previous=first)
+        assert ops(second)['data/renamed.bin'] == 'move'
+        assert second.by_op('move')[0].source == 'data/synced.bin'
+
+        third = plan(root, entries[1:3], previous=first)
+        assert ops(third)['data/synced.bin'] == 'delete'
+
+    def test_type_filter_never_deletes(self, project):
+        """Test assets outside the type filter are not retired"""
+        root, entries = project
+        first = plan(root, entries, previous=False)
+        assert plan(root, entries, previous=first, types={'dataset'}).by_op('delete') == []
+
+    def test_modified_file_not_deleted(self, project):
+        """Test a file edited since the last plan is left alone"""
+        root, entries = project
+        first = plan(root, entries, previous=False)
+        (root / 'data/synced.bin').write_bytes(b'edited locally')
+
+        assert plan(root, entries[1:], previous=first).by_op('delete') == []
+
+    def test_baseline_after_filtered_run(self, project):
+        """Test a type-filtered run keeps the other types' baseline, so they can still be retired"""
+        root, entries = project
+        first = plan(root, entries, previous=False)
+        first.satisfied['data/unhashed.bin'] = asset_plan._stat_key(str(root / 'data/unhashed.bin'))
+
+        filtered = plan(root, entries, previous=first, types={'model'})
+        baseline = next_baseline(filtered, str(root), synced={'data/stale.bin'}, previous=first)
+        assert {'data/synced.bin', 'data/stale.bin', 'data/unhashed.bin'} <= set(baseline.satisfied)
+
+        assert ops(plan(root, entries[:1], previous=baseline))['data/unhashed.bin'] == 'delete'
+
+    def test_shared_r2_key_copied(self, tmp_path):
+        """Test two paths for one object transfer once and copy"""
+        shared = entry('data/a.bin', b'shared')
+        other = dict(shared, path='data/b.bin')
+
+        result = plan(tmp_path, [shared, other], previous=False)
+        assert ops(result) == {'data/a.bin': 'transfer', 'data/b.bin': 'copy'}
+        assert result.transfer_bytes == len(b'shared')
+
+    def test_estimate(self, project):
+        """Test dry-run estimates scale with bandwidth"""
+        root, entries = project
+        result = plan(root, entries, previous=False)
+
+        assert result.estimate_seconds(bandwidth=1) > result.estimate_seconds(bandwidth=1000)
+
+
+class TestPersistence:
+    """Test saving and loading plans"""
+
+    def test_round_trip(self, project, tmp_path):
+        """Test a saved plan loads back equal and is ignored for another device"""
+        root, entries = project
+        original = plan(root, entries, previous=False)
+        path = str(tmp_path / 'saved.plan')
+        original.save(path)
+
+        loaded = SyncPlan.load(path)
+        assert (loaded.actions, loaded.desired, loaded.satisfied) == (original.actions, original.desired, original.satisfied)
+        assert SyncPlan.load(str(tmp_path / 'nope.plan')) is None
+        assert 'data/studio.bin' in ops(plan(root, entries, device='mac-studio', previous=loaded))
+
+    def test_cli_dry_run(self, project, capsys):
+        """Test --dry-run prints the plan and changes nothing"""
+        root, entries = project
+        yaml = pytest.importorskip('yaml')
+        manifest = root / '.r2-manifest.yml'
+        manifest.write_text(yaml.safe_dump({'assets': entries}))
+
+        assert main([str(manifest), '--device', 'macbook', '--dry-run']) == 0
+        out = capsys.readouterr().out
+        assert 'transfer: data/missing.bin' in out
+        assert '11.0 B to download' in out
+        assert not (root / asset_plan.plan_path_for('.r2-manifest.yml')).exists()
+
+    def test_cli_run_saves_incremental_baseline(self, tmp_path, monkeypatch):
+        """Test a completed run records digests and a baseline that skips work and retires assets"""
+        yaml = pytest.importorskip('yaml')
+        for name in ('R2_ENDPOINT', 'R2_ACCESS_KEY_ID', 'R2_SECRET_ACCESS_KEY'):
+            monkeypatch.setenv(name, 'http://127.0.0.1:9' if name == 'R2_ENDPOINT' else 'unused')
+        (tmp_path / 'data').mkdir()
+        entries = []
+        for name in ('a', 'b', 'c'):
+            (tmp_path / f'data/{name}.bin').write_bytes(name.encode() * 10)
+            entries.append(entry(f'data/{name}.bin', name.encode() * 10))
+        manifest = tmp_path / '.r2-manifest.yml'
+        manifest.write_text(yaml.safe_dump({'assets': entries}))
+
+        assert main([str(manifest), '--device', 'macbook']) == 0
+        assert (tmp_path / '.r2-manifest.digests').exists()
+        assert plan_sync(str(manifest), 'macbook').actions == []
+
+        manifest.write_text(yaml.safe_dump({'assets': entries[1:]}))
+        assert ops(plan_sync(str(manifest), 'macbook')) == {'data/a.bin': 'delete'}
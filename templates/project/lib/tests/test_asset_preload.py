@@ -0,0 +1,175 @@
+"""
+Test Suite for Preload Link Headers and Early Hints
+
+Run tests:
+    pytest tests/test_asset_preload.py -v
+"""
+
+import asyncio
+
+import pytest
+from lib.asset_preload import (
+    PreloadASGIMiddleware,
+    PreloadRegistry,
+    PreloadWSGIMiddleware,
+    format_link,
+    preload_destination,
+)
+from lib.assets import AssetIndex
+
+MANIFEST = {
+    'project': 'demo',
+    'assets': [
+        {'path': 'public/media/hero.jpg', 'cdn_url': 'https://cdn.example.com/media/hero.jpg', 'type': 'media', 'sha256': 'ab' * 32},
+        {'path': 'public/fonts/inter.woff2', 'cdn_url': 'https://cdn.example.com/fonts/inter.woff2', 'type': 'data'},
+        {'path': 'public/data/search.json', 'type': 'data'},
+    ],
+}
+
+HERO = '<https://cdn.example.com/media/hero.jpg>; rel=preload; as=image; type="image/jpeg"'
+FONT = '<https://cdn.example.com/fonts/inter.woff2>; rel=preload; as=font; type="font/woff2"; crossorigin'
+
+
+@pytest.fixture
+def registry(resolver):
+    registry = PreloadRegistry(AssetIndex.from_manifest(MANIFEST))
+    registry.bundle('home', ['public/fonts/inter.woff2', 'public/media/hero.jpg'])
+    registry.route('/', 'home')
+    return registry
+
+
+class TestLinks:
+    """Test destination inference and serialization"""
+
+    @pytest.mark.parametrize('url,asset_type,expected', [
+        ('/media/hero.jpg', 'media', 'image'),
+        ('/media/hero.avif', None, 'image'),
+        ('/fonts/inter.woff2', 'data', 'font'),
+        ('https://cdn.example.com/css/site.css?v=1', 'data', 'style'),
+        ('/js/app.mjs', None, 'script'),
+        ('/video/intro.mp4', 'video', 'video'),
+        ('/models/tiny.onnx', 'model', 'fetch'),
+        ('/data/search.json', 'data', 'fetch'),
+    ])
+    def test_preload_destination(self, url, asset_type, expected):
+        """Test manifest types and extensions map to preload destinations"""
+        assert preload_destination(url, asset_type) == expected
+
+    def test_format_link(self):
+        """Test type hints, crossorigin and percent-encoding"""
+        assert format_link('/data/search.json', 'fetch') == '</data/search.json>; rel=preload; as=fetch; crossorigin'
+        assert format_link('/css/site.css', 'style') == '</css/site.css>; rel=preload; as=style'
+        assert format_link('/media/café.png', 'image').startswith('</media/caf%C3%A9.png>;')
+
+
+class TestRegistry:
+    """Test bundle compilation and invalidation"""
+
+    def test_header_is_precomputed(self, registry):
+        """Test the header value, bytes forms and per-path lookup"""
+        bundle = registry.for_path('/')
+
+        assert bundle.value == f'{FONT}, {HERO}'
+        assert bundle.header == bundle.value.encode()
+        assert bundle.links == (FONT.encode(), HERO.encode())
+        assert registry.for_path('/') is bundle
+        assert registry.for_path('/about') is None
+
+    def test_mapping_assets(self, registry):
+        """Test batch-style mappings, local-only assets and `as` overrides"""
+        registry.bundle('search', [
+            'public/data/search.json',
+            {'local_path': '/css/site.css', 'cdn_url': 'https://cdn.example.com/css/site.css'},
+            {'key': 'public/media/hero.jpg', 'as': 'fetch'},
+        ])
+
+        assert registry.get('search').urls == (
+            '/data/search.json',
+            'https://cdn.example.com/css/site.css',
+            'https://cdn.example.com/media/hero.jpg',
+        )
+        assert 'as=fetch; crossorigin' in registry.get('search').value.rsplit(', ', 1)[1]
+
+    def test_config_change_recompiles(self, registry, resolver):
+        """Test switching environment rebuilds headers with local URLs"""
+        assert registry.for_path('/').urls[0].startswith('https://')
+
+        resolver.environment = 'development'
+        assert registry.for_path('/').urls == ('/fonts/inter.woff2', '/media/hero.jpg')
+
+    def test_fingerprinted_urls(self, registry, resolver, monkeypatch):
+        """Test headers use the same fingerprinted URLs as get_asset_url()"""
+        monkeypatch.setenv('ASSET_FINGERPRINT', 'query')
+        resolver.reload_config()
+
+        assert registry.for_path('/').urls[1] == f"https://cdn.example.com/media/hero.jpg?v={'ab' * 6}"
+
+    def test_rejects_unknown_assets(self, registry):
+        """Test declaration errors surface at startup"""
+        with pytest.raises(ValueError):
+            registry.bundle('bad', ['public/media/missing.png'])
+        with pytest.raises(ValueError):
+            registry.bundle('bad', [{'env_mode': 'cdn-always'}])
+        with pytest.raises(ValueError):
+            registry.route('/bad', 'missing')
+
+
+def run_asgi(middleware, path='/', method='GET', status=200, extensions=None):
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'text/html')]})
+        await send({'type': 'http.response.body', 'body': b'<html></html>'})
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'extensions': extensions or {}}
+    asyncio.run(PreloadASGIMiddleware(app, middleware)(scope, None, send))
+    return sent
+
+
+class TestMiddleware:
+    """Test the ASGI and WSGI middleware"""
+
+    def test_asgi_adds_link_header(self, registry):
+        """Test the cached bytes are appended to the response headers"""
+        start, body = run_asgi(registry)
+
+        assert start['headers'] == [(b'content-type', b'text/html'), (b'link', registry.for_path('/').header)]
+        assert body['body'] == b'<html></html>'
+
+    def test_asgi_early_hints(self, registry):
+        """Test 103 Early Hints are sent first when the server supports them"""
+        hint, start, _ = run_asgi(registry, extensions={'http.response.early_hint': {}})
+
+        assert hint == {'type': 'http.response.early_hint', 'links': [FONT.encode(), HERO.encode()]}
+        assert start['type'] == 'http.response.start'
+
+    @pytest.mark.parametrize('kwargs', [{'path': '/about'}, {'method': 'POST'}, {'status': 404}])
+    def test_asgi_skips(self, registry, kwargs):
+        """Test other routes, methods and error responses get no Link header"""
+        sent = run_asgi(registry, **kwargs)
+
+        start = next(message for message in sent if message['type'] == 'http.response.start')
+        assert start['headers'] == [(b'content-type', b'text/html')]
+
+    def test_wsgi_adds_link_header(self, registry):
+        """Test the WSGI middleware appends the cached str value"""
+        statuses = {'/': '200 OK', '/missing': '404 Not Found'}
+        captured = {}
+
+        def app(environ, start_response):
+            start_response(statuses[environ['PATH_INFO']], [('Content-Type', 'text/html')])
+            return [b'ok']
+
+        def start_response(status, headers, exc_info=None):
+            captured[status] = headers
+
+        middleware = PreloadWSGIMiddleware(app, registry)
+        assert middleware({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}, start_response) == [b'ok']
+        registry.route('/missing', 'home')
+        middleware({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/missing'}, start_response)
+
+        assert captured['200 OK'] == [('Content-Type', 'text/html'), ('Link', f'{FONT}, {HERO}')]
+        assert captured['404 Not Found'] == [('Content-Type', 'text/html')]
@@ -0,0 +1,249 @@
+"""
+Test Suite for CDN Reachability Probing
+
+Runs the async API against a local stand-in HTTP server; no network access
+or async test plugin required.
+
+Run tests:
+    pytest tests/test_asset_probe.py -v
+"""
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from lib.asset_probe import CdnProber, ProbeCache
+from lib.assets import (
+    AssetIndex,
+    AssetResolver,
+    abatch_resolve_assets,
+    aget_asset_url,
+)
+
+
+class StandInCdn(BaseHTTPRequestHandler):
+    """Answers HEAD 200 for /ok*, 404 otherwise; counts requests and connections"""
+
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+    def do_HEAD(self):
+        StandInCdn.requests.append((self.path, self.client_address))
+        self.send_response(200 if self.path.startswith('/ok') else 404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def cdn():
+    """Start a local HTTP server standing in for the CDN"""
+    StandInCdn.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInCdn)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def dev_resolver(asset_env):
+    """Resolve in development with cdn-always assets, probing enabled"""
+    asset_env.setenv('ENVIRONMENT', 'development')
+    AssetResolver.reset_instance()
+    yield AssetResolver.get_instance()
+    AssetResolver.reset_instance()
+
+
+class TestProbeCache:
+    """Test TTL and negative caching"""
+
+    def test_positive_and_negative_ttl(self, monkeypatch):
+        """Test failures expire sooner than successes"""
+        import lib.asset_probe
+
+        now = [1000.0]
+        monkeypatch.setattr(lib.asset_probe.time, 'monotonic', lambda: now[0])
+        cache = ProbeCache(ttl=60, negative_ttl=5)
+        cache.set('ok', True)
+        cache.set('missing', False)
+
+        now[0] += 10
+        assert cache.get('ok') is True
+        assert cache.get('missing') is None
+
+        now[0] += 60
+        assert cache.get('ok') is None
+
+    def test_bounded(self):
+        """Test the oldest entry is dropped when full"""
+        cache = ProbeCache(maxsize=2)
+        cache.set('a', True)
+        cache.set('b', True)
+        cache.set('c', True)
+        assert len(cache) == 2
+        assert cache.get('a') is None
+
+
+class TestCdnProber:
+    """Test HEAD probing against the stand-in server"""
+
+    def test_reachable_and_missing(self, cdn):
+        """Test status codes map to reachability"""
+        async def run():
+            prober = CdnProber()
+            result = (await prober.is_available(f'{cdn}/ok.png'), await prober.is_available(f'{cdn}/gone.png'))
+            await prober.aclose()
+            return result
+
+        assert asyncio.run(run()) == (True, False)
+
+    def test_unreachable_host_is_negative(self):
+        """Test connection errors count as unreachable"""
+        async def run():
+            return await CdnProber(timeout=0.5).is_available('http://127.0.0.1:9/ok.png')
+
+        assert asyncio.run(run()) is False
+
+    def test_results_are_cached(self, cdn):
+        """Test a second check is served from cache"""
+        async def run():
+            prober = CdnProber()
+            for _ in range(3):
+                await prober.is_available(f'{cdn}/ok.png')
+            await prober.aclose()
+            return prober.requests
+
+        assert asyncio.run(run()) == 1
+
+    def test_concurrent_probes_coalesce(self, cdn):
+        """Test simultaneous checks of one URL send a single request"""
+        async def run():
+            prober = CdnProber()
+            results = await asyncio.gather(*(prober.is_available(f'{cdn}/ok.png') for _ in range(20)))
+            await prober.aclose()
+            return results, prober.requests
+
+        results, requests = asyncio.run(run())
+        assert all(results)
+        assert requests == 1
+
+    def test_connections_are_pooled(self, cdn):
+        """Test sequential probes reuse one keep-alive connection"""
+        async def run():
+            prober = CdnProber(concurrency=1)
+            await prober.probe_many(f'{cdn}/ok{i}.png' for i in range(5))
+            await prober.aclose()
+
+        asyncio.run(run())
+        assert len(StandInCdn.requests) == 5
+        assert len({client for _, client in StandInCdn.requests}) == 1
+
+    def test_concurrency_limit(self, cdn):
+        """Test no more than `concurrency` probes are in flight"""
+        async def run():
+            prober = CdnProber(concurrency=3)
+            in_flight = peak = 0
+            original = prober._pool.head
+
+            async def tracked(url):
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                try:
+                    await asyncio.sleep(0.01)
+                    return await original(url)
+                finally:
+                    in_flight -= 1
+
+            prober._pool.head = tracked
+            await prober.probe_many(f'{cdn}/ok{i}.png' for i in range(12))
+            await prober.aclose()
+            return peak
+
+        assert asyncio.run(run()) == 3
+
+    def test_rejects_non_positive_concurrency(self):
+        """Test invalid concurrency is rejected"""
+        with pytest.raises(ValueError):
+            CdnProber(concurrency=0)
+
+
+class TestAsyncResolution:
+    """Test the async resolver API"""
+
+    def test_without_probing_matches_sync(self, dev_resolver):
+        """Test aget_asset_url equals get_asset_url when probing is off"""
+        url = asyncio.run(aget_asset_url('/media/logo.png', 'https://cdn.example.com/logo.png', 'cdn-always'))
+        assert url == 'https://cdn.example.com/logo.png'
+
+    def test_missing_cdn_object_falls_back_to_local(self, cdn, dev_resolver):
+        """Test a 404 on the CDN serves the local path instead"""
+        dev_resolver.enable_cdn_probing()
+
+        async def run():
+            return (
+                await aget_asset_url('/media/ok.png', f'{cdn}/ok.png', 'cdn-always'),
+                await aget_asset_url('/media/gone.png', f'{cdn}/gone.png', 'cdn-always'),
+            )
+
+        assert asyncio.run(run()) == (f'{cdn}/ok.png', '/media/gone.png')
+
+    def test_local_resolution_skips_probe(self, cdn, dev_resolver):
+        """Test assets resolved locally are never probed"""
+        dev_resolver.enable_cdn_probing()
+        url = asyncio.run(aget_asset_url('/media/ok.png', f'{cdn}/ok.png'))
+
+        assert url == '/media/ok.png'
+        assert StandInCdn.requests == []
+
+    def test_fingerprinted_urls_are_probed(self, cdn, dev_resolver, monkeypatch):
+        """Test resolved CDN URLs that differ from the manifest cdn_url are still probed"""
+        monkeypatch.setenv('ASSET_FINGERPRINT', 'query')
+        dev_resolver.reload_config()
+        dev_resolver.register_fingerprints({f'{cdn}/ok.png': 'a' * 64, f'{cdn}/gone.png': 'b' * 64})
+        prober = dev_resolver.enable_cdn_probing()
+
+        index = AssetIndex.from_manifest({'assets': [{'path': 'public/media/ok.png', 'cdn_url': f'{cdn}/ok.png'}]})
+
+        async def run():
+            ok = await aget_asset_url('/media/ok.png', f'{cdn}/ok.png', 'cdn-always')
+            gone = await dev_resolver.aresolve_many([('/media/gone.png', f'{cdn}/gone.png', 'cdn-always')])
+            prober.cache.clear()
+            return ok, gone, await dev_resolver.awarm_cdn_probes(index)
+
+        assert asyncio.run(run()) == (f'{cdn}/ok.png?v=aaaaaaaaaaaa', ['/media/gone.png'], 1)
+        assert sorted(set(path for path, _ in StandInCdn.requests)) == ['/gone.png?v=bbbbbbbbbbbb', '/ok.png?v=aaaaaaaaaaaa']
+        assert prober.cache.get(f'{cdn}/ok.png?v=aaaaaaaaaaaa') is True
+
+    def test_async_batch_probes_distinct_urls(self, cdn, dev_resolver):
+        """Test async batch resolution probes each CDN URL once"""
+        dev_resolver.enable_cdn_probing()
+        configs = [
+            {'local_path': '/media/ok.png', 'cdn_url': f'{cdn}/ok.png', 'env_mode': 'cdn-always'},
+            {'local_path': '/media/gone.png', 'cdn_url': f'{cdn}/gone.png', 'env_mode': 'cdn-always'},
+            {'local_path': '/media/ok.png', 'cdn_url': f'{cdn}/ok.png', 'env_mode': 'cdn-always'},
+            {'local_path': '/media/dev.png', 'cdn_url': f'{cdn}/dev.png'},
+        ]
+
+        urls = asyncio.run(abatch_resolve_assets(configs))
+        assert urls == [f'{cdn}/ok.png', '/media/gone.png', f'{cdn}/ok.png', '/media/dev.png']
+        assert sorted(path for path, _ in StandInCdn.requests) == ['/gone.png', '/ok.png']
+
+    def test_warm_from_manifest(self, cdn, dev_resolver):
+        """Test warming the probe cache from an AssetIndex"""
+        prober = dev_resolver.enable_cdn_probing()
+        index = AssetIndex.from_manifest({'assets': [
+            {'path': 'public/media/ok.png', 'cdn_url': f'{cdn}/ok.png'},
+            {'path': 'public/media/gone.png', 'cdn_url': f'{cdn}/gone.png'},
+            {'path': 'data/private.bin'},
+        ]})
+
+        reachable = asyncio.run(dev_resolver.awarm_cdn_probes(index))
+        assert reachable == 1
+        assert prober.cache.get(f'{cdn}/ok.png') is True
+        assert prober.cache.get(f'{cdn}/gone.png') is False
@@ -0,0 +1,209 @@
+"""
+Test Suite for the Build-Time Asset Reference Rewriter
+
+Run tests:
+    pytest tests/test_asset_rewrite.py -v
+"""
+
+import os
+import random
+
+import pytest
+from lib import asset_rewrite
+from lib.asset_rewrite import WINDOW, main, resolve_reference, rewrite_file, rewrite_stream, rewrite_tree, url_table
+from lib.assets import AssetIndex, AssetResolver
+
+TABLE = {
+    '/media/logo.png': 'https://cdn.example.com/media/logo.png?v=a1b2c3d4e5f6',
+    '/media/hero.jpg': 'https://cdn.example.com/media/hero.jpg',
+    '/fonts/inter.woff2': 'https://cdn.example.com/fonts/inter.woff2',
+    '/media/my logo.svg': 'https://cdn.example.com/media/my%20logo.svg',
+}
+
+PAGE = (
+    '<link rel="preload" href="/fonts/inter.woff2" as="font">\n'
+    '<img src="/media/logo.png" data-src="/media/logo.png" alt="/media/logo.png">\n'
+    "<img SRC='/media/hero.jpg' srcset=\"/media/hero.jpg 1x,\n  /media/missing.jpg 2x, /media/logo.png?x=1 3x\">\n"
+    '<a href=/media/hero.jpg#top>hero</a> <a href="https://example.com/media/hero.jpg">abs</a>\n'
+    '<div style="background: url(\'/media/hero.jpg\')"></div>\n'
+    '<style>@font-face { src: url( "/fonts/inter.woff2" ) }</style>\n'
+    '<video poster="/media/my%20logo.svg"></video>\n'
+)
+
+EXPECTED = (
+    '<link rel="preload" href="https://cdn.example.com/fonts/inter.woff2" as="font">\n'
+    '<img src="https://cdn.example.com/media/logo.png?v=a1b2c3d4e5f6" data-src="/media/logo.png" alt="/media/logo.png">\n'
+    "<img SRC='https://cdn.example.com/media/hero.jpg' srcset=\"https://cdn.example.com/media/hero.jpg 1x,\n"
+    '  /media/missing.jpg 2x, https://cdn.example.com/media/logo.png?v=a1b2c3d4e5f6&x=1 3x">\n'
+    '<a href="https://cdn.example.com/media/hero.jpg#top">hero</a> <a href="https://example.com/media/hero.jpg">abs</a>\n'
+    '<div style="background: url(\'https://cdn.example.com/media/hero.jpg\')"></div>\n'
+    '<style>@font-face { src: url( "https://cdn.example.com/fonts/inter.woff2" ) }</style>\n'
+    '<video poster="https://cdn.example.com/media/my%20logo.svg"></video>\n'
+)
+
+CSS = (
+    '.hero { background: url(/media/hero.jpg) no-repeat; }\n'
+    ".logo { background-image: url('/media/logo.png'); }\n"
+    '.x { background: url(data:image/png;base64,AAAA); } /* href="/media/hero.jpg" */\n'
+)
+
+
+def rewrite(text, kind='html'):
+    return ''.join(output for output, _ in rewrite_stream([text], TABLE, kind))
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+@pytest.fixture
+def build(tmp_path):
+    root = tmp_path / 'build'
+    write(str(root / 'index.html'), PAGE)
+    write(str(root / 'blog' / 'post.htm'), PAGE * 3)
+    write(str(root / 'css' / 'site.css'), CSS)
+    write(str(root / 'js' / 'app.js'), 'fetch("/media/hero.jpg")')
+    return root
+
+
+class TestReferences:
+    """Test which references are rewritten and how"""
+
+    def test_html(self):
+        """Test src, href, srcset, poster, style attributes and <style> blocks"""
+        assert rewrite(PAGE) == EXPECTED
+
+    def test_css(self):
+        """Test url() forms in CSS; attributes are not looked for"""
+        assert rewrite(CSS, 'css') == CSS.replace(
+            'url(/media/hero.jpg)', 'url(https://cdn.example.com/media/hero.jpg)'
+        ).replace("url('/media/logo.png')", "url('https://cdn.example.com/media/logo.png?v=a1b2c3d4e5f6')")
+
+    @pytest.mark.parametrize('reference', ['media/logo.png', '//media/logo.png', '/media/other.png', ''])
+    def test_unresolved_references(self, reference):
+        """Test relative, protocol-relative and unknown references are left alone"""
+        assert resolve_reference(reference, TABLE) is None
+
+    def test_chunk_boundaries(self):
+        """Test streaming in random chunks gives the same output as the whole text"""
+        text = (PAGE + 'x' * 3000) * 50
+        rng = random.Random(7)
+        chunks, at = [], 0
+        while at < len(text):
+            size = rng.choice((1, 7, 100, 5000, 20000))
+            chunks.append(text[at:at + size])
+            at += size
+
+        results = list(rewrite_stream(chunks, TABLE))
+        assert ''.join(output for output, _ in results) == rewrite(text) == (EXPECTED + 'x' * 3000) * 50
+        assert sum(count for _, count in results) == 8 * 50
+
+    def test_unchanged_reference_at_every_split(self):
+        """Test a reference left alone is not rescanned when a chunk ends inside it"""
+        text = PAGE + '<a href="/x?u=url(/media/hero.jpg)">' + 'x' * WINDOW + PAGE
+        whole = rewrite(text)
+
+        for at in range(len(text)):
+            assert ''.join(output for output, _ in rewrite_stream([text[:at], text[at:]], TABLE)) == whole, at
+
+
+class TestFiles:
+    """Test file and tree rewriting"""
+
+    def test_file_preserves_bytes(self, tmp_path):
+        """Test invalid UTF-8 and CRLF line endings survive, and untouched files keep their mtime"""
+        path = tmp_path / 'page.html'
+        path.write_bytes(b'<img src="/media/hero.jpg">\r\n\xff\xfe caf\xc3\xa9\r\n')
+        assert rewrite_file(str(path), str(path), TABLE) == 1
+        assert path.read_bytes() == b'<img src="https://cdn.example.com/media/hero.jpg">\r\n\xff\xfe caf\xc3\xa9\r\n'
+
+        os.utime(path, ns=(1, 1))
+        assert rewrite_file(str(path), str(path), TABLE) == 0
+        assert os.stat(path).st_mtime_ns == 1
+
+    def test_tree_to_output_directory(self, build, tmp_path):
+        """Test HTML/CSS are rewritten, other files copied, and a second run skips everything"""
+        dest = tmp_path / 'dist'
+        stats = rewrite_tree(str(build), TABLE, str(dest))
+
+        assert (stats.rewritten, stats.copied, stats.skipped, stats.errors) == (3, 1, 0, [])
+        assert stats.references == 8 * 4 + 2
+        assert read(str(dest / 'blog' / 'post.htm')) == EXPECTED * 3
+        assert read(str(dest / 'js' / 'app.js')) == 'fetch("/media/hero.jpg")'
+        assert read(str(build / 'index.html')) == PAGE
+
+        assert rewrite_tree(str(build), TABLE, str(dest)).skipped == 4
+
+    def test_incremental(self, build, tmp_path):
+        """Test only changed files, or all pages after a URL table change, are redone"""
+        dest = tmp_path / 'dist'
+        rewrite_tree(str(build), TABLE, str(dest))
+
+        write(str(build / 'index.html'), '<img src="/media/logo.png">')
+        stats = rewrite_tree(str(build), TABLE, str(dest))
+        assert (stats.rewritten, stats.skipped) == (1, 3)
+
+        table = dict(TABLE, **{'/media/hero.jpg': 'https://cdn-b.example.com/media/hero.jpg'})
+        stats = rewrite_tree(str(build), table, str(dest))
+        assert (stats.rewritten, stats.copied, stats.skipped) == (3, 0, 1)
+        assert 'https://cdn-b.example.com/media/hero.jpg' in read(str(dest / 'css' / 'site.css'))
+
+    def test_in_place(self, build):
+        """Test in-place rewriting, skipped on the next run"""
+        stats = rewrite_tree(str(build), TABLE)
+
+        assert (stats.rewritten, stats.copied) == (3, 0)
+        assert read(str(build / 'index.html')) == EXPECTED
+        assert rewrite_tree(str(build), TABLE).skipped == 3
+
+    def test_process_pool(self, build, tmp_path, monkeypatch):
+        """Test the parallel path gives the same output"""
+        monkeypatch.setattr(asset_rewrite, 'POOL_THRESHOLD', 0)
+        stats = rewrite_tree(str(build), TABLE, str(tmp_path / 'dist'), cache=False, workers=2)
+
+        assert (stats.rewritten, stats.references) == (3, 34)
+        assert read(str(tmp_path / 'dist' / 'index.html')) == EXPECTED
+
+
+class TestManifest:
+    """Test URL tables follow the resolver rules"""
+
+    @pytest.fixture
+    def manifest(self, tmp_path, monkeypatch):
+        monkeypatch.delenv('ASSET_MODE', raising=False)
+        monkeypatch.delenv('ASSET_FINGERPRINT', raising=False)
+        monkeypatch.delenv('ASSET_CDN_HOSTS', raising=False)
+        AssetResolver.reset_instance()
+        path = tmp_path / '.r2-manifest.yml'
+        path.write_text(
+            'project: demo\nversion: "1.1"\nassets:\n'
+            '  - path: public/media/hero.jpg\n    cdn_url: https://cdn.example.com/media/hero.jpg\n'
+            '  - path: public/media/icon.svg\n    cdn_url: https://cdn.example.com/media/icon.svg\n'
+            '    env_mode: local-always\n'
+        )
+        yield str(path)
+        AssetResolver.reset_instance()
+
+    def test_table_by_environment(self, manifest, monkeypatch):
+        """Test production resolves to the CDN, development and local-always assets stay local"""
+        monkeypatch.setenv('ENVIRONMENT', 'production')
+        assert url_table(AssetIndex.load(manifest)) == {'/media/hero.jpg': 'https://cdn.example.com/media/hero.jpg'}
+
+        AssetResolver.reset_instance()
+        monkeypatch.setenv('ENVIRONMENT', 'development')
+        assert url_table(AssetIndex.load(manifest)) == {}
+
+    def test_main(self, manifest, build, monkeypatch, capsys):
+        """Test the command line rewrites a build directory in place"""
+        monkeypatch.setenv('ENVIRONMENT', 'production')
+        assert main([str(build), '--manifest', manifest]) == 0
+
+        assert 'url(https://cdn.example.com/media/hero.jpg)' in read(str(build / 'css' / 'site.css'))
+        assert '3 rewritten' in capsys.readouterr().out
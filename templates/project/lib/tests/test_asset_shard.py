@@ -0,0 +1,193 @@
+"""
+Test Suite for CDN Host Sharding and Failover
+
+Run tests:
+    pytest tests/test_asset_shard.py -v
+"""
+
+import tracemalloc
+from collections import Counter
+
+import pytest
+from lib.asset_shard import HostPool
+from lib.assets import AssetIndex, ConfigWatcher, ResolverConfig, cdn_origin
+
+HOSTS = [('https://cdn-a.example.com', 2.0), ('https://cdn-b.example.com', 1.0), ('https://cdn-c.example.com', 1.0)]
+KEYS = [f'/media/set{i // 100}/image{i}.jpg' for i in range(4000)]
+
+
+def url(key, origin='https://cdn-a.example.com'):
+    return origin + key
+
+
+def host_of(routed):
+    return routed[:routed.index('/', 8)]
+
+
+class TestHostPool:
+    """Test host selection, weighting and failover"""
+
+    def test_deterministic(self):
+        """Test the same path maps to the same host in every pool instance and from every member origin"""
+        first, second = HostPool(HOSTS), HostPool(list(reversed(HOSTS)))
+
+        for key in KEYS[:200]:
+            routed = first.route(url(key))
+            assert routed == second.route(url(key)) == first.route(url(key, 'https://cdn-c.example.com'))
+            assert routed.endswith(key)
+
+    def test_weights(self):
+        """Test assets spread across hosts in proportion to their weights"""
+        counts = Counter(host_of(HostPool(HOSTS).route(url(key))) for key in KEYS)
+
+        assert counts['https://cdn-a.example.com'] / len(KEYS) == pytest.approx(0.5, abs=0.05)
+        assert counts['https://cdn-b.example.com'] / len(KEYS) == pytest.approx(0.25, abs=0.05)
+        assert counts['https://cdn-c.example.com'] / len(KEYS) == pytest.approx(0.25, abs=0.05)
+
+    def test_failover_moves_only_drained_assets(self):
+        """Test draining a host moves its assets by weight and keeps every other mapping"""
+        pool = HostPool(HOSTS)
+        drained = pool.with_down(['https://cdn-a.example.com'])
+        moved = Counter()
+
+        for key in KEYS:
+            before, after = pool.route(url(key)), drained.route(url(key))
+            if host_of(before) == 'https://cdn-a.example.com':
+                assert host_of(after) == pool.ranking(key)[1]
+                moved[host_of(after)] += 1
+            else:
+                assert after == before
+
+        assert moved['https://cdn-b.example.com'] / sum(moved.values()) == pytest.approx(0.5, abs=0.06)
+
+    def test_all_down_and_foreign_urls(self):
+        """Test URLs stay unchanged when every host is down or they are not on the pool"""
+        pool = HostPool(HOSTS, down=[origin for origin, _ in HOSTS])
+
+        assert pool.route(url('/media/logo.png')) == url('/media/logo.png')
+        assert HostPool(HOSTS).route('https://other.example.com/logo.png') == 'https://other.example.com/logo.png'
+        assert HostPool(HOSTS).route('http://cdn-a.example.com/logo.png') == 'http://cdn-a.example.com/logo.png'
+        assert HostPool(HOSTS).route('/media/logo.png') == '/media/logo.png'
+
+    @pytest.mark.parametrize('hosts', [[], [('https://cdn-a.example.com', 0.0)], HOSTS + HOSTS[:1]])
+    def test_rejects_invalid_pools(self, hosts):
+        """Test empty pools, non-positive weights and duplicate hosts"""
+        with pytest.raises(ValueError):
+            HostPool(hosts)
+
+
+class TestConfig:
+    """Test the pool settings in ResolverConfig"""
+
+    def test_from_env(self):
+        """Test ASSET_CDN_HOSTS weights and ASSET_CDN_DOWN parse, skipping invalid entries"""
+        config = ResolverConfig.from_env({
+            'ASSET_CDN_HOSTS': 'CDN-A.example.com=2, https://cdn-b.example.com/, http://x.example.com, cdn-c.example.com=-1',
+            'ASSET_CDN_DOWN': 'cdn-b.example.com',
+        })
+
+        assert config.cdn_hosts == (('https://cdn-a.example.com', 2.0), ('https://cdn-b.example.com', 1.0))
+        assert config.cdn_down == ('https://cdn-b.example.com',)
+
+    @pytest.mark.parametrize('host', ['', 'http://cdn.example.com', 'cdn.example.com/media'])
+    def test_cdn_origin_rejects(self, host):
+        """Test hosts that are not HTTPS origins"""
+        with pytest.raises(ValueError):
+            cdn_origin(host)
+
+
+class TestResolver:
+    """Test sharded resolution through AssetResolver and AssetIndex"""
+
+    def test_get_asset_url_routes_and_fails_over(self, resolver):
+        """Test CDN URLs follow the pool, and marking a host down re-routes only its assets"""
+        resolver.set_cdn_hosts(dict(HOSTS))
+        pool = HostPool(HOSTS)
+        key = next(key for key in KEYS if host_of(pool.route(url(key))) == 'https://cdn-b.example.com')
+
+        assert resolver.get_asset_url(key, url(key)) == pool.route(url(key))
+
+        assert resolver.mark_cdn_host('cdn-b.example.com', healthy=False)
+        assert not resolver.mark_cdn_host('cdn-b.example.com', healthy=False)
+        assert host_of(resolver.get_asset_url(key, url(key))) == pool.ranking(key)[1]
+
+        assert resolver.mark_cdn_host('cdn-b.example.com', healthy=True)
+        assert resolver.get_asset_url(key, url(key)) == pool.route(url(key))
+
+    def test_cache_hits_build_nothing(self, resolver):
+        """Test cache hits return the routed URL object itself and retain no memory"""
+        resolver.set_cdn_hosts(dict(HOSTS))
+        first = resolver.get_asset_url(KEYS[0], url(KEYS[0]))
+        assert resolver.get_asset_url(KEYS[0], url(KEYS[0])) is first
+
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            for _ in range(10000):
+                resolver.get_asset_url(KEYS[0], url(KEYS[0]))
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        # Only the cache's hit counter may grow (one int object)
+        grown = sum(stat.size_diff for stat in after.compare_to(before, 'filename') if 'assets.py' in str(stat.traceback))
+        assert grown <= 64
+
+    def test_index_routes_then_fingerprints(self, resolver):
+        """Test manifest URLs are routed, fingerprinted, and agree with get_asset_url"""
+        resolver.apply_config(ResolverConfig('production', fingerprint='query', cdn_hosts=tuple(HOSTS)))
+        index = AssetIndex.from_manifest({'assets': [
+            {'path': f'public{key}', 'cdn_url': url(key), 'sha256': f'{i:012x}'.ljust(64, '0'), 'type': 'media'}
+            for i, key in enumerate(KEYS[:100])
+        ]})
+
+        pool = HostPool(HOSTS)
+        for i, key in enumerate(KEYS[:100]):
+            expected = f'{pool.route(url(key))}?v={i:012x}'
+            assert index[f'public{key}'] == expected
+            assert resolver.get_asset_url(key, url(key)) == expected
+        assert len({host_of(index[f'public{key}']) for key in KEYS[:100]}) == 3
+
+    def test_drain_via_override_file(self, resolver, tmp_path, monkeypatch):
+        """Test ASSET_CDN_DOWN in a watched override file drains a host without a restart"""
+        monkeypatch.setenv('ASSET_CDN_HOSTS', 'cdn-a.example.com=2,cdn-b.example.com,cdn-c.example.com')
+        override = tmp_path / 'assets.env'
+        watcher = ConfigWatcher(str(override), resolver=resolver)
+        watcher.reload()
+
+        routed = [resolver.get_asset_url(key, url(key)) for key in KEYS[:300]]
+        assert any(host_of(u) == 'https://cdn-c.example.com' for u in routed)
+
+        override.write_text('ASSET_CDN_DOWN=cdn-c.example.com\n')
+        assert watcher.reload()
+        assert all(host_of(resolver.get_asset_url(key, url(key))) != 'https://cdn-c.example.com' for key in KEYS[:300])
+
+    def test_runtime_changes_survive_watcher(self, resolver, tmp_path):
+        """Test a pool and drain set at runtime outlive ConfigWatcher reloads that do not touch them"""
+        resolver.set_cdn_hosts(dict(HOSTS))
+        resolver.mark_cdn_host('cdn-b.example.com', healthy=False)
+        drained = resolver.config
+        override = tmp_path / 'assets.env'
+        watcher = ConfigWatcher(str(override), resolver=resolver).start()
+        try:
+            assert resolver.config == drained
+
+            override.write_text('ASSET_FINGERPRINT=query\n')
+            assert watcher.check()
+            assert (resolver.config.cdn_hosts, resolver.config.cdn_down) == (drained.cdn_hosts, drained.cdn_down)
+
+            override.write_text('ASSET_FINGERPRINT=query\nASSET_CDN_DOWN=cdn-c.example.com\n')
+            assert watcher.check()
+            assert resolver.config.cdn_down == ('https://cdn-b.example.com', 'https://cdn-c.example.com')
+
+            override.unlink()
+            assert watcher.check()
+            assert resolver.config.cdn_down == ('https://cdn-b.example.com',)
+        finally:
+            watcher.stop()
+
+    def test_batch_matches_single(self, resolver):
+        """Test iter_resolve routes like get_asset_url"""
+        resolver.set_cdn_hosts(dict(HOSTS), down=['cdn-a.example.com'])
+        rows = [(key, url(key)) for key in KEYS[:200]]
+
+        assert list(resolver.iter_resolve(rows)) == [resolver.get_asset_url(*row) for row in rows]
@@ -0,0 +1,190 @@
+"""
+Test Suite for the Shared-Memory Asset Table
+
+Run tests:
+    pytest tests/test_asset_shared.py -v
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from lib.asset_shared import SharedAssetTable, pack_asset_table, shared_table_path
+from lib.assets import AssetIndex, ResolverConfig
+
+
+def make_manifest(count):
+    return {'assets': [
+        {
+            'path': f'public/media/set{i // 100}/image{i}.jpg',
+            'cdn_url': f'https://cdn.example.com/media/set{i // 100}/image{i}.jpg',
+            'sha256': f'{i:064x}',
+            'type': 'media',
+            'dimensions': {'width': 1920, 'height': 1080},
+        }
+        for i in range(count)
+    ]}
+
+
+@pytest.fixture
+def index(resolver):
+    return AssetIndex.from_manifest(make_manifest(5000))
+
+
+class TestTable:
+    """Test lookups and the mapping protocol"""
+
+    def test_matches_index(self, index):
+        """Test every key resolves to the same URL as the index"""
+        with SharedAssetTable.build(index) as table:
+            assert len(table) == len(index)
+            assert all(table[key] == index[key] for key in index)
+            assert list(table) == sorted(index)
+
+    def test_missing_keys(self, index):
+        """Test unknown, non-string and unencodable keys"""
+        with SharedAssetTable.build(index) as table:
+            assert table.get('public/media/missing.jpg') is None
+            assert table.get('public/media/missing.jpg', 'fallback') == 'fallback'
+            assert 'public/media/missing.jpg' not in table
+            assert 42 not in table
+            assert table.get('\ud800') is None
+            with pytest.raises(KeyError):
+                table['public/media/missing.jpg']
+
+    def test_unicode_and_shared_strings(self):
+        """Test non-ASCII keys, and keys whose URL is another key"""
+        urls = {'café.png': '/café.png', '/café.png': 'x', 'a': 'a', '': '/empty'}
+        table = SharedAssetTable(pack_asset_table(urls, ResolverConfig()))
+
+        assert {key: table[key] for key in table} == urls
+
+    def test_named_segment(self, index, tmp_path):
+        """Test a table written to a path is readable by another opener"""
+        path = str(tmp_path / 'assets.table')
+        SharedAssetTable.build(index, path).close()
+
+        with SharedAssetTable.open(path) as table:
+            assert table['public/media/set0/image1.jpg'] == 'https://cdn.example.com/media/set0/image1.jpg'
+        assert shared_table_path('demo').endswith('r2-assets-demo.table')
+
+    def test_config_recorded(self, index, resolver):
+        """Test tables know the config their URLs were resolved with"""
+        with SharedAssetTable.build(index) as table:
+            assert (table.environment, table.asset_mode, table.fingerprint) == ('production', 'auto', 'off')
+            assert table.matches()
+
+            resolver.environment = 'development'
+            assert not table.matches()
+
+    def test_cdn_changes_do_not_match(self, index, resolver):
+        """Test a changed CDN pool or a drained host invalidates the table"""
+        resolver.set_cdn_hosts(['cdn.example.com', 'cdn-b.example.com'])
+        with SharedAssetTable.build(index) as table:
+            assert table.matches()
+
+            resolver.mark_cdn_host('cdn-b.example.com', healthy=False)
+            assert not table.matches()
+
+            resolver.mark_cdn_host('cdn-b.example.com', healthy=True)
+            assert table.matches()
+
+            resolver.set_cdn_hosts(['cdn.example.com'])
+            assert not table.matches()
+
+    @pytest.mark.parametrize('data', [b'', b'R2AS' + b'\x00' * 60, pack_asset_table({'a': 'b'}, ResolverConfig())[:60]])
+    def test_rejects_invalid_buffers(self, data):
+        """Test truncated, foreign and corrupt buffers"""
+        with pytest.raises(ValueError):
+            SharedAssetTable(data)
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# A prefork master in a fresh interpreter (so the only sizeable heap is the
+# asset table): build the index, optionally swap it for a shared table,
+# fork workers that look up every asset and collect garbage as a
+# long-running worker would, and report each worker's memory.
+PREFORK_SCRIPT = """
+import gc, json, os, sys
+from lib.assets import AssetIndex
+from lib.asset_shared import SharedAssetTable
+
+mode, count, workers = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+
+def key(i):
+    return f'public/media/set{i // 100}/image{i}.jpg'
+
+def memory_kb():
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                fields[name] = int(value.split()[0])
+    return {'rss': fields['Rss'], 'private': fields['Private_Clean'] + fields['Private_Dirty']}
+
+assets = AssetIndex.from_manifest({'assets': [
+    {'path': key(i), 'cdn_url': f'https://cdn.example.com/{key(i)}', 'sha256': f'{i:064x}', 'type': 'media'}
+    for i in range(count)
+]})
+if mode == 'on':
+    assets = SharedAssetTable.build(assets)
+gc.collect()
+
+reports = []
+for _ in range(workers):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        for i in range(count):
+            assets.get(key(i))
+        gc.collect()
+        os.write(write_fd, json.dumps(memory_kb()).encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        reports.append(json.loads(f.read()))
+    os.waitpid(pid, 0)
+print(json.dumps(reports))
+"""
+
+
+def worker_memory(mode, count=30_000, workers=2):
+    """Average per-worker RSS and private (unshared) memory in kB"""
+    output = subprocess.run(
+        [sys.executable, '-c', PREFORK_SCRIPT, mode, str(count), str(workers)],
+        cwd=PROJECT_ROOT,
+        env=dict(os.environ, ENVIRONMENT='production'),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    reports = json.loads(output)
+    return {field: sum(report[field] for report in reports) / len(reports) for field in ('rss', 'private')}
+
+
+@pytest.mark.skipif(
+    not hasattr(os, 'fork') or not os.path.exists('/proc/self/smaps_rollup'),
+    reason='needs fork and Linux /proc memory accounting',
+)
+class TestWorkerMemory:
+    """Test per-worker memory with the shared table on and off"""
+
+    def test_workers_share_the_table(self):
+        """
+        Test workers reading the shared table keep it shared
+
+        RSS counts shared pages in every worker, so it barely differs; the
+        private figure is what each additional worker really costs.
+        """
+        off = worker_memory('off')
+        on = worker_memory('on')
+        print(f"\nper worker, off: RSS {off['rss']:.0f} kB, private {off['private']:.0f} kB; "
+              f"on: RSS {on['rss']:.0f} kB, private {on['private']:.0f} kB")
+
+        assert off['private'] - on['private'] > 4096
+        assert on['private'] < off['private'] / 2
@@ -0,0 +1,216 @@
+"""
+Test Suite for Concurrent, Resumable R2 Asset Sync
+
+Runs against the local S3 stand-in in conftest.py, which checks SigV4
+signatures, honours Range requests and can drop connections mid-body.
+
+Run tests:
+    pytest tests/test_asset_sync.py -v
+"""
+
+import dataclasses
+import hashlib
+import os
+
+import pytest
+from lib import asset_verify
+from lib.asset_sync import AssetSyncer, R2Credentials
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_syncer(s3, secret=None, **kwargs):
+    credentials = s3.credentials
+    if secret is not None:
+        credentials = dataclasses.replace(credentials, secret_access_key=secret)
+    return AssetSyncer(credentials, **kwargs)
+
+
+def add_object(s3, key, data):
+    s3.objects['/' + key] = data
+    return {'path': f'data/{key.rsplit("/", 1)[-1]}', 'r2_key': key, 'size': len(data), 'sha256': sha256(data)}
+
+
+def statuses(results):
+    return {result.path: result.status for result in results}
+
+
+class TestCredentials:
+    """Test credential loading"""
+
+    def test_from_env(self):
+        """Test account id expansion and missing keys"""
+        creds = R2Credentials.from_env({
+            'R2_ACCOUNT_ID': 'abc', 'R2_ACCESS_KEY_ID': 'id', 'R2_SECRET_ACCESS_KEY': 'secret',
+        })
+        assert creds.endpoint == 'https://abc.r2.cloudflarestorage.com'
+
+        with pytest.raises(ValueError):
+            R2Credentials.from_env({'R2_ACCOUNT_ID': 'abc'})
+
+
+class TestSync:
+    """Test downloading manifest assets"""
+
+    def test_downloads_missing_then_up_to_date(self, s3, tmp_path):
+        """Test missing files are fetched, verified and cached; a rerun sends no requests"""
+        entries = [add_object(s3, f'bucket/file{i}.bin', os.urandom(5000 + i)) for i in range(6)]
+
+        with make_syncer(s3, concurrency=4) as syncer:
+            results = list(syncer.sync(entries, str(tmp_path)))
+            assert set(statuses(results).values()) == {'downloaded'}
+            assert syncer.connections_opened <= 4
+
+        for entry in entries:
+            assert sha256((tmp_path / entry['path']).read_bytes()) == entry['sha256']
+
+        sent = len(s3.requests)
+        with make_syncer(s3) as syncer:
+            assert set(statuses(syncer.sync(entries, str(tmp_path))).values()) == {'up-to-date'}
+        assert len(s3.requests) == sent
+
+    def test_verifies_without_forking(self, s3, tmp_path, monkeypatch):
+        """Test local files are hashed in threads, never a process pool forked beside download threads"""
+        def no_fork(*args, **kwargs):
+            raise AssertionError('process pool started during sync')
+
+        monkeypatch.setattr(asset_verify, 'POOL_THRESHOLD', 0)
+        monkeypatch.setattr(asset_verify, 'ProcessPoolExecutor', no_fork)
+        entries = [add_object(s3, f'bucket/stale{i}.bin', os.urandom(4096)) for i in range(4)]
+        for entry in entries:
+            (tmp_path / entry['path']).parent.mkdir(exist_ok=True)
+            (tmp_path / entry['path']).write_bytes(b'x' * 4096)
+
+        with make_syncer(s3) as syncer:
+            assert set(statuses(syncer.sync(entries, str(tmp_path))).values()) == {'downloaded'}
+
+    def test_multipart_ranged_parts(self, s3, tmp_path):
+        """Test large objects are fetched as ranged parts and reassembled"""
+        data = os.urandom(300_000)
+        entry = add_object(s3, 'bucket/big.bin', data)
+
+        with make_syncer(s3, concurrency=4, part_size=64 * 1024, multipart_threshold=100_000) as syncer:
+            [result] = syncer.sync([entry], str(tmp_path))
+
+        assert result.status == 'downloaded'
+        assert (tmp_path / 'data/big.bin').read_bytes() == data
+        assert len([r for _, r in s3.requests if r]) == 5
+        assert not os.path.exists(tmp_path / 'data/big.bin.part.state')
+
+    def test_resumes_partial_download(self, s3, tmp_path):
+        """Test an existing .part is kept and only the rest is requested"""
+        data = os.urandom(50_000)
+        entry = add_object(s3, 'bucket/resume.bin', data)
+        (tmp_path / 'data').mkdir()
+        (tmp_path / 'data/resume.bin.part').write_bytes(data[:20_000])
+
+        with make_syncer(s3) as syncer:
+            [result] = syncer.sync([entry], str(tmp_path))
+
+        assert (result.status, result.resumed, result.transferred) == ('downloaded', True, 30_000)
+        assert s3.requests[-1][1] == 'bytes=20000-49999'
+        assert (tmp_path / 'data/resume.bin').read_bytes() == data
+
+    def test_resumes_interrupted_multipart(self, s3, tmp_path):
+        """Test a multipart download that fails midway resumes from its hashed frontier"""
+        data = os.urandom(256 * 1024)
+        entry = add_object(s3, 'bucket/parts.bin', data)
+        options = dict(concurrency=1, part_size=64 * 1024, multipart_threshold=1, retries=0)
+        s3.unavailable_after = 2
+
+        with make_syncer(s3, **options) as syncer:
+            [result] = syncer.sync([entry], str(tmp_path))
+        assert result.status == 'failed'
+        assert (tmp_path / 'data/parts.bin.part.state').read_text() == str(128 * 1024)
+
+        s3.unavailable_after = None
+        with make_syncer(s3, **options) as syncer:
+            [result] = syncer.sync([entry], str(tmp_path))
+        assert (result.status, result.resumed, result.transferred) == ('downloaded', True, 128 * 1024)
+        assert (tmp_path / 'data/parts.bin').read_bytes() == data
+
+    def test_recovers_preallocated_part_without_state(self, s3, tmp_path):
+        """Test a multipart run stopped before its first state write restarts from zero"""
+        data = os.urandom(300_000)
+        entry = add_object(s3, 'bucket/prealloc.bin', data)
+        (tmp_path / 'data').mkdir()
+        (tmp_path / 'data/prealloc.bin.part').write_bytes(bytes(len(data)))
+
+        with make_syncer(s3, part_size=64 * 1024, multipart_threshold=100_000) as syncer:
+            [result] = syncer.sync([entry], str(tmp_path))
+
+        assert (result.status, result.resumed) == ('downloaded', False)
+        assert 'bytes=0-65535' in {r for _, r in s3.requests}
+        assert (tmp_path / 'data/prealloc.bin').read_bytes() == data
+
+    def test_completed_part_is_not_requested_again(self, s3, tmp_path):
+        """Test a part hashed to the end before a stop is finished without a request"""
+        data = os.urandom(300_000)
+        entry = add_object(s3, 'bucket/done.bin', data)
+        (tmp_path / 'data').mkdir()
+        (tmp_path / 'data/done.bin.part').write_bytes(data)
+        (tmp_path / 'data/done.bin.part.state').write_text(str(len(data)))
+
+        with make_syncer(s3, multipart_threshold=100_000) as syncer:
+            [result] = syncer.sync([entry], str(tmp_path))
+
+        assert (result.status, result.transferred) == ('downloaded', 0)
+        assert s3.requests == []
+        assert (tmp_path / 'data/done.bin').read_bytes() == data
+
+    def test_retries_dropped_connection(self, s3, tmp_path):
+        """Test a connection dropped mid-body is retried from where it stopped"""
+        data = os.urandom(40_000)
+        entry = add_object(s3, 'bucket/flaky.bin', data)
+        s3.drop_after['/bucket/flaky.bin'] = 15_000
+
+        with make_syncer(s3) as syncer:
+            [result] = syncer.sync([entry], str(tmp_path))
+
+        assert result.status == 'downloaded'
+        assert (tmp_path / 'data/flaky.bin').read_bytes() == data
+        assert s3.requests[-1][1].startswith('bytes=15000-')
+
+    def test_hash_mismatch_discards_download(self, s3, tmp_path):
+        """Test corrupt content never replaces the destination"""
+        entry = add_object(s3, 'bucket/bad.bin', b'actual')
+        entry['sha256'] = sha256(b'expect')
+
+        with make_syncer(s3) as syncer:
+            [result] = syncer.sync([entry], str(tmp_path))
+
+        assert result.status == 'hash-mismatch'
+        assert not os.listdir(tmp_path / 'data')
+
+    def test_http_errors_fail_without_retry(self, s3, tmp_path):
+        """Test 404 and bad signatures are reported as failures"""
+        missing = {'path': 'data/gone.bin', 'r2_key': 'bucket/gone.bin', 'size': 1, 'sha256': sha256(b'x')}
+        signed = add_object(s3, 'bucket/ok.bin', b'ok')
+
+        with make_syncer(s3) as syncer:
+            [result] = syncer.sync([missing], str(tmp_path))
+        assert result.status == 'failed' and 'HTTP 404' in result.error
+        assert len(s3.requests) == 1
+
+        with make_syncer(s3, secret='wrong') as syncer:
+            [result] = syncer.sync([signed], str(tmp_path))
+        assert result.status == 'failed' and 'HTTP 403' in result.error
+
+    def test_respects_sync_field(self, s3, tmp_path):
+        """Test manual and cdn-only entries are skipped; library copies avoid R2"""
+        library = tmp_path / 'library.bin'
+        library.write_bytes(b'library')
+        entries = [
+            {'path': 'data/manual.bin', 'r2_key': 'bucket/manual.bin', 'size': 1, 'sha256': sha256(b'm'), 'sync': False},
+            {'path': 'data/cdn.bin', 'r2_key': 'bucket/cdn.bin', 'size': 1, 'sha256': sha256(b'c'), 'sync': 'cdn-only'},
+            {
+                'path': 'data/lib.bin', 'r2_key': 'bucket/lib.bin', 'size': 7, 'sha256': sha256(b'library'),
+                'sync': 'copy-from-library', 'source': str(library),
+            },
+        ]
+
+        with make_syncer(s3) as syncer:
+            assert statuses(syncer.sync(entries, str(tmp_path))) == {'data/lib.bin': 'downloaded'}
+        assert s3.requests == []
@@ -0,0 +1,166 @@
+"""
+Test Suite for Precompressed and Modern-Format Variant Selection
+
+Run tests:
+    pytest tests/test_asset_variants.py -v
+"""
+
+import pytest
+from lib.asset_variants import AVIF, BR, GZIP, WEBP, VariantIndex, accept_signature
+from lib.assets import AssetIndex, get_asset_url
+
+CHROME_ACCEPT = 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8'
+OLD_SAFARI_ACCEPT = 'image/webp,image/png,image/svg+xml,image/*;q=0.8,*/*;q=0.5'
+BROWSER_ENCODING = 'gzip, deflate, br'
+
+SIZES = {
+    'media/hero.jpg': 100_000,
+    'media/hero.webp': 60_000,
+    'media/hero.avif': 40_000,
+    'media/logo.png': 2_000,
+    'media/logo.webp': 3_000,
+    'css/app.css': 50_000,
+    'css/app.css.br': 10_000,
+    'css/app.css.gz': 12_000,
+    'js/app.js': 80_000,
+    'js/app.js.gz': 20_000,
+}
+
+
+def manifest():
+    return {'assets': [
+        {'path': f'public/{path}', 'cdn_url': f'https://cdn.example.com/{path}', 'size': size}
+        for path, size in SIZES.items()
+    ]}
+
+
+def cdn(path):
+    return f'https://cdn.example.com/{path}'
+
+
+@pytest.fixture
+def resolver(resolver):
+    resolver.set_variants(VariantIndex.from_index(AssetIndex.from_manifest(manifest())))
+    return resolver
+
+
+class TestSignature:
+    """Test reducing request headers to variant bits"""
+
+    @pytest.mark.parametrize('accept, accept_encoding, expected', [
+        (CHROME_ACCEPT, BROWSER_ENCODING, AVIF | WEBP | BR | GZIP),
+        (OLD_SAFARI_ACCEPT, 'gzip, deflate', WEBP | GZIP),
+        ('*/*', 'identity', 0),
+        ('image/avif;q=0, image/webp', 'br;q=0, *', WEBP | GZIP),
+        ('IMAGE/AVIF', 'X-GZIP', AVIF | GZIP),
+        ('image/webp;q=oops', '*;q=0, br', BR),
+        (None, None, 0),
+    ])
+    def test_headers(self, accept, accept_encoding, expected):
+        """Test explicit formats, q-values, wildcards and malformed parameters"""
+        assert accept_signature(accept, accept_encoding) == expected
+
+
+class TestVariantIndex:
+    """Test grouping files into originals and variants"""
+
+    def test_from_manifest(self):
+        """Test siblings are grouped and orphans ignored"""
+        variants = VariantIndex.from_files([
+            ('/media/hero.jpg', cdn('media/hero.jpg'), 100),
+            ('/media/hero.avif', cdn('media/hero.avif'), 40),
+            ('/media/HERO.webp', None, 60),
+            ('/media/orphan.avif', None, 1),
+            ('/media/orphan.png.br', None, 1),
+        ])
+
+        assert len(variants) == 1
+        assert '/media/orphan.avif' not in variants
+        assert [v.local_path for v in variants.variants('/media/hero.jpg')] == ['/media/hero.avif', '/media/HERO.webp']
+
+    def test_choose_smallest(self):
+        """Test the smallest accepted variant wins, and the original when it is smallest"""
+        variants = VariantIndex.from_index(AssetIndex.from_manifest(manifest()))
+
+        assert variants.choose('/media/hero.jpg', AVIF | WEBP).local_path == '/media/hero.avif'
+        assert variants.choose('/media/hero.jpg', WEBP).local_path == '/media/hero.webp'
+        assert variants.choose('/media/hero.jpg', BR | GZIP) is None
+        assert variants.choose('/media/logo.png', WEBP) is None
+        assert variants.choose('/css/app.css', BR | GZIP).encoding == 'br'
+        assert variants.choose('/css/app.css', GZIP).encoding == 'gzip'
+
+    def test_unknown_sizes_prefer_modern(self):
+        """Test variants win by rank when sizes are unknown"""
+        variants = VariantIndex.from_files([('/a.css', None, 0), ('/a.css.gz', None, 0), ('/a.css.br', None, 0)])
+
+        assert variants.choose('/a.css', BR | GZIP).encoding == 'br'
+
+    def test_scan(self, tmp_path):
+        """Test a directory scan finds variants with their sizes"""
+        (tmp_path / 'css').mkdir()
+        (tmp_path / 'css' / 'app.css').write_bytes(b'x' * 1000)
+        (tmp_path / 'css' / 'app.css.br').write_bytes(b'x' * 100)
+
+        variants = VariantIndex.scan(str(tmp_path), url_prefix='/static')
+        variant = variants.choose('/static/css/app.css', BR)
+
+        assert (variant.local_path, variant.cdn_url, variant.size) == ('/static/css/app.css.br', None, 100)
+
+
+class TestResolver:
+    """Test variant selection through get_asset_url"""
+
+    @pytest.mark.parametrize('path, accept, accept_encoding, expected', [
+        ('media/hero.jpg', CHROME_ACCEPT, BROWSER_ENCODING, 'media/hero.avif'),
+        ('media/hero.jpg', OLD_SAFARI_ACCEPT, BROWSER_ENCODING, 'media/hero.webp'),
+        ('media/hero.jpg', '*/*', BROWSER_ENCODING, 'media/hero.jpg'),
+        ('css/app.css', 'text/css,*/*;q=0.1', BROWSER_ENCODING, 'css/app.css.br'),
+        ('css/app.css', 'text/css,*/*;q=0.1', 'gzip', 'css/app.css.gz'),
+        ('js/app.js', '*/*', BROWSER_ENCODING, 'js/app.js.gz'),
+        ('js/app.js', '*/*', 'identity', 'js/app.js'),
+    ])
+    def test_negotiates(self, resolver, path, accept, accept_encoding, expected):
+        """Test the smallest acceptable variant is returned"""
+        url = resolver.get_asset_url(f'/{path}', cdn(path), accept=accept, accept_encoding=accept_encoding)
+
+        assert url == cdn(expected)
+
+    def test_without_headers_unchanged(self, resolver):
+        """Test calls without headers, or with no variant index, return the original"""
+        assert get_asset_url('/css/app.css', cdn('css/app.css')) == cdn('css/app.css')
+
+        resolver.set_variants(None)
+        assert get_asset_url('/css/app.css', cdn('css/app.css'), accept_encoding='br') == cdn('css/app.css')
+
+    def test_cached_per_signature(self, resolver):
+        """Test headers with the same signature share one cached result"""
+        first = resolver.get_asset_url('/media/hero.jpg', cdn('media/hero.jpg'), accept=CHROME_ACCEPT)
+        again = resolver.get_asset_url(
+            '/media/hero.jpg', cdn('media/hero.jpg'), accept='image/avif,image/webp,*/*', accept_encoding='identity'
+        )
+
+        assert again is first
+        assert resolver._state.negotiated.info().hits == 1
+
+    def test_local_variants_in_development(self, resolver):
+        """Test local resolution picks local variants, and a config change re-negotiates"""
+        resolver.environment = 'development'
+        assert get_asset_url('/css/app.css', cdn('css/app.css'), accept_encoding='br') == '/css/app.css.br'
+
+        resolver.environment = 'production'
+        assert get_asset_url('/css/app.css', cdn('css/app.css'), accept_encoding='br') == cdn('css/app.css.br')
+
+    def test_cdn_needs_cdn_variant(self, resolver):
+        """Test variants found only on disk are not used for CDN URLs"""
+        resolver.set_variants(VariantIndex.from_files([('/a.css', None, 100), ('/a.css.br', None, 10)]))
+
+        assert get_asset_url('/a.css', cdn('a.css'), accept_encoding='br') == cdn('a.css')
+        assert get_asset_url('/a.css', cdn('a.css'), 'local-always', accept_encoding='br') == '/a.css.br'
+
+    def test_routed_like_originals(self, resolver):
+        """Test variant CDN URLs are fingerprinted and sharded like any CDN URL"""
+        resolver.set_cdn_hosts(['cdn.example.com', 'cdn-b.example.com'])
+        url = get_asset_url('/media/hero.jpg', cdn('media/hero.jpg'), accept=CHROME_ACCEPT)
+
+        assert url.endswith('/media/hero.avif')
+        assert url == resolver.get_asset_url('/media/hero.avif', cdn('media/hero.avif'))
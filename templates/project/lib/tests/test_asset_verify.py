@@ -0,0 +1,171 @@
+"""
+Test Suite for Manifest Asset Verification
+
+Run tests:
+    pytest tests/test_asset_verify.py -v
+"""
+
+import hashlib
+import os
+
+import pytest
+from lib import asset_verify
+from lib.asset_verify import (
+    DigestCache,
+    digest_cache_path_for,
+    hash_file,
+    hash_files,
+    main,
+    verify_assets,
+)
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A project with a manifest describing good, corrupt, short and missing files"""
+    files = {
+        'data/good.bin': b'g' * 5000,
+        'data/corrupt.bin': b'c' * 100,
+        'data/short.bin': b's' * 10,
+    }
+    for path, data in files.items():
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_bytes(data)
+
+    entries = [
+        {'path': 'data/good.bin', 'size': 5000, 'sha256': sha256(b'g' * 5000)},
+        {'path': 'data/corrupt.bin', 'size': 100, 'sha256': sha256(b'x' * 100)},
+        {'path': 'data/short.bin', 'size': 20, 'sha256': sha256(b's' * 20)},
+        {'path': 'data/missing.bin', 'size': 1, 'sha256': sha256(b'm')},
+        {'path': 'public/hero.jpg', 'size': 1, 'sha256': sha256(b'h'), 'sync': 'cdn-only'},
+    ]
+    return tmp_path, entries
+
+
+def statuses(results):
+    return {result.path: result.status for result in results}
+
+
+class TestHashFile:
+    """Test file hashing"""
+
+    @pytest.mark.parametrize('size', [0, 1, 100_000])
+    def test_buffered_and_mmap_agree(self, tmp_path, monkeypatch, size):
+        """Test both read strategies produce the hashlib digest"""
+        path = tmp_path / 'blob'
+        data = os.urandom(size)
+        path.write_bytes(data)
+
+        assert hash_file(str(path), chunk_size=4096) == sha256(data)
+        monkeypatch.setattr(asset_verify, 'MMAP_THRESHOLD', 1)
+        assert hash_file(str(path), chunk_size=4096) == sha256(data)
+
+
+class TestVerifyAssets:
+    """Test verification results"""
+
+    def test_reports_each_failure_kind(self, project):
+        """Test ok, hash mismatch, size mismatch and missing are distinguished"""
+        root, entries = project
+
+        assert statuses(verify_assets(entries, str(root), cache=False)) == {
+            'data/good.bin': 'ok',
+            'data/corrupt.bin': 'hash-mismatch',
+            'data/short.bin': 'size-mismatch',
+            'data/missing.bin': 'missing',
+        }
+
+    def test_size_checked_before_hashing(self, project, monkeypatch):
+        """Test size mismatches and missing files are yielded without hashing anything"""
+        root, entries = project
+        hashed = []
+        monkeypatch.setattr(asset_verify, '_try_hash', lambda path: hashed.append(path) or None)
+
+        results = verify_assets(entries, str(root), cache=False)
+        first_two = [next(results), next(results)]
+
+        assert {r.status for r in first_two} == {'size-mismatch', 'missing'}
+        assert hashed == []
+        results.close()
+
+    @pytest.mark.parametrize('threshold, processes', [(None, True), (0, True), (0, False)])
+    def test_hash_files(self, tmp_path, monkeypatch, threshold, processes):
+        """Test in-process, process pool and thread pool hashing agree, with unreadable files as None"""
+        if threshold is not None:
+            monkeypatch.setattr(asset_verify, 'POOL_THRESHOLD', threshold)
+        files = {f'f{i}.bin': os.urandom(1000 + i) for i in range(4)}
+        for name, data in files.items():
+            (tmp_path / name).write_bytes(data)
+
+        digests = dict(hash_files([*files, 'missing.bin'], str(tmp_path), workers=2, processes=processes))
+        assert digests == {**{name: sha256(data) for name, data in files.items()}, 'missing.bin': None}
+
+    def test_process_pool(self, project, monkeypatch):
+        """Test the process pool path gives the same results"""
+        root, entries = project
+        monkeypatch.setattr(asset_verify, 'POOL_THRESHOLD', 0)
+
+        results = statuses(verify_assets(entries, str(root), workers=2, cache=False))
+        assert results['data/good.bin'] == 'ok'
+        assert results['data/corrupt.bin'] == 'hash-mismatch'
+
+    def test_cache_skips_unchanged_files(self, project, monkeypatch):
+        """Test a second run serves digests from the cache"""
+        root, entries = project
+        cache_path = str(root / '.r2-manifest.digests')
+
+        list(verify_assets(entries, str(root), cache=DigestCache(cache_path)))
+        monkeypatch.setattr(asset_verify, '_try_hash', lambda path: pytest.fail(f're-hashed {path}'))
+
+        results = {r.path: r for r in verify_assets(entries, str(root), cache=DigestCache(cache_path))}
+        assert results['data/good.bin'].cached and results['data/good.bin'].ok
+        assert results['data/corrupt.bin'].cached and results['data/corrupt.bin'].status == 'hash-mismatch'
+
+    def test_cache_invalidated_by_change(self, project):
+        """Test rewriting a file (same size) forces a re-hash"""
+        root, entries = project
+        cache_path = str(root / '.r2-manifest.digests')
+        list(verify_assets(entries, str(root), cache=DigestCache(cache_path)))
+
+        good = root / 'data/good.bin'
+        good.write_bytes(b'G' * 5000)
+        os.utime(good, ns=(0, os.stat(good).st_mtime_ns + 1_000_000))
+
+        result = next(r for r in verify_assets(entries, str(root), cache=DigestCache(cache_path)) if r.path == 'data/good.bin')
+        assert not result.cached
+        assert result.status == 'hash-mismatch'
+
+    def test_corrupt_cache_is_ignored(self, project):
+        """Test an unreadable cache file only costs a re-hash"""
+        root, entries = project
+        cache_path = root / '.r2-manifest.digests'
+        cache_path.write_bytes(b'\xff\xfe garbage')
+
+        assert len(DigestCache(str(cache_path))) == 0
+        assert statuses(verify_assets(entries, str(root), cache=DigestCache(str(cache_path))))['data/good.bin'] == 'ok'
+
+    def test_loads_manifest_file(self, project):
+        """Test a manifest path is parsed and its directory used as root"""
+        root, entries = project
+        yaml = pytest.importorskip('yaml')
+        manifest = root / '.r2-manifest.yml'
+        manifest.write_text(yaml.safe_dump({'project': 'demo', 'assets': entries}))
+
+        assert statuses(verify_assets(str(manifest)))['data/good.bin'] == 'ok'
+        assert os.path.exists(digest_cache_path_for(str(manifest)))
+
+    def test_cli_exit_code(self, project, capsys):
+        """Test the CLI prints failures and exits non-zero"""
+        root, entries = project
+        yaml = pytest.importorskip('yaml')
+        manifest = root / '.r2-manifest.yml'
+        manifest.write_text(yaml.safe_dump({'assets': entries[:1]}))
+        assert main([str(manifest), '--quiet']) == 0
+
+        manifest.write_text(yaml.safe_dump({'assets': entries}))
+        assert main([str(manifest), '--quiet']) == 1
+        assert 'size-mismatch: data/short.bin' in capsys.readouterr().out
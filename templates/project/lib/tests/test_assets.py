@@ -17,11 +17,28 @@ Run tests:
 
 import os
 import pytest
+from lib import assets as assets_module
 from lib.assets import (
+    AssetIndex,
     AssetMode,
+    AssetRecord,
     AssetResolver,
+    AssetSnapshot,
+    Breakpoints,
+    ConfigWatcher,
+    ResolutionCache,
+    ResolverConfig,
+    WarningRateLimiter,
     get_asset_url,
+    get_responsive_image,
     batch_resolve_assets,
+    compile_manifest_snapshot,
+    fingerprint_url,
+    read_override_file,
+    resolve_asset_columns,
+    resolve_asset_rows,
+    snapshot_path_for,
+    stream_resolve_assets,
 )
 
 
@@ -57,6 +74,46 @@ class TestAssetResolver:
         instance2 = AssetResolver.get_instance()
         assert instance1 is not instance2
 
+    def test_direct_construction_rejected(self):
+        """Test that the constructor refuses to build a second instance"""
+        AssetResolver.get_instance()
+        with pytest.raises(RuntimeError):
+            AssetResolver()
+
+    def test_concurrent_first_access_builds_once(self, monkeypatch):
+        """Test a cold burst of threads shares one instance without errors"""
+        import threading
+        import time
+
+        constructed = []
+        original = ResolverConfig.from_env
+
+        def slow_from_env(*args, **kwargs):
+            constructed.append(1)
+            time.sleep(0.01)  # widen the race window
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(ResolverConfig, 'from_env', slow_from_env)
+        barrier = threading.Barrier(32)
+        seen, errors = [], []
+
+        def worker():
+            barrier.wait()
+            try:
+                seen.append(AssetResolver.get_instance())
+            except Exception as exc:  # pragma: no cover - surfaced below
+                errors.append(exc)
+
+        threads = [threading.Thread(target=worker) for _ in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(constructed) == 1
+        assert len({id(instance) for instance in seen}) == 1
+
 
 class TestEnvironmentDetection:
     """Test environment detection logic"""
@@ -107,6 +164,211 @@ class TestEnvironmentDetection:
         assert resolver.get_environment() == 'production'
 
 
+class TestResolverConfig:
+    """Test the frozen resolver configuration snapshot"""
+
+    @pytest.fixture(autouse=True)
+    def reset_resolver(self):
+        """Reset singleton before each test"""
+        AssetResolver.reset_instance()
+        yield
+        AssetResolver.reset_instance()
+
+    def test_from_explicit_mapping(self):
+        """Test detection from a mapping instead of os.environ"""
+        config = ResolverConfig.from_env({'PYTHON_ENV': 'prod', 'ASSET_MODE': 'cdn', 'ASSET_CACHE_SIZE': '8'})
+        assert config == ResolverConfig('production', AssetMode.CDN, 8)
+
+    def test_defaults(self):
+        """Test defaults with no variables set"""
+        assert ResolverConfig.from_env({}) == ResolverConfig('development', AssetMode.AUTO, 4096)
+
+    def test_is_immutable(self):
+        """Test the snapshot cannot be mutated in place"""
+        import dataclasses
+
+        config = ResolverConfig.from_env({})
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            config.environment = 'production'
+
+    def test_resolver_exposes_config(self, monkeypatch):
+        """Test the resolver reads environment and mode from its config"""
+        monkeypatch.setenv('ENVIRONMENT', 'test')
+        monkeypatch.setenv('ASSET_MODE', 'local')
+        resolver = AssetResolver.get_instance()
+
+        assert resolver.config.environment == resolver.get_environment() == 'test'
+        assert resolver.config.asset_mode == resolver.get_asset_mode() == AssetMode.LOCAL
+
+    def test_resolvers_are_freed_after_reset(self):
+        """Test repeated resets do not keep old resolvers alive"""
+        import gc
+        import weakref
+
+        # Reference counting alone must free them: no cycles, no class-level caches
+        refs = []
+        gc.disable()
+        try:
+            for _ in range(50):
+                resolver = AssetResolver.get_instance()
+                resolver.get_asset_url('/media/logo.png', 'https://cdn.example.com/logo.png')
+                resolver.get_environment()
+                resolver.get_asset_mode()
+                refs.append(weakref.ref(resolver))
+                del resolver
+                AssetResolver.reset_instance()
+
+            assert [ref for ref in refs if ref() is not None] == []
+        finally:
+            gc.enable()
+
+
+class TestHotReload:
+    """Test config hot reload without restarting"""
+
+    LOGO = ('/media/logo.png', 'https://cdn.example.com/logo.png')
+
+    @pytest.fixture(autouse=True)
+    def setup_prod_env(self, monkeypatch):
+        """Setup production environment"""
+        monkeypatch.setenv('ENVIRONMENT', 'production')
+        monkeypatch.delenv('ASSET_MODE', raising=False)
+        AssetResolver.reset_instance()
+        yield
+        AssetResolver.reset_instance()
+
+    def test_read_override_file(self, tmp_path):
+        """Test .env-style parsing keeps only known keys"""
+        path = tmp_path / 'asset-mode.env'
+        path.write_text('# incident\nexport ASSET_MODE="local"\nSECRET=nope\n\nENVIRONMENT=prod\n')
+
+        assert read_override_file(str(path)) == {'ASSET_MODE': 'local', 'ENVIRONMENT': 'prod'}
+        assert read_override_file(str(tmp_path / 'missing.env')) == {}
+
+    def test_reload_config_swaps_config_and_cache(self):
+        """Test a changed environment swaps config and empties the cache"""
+        resolver = AssetResolver.get_instance()
+        assert resolver.get_asset_url(*self.LOGO) == self.LOGO[1]
+
+        assert resolver.reload_config({'ENVIRONMENT': 'production', 'ASSET_MODE': 'local'})
+        assert resolver.cache_info().currsize == 0
+        assert resolver.get_asset_url(*self.LOGO) == self.LOGO[0]
+        assert not resolver.reload_config({'ENVIRONMENT': 'production', 'ASSET_MODE': 'local'})
+
+    def test_watcher_applies_file_changes(self, tmp_path):
+        """Test editing and removing the override file flips the fleet and back"""
+        path = tmp_path / 'asset-mode.env'
+        watcher = ConfigWatcher(str(path))
+        resolver = AssetResolver.get_instance()
+
+        path.write_text('ASSET_MODE=local\n')
+        assert watcher.check()
+        assert resolver.get_asset_url(*self.LOGO) == self.LOGO[0]
+        assert not watcher.check()
+
+        path.unlink()
+        assert watcher.check()
+        assert resolver.get_asset_url(*self.LOGO) == self.LOGO[1]
+
+        stats = watcher.stats()
+        assert stats.reloads == 2
+        assert stats.last_latency is not None and stats.last_latency >= 0
+        assert stats.max_latency >= stats.last_latency
+
+    def test_watcher_thread_polls(self, tmp_path):
+        """Test the background thread picks up a change"""
+        import time
+
+        path = tmp_path / 'asset-mode.env'
+        reloaded = []
+        watcher = ConfigWatcher(str(path), interval=0.01, on_reload=reloaded.append).start()
+        try:
+            path.write_text('ASSET_MODE=local\n')
+            deadline = time.monotonic() + 5
+            while not reloaded and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            watcher.stop()
+
+        assert reloaded and reloaded[-1].asset_mode == AssetMode.LOCAL
+        assert AssetResolver.get_instance().get_asset_url(*self.LOGO) == self.LOGO[0]
+
+    def test_watcher_signal_forces_reload(self, tmp_path):
+        """Test the configured signal re-reads the override file"""
+        import signal
+
+        import time
+
+        path = tmp_path / 'asset-mode.env'
+        reloaded = []
+        watcher = ConfigWatcher(str(path), interval=3600, signum=signal.SIGUSR1, on_reload=reloaded.append).start()
+        try:
+            path.write_text('ASSET_MODE=local\n')
+            os.kill(os.getpid(), signal.SIGUSR1)
+            deadline = time.monotonic() + 5
+            while not reloaded and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            watcher.stop()
+
+        assert AssetResolver.get_instance().get_asset_mode() == AssetMode.LOCAL
+        assert watcher.stats().reloads == 1
+
+    def test_watcher_signal_reloads_off_handler(self, monkeypatch):
+        """Test a signal-only watcher reloads on its own thread, never inside the handler"""
+        import signal
+        import threading
+        import time
+
+        threads = []
+        watcher = ConfigWatcher(signum=signal.SIGUSR1, on_reload=lambda config: threads.append(threading.current_thread()))
+        watcher.start()
+        try:
+            monkeypatch.setenv('ASSET_MODE', 'local')
+            os.kill(os.getpid(), signal.SIGUSR1)
+            deadline = time.monotonic() + 5
+            while not threads and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            watcher.stop()
+
+        assert AssetResolver.get_instance().get_asset_mode() == AssetMode.LOCAL
+        assert threads and threads[0] is not threading.main_thread()
+
+    def test_batch_in_flight_keeps_its_snapshot(self):
+        """Test a reload mid-batch does not change the rest of that batch"""
+        resolver = AssetResolver.get_instance()
+        urls = resolver.iter_resolve([self.LOGO] * 3)
+
+        first = next(urls)
+        resolver.reload_config({'ENVIRONMENT': 'production', 'ASSET_MODE': 'local'})
+        assert [first, *urls] == [self.LOGO[1]] * 3
+        assert resolver.get_asset_url(*self.LOGO) == self.LOGO[0]
+
+    def test_concurrent_reads_during_switches(self):
+        """Test readers only ever see a URL valid for one of the configs"""
+        import threading
+
+        resolver = AssetResolver.get_instance()
+        stop = threading.Event()
+        seen = set()
+
+        def reader():
+            while not stop.is_set():
+                seen.add(resolver.get_asset_url(*self.LOGO))
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for i in range(200):
+            resolver.reload_config({'ENVIRONMENT': 'production', 'ASSET_MODE': 'local' if i % 2 else 'cdn'})
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        assert seen <= set(self.LOGO)
+
+
 class TestAssetModeDetection:
     """Test asset mode detection logic"""
 
@@ -389,6 +651,174 @@ class TestBatchResolution:
         assert urls[1] == 'https://cdn.example.com/banner.jpg'
 
 
+class TestColumnarResolution:
+    """Test columnar and tuple-based batch resolution"""
+
+    @pytest.fixture(autouse=True)
+    def setup_dev_env(self, monkeypatch):
+        """Setup development environment"""
+        monkeypatch.setenv('ENVIRONMENT', 'development')
+        monkeypatch.delenv('ASSET_MODE', raising=False)
+        AssetResolver.reset_instance()
+        yield
+        AssetResolver.reset_instance()
+
+    def test_columns_with_single_env_mode(self):
+        """Test parallel columns with one env mode for all rows"""
+        urls = resolve_asset_columns(
+            ['/media/logo.png', '/media/banner.jpg'],
+            ['https://cdn.example.com/logo.png', 'https://cdn.example.com/banner.jpg'],
+            'cdn-always',
+        )
+        assert urls == ['https://cdn.example.com/logo.png', 'https://cdn.example.com/banner.jpg']
+
+    def test_columns_with_per_row_env_modes(self):
+        """Test parallel columns with one env mode per row"""
+        urls = resolve_asset_columns(
+            ['/media/logo.png', '/media/banner.jpg'],
+            ['https://cdn.example.com/logo.png', 'https://cdn.example.com/banner.jpg'],
+            ['cdn-production-local-dev', 'cdn-always'],
+        )
+        assert urls == ['/media/logo.png', 'https://cdn.example.com/banner.jpg']
+
+    def test_columns_reject_length_mismatch(self):
+        """Test columns of different lengths are rejected"""
+        with pytest.raises(ValueError):
+            resolve_asset_columns(['/media/logo.png'], [])
+
+    def test_rows_accept_two_and_three_tuples(self):
+        """Test tuple rows with and without env mode"""
+        urls = resolve_asset_rows([
+            ('/media/logo.png', 'https://cdn.example.com/logo.png'),
+            ('/media/icon.svg', 'https://cdn.example.com/icon.svg', 'cdn-always'),
+        ])
+        assert urls == ['/media/logo.png', 'https://cdn.example.com/icon.svg']
+
+    def test_lazy_returns_generator(self):
+        """Test lazy=True defers resolution"""
+        urls = resolve_asset_rows(iter([('/media/logo.png', 'https://cdn.example.com/logo.png')]), lazy=True)
+        assert not isinstance(urls, list)
+        assert list(urls) == ['/media/logo.png']
+
+    def test_matches_get_asset_url(self, monkeypatch):
+        """Test batch results agree with single resolution in every env mode"""
+        monkeypatch.setenv('ENVIRONMENT', 'production')
+        AssetResolver.reset_instance()
+        resolver = AssetResolver.get_instance()
+        rows = [
+            ('/media/a.png', 'https://cdn.example.com/a.png', mode)
+            for mode in ('cdn-production-local-dev', 'cdn-always', 'local-always')
+        ]
+        rows.append(('../bad.png', 'https://cdn.example.com/b.png', 'local-always'))
+
+        assert resolve_asset_rows(rows) == [resolver.get_asset_url(*row) for row in rows]
+
+    def test_validates_each_distinct_string_once(self, monkeypatch):
+        """Test repeated strings are validated a single time"""
+        resolver = AssetResolver.get_instance()
+        calls = []
+        original = resolver._validate_local_path
+        monkeypatch.setattr(resolver, '_validate_local_path', lambda p: calls.append(p) or original(p))
+
+        resolve_asset_columns(['/media/logo.png'] * 100, ['https://cdn.example.com/logo.png'] * 100)
+        assert calls == ['/media/logo.png']
+
+    def test_fallback_warns_once(self, monkeypatch, caplog):
+        """Test a repeated fallback logs a single warning"""
+        monkeypatch.setattr(assets_module, 'warning_limiter', WarningRateLimiter())
+        urls = resolve_asset_columns(['../bad.png'] * 3, ['https://cdn.example.com/logo.png'] * 3)
+
+        assert urls == ['https://cdn.example.com/logo.png'] * 3
+        assert caplog.text.count('Falling back') == 1
+
+    def test_raises_on_invalid_row(self):
+        """Test a row with no valid URL raises"""
+        with pytest.raises(ValueError):
+            resolve_asset_rows([('../bad.png', 'not-a-url')])
+
+
+class TestStreamingResolution:
+    """Test constant-memory streaming resolution"""
+
+    @pytest.fixture(autouse=True)
+    def setup_dev_env(self, monkeypatch):
+        """Setup development environment"""
+        monkeypatch.setenv('ENVIRONMENT', 'development')
+        monkeypatch.delenv('ASSET_MODE', raising=False)
+        AssetResolver.reset_instance()
+        yield
+        AssetResolver.reset_instance()
+
+    BAD_ROWS = [
+        {'local_path': '/media/logo.png', 'cdn_url': 'https://cdn.example.com/logo.png'},
+        {'local_path': '../bad.png', 'cdn_url': 'not-a-url'},
+        ('/media/icon.svg', 'https://cdn.example.com/icon.svg', 'cdn-always'),
+        ('too-short',),
+    ]
+
+    def test_streams_dicts_and_tuples(self):
+        """Test mixed dict and tuple configs"""
+        urls = stream_resolve_assets(iter([self.BAD_ROWS[0], self.BAD_ROWS[2]]))
+        assert next(urls) == '/media/logo.png'
+        assert next(urls) == 'https://cdn.example.com/icon.svg'
+
+    def test_on_error_raise(self):
+        """Test the default policy raises on the first bad row"""
+        urls = stream_resolve_assets(self.BAD_ROWS)
+        assert next(urls) == '/media/logo.png'
+        with pytest.raises(ValueError):
+            next(urls)
+
+    def test_on_error_skip(self):
+        """Test bad rows are dropped"""
+        urls = list(stream_resolve_assets(self.BAD_ROWS, on_error='skip'))
+        assert urls == ['/media/logo.png', 'https://cdn.example.com/icon.svg']
+
+    def test_on_error_sentinel(self):
+        """Test bad rows are replaced by the sentinel, keeping alignment"""
+        marker = object()
+        urls = list(stream_resolve_assets(self.BAD_ROWS, on_error='sentinel', sentinel=marker))
+        assert urls == ['/media/logo.png', marker, 'https://cdn.example.com/icon.svg', marker]
+
+    def test_rejects_unknown_policy(self):
+        """Test an unknown on_error value fails eagerly"""
+        with pytest.raises(ValueError):
+            stream_resolve_assets([], on_error='ignore')
+
+    def test_reads_jsonl_lazily(self, tmp_path):
+        """Test streaming straight from a JSONL file"""
+        import json
+
+        path = tmp_path / 'assets.jsonl'
+        path.write_text(''.join(
+            json.dumps({'local_path': f'/media/{i}.png', 'cdn_url': f'https://cdn.example.com/{i}.png'}) + '\n'
+            for i in range(10)
+        ))
+        with open(path) as f:
+            urls = list(stream_resolve_assets(json.loads(line) for line in f))
+
+        assert urls == [f'/media/{i}.png' for i in range(10)]
+
+    def test_memory_stays_flat(self):
+        """Test peak memory does not grow with the number of distinct rows"""
+        import tracemalloc
+
+        AssetResolver.get_instance().batch_memo_size = 1024
+
+        def peak(size):
+            rows = ((f'/media/{i}.png', f'https://cdn.example.com/{i}.png') for i in range(size))
+            tracemalloc.start()
+            for _ in stream_resolve_assets(rows):
+                pass
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak_bytes
+
+        small = peak(20_000)
+        large = peak(100_000)
+        assert large < small * 1.5
+
+
 class TestEdgeCases:
     """Test edge cases and fallback behavior"""
 
@@ -398,18 +828,513 @@ class TestEdgeCases:
         AssetResolver.reset_instance()
         self.resolver = AssetResolver.get_instance()
 
-    def test_falls_back_when_one_path_invalid(self, capsys):
+    def test_falls_back_when_one_path_invalid(self, monkeypatch, caplog):
         """Test graceful fallback when one path is invalid"""
+        monkeypatch.setattr(assets_module, 'warning_limiter', WarningRateLimiter())
         url = self.resolver.get_asset_url(
             '../invalid',
             'https://cdn.example.com/logo.png'
         )
         assert url == 'https://cdn.example.com/logo.png'
 
-        # Check that warning was printed
-        captured = capsys.readouterr()
-        assert 'Warning' in captured.out or 'Falling back' in captured.out
+        # Check that warning was logged
+        assert 'Warning' in caplog.text or 'Falling back' in caplog.text
+
+
+class TestResolutionCache:
+    """Test memoized URL resolution"""
+
+    @pytest.fixture(autouse=True)
+    def setup_dev_env(self, monkeypatch):
+        """Setup development environment"""
+        monkeypatch.setenv('ENVIRONMENT', 'development')
+        monkeypatch.delenv('ASSET_MODE', raising=False)
+        AssetResolver.reset_instance()
+        yield
+        AssetResolver.reset_instance()
+
+    def test_repeat_lookup_hits_cache(self):
+        """Test that a repeated resolution is served from the cache"""
+        resolver = AssetResolver.get_instance()
+        for _ in range(3):
+            url = resolver.get_asset_url('/media/logo.png', 'https://cdn.example.com/logo.png')
+
+        assert url == '/media/logo.png'
+        info = resolver.cache_info()
+        assert info.misses == 1
+        assert info.hits == 2
+        assert info.currsize == 1
+
+    def test_env_mode_is_part_of_key(self):
+        """Test that different env modes are cached separately"""
+        resolver = AssetResolver.get_instance()
+        local = resolver.get_asset_url('/media/logo.png', 'https://cdn.example.com/logo.png')
+        cdn = resolver.get_asset_url('/media/logo.png', 'https://cdn.example.com/logo.png', 'cdn-always')
+
+        assert local == '/media/logo.png'
+        assert cdn == 'https://cdn.example.com/logo.png'
+        assert resolver.cache_info().currsize == 2
+
+    def test_respects_asset_mode_override(self):
+        """Test that changing the asset mode bypasses stale entries"""
+        resolver = AssetResolver.get_instance()
+        assert resolver.get_asset_url('/media/logo.png', 'https://cdn.example.com/logo.png') == '/media/logo.png'
+
+        resolver.asset_mode = AssetMode.CDN
+        assert resolver.get_asset_url('/media/logo.png', 'https://cdn.example.com/logo.png') == 'https://cdn.example.com/logo.png'
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = ResolutionCache(maxsize=2)
+        cache.put('a', '/a.png')
+        cache.put('b', '/b.png')
+        cache.get('a')
+        cache.put('c', '/c.png')
+
+        assert cache.get('b') is None
+        assert cache.get('a') == '/a.png'
+        assert cache.get('c') == '/c.png'
+        assert len(cache) == 2
+
+    def test_rejects_non_positive_size(self):
+        """Test that a zero-sized cache is rejected"""
+        with pytest.raises(ValueError):
+            ResolutionCache(maxsize=0)
+
+    def test_cache_size_from_environment(self, monkeypatch):
+        """Test ASSET_CACHE_SIZE configures the cache bound"""
+        monkeypatch.setenv('ASSET_CACHE_SIZE', '16')
+        AssetResolver.reset_instance()
+        assert AssetResolver.get_instance().cache_info().maxsize == 16
+
+    def test_reset_instance_clears_cache(self):
+        """Test that reset_instance invalidates cached resolutions"""
+        resolver = AssetResolver.get_instance()
+        resolver.get_asset_url('/media/logo.png', 'https://cdn.example.com/logo.png')
+        AssetResolver.reset_instance()
+
+        assert resolver.cache_info().currsize == 0
+        assert AssetResolver.get_instance().cache_info().currsize == 0
+
+    def test_invalid_assets_are_not_cached(self):
+        """Test that resolution errors are raised on every call"""
+        resolver = AssetResolver.get_instance()
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                resolver.get_asset_url('../invalid', 'not-a-url')
+
+        assert resolver.cache_info().currsize == 0
+
+    def test_thread_safe_under_contention(self):
+        """Test concurrent resolutions through a tiny cache stay consistent"""
+        import threading
+
+        AssetResolver.reset_instance()
+        resolver = AssetResolver.get_instance()
+        resolver._cache = ResolutionCache(maxsize=8)
+        errors = []
+
+        def worker(offset):
+            try:
+                for i in range(500):
+                    n = (i + offset) % 32
+                    url = resolver.get_asset_url(f'/media/{n}.png', f'https://cdn.example.com/{n}.png')
+                    assert url == f'/media/{n}.png'
+            except Exception as exc:  # pragma: no cover - surfaced below
+                errors.append(exc)
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(resolver._cache) <= 8
+
+
+MANIFEST_YAML = """\
+project: website-portfolio
+version: "1.1"
+updated: 2025-01-24T16:00:00Z
+assets:
+  - path: public/media/logo.svg
+    r2_key: media-cdn/logos/logo.svg
+    cdn_url: https://cdn.example.com/logos/logo.svg
+    size: 15234
+    sha256: a1b2c3d4e5f6
+    type: media
+    dimensions: {width: 512, height: 512}
+  - path: public/images/profile.png
+    r2_key: website-portfolio/images/profile.png
+    cdn_url: https://cdn.example.com/portfolio/profile.png
+    size: 156234
+    sha256: 234567890123
+    type: media
+    env_mode: cdn-always
+  - path: data/models/whisper.bin
+    r2_key: website-portfolio/models/whisper.bin
+    size: 2847213568
+    sha256: c3d4e5f67890
+    type: model
+    env_mode: local-always
+"""
+
+
+class TestAssetIndex:
+    """Test manifest-driven asset index"""
+
+    @pytest.fixture(autouse=True)
+    def reset_resolver(self, monkeypatch):
+        """Reset singleton before each test"""
+        monkeypatch.delenv('ASSET_MODE', raising=False)
+        AssetResolver.reset_instance()
+        yield
+        AssetResolver.reset_instance()
+
+    @pytest.fixture
+    def manifest_path(self, tmp_path):
+        """Write a sample manifest to disk"""
+        pytest.importorskip('yaml')
+        path = tmp_path / '.r2-manifest.yml'
+        path.write_text(MANIFEST_YAML)
+        return str(path)
+
+    def test_resolves_local_urls_in_development(self, monkeypatch, manifest_path):
+        """Test development resolution strips the public/ web root"""
+        monkeypatch.setenv('ENVIRONMENT', 'development')
+        assets = AssetIndex.load(manifest_path)
+
+        assert assets['public/media/logo.svg'] == '/media/logo.svg'
+        assert assets['public/images/profile.png'] == 'https://cdn.example.com/portfolio/profile.png'
+        assert assets['data/models/whisper.bin'] == '/data/models/whisper.bin'
+
+    def test_resolves_cdn_urls_in_production(self, monkeypatch, manifest_path):
+        """Test production resolution uses CDN URLs except private/local-always assets"""
+        monkeypatch.setenv('ENVIRONMENT', 'production')
+        assets = AssetIndex.load(manifest_path)
+
+        assert assets['public/media/logo.svg'] == 'https://cdn.example.com/logos/logo.svg'
+        assert assets['data/models/whisper.bin'] == '/data/models/whisper.bin'
+        assert assets.environment == 'production'
+
+    def test_respects_asset_mode_override(self, monkeypatch, manifest_path):
+        """Test ASSET_MODE=local forces local URLs in production"""
+        monkeypatch.setenv('ENVIRONMENT', 'production')
+        monkeypatch.setenv('ASSET_MODE', 'local')
+        assets = AssetIndex.load(manifest_path)
+
+        assert assets['public/images/profile.png'] == '/images/profile.png'
+
+    def test_follows_config_reload(self, monkeypatch, manifest_path, tmp_path):
+        """Test a ConfigWatcher reload re-resolves the index like get_asset_url"""
+        monkeypatch.setenv('ENVIRONMENT', 'production')
+        assets = AssetIndex.load(manifest_path)
+        cached = assets.responsive('public/media/logo.svg')
+        override = tmp_path / 'asset-mode.env'
+        watcher = ConfigWatcher(str(override))
+
+        override.write_text('ASSET_MODE=local\n')
+        assert watcher.reload()
+        assert assets['public/media/logo.svg'] == '/media/logo.svg'
+        assert assets.responsive('public/media/logo.svg').src == '/media/logo.svg' != cached.src
+        assert assets.asset_mode == AssetMode.LOCAL
+
+        override.unlink()
+        assert watcher.reload()
+        assert assets['public/media/logo.svg'] == get_asset_url(
+            '/media/logo.svg', 'https://cdn.example.com/logos/logo.svg'
+        ) == 'https://cdn.example.com/logos/logo.svg'
+
+    def test_exposes_manifest_metadata(self, manifest_path):
+        """Test records keep manifest size, checksum and dimensions"""
+        assets = AssetIndex.load(manifest_path)
+        record = assets.record('public/media/logo.svg')
+
+        assert isinstance(record, AssetRecord)
+        assert record.size == 15234
+        assert record.sha256 == 'a1b2c3d4e5f6'
+        assert (record.width, record.height) == (512, 512)
+        assert assets.record('data/models/whisper.bin').cdn_url is None
+        assert assets.project == 'website-portfolio'
+        assert assets.updated == '2025-01-24T16:00:00Z'
+
+    def test_mapping_protocol(self, manifest_path):
+        """Test len, membership, iteration and get()"""
+        assets = AssetIndex.load(manifest_path)
+
+        assert len(assets) == 3
+        assert 'public/media/logo.svg' in assets
+        assert 'missing.png' not in assets
+        assert assets.get('missing.png') is None
+        assert set(assets) == {r.key for r in assets.records()}
+        with pytest.raises(KeyError):
+            assets['missing.png']
+
+    def test_records_use_slots(self):
+        """Test records carry no per-instance __dict__"""
+        record = AssetRecord('a.png', '/a.png', '/a.png')
+        assert not hasattr(record, '__dict__')
+
+    def test_rejects_unresolvable_asset(self):
+        """Test an asset with neither a valid local path nor CDN URL fails to load"""
+        with pytest.raises(ValueError):
+            AssetIndex.from_manifest({
+                'assets': [{'path': '../escape.png', 'cdn_url': 'not-a-url'}]
+            })
+
+    def test_rejects_malformed_manifest(self):
+        """Test non-list assets are rejected"""
+        with pytest.raises(ValueError):
+            AssetIndex.from_manifest({'assets': 'nope'})
+
+
+class TestManifestSnapshot:
+    """Test compiled binary manifest snapshots"""
+
+    @pytest.fixture(autouse=True)
+    def setup_dev_env(self, monkeypatch):
+        """Setup development environment"""
+        monkeypatch.setenv('ENVIRONMENT', 'development')
+        monkeypatch.delenv('ASSET_MODE', raising=False)
+        AssetResolver.reset_instance()
+        yield
+        AssetResolver.reset_instance()
+
+    @pytest.fixture
+    def manifest_path(self, tmp_path):
+        """Write a sample manifest to disk"""
+        pytest.importorskip('yaml')
+        path = tmp_path / '.r2-manifest.yml'
+        path.write_text(MANIFEST_YAML)
+        return str(path)
+
+    def test_default_snapshot_path(self):
+        """Test snapshot path sits next to the manifest"""
+        assert snapshot_path_for('/srv/app/.r2-manifest.yml') == '/srv/app/.r2-manifest.snapshot'
+
+    def test_round_trip_matches_yaml(self, manifest_path):
+        """Test snapshot records decode to the same rows as YAML"""
+        from_yaml = AssetIndex.load(manifest_path, snapshot=False)
+        compile_manifest_snapshot(manifest_path)
+
+        with AssetSnapshot(snapshot_path_for(manifest_path)) as snap:
+            assert len(snap) == 3
+            assert snap.project == 'website-portfolio'
+            assert snap.updated == '2025-01-24T16:00:00Z'
+            keys = [row[0] for row in snap.rows()]
+            assert keys == sorted(keys)
+
+        from_snapshot = AssetIndex.load(manifest_path)
+        for key in from_yaml:
+            expected = from_yaml.record(key)
+            actual = from_snapshot.record(key)
+            for field in AssetRecord.__slots__:
+                assert getattr(actual, field) == getattr(expected, field)
+        assert from_snapshot.record('public/media/logo.svg').r2_key == 'media-cdn/logos/logo.svg'
+
+    def test_load_skips_yaml_when_snapshot_fresh(self, manifest_path, monkeypatch):
+        """Test a fresh snapshot is used without parsing YAML"""
+        import lib.assets
+
+        compile_manifest_snapshot(manifest_path)
+
+        def fail(path):
+            raise AssertionError('YAML should not be parsed')
+
+        monkeypatch.setattr(lib.assets, '_load_manifest_yaml', fail)
+        assets = AssetIndex.load(manifest_path)
+        assert assets['public/media/logo.svg'] == '/media/logo.svg'
+
+    def test_stale_snapshot_falls_back_to_yaml(self, manifest_path):
+        """Test a changed manifest invalidates the snapshot"""
+        compile_manifest_snapshot(manifest_path)
+        with open(manifest_path, 'a') as f:
+            f.write(
+                "  - path: public/media/new.png\n"
+                "    r2_key: website-portfolio/new.png\n"
+                "    size: 10\n"
+                "    sha256: ffff\n"
+                "    type: media\n"
+            )
+
+        assets = AssetIndex.load(manifest_path)
+        assert assets['public/media/new.png'] == '/media/new.png'
+
+    def test_corrupt_snapshot_falls_back_to_yaml(self, manifest_path):
+        """Test an unreadable snapshot is ignored"""
+        with open(snapshot_path_for(manifest_path), 'wb') as f:
+            f.write(b'not a snapshot')
 
+        assets = AssetIndex.load(manifest_path)
+        assert len(assets) == 3
+
+    def test_rejects_wrong_magic(self, tmp_path):
+        """Test AssetSnapshot refuses foreign files"""
+        path = tmp_path / 'bogus.snapshot'
+        path.write_bytes(b'\0' * 256)
+        with pytest.raises(ValueError):
+            AssetSnapshot(str(path))
+
+
+class TestFingerprinting:
+    """Test content-fingerprinted CDN URLs"""
+
+    @pytest.fixture(autouse=True)
+    def production(self, monkeypatch):
+        """Resolve in production with query fingerprints"""
+        monkeypatch.setenv('ENVIRONMENT', 'production')
+        monkeypatch.setenv('ASSET_FINGERPRINT', 'query')
+        monkeypatch.delenv('ASSET_MODE', raising=False)
+        AssetResolver.reset_instance()
+        yield
+        AssetResolver.reset_instance()
+
+    @pytest.fixture
+    def manifest_path(self, tmp_path):
+        """Write the sample manifest"""
+        path = tmp_path / '.r2-manifest.yml'
+        path.write_text(MANIFEST_YAML)
+        return str(path)
+
+    def test_query_style(self):
+        """Test the hash is added as the first query parameter"""
+        assert fingerprint_url('https://cdn.example.com/a.png', 'A1B2C3D4E5F6A7') == 'https://cdn.example.com/a.png?v=a1b2c3d4e5f6'
+        assert fingerprint_url('https://cdn.example.com/a.png?w=2#x', 'a1b2c3d4e5f6') == 'https://cdn.example.com/a.png?v=a1b2c3d4e5f6&w=2#x'
+
+    def test_path_style(self):
+        """Test the hash is inserted before the extension"""
+        assert fingerprint_url('https://cdn.example.com/a.min.js', 'a1b2c3d4e5f6', 'path') == 'https://cdn.example.com/a.min.a1b2c3d4e5f6.js'
+        assert fingerprint_url('https://cdn.example.com/LICENSE', 'a1b2c3d4e5f6', 'path') == 'https://cdn.example.com/LICENSE.a1b2c3d4e5f6'
+
+    def test_ignores_non_hex_digest(self):
+        """Test a malformed sha256 or style 'off' leaves the URL unchanged"""
+        assert fingerprint_url('https://cdn.example.com/a.png', 'not-a-hash') == 'https://cdn.example.com/a.png'
+        assert fingerprint_url('https://cdn.example.com/a.png', 'a1b2c3d4e5f6', 'off') == 'https://cdn.example.com/a.png'
+
+    def test_config_reads_env(self):
+        """Test ASSET_FINGERPRINT selects the style and unknown values disable it"""
+        assert AssetResolver.get_instance().config.fingerprint == 'query'
+        assert ResolverConfig.from_env({'ASSET_FINGERPRINT': 'bogus'}).fingerprint == 'off'
+
+    def test_index_urls_are_fingerprinted(self, manifest_path):
+        """Test AssetIndex fingerprints CDN URLs and leaves local paths alone"""
+        assets = AssetIndex.load(manifest_path)
+
+        assert assets['public/media/logo.svg'] == 'https://cdn.example.com/logos/logo.svg?v=a1b2c3d4e5f6'
+        assert assets['data/models/whisper.bin'] == '/data/models/whisper.bin'
+        assert assets.record('public/media/logo.svg').cdn_url == 'https://cdn.example.com/logos/logo.svg'
+
+    def test_resolver_uses_manifest_digests(self, manifest_path):
+        """Test get_asset_url() and batches pick up fingerprints from a loaded manifest"""
+        AssetIndex.load(manifest_path)
+        logo = ('/media/logo.svg', 'https://cdn.example.com/logos/logo.svg')
+
+        assert get_asset_url(*logo) == 'https://cdn.example.com/logos/logo.svg?v=a1b2c3d4e5f6'
+        assert resolve_asset_rows([logo]) == ['https://cdn.example.com/logos/logo.svg?v=a1b2c3d4e5f6']
+        assert get_asset_url('/x.png', 'https://cdn.example.com/x.png') == 'https://cdn.example.com/x.png'
+
+    def test_off_by_default(self, monkeypatch, manifest_path):
+        """Test URLs are unchanged without ASSET_FINGERPRINT"""
+        monkeypatch.delenv('ASSET_FINGERPRINT')
+        AssetResolver.reset_instance()
+
+        assets = AssetIndex.load(manifest_path)
+        assert assets['public/media/logo.svg'] == 'https://cdn.example.com/logos/logo.svg'
+        assert get_asset_url('/media/logo.svg', 'https://cdn.example.com/logos/logo.svg') == 'https://cdn.example.com/logos/logo.svg'
+
+    def test_hot_switch_rebuilds_urls(self, manifest_path):
+        """Test switching style precomputes new URLs from registered digests"""
+        AssetIndex.load(manifest_path)
+        resolver = AssetResolver.get_instance()
+
+        resolver.reload_config({'ENVIRONMENT': 'production', 'ASSET_FINGERPRINT': 'path'})
+        url = resolver.get_asset_url('/media/logo.svg', 'https://cdn.example.com/logos/logo.svg')
+        assert url == 'https://cdn.example.com/logos/logo.a1b2c3d4e5f6.svg'
+
+class TestResponsiveImages:
+    """Test srcset/sizes/width/height generation"""
+
+    HERO = ('/media/hero.jpg', 'https://cdn.example.com/hero.jpg', 1600, 900)
+
+    @pytest.fixture(autouse=True)
+    def reset_resolver(self, monkeypatch):
+        """Resolve in production without overrides"""
+        monkeypatch.setenv('ENVIRONMENT', 'production')
+        monkeypatch.delenv('ASSET_MODE', raising=False)
+        monkeypatch.delenv('ASSET_FINGERPRINT', raising=False)
+        AssetResolver.reset_instance()
+        yield
+        AssetResolver.reset_instance()
+
+    def test_cdn_variants_below_intrinsic_width(self):
+        """Test only breakpoints below the intrinsic width are emitted, plus the original"""
+        image = get_responsive_image(*self.HERO, breakpoints=Breakpoints(widths=(640, 1280, 1920)))
+
+        assert image.variants == (
+            (640, 'https://cdn.example.com/hero.jpg?w=640'),
+            (1280, 'https://cdn.example.com/hero.jpg?w=1280'),
+            (1600, 'https://cdn.example.com/hero.jpg'),
+        )
+        assert image.srcset.endswith('https://cdn.example.com/hero.jpg 1600w')
+        assert (image.src, image.width, image.height) == ('https://cdn.example.com/hero.jpg', 1600, 900)
+
+    def test_local_lists_only_original(self, monkeypatch):
+        """Test local paths are not resized"""
+        monkeypatch.setenv('ENVIRONMENT', 'development')
+        AssetResolver.reset_instance()
+
+        image = get_responsive_image(*self.HERO)
+        assert image.srcset == '/media/hero.jpg 1600w'
+
+    def test_cloudflare_resizing(self):
+        """Test the Cloudflare Image Resizing URL scheme"""
+        breakpoints = Breakpoints(widths=(640,), resize='cloudflare')
+        image = get_responsive_image(*self.HERO, breakpoints=breakpoints)
+
+        assert image.variants[0] == (640, 'https://cdn.example.com/cdn-cgi/image/width=640,fit=scale-down/hero.jpg')
+
+    def test_cached_per_environment(self):
+        """Test repeat calls return the cached object until the config changes"""
+        resolver = AssetResolver.get_instance()
+        first = resolver.get_responsive_image(*self.HERO)
+
+        assert resolver.get_responsive_image(*self.HERO) is first
+        resolver.environment = 'development'
+        assert resolver.get_responsive_image(*self.HERO).src == '/media/hero.jpg'
+
+    def test_html_attributes(self):
+        """Test attributes render escaped, with a sizes override"""
+        image = get_responsive_image(*self.HERO, breakpoints=Breakpoints(widths=(640,)))
+
+        html = image.html(sizes='(min-width: 960px) 50vw, 100vw')
+        assert 'width="1600" height="900"' in html
+        assert 'sizes="(min-width: 960px) 50vw, 100vw"' in html
+        assert image.attrs()['sizes'] == '100vw'
+
+    def test_rejects_bad_input(self):
+        """Test invalid dimensions and breakpoint settings raise"""
+        with pytest.raises(ValueError):
+            get_responsive_image('/media/hero.jpg', 'https://cdn.example.com/hero.jpg', 0, 900)
+        with pytest.raises(ValueError):
+            Breakpoints(resize='imgix')
+        with pytest.raises(ValueError):
+            Breakpoints(widths=())
+
+    def test_index_uses_manifest_dimensions(self, tmp_path):
+        """Test AssetIndex builds and caches images from manifest dimensions"""
+        path = tmp_path / '.r2-manifest.yml'
+        path.write_text(MANIFEST_YAML)
+        assets = AssetIndex.load(str(path))
+
+        image = assets.responsive('public/media/logo.svg')
+        assert (image.width, image.height) == (512, 512)
+        assert [w for w, _ in image.variants] == [320, 512]
+        assert assets.responsive('public/media/logo.svg') is image
+        assert assets.precompute_responsive() == 1
+
+        with pytest.raises(ValueError):
+            assets.responsive('public/images/profile.png')
 
 # Integration tests
 class TestIntegration:
@@ -448,3 +1373,41 @@ class TestIntegration:
             'local-always'  # Always use local for ML models
         )
         assert model_path == 'data/models/whisper-large.bin'
+
+
+class TestWarningRateLimiter:
+    """Test resolver warnings are logged with a budget"""
+
+    def test_drops_warnings_over_limit(self, caplog):
+        """Test only `limit` warnings are logged per window"""
+        limiter = WarningRateLimiter(limit=3, interval=3600)
+
+        logged = [limiter.warn(f'[AssetResolver] Warning: Falling back to local path: /m/{i}.png') for i in range(10)]
+
+        assert logged == [True] * 3 + [False] * 7
+        assert caplog.text.count('Falling back') == 3
+        assert limiter.suppressed == 7
+
+    def test_summarizes_dropped_warnings_in_next_window(self, caplog):
+        """Test the next window starts with a suppressed-count summary"""
+        limiter = WarningRateLimiter(limit=1, interval=3600)
+        limiter.warn('first')
+        limiter.warn('dropped')
+        limiter._window_start -= 3600
+
+        assert limiter.warn('second')
+        assert '1 similar warnings suppressed' in caplog.text
+        assert 'dropped' not in caplog.messages
+
+    def test_bad_template_cannot_flood_logs(self, monkeypatch, caplog):
+        """Test thousands of fallbacks log a bounded number of lines"""
+        monkeypatch.setenv('ENVIRONMENT', 'development')
+        monkeypatch.setattr(assets_module, 'warning_limiter', WarningRateLimiter(limit=5))
+        AssetResolver.reset_instance()
+        resolver = AssetResolver.get_instance()
+
+        for i in range(1000):
+            resolver.get_asset_url(f'../bad{i}.png', f'https://cdn.example.com/{i}.png')
+
+        assert len(caplog.records) == 5
+        assert all(record.name == 'lib.assets' for record in caplog.records)
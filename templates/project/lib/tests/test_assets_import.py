@@ -0,0 +1,117 @@
+"""
+Test Suite for the Import-Time Budget of lib/assets.py
+
+Every worker, cron job and CLI tool imports lib.assets, so importing it must
+stay cheap: no logging, URL parsing, hashing, YAML or HTTP modules, and no
+environment detection until the resolver is first used.
+
+Run tests:
+    pytest tests/test_assets_import.py -v
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Cumulative `-X importtime` microseconds for lib.assets, including the
+# stdlib modules it pulls in. Measured as this test does (cumulative column
+# of `python -X importtime -c 'import lib.assets'`, best of warm runs) on
+# Python 3.11 in a 1-CPU container: 33-38ms, ~65ms before the lazy imports.
+# The default leaves ~25% headroom over that, so eager heavy imports coming
+# back fail the test. Override with ASSET_IMPORT_BUDGET_MS on slower machines.
+IMPORT_BUDGET_US = int(float(os.environ.get('ASSET_IMPORT_BUDGET_MS', '45')) * 1000)
+
+# Must not be loaded by `import lib.assets`
+LAZY_MODULES = (
+    'logging',
+    'urllib.parse',
+    'hashlib',
+    'mmap',
+    'yaml',
+    'http.client',
+    'ssl',
+    'asyncio',
+    'concurrent.futures',
+    'lib.asset_metrics',
+    'lib.asset_presign',
+    'lib.asset_probe',
+    'lib.asset_shard',
+    'lib.asset_sync',
+    'lib.asset_variants',
+    'lib.asset_verify',
+)
+
+
+def run_python(code, *flags):
+    environ = dict(os.environ, PYTHONDONTWRITEBYTECODE='')
+    return subprocess.run(
+        [sys.executable, *flags, '-c', code],
+        cwd=PROJECT_ROOT,
+        env=environ,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+class TestImportCost:
+    """Test what importing lib.assets loads and how long it takes"""
+
+    def test_heavy_modules_stay_unloaded(self):
+        """Test lazily imported modules are absent after import"""
+        output = run_python(
+            'import sys; before = set(sys.modules); import lib.assets; '
+            'print("\\n".join(sorted(set(sys.modules) - before)))'
+        ).stdout.split()
+
+        assert 'lib.assets' in output
+        assert [name for name in LAZY_MODULES if name in output] == []
+
+    def test_environment_not_read_at_import(self):
+        """Test environment detection waits for the first resolver use"""
+        code = (
+            'import os\n'
+            'class Recording(dict):\n'
+            '    reads = []\n'
+            '    def get(self, key, default=None):\n'
+            '        self.reads.append(key)\n'
+            '        return super().get(key, default)\n'
+            '    def __getitem__(self, key):\n'
+            '        self.reads.append(key)\n'
+            '        return super().__getitem__(key)\n'
+            'os.environ = Recording(os.environ)\n'
+            'import lib.assets\n'
+            'assert lib.assets.AssetResolver._instance is None\n'
+            'print(len(os.environ.reads))\n'
+            'lib.assets.get_asset_url("/a.png", "https://cdn.example.com/a.png")\n'
+            'print(len(os.environ.reads))\n'
+        )
+        at_import, after_use = run_python(code).stdout.split()
+
+        assert at_import == '0'
+        assert int(after_use) > 0
+
+    def test_import_time_budget(self):
+        """Test `-X importtime` stays within the budget (best of 3 runs)"""
+        pattern = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \| lib\.assets$', re.MULTILINE)
+        runs = []
+        for _ in range(3):
+            # The first run may write bytecode; the best run reflects a warm start
+            match = pattern.search(run_python('import lib.assets', '-X', 'importtime').stderr)
+            assert match, 'lib.assets missing from -X importtime output'
+            runs.append(int(match.group(1)))
+
+        assert min(runs) <= IMPORT_BUDGET_US, f'import lib.assets took {min(runs) / 1000:.1f} ms'
+
+    def test_logger_still_available(self):
+        """Test `lib.assets.logger` is created on first access"""
+        from lib import assets
+
+        assert assets.logger.name == 'lib.assets'
+        with pytest.raises(AttributeError):
+            assets.no_such_attribute
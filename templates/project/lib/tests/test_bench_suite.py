@@ -0,0 +1,85 @@
+"""
+Test Suite for the Benchmark Baselines and Regression Threshold
+
+Run tests:
+    pytest tests/test_bench_suite.py -v
+"""
+
+import json
+
+import pytest
+from lib.benchmarks import bench_suite
+from lib.benchmarks.bench_suite import Regression, compare, load_baseline, main, save_baseline
+
+
+class TestCompare:
+    """Test regression detection against a baseline"""
+
+    def test_threshold(self):
+        """Test only cases slower than the threshold are reported"""
+        baseline = {'fast': 1e-6, 'slow': 1e-6, 'edge': 1e-6, 'gone': 1e-6}
+        results = {'fast': 0.5e-6, 'slow': 2e-6, 'edge': 1.2e-6, 'new': 9.0}
+
+        assert compare(results, baseline, 0.25) == [Regression('slow', 1e-6, 2e-6, 2.0)]
+        assert [r.name for r in compare(results, baseline, 0.1)] == ['slow', 'edge']
+
+
+class TestBaselines:
+    """Test saving and loading baselines"""
+
+    def test_round_trip_and_merge(self, tmp_path):
+        """Test saves merge with earlier cases from the same machine"""
+        path = str(tmp_path / '.benchmarks' / 'assets.json')
+        save_baseline({'a': 1.0, 'b': 2.0}, path)
+        save_baseline({'b': 3.0}, path)
+
+        baseline = load_baseline(path)
+        assert baseline['results'] == {'a': 1.0, 'b': 3.0}
+        assert baseline['machine'] == bench_suite.machine()
+
+    def test_other_machine_not_merged(self, tmp_path):
+        """Test a baseline from another machine is replaced, not mixed in"""
+        path = tmp_path / 'assets.json'
+        path.write_text(json.dumps({'version': 1, 'machine': {'cpus': -1}, 'results': {'a': 1.0}}))
+        save_baseline({'b': 2.0}, str(path))
+
+        assert load_baseline(str(path))['results'] == {'b': 2.0}
+
+    def test_rejects_foreign_files(self, tmp_path):
+        """Test unrelated JSON is not mistaken for a baseline"""
+        path = tmp_path / 'assets.json'
+        path.write_text('[]')
+        with pytest.raises(ValueError):
+            load_baseline(str(path))
+
+
+class TestMain:
+    """Test the command line exit codes"""
+
+    @pytest.fixture
+    def fake_suite(self, monkeypatch):
+        timings = {'get_instance': 1e-7}
+        monkeypatch.setattr(bench_suite, 'run_suite', lambda full=False, only=None, repeat=5: {
+            name: seconds for name, seconds in timings.items() if not only or only in name
+        })
+        return timings
+
+    def test_save_then_compare(self, tmp_path, fake_suite, capsys):
+        """Test a saved baseline passes, then a confirmed slowdown fails"""
+        path = str(tmp_path / 'assets.json')
+        assert main(['--baseline', path]) == 0
+        assert 'run with --save' in capsys.readouterr().out
+
+        assert main(['--baseline', path, '--save']) == 0
+        assert main(['--baseline', path]) == 0
+
+        fake_suite['get_instance'] = 2e-7
+        assert main(['--baseline', path]) == 1
+        assert main(['--baseline', path, '--threshold', '1.5']) == 0
+
+    def test_real_case_runs(self, tmp_path):
+        """Test a real (filtered) case measures a positive time"""
+        results = bench_suite.run_suite(only='get_instance', repeat=1)
+
+        assert set(results) == {'get_instance', 'get_instance x8 threads'}
+        assert all(seconds > 0 for seconds in results.values())